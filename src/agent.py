@@ -101,7 +101,9 @@ class Agent:
 
         elif action_name == AgentAction.ANALYZE_NEWS:
             recent_news = "No recent news found"
-            retrieved = await self.memory_module.search("news", top_k=1)
+            retrieved = await self.memory_module.recent(
+                top_k=1, filters={"action": AgentAction.ANALYZE_NEWS.value}
+            )
             logger.debug(f"Retrieved memories: {retrieved}")
             if retrieved:
                 recent_news = retrieved[0]["event"]
@@ -125,6 +127,7 @@ class Agent:
     async def start_runtime_loop(self) -> None:
         """The main runtime loop for the agent."""
         logger.info("Starting the autonomous agent runtime loop...")
+        await self.memory_module.start()
         while True:
             try:
                 # 1. Choose an action
@@ -3,7 +3,15 @@ from typing import List
 from pydantic import field_validator
 from pydantic_settings import BaseSettings, SettingsConfigDict
 
-from src.core.defs import Environment, LLMProviderType, MemoryBackendType
+from src.core.defs import (
+    EmbeddingDtype,
+    EmbeddingProviderType,
+    Environment,
+    LLMProviderType,
+    MemoryBackendType,
+    RollupSummarizer,
+    VectorQuantization,
+)
 
 
 class Settings(BaseSettings):
@@ -55,22 +63,227 @@ class Settings(BaseSettings):
     #: Memory persist directory. Used only for ChromaDB.
     MEMORY_PERSIST_DIRECTORY: str = ".chromadb"
 
+    #: Memory directory of the local backend (empty keeps memories in memory only)
+    MEMORY_LOCAL_PATH: str = ".memory_store"
+
+    #: Number of memories preallocated by the local backend. The store doubles when full.
+    MEMORY_LOCAL_INITIAL_CAPACITY: int = 1024
+
+    #: Search large local stores through an approximate nearest-neighbour (IVF) index
+    MEMORY_LOCAL_ANN_INDEX: bool = False
+
+    #: Number of lists of the local index (0 picks about the square root of the memory count)
+    MEMORY_LOCAL_ANN_LISTS: int = 0
+
+    #: Number of local index lists searched per query. More is slower but more accurate.
+    MEMORY_LOCAL_ANN_NPROBE: int = 8
+
+    #: Number of memories from which the local index is used instead of an exact scan
+    MEMORY_LOCAL_ANN_MIN_SIZE: int = 50000
+
+    #: Factor by which the local store grows before its index is retrained in the background
+    MEMORY_LOCAL_ANN_REBUILD_GROWTH: float = 2.0
+
+    #: Quantization of stored memory vectors (none, int8 or pq). Used by Qdrant and the local
+    #: backend.
+    MEMORY_QUANTIZATION: VectorQuantization = VectorQuantization.NONE
+
+    #: Re-score this many times `top_k` quantized candidates with the full vectors (0 disables)
+    MEMORY_QUANTIZATION_RERANK: int = 4
+
+    #: Number of product quantization subvectors, i.e. bytes per vector. Used only for the local
+    #: backend (0 picks one per 16 dimensions).
+    MEMORY_PQ_SUBVECTORS: int = 0
+
+    #: SQLite file of the processed-signal index (empty keeps it in memory only)
+    SIGNAL_INDEX_PATH: str = "processed_signals.sqlite3"
+
+    #: Seconds a signal is remembered as processed (0 never expires)
+    SIGNAL_INDEX_TTL: int = 7 * 24 * 3600
+
+    #: Expected number of processed signals of the index's Bloom filter (0 disables the filter)
+    SIGNAL_INDEX_BLOOM_CAPACITY: int = 100000
+
+    #: Maximum number of analyzed signals read from memory to seed an empty processed-signal
+    #: index, so signals processed before the index existed aren't processed again
+    SIGNAL_INDEX_SEED_LIMIT: int = 10000
+
+    #: Maximum number of tokens of a memory chunk. Longer memories are split into chunks.
+    MEMORY_CHUNK_MAX_TOKENS: int = 512
+
+    #: Number of tokens consecutive chunks of a memory share
+    MEMORY_CHUNK_OVERLAP_TOKENS: int = 64
+
+    #: Number of chunks embedded and written to the backend per round trip during ingestion
+    MEMORY_INGEST_BATCH_SIZE: int = 64
+
+    #: Factor by which a search is widened when several hits are chunks of the same memory
+    MEMORY_CHUNK_SEARCH_OVERSAMPLE: int = 4
+
+    #: Maximum number of vector store calls running at the same time, per backend
+    MEMORY_BACKEND_MAX_CONCURRENCY: int = 4
+
+    #: Seconds to wait for a vector store read (0 waits forever). Writes are waited for until
+    #: they finish, as a write that timed out would still be committed.
+    MEMORY_BACKEND_TIMEOUT: float = 10.0
+
+    #: Buffer memory writes and store them in batches in the background
+    MEMORY_WRITE_BEHIND: bool = False
+
+    #: Maximum number of buffered memory writes. Further writes wait for a flush.
+    MEMORY_WRITE_BUFFER_SIZE: int = 256
+
+    #: Number of buffered memory writes that triggers a flush
+    MEMORY_WRITE_FLUSH_SIZE: int = 32
+
+    #: Seconds between flushes of the memory write buffer (0 flushes by size and on close only)
+    MEMORY_WRITE_FLUSH_INTERVAL: float = 5.0
+
+    #: File buffered memory writes are persisted to until flushed (empty keeps them in memory)
+    MEMORY_WRITE_SPILL_PATH: str = "memory_write_buffer.jsonl"
+
+    #: Number of failed flushes after which a buffered memory write is given up
+    MEMORY_WRITE_MAX_ATTEMPTS: int = 5
+
+    #: File given up memory writes are appended to (empty drops them)
+    MEMORY_WRITE_DEAD_LETTER_PATH: str = "memory_write_dead_letter.jsonl"
+
+    #: Flush buffered memory writes before searching, so searches see every stored memory
+    MEMORY_READ_YOUR_WRITES: bool = True
+
+    #: Keep a BM25 keyword index of stored memories, used for hybrid and lexical search
+    MEMORY_LEXICAL_INDEX: bool = False
+
+    #: File the keyword index's memories are persisted to (empty keeps them in memory)
+    MEMORY_LEXICAL_PATH: str = "memory_lexical.jsonl"
+
+    #: Rank offset of reciprocal rank fusion in hybrid search. Larger values flatten the ranks.
+    MEMORY_SEARCH_RRF_K: int = 60
+
+    #: Payload fields indexed for filtered memory search (Qdrant payload indexes, local backend
+    #: pre-filter indexes). Filters on other fields scan the payloads.
+    MEMORY_FILTER_INDEX_FIELDS: List[str] = ["action", "state", "parent_id"]
+
+    #: Run the memory lifecycle manager: merge repeated memories, roll up old ones into digests
+    MEMORY_LIFECYCLE: bool = False
+
+    #: Maximum number of recent memories kept in the hot tier, where repeats are merged
+    MEMORY_HOT_MAX_ENTRIES: int = 1024
+
+    #: Seconds a memory stays in the hot tier after it last occurred
+    MEMORY_HOT_TTL: float = 3600.0
+
+    #: Seconds after which memories are rolled up into digests (0 disables rollups)
+    MEMORY_ROLLUP_AGE: float = 7 * 24 * 3600.0
+
+    #: Seconds of memories summarized by one digest
+    MEMORY_ROLLUP_WINDOW: float = 24 * 3600.0
+
+    #: Maximum number of memories summarized by one digest. Larger windows are split.
+    MEMORY_ROLLUP_MAX_ENTRIES: int = 500
+
+    #: Maximum number of digests written per lifecycle run
+    MEMORY_ROLLUP_WINDOWS_PER_RUN: int = 8
+
+    #: Summarizer of rollup digests (`extractive` or `llm`)
+    MEMORY_ROLLUP_SUMMARIZER: RollupSummarizer = RollupSummarizer.EXTRACTIVE
+
+    #: Actions whose memories are never rolled up, e.g. ingested documents
+    MEMORY_ROLLUP_KEEP_ACTIONS: List[str] = ["store_file"]
+
+    #: Seconds between runs of the memory lifecycle manager
+    MEMORY_LIFECYCLE_INTERVAL: float = 300.0
+
     # --- LLMs settings ---
 
     LLM_PROVIDER: LLMProviderType = LLMProviderType.OPENAI
 
     #: Anthropic
     ANTHROPIC_API_KEY: str = ""
-    ANTHROPIC_MODEL: str = "claude-2"
+    ANTHROPIC_MODEL: str = "claude-3-5-sonnet-latest"
+    ANTHROPIC_MAX_TOKENS: int = 1024
 
     #: OpenAI
     OPENAI_API_KEY: str = ""
     OPENAI_MODEL: str = "gpt-4o-mini"
     OPENAI_EMBEDDING_MODEL: str = "text-embedding-3-small"
 
+    #: Embedding provider (openai, hashing or transformers)
+    EMBEDDING_PROVIDER: EmbeddingProviderType = EmbeddingProviderType.OPENAI
+
+    #: Local model directory for the transformers embedding provider
+    EMBEDDING_LOCAL_MODEL_PATH: str = ""
+
+    #: Shorten embeddings to this size (text-embedding-3 models only, 0 keeps the model's size)
+    EMBEDDING_DIMENSIONS: int = 0
+
+    #: Floating point type embeddings are kept in (float32 or float16)
+    EMBEDDING_DTYPE: EmbeddingDtype = EmbeddingDtype.FLOAT32
+
     #: xAI
     XAI_API_KEY: str = ""
     XAI_MODEL: str = "grok-2-latest"
+    XAI_BASE_URL: str = "https://api.x.ai/v1"
+
+    #: Maximum number of open connections per API client
+    LLM_HTTP_MAX_CONNECTIONS: int = 100
+
+    #: Maximum number of idle keep-alive connections per API client
+    LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS: int = 20
+
+    #: Seconds an idle keep-alive connection is kept open
+    LLM_HTTP_KEEPALIVE_EXPIRY: float = 30.0
+
+    #: Use HTTP/2 for API clients when the `h2` package is installed
+    LLM_HTTP2: bool = True
+
+    #: Providers to fall back to when `LLM_PROVIDER` fails or is slow (empty disables routing)
+    LLM_FALLBACK_PROVIDERS: List[LLMProviderType] = []
+
+    #: Seconds to wait for a provider before hedging with the next one (0 disables hedging)
+    LLM_ROUTER_HEDGE_DELAY: float = 0.0
+
+    #: Number of recent requests the provider latency and error statistics are computed over
+    LLM_ROUTER_WINDOW: int = 100
+
+    #: Consecutive failures after which a provider is skipped
+    LLM_CIRCUIT_FAILURE_THRESHOLD: int = 3
+
+    #: Seconds a failing provider is skipped before it is tried again
+    LLM_CIRCUIT_RESET_TIMEOUT: float = 60.0
+
+    #: Cache LLM responses
+    LLM_CACHE_ENABLED: bool = False
+
+    #: SQLite file the response cache is persisted to (empty keeps it in memory only)
+    LLM_CACHE_PATH: str = "llm_cache.sqlite3"
+
+    #: Maximum number of cached LLM responses
+    LLM_CACHE_MAX_ENTRIES: int = 1000
+
+    #: Seconds a cached LLM response stays valid (0 never expires)
+    LLM_CACHE_TTL: int = 3600
+
+    #: Minimum cosine similarity for reusing the response of a similar prompt (0 disables)
+    LLM_CACHE_SEMANTIC_THRESHOLD: float = 0.0
+
+    #: Cache embeddings by model and text content
+    EMBEDDING_CACHE_ENABLED: bool = True
+
+    #: Directory the embedding cache is persisted to (empty keeps it in memory only)
+    EMBEDDING_CACHE_PATH: str = ".embedding_cache"
+
+    #: Maximum number of embeddings kept in memory (the disk tier is unbounded)
+    EMBEDDING_CACHE_MAX_ENTRIES: int = 10000
+
+    #: Maximum number of texts sent in one embeddings request
+    EMBEDDING_BATCH_MAX_SIZE: int = 2048
+
+    #: Maximum estimated number of tokens sent in one embeddings request
+    EMBEDDING_BATCH_MAX_TOKENS: int = 300000
+
+    #: Maximum time in milliseconds to wait for more texts before sending an embeddings request
+    EMBEDDING_BATCH_MAX_WAIT_MS: int = 10
 
     # ==========================
     # Agent settings
@@ -199,6 +412,30 @@ class Settings(BaseSettings):
     LLAMA_MODEL_PATH: str = ""
     LLAMA_MAX_TOKENS: int = 512
 
+    #: Maximum number of Llama models kept resident at the same time
+    LLAMA_MAX_LOADED_MODELS: int = 1
+
+    #: Unload a resident Llama model after this many idle seconds (0 keeps it loaded)
+    LLAMA_MODEL_IDLE_TIMEOUT: int = 0
+
+    #: Evict resident Llama models when available RAM drops below this many GB (0 disables)
+    LLAMA_MIN_FREE_MEMORY_GB: float = 0.0
+
+    #: Maximum number of Llama generations running at the same time
+    LLAMA_MAX_CONCURRENCY: int = 1
+
+    #: Maximum number of Llama requests waiting for a free inference worker
+    LLAMA_MAX_QUEUE_SIZE: int = 16
+
+    #: Maximum number of concurrent Llama requests generated as one batch (1 disables batching)
+    LLAMA_BATCH_MAX_SIZE: int = 8
+
+    #: Maximum time in milliseconds to wait for more requests before generating a batch
+    LLAMA_BATCH_MAX_WAIT_MS: int = 20
+
+    #: Number of system-prompt prefixes whose key/value states are kept for reuse (0 disables)
+    LLAMA_PREFIX_CACHE_SIZE: int = 4
+
     # ==========================
     # Validators
     # ==========================
@@ -34,6 +34,45 @@ class MemoryBackendType(str, Enum):
 
     QDRANT = "qdrant"
     CHROMA = "chroma"
+    LOCAL = "local"
+
+
+class VectorQuantization(str, Enum):
+    """Quantization of stored memory vectors."""
+
+    NONE = "none"
+    INT8 = "int8"
+    PQ = "pq"
+
+
+class SearchMode(str, Enum):
+    """Retrieval used by memory search."""
+
+    HYBRID = "hybrid"
+    VECTOR = "vector"
+    LEXICAL = "lexical"
+
+
+class RollupSummarizer(str, Enum):
+    """Summarizer of memory rollup digests."""
+
+    EXTRACTIVE = "extractive"
+    LLM = "llm"
+
+
+class EmbeddingProviderType(str, Enum):
+    """Available embedding provider types."""
+
+    OPENAI = "openai"
+    HASHING = "hashing"
+    TRANSFORMERS = "transformers"
+
+
+class EmbeddingDtype(str, Enum):
+    """Floating point types embeddings are kept in."""
+
+    FLOAT32 = "float32"
+    FLOAT16 = "float16"
 
 
 class LLMProviderType(str, Enum):
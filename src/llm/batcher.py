@@ -0,0 +1,156 @@
+import asyncio
+import functools
+from dataclasses import dataclass, field
+from typing import Any, Awaitable, Callable, Dict, Generic, Hashable, List, Optional, TypeVar
+
+from loguru import logger
+
+ItemT = TypeVar("ItemT")
+ResultT = TypeVar("ResultT")
+
+#: Batch handler. Returns one result per item; an `Exception` result fails only that item.
+BatchHandler = Callable[[Hashable, List[ItemT]], Awaitable[List[Any]]]
+
+
+@dataclass
+class _PendingBatch(Generic[ItemT]):
+    """Items collected for one group while the batch window is open."""
+
+    items: List[ItemT] = field(default_factory=list)
+    futures: List[asyncio.Future] = field(default_factory=list)
+    weight: int = 0
+    timer: Optional[asyncio.TimerHandle] = None
+
+
+class RequestBatcher(Generic[ItemT, ResultT]):
+    """
+    Coalesce concurrent requests into batches.
+
+    Requests submitted with the same group key are collected for up to `max_wait_ms`
+    milliseconds or until `max_batch_size` requests are waiting, then handed to the batch
+    handler in one call. Each caller receives the result at its own position in the batch.
+    Batches can also be capped by a total item weight, e.g. an estimated token count.
+    """
+
+    def __init__(
+        self,
+        handler: BatchHandler[ItemT],
+        max_batch_size: int,
+        max_wait_ms: float,
+        name: str = "batcher",
+        weigher: Optional[Callable[[ItemT], int]] = None,
+        max_batch_weight: int = 0,
+    ):
+        """
+        Initialize the request batcher.
+
+        Args:
+            handler: Async callable receiving the group key and a list of items
+            max_batch_size: Maximum number of items in a batch
+            max_wait_ms: Maximum time to wait for more items after the first one arrives
+            name: Name used in log messages
+            weigher: Callable returning the weight of an item
+            max_batch_weight: Maximum total weight of a batch (0 disables the limit). A single
+                item heavier than the limit is dispatched in a batch of its own.
+        """
+        self.handler = handler
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max(0.0, max_wait_ms) / 1000
+        self.name = name
+        self.weigher = weigher
+        self.max_batch_weight = max(0, max_batch_weight)
+
+        self._pending: Dict[Hashable, _PendingBatch[ItemT]] = {}
+        self._running: Dict[asyncio.Task, List[asyncio.Future]] = {}
+
+    async def submit(self, item: ItemT, group: Hashable = None) -> ResultT:
+        """
+        Add an item to the current batch of its group and wait for its result.
+
+        Args:
+            item: The request item
+            group: Key of the group the item can be batched with
+
+        Returns:
+            ResultT: The result for this item
+        """
+        loop = asyncio.get_running_loop()
+        future: asyncio.Future = loop.create_future()
+        weight = self.weigher(item) if self.weigher and self.max_batch_weight else 0
+
+        batch = self._pending.get(group)
+        if batch is not None and batch.items and batch.weight + weight > self.max_batch_weight > 0:
+            # The item doesn't fit anymore, dispatch what has been collected so far
+            self._flush(group)
+            batch = None
+        if batch is None:
+            batch = self._pending[group] = _PendingBatch()
+            if self.max_batch_size > 1:
+                batch.timer = loop.call_later(self.max_wait, self._flush, group)
+        batch.items.append(item)
+        batch.futures.append(future)
+        batch.weight += weight
+
+        if len(batch.items) >= self.max_batch_size or batch.weight >= self.max_batch_weight > 0:
+            self._flush(group)
+
+        return await future
+
+    def _flush(self, group: Hashable) -> None:
+        """Close the batch window of a group and start its handler."""
+        batch = self._pending.pop(group, None)
+        if batch is None:
+            return
+        if batch.timer:
+            batch.timer.cancel()
+
+        # Callers that gave up while the window was open don't need a result
+        live = [(item, fut) for item, fut in zip(batch.items, batch.futures) if not fut.done()]
+        if not live:
+            return
+
+        items = [item for item, _ in live]
+        futures = [fut for _, fut in live]
+        logger.debug(f"{self.name}: dispatching batch of {len(items)}")
+
+        task = asyncio.ensure_future(self._run(group, items, futures))
+        self._running[task] = futures
+        task.add_done_callback(lambda t: self._running.pop(t, None))
+        for fut in futures:
+            fut.add_done_callback(functools.partial(self._cancel_if_abandoned, task))
+
+    async def _run(
+        self, group: Hashable, items: List[ItemT], futures: List[asyncio.Future]
+    ) -> None:
+        """Run the handler and route each result to its caller."""
+        try:
+            results = await self.handler(group, items)
+            if len(results) != len(items):
+                raise RuntimeError(
+                    f"{self.name}: handler returned {len(results)} results for {len(items)} items"
+                )
+        except asyncio.CancelledError:
+            for fut in futures:
+                if not fut.done():
+                    fut.cancel()
+            raise
+        except Exception as e:
+            for fut in futures:
+                if not fut.done():
+                    fut.set_exception(e)
+            return
+
+        for fut, result in zip(futures, results):
+            if fut.done():
+                continue
+            if isinstance(result, Exception):
+                fut.set_exception(result)
+            else:
+                fut.set_result(result)
+
+    def _cancel_if_abandoned(self, task: asyncio.Task, _: asyncio.Future) -> None:
+        """Cancel a running batch once every caller waiting on it has been cancelled."""
+        futures = self._running.get(task)
+        if futures and all(fut.cancelled() for fut in futures) and not task.done():
+            logger.debug(f"{self.name}: all callers cancelled, stopping batch")
+            task.cancel()
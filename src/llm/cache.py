@@ -0,0 +1,313 @@
+import asyncio
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Dict, List, Optional, Sequence
+
+import numpy as np
+from loguru import logger
+
+from src.core.config import settings
+from src.llm.embeddings import EmbeddingGenerator
+
+
+@dataclass
+class CacheStats:
+    """Hit and miss counters of a response cache."""
+
+    exact_hits: int = 0
+    semantic_hits: int = 0
+    misses: int = 0
+    evictions: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache."""
+        lookups = self.exact_hits + self.semantic_hits + self.misses
+        return (self.exact_hits + self.semantic_hits) / lookups if lookups else 0.0
+
+
+@dataclass
+class _CacheEntry:
+    """A cached response."""
+
+    key: str
+    scope: str
+    response: str
+    created_at: float
+    embedding: Optional[np.ndarray] = None
+
+
+class ResponseCache:
+    """
+    Two-tier cache of LLM responses.
+
+    The exact tier matches a hash of the provider, model, generation parameters and messages.
+    The optional semantic tier embeds the prompt and returns the response of the most similar
+    cached prompt with the same provider, model and parameters, if its cosine similarity reaches
+    the threshold. Entries expire after a TTL, are evicted in LRU order and are persisted to
+    SQLite so they survive restarts.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.LLM_CACHE_PATH,
+        max_entries: int = settings.LLM_CACHE_MAX_ENTRIES,
+        ttl: float = settings.LLM_CACHE_TTL,
+        semantic_threshold: float = settings.LLM_CACHE_SEMANTIC_THRESHOLD,
+        embedding_generator: Optional[EmbeddingGenerator] = None,
+    ):
+        """
+        Initialize the response cache.
+
+        Args:
+            path: SQLite file the cache is persisted to. An empty path keeps it in memory only.
+            max_entries: Maximum number of cached responses
+            ttl: Seconds a response stays valid (0 never expires)
+            semantic_threshold: Minimum cosine similarity for a semantic hit (0 disables the tier)
+            embedding_generator: Generator used to embed prompts for the semantic tier
+        """
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.ttl = ttl
+        self.semantic_threshold = semantic_threshold
+        self.embedding_generator = embedding_generator
+        if self.semantic_enabled and self.embedding_generator is None:
+            self.embedding_generator = EmbeddingGenerator()
+        self.stats = CacheStats()
+
+        self._entries: "OrderedDict[str, _CacheEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._db: Optional[sqlite3.Connection] = None
+        self._purge_pending = False
+        if path:
+            self._open(path)
+
+    @property
+    def semantic_enabled(self) -> bool:
+        """Whether near-identical prompts are matched by embedding similarity."""
+        return self.semantic_threshold > 0
+
+    async def get(
+        self, provider: str, model: str, messages: List[Dict[str, Any]], **params
+    ) -> Optional[str]:
+        """
+        Look up a cached response.
+
+        Args:
+            provider: LLM provider
+            model: Model name
+            messages: Prompt messages
+            params: Generation parameters (e.g., temperature)
+
+        Returns:
+            Optional[str]: The cached response, or None on a miss
+        """
+        scope = _hash({"provider": provider, "model": model, "params": params})
+        key = _hash({"scope": scope, "messages": messages})
+
+        with self._lock:
+            entry = self._entries.get(key)
+            expired = entry is not None and self._expired(entry)
+            if expired:
+                self._entries.pop(key)
+                entry = None
+            elif entry:
+                self._entries.move_to_end(key)
+                self.stats.exact_hits += 1
+
+        if expired:
+            await self._write(removed=[key])
+        if entry:
+            logger.debug(f"Response cache exact hit ({self.stats.hit_rate:.0%} hit rate)")
+            return entry.response
+
+        if self.semantic_enabled:
+            response = await self._get_similar(scope, messages)
+            if response is not None:
+                return response
+
+        self.stats.misses += 1
+        return None
+
+    async def set(
+        self, provider: str, model: str, messages: List[Dict[str, Any]], response: str, **params
+    ) -> None:
+        """
+        Cache a response.
+
+        Args:
+            provider: LLM provider
+            model: Model name
+            messages: Prompt messages
+            response: Response to cache
+            params: Generation parameters (e.g., temperature)
+        """
+        scope = _hash({"provider": provider, "model": model, "params": params})
+        key = _hash({"scope": scope, "messages": messages})
+
+        embedding = None
+        if self.semantic_enabled:
+            embedding = await self._embed(messages)
+
+        entry = _CacheEntry(
+            key=key, scope=scope, response=response, created_at=time.time(), embedding=embedding
+        )
+        evicted = []
+        with self._lock:
+            self._entries[key] = entry
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                evicted.append(self._entries.popitem(last=False)[0])
+                self.stats.evictions += 1
+
+        await self._write(entry, evicted)
+
+    def clear(self) -> None:
+        """Drop every cached response."""
+        with self._lock:
+            self._entries.clear()
+            if self._db is not None:
+                self._db.execute("DELETE FROM responses")
+                self._db.commit()
+
+    def close(self) -> None:
+        """Close the SQLite store."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _expired(self, entry: _CacheEntry) -> bool:
+        """Check whether an entry is older than the TTL."""
+        return self.ttl > 0 and time.time() - entry.created_at > self.ttl
+
+    async def _write(
+        self, entry: Optional[_CacheEntry] = None, removed: Sequence[str] = ()
+    ) -> None:
+        """Write an entry and drop removed entries from disk, off the event loop."""
+        if self._db is not None:
+            await asyncio.to_thread(self._persist, entry, removed)
+
+    async def _get_similar(self, scope: str, messages: List[Dict[str, Any]]) -> Optional[str]:
+        """Return the response of the most similar cached prompt above the threshold."""
+        with self._lock:
+            candidates = [
+                entry
+                for entry in self._entries.values()
+                if entry.scope == scope and entry.embedding is not None and not self._expired(entry)
+            ]
+        if not candidates:
+            return None
+
+        query = await self._embed(messages)
+        if query is None:
+            return None
+        # Entries embedded by a different embedding model can't be compared
+        candidates = [
+            entry
+            for entry in candidates
+            if entry.embedding is not None and entry.embedding.shape == query.shape
+        ]
+        if not candidates:
+            return None
+
+        matrix = np.stack([entry.embedding for entry in candidates])  # type: ignore[misc]
+        similarities = matrix @ query
+        best = int(np.argmax(similarities))
+        if similarities[best] < self.semantic_threshold:
+            return None
+
+        entry = candidates[best]
+        with self._lock:
+            if entry.key in self._entries:
+                self._entries.move_to_end(entry.key)
+            self.stats.semantic_hits += 1
+        logger.debug(f"Response cache semantic hit (similarity {similarities[best]:.3f})")
+        return entry.response
+
+    async def _embed(self, messages: List[Dict[str, Any]]) -> Optional[np.ndarray]:
+        """Embed the prompt text as a unit vector, or return None if embedding fails."""
+        assert self.embedding_generator is not None
+        text = "\n".join(str(m.get("content", "")) for m in messages)
+        try:
+            embedding = (await self.embedding_generator.get_embedding(text))[0]
+        except Exception as e:
+            logger.warning(f"Response cache could not embed prompt: {e}")
+            return None
+        embedding = np.asarray(embedding, dtype=np.float32)
+        norm = np.linalg.norm(embedding)
+        return embedding / norm if norm else embedding
+
+    def _open(self, path: str) -> None:
+        """
+        Open the SQLite store and load the most recently used unexpired entries. Expired rows
+        are purged by the next write, which runs off the event loop.
+        """
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.execute(
+            "CREATE TABLE IF NOT EXISTS responses ("
+            "key TEXT PRIMARY KEY, scope TEXT, response TEXT, created_at REAL, embedding BLOB)"
+        )
+        self._db.commit()
+        self._purge_pending = self.ttl > 0
+
+        rows = self._db.execute(
+            "SELECT key, scope, response, created_at, embedding FROM responses "
+            "WHERE created_at >= ? ORDER BY created_at DESC LIMIT ?",
+            (time.time() - self.ttl if self.ttl > 0 else 0.0, self.max_entries),
+        ).fetchall()
+        for key, scope, response, created_at, blob in reversed(rows):
+            embedding = np.frombuffer(blob, dtype=np.float32) if blob else None
+            self._entries[key] = _CacheEntry(key, scope, response, created_at, embedding)
+        logger.debug(f"Loaded {len(rows)} cached responses from {path}")
+
+    def _persist(self, entry: Optional[_CacheEntry], removed: Sequence[str]) -> None:
+        """Write an entry to the SQLite store and delete removed and expired entries."""
+        blob = None
+        if entry is not None and entry.embedding is not None:
+            blob = entry.embedding.astype(np.float32).tobytes()
+        with self._lock:
+            if self._db is None:
+                return
+            if self._purge_pending:
+                self._db.execute(
+                    "DELETE FROM responses WHERE created_at < ?", (time.time() - self.ttl,)
+                )
+                self._purge_pending = False
+            self._db.executemany("DELETE FROM responses WHERE key = ?", [(key,) for key in removed])
+            if entry is not None:
+                self._db.execute(
+                    "INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)",
+                    (entry.key, entry.scope, entry.response, entry.created_at, blob),
+                )
+            self._db.commit()
+
+
+def _hash(value: Any) -> str:
+    """Return a stable hash of a JSON-serializable value."""
+    return hashlib.sha256(json.dumps(value, sort_keys=True, default=str).encode()).hexdigest()
+
+
+_response_cache: Optional[ResponseCache] = None
+_response_cache_lock = threading.Lock()
+
+
+def get_response_cache() -> ResponseCache:
+    """Get the process-wide LLM response cache."""
+    global _response_cache
+    with _response_cache_lock:
+        if _response_cache is None:
+            _response_cache = ResponseCache()
+        return _response_cache
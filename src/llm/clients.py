@@ -0,0 +1,153 @@
+import importlib.util
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+import anthropic
+import httpx
+import openai
+from loguru import logger
+
+from src.core.config import settings
+
+#: Client key: (provider, base_url, api_key)
+ClientKey = Tuple[str, Optional[str], str]
+
+
+class ClientManager:
+    """
+    Owner of the long-lived API clients.
+
+    One client is kept per (provider, base_url, api_key), so every call to the same endpoint
+    shares one HTTP connection pool and reuses its keep-alive connections instead of paying a
+    new TLS handshake per request.
+    """
+
+    def __init__(
+        self,
+        max_connections: int = settings.LLM_HTTP_MAX_CONNECTIONS,
+        max_keepalive_connections: int = settings.LLM_HTTP_MAX_KEEPALIVE_CONNECTIONS,
+        keepalive_expiry: float = settings.LLM_HTTP_KEEPALIVE_EXPIRY,
+        http2: bool = settings.LLM_HTTP2,
+    ):
+        """
+        Initialize the client manager.
+
+        Args:
+            max_connections: Maximum number of open connections per client
+            max_keepalive_connections: Maximum number of idle connections kept per client
+            keepalive_expiry: Seconds an idle connection is kept open
+            http2: Use HTTP/2 when the `h2` package is installed
+        """
+        self.limits = httpx.Limits(
+            max_connections=max_connections,
+            max_keepalive_connections=max_keepalive_connections,
+            keepalive_expiry=keepalive_expiry,
+        )
+        self.http2 = http2 and importlib.util.find_spec("h2") is not None
+        if http2 and not self.http2:
+            logger.debug("HTTP/2 requested but the h2 package is not installed, using HTTP/1.1")
+
+        self._clients: Dict[ClientKey, Any] = {}
+        self._lock = threading.Lock()
+
+    def get_openai(self, api_key: str, base_url: Optional[str] = None) -> openai.AsyncOpenAI:
+        """
+        Return the shared OpenAI-compatible client for an endpoint.
+
+        Args:
+            api_key: API key of the endpoint
+            base_url: Base URL of an OpenAI-compatible API. Defaults to the OpenAI API.
+
+        Returns:
+            openai.AsyncOpenAI: The shared client
+        """
+        return self._get(
+            ("openai", base_url, api_key),
+            lambda: openai.AsyncOpenAI(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=openai.DefaultAsyncHttpxClient(limits=self.limits, http2=self.http2),
+            ),
+        )
+
+    def get_anthropic(
+        self, api_key: str, base_url: Optional[str] = None
+    ) -> anthropic.AsyncAnthropic:
+        """
+        Return the shared Anthropic client for an endpoint.
+
+        Args:
+            api_key: Anthropic API key
+            base_url: Base URL of the Anthropic API. Defaults to the public API.
+
+        Returns:
+            anthropic.AsyncAnthropic: The shared client
+        """
+        return self._get(
+            ("anthropic", base_url, api_key),
+            lambda: anthropic.AsyncAnthropic(
+                api_key=api_key,
+                base_url=base_url,
+                http_client=anthropic.DefaultAsyncHttpxClient(limits=self.limits, http2=self.http2),
+            ),
+        )
+
+    async def close(self) -> None:
+        """Close every client and its connection pool."""
+        with self._lock:
+            clients = list(self._clients.values())
+            self._clients.clear()
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close API client: {e}")
+        if clients:
+            logger.debug(f"Closed {len(clients)} API clients")
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _get(self, key: ClientKey, factory: Callable[[], Any]) -> Any:
+        """Return the client for `key`, creating it with `factory` on first use."""
+        with self._lock:
+            client = self._clients.get(key)
+            if client is None:
+                logger.debug(f"Creating {key[0]} client for {key[1] or 'default endpoint'}")
+                client = self._clients[key] = factory()
+            return client
+
+
+_manager: Optional[ClientManager] = None
+_manager_lock = threading.Lock()
+
+
+def get_client_manager() -> ClientManager:
+    """Get the process-wide API client manager."""
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = ClientManager()
+        return _manager
+
+
+def get_openai_client(api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    """Get the shared OpenAI client."""
+    return get_client_manager().get_openai(api_key or settings.OPENAI_API_KEY)
+
+
+def get_xai_client(api_key: Optional[str] = None) -> openai.AsyncOpenAI:
+    """Get the shared xAI client."""
+    return get_client_manager().get_openai(api_key or settings.XAI_API_KEY, settings.XAI_BASE_URL)
+
+
+def get_anthropic_client(api_key: Optional[str] = None) -> anthropic.AsyncAnthropic:
+    """Get the shared Anthropic client."""
+    return get_client_manager().get_anthropic(api_key or settings.ANTHROPIC_API_KEY)
+
+
+async def close_clients() -> None:
+    """Close every shared API client, if any were created."""
+    if _manager is not None:
+        await _manager.close()
@@ -0,0 +1,211 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Dict, List, Optional, Sequence, Tuple
+
+import numpy as np
+from loguru import logger
+
+from src.core.config import settings
+
+#: File holding the cached vectors as one flat float32 array
+VECTORS_FILE = "vectors.f32"
+
+#: File mapping cache keys to their (offset, dimension) in the vectors file
+INDEX_FILE = "index.txt"
+
+
+@dataclass
+class EmbeddingCacheStats:
+    """Hit and miss counters of an embedding cache."""
+
+    memory_hits: int = 0
+    disk_hits: int = 0
+    misses: int = 0
+
+    @property
+    def hit_rate(self) -> float:
+        """Share of lookups answered from the cache."""
+        lookups = self.memory_hits + self.disk_hits + self.misses
+        return (self.memory_hits + self.disk_hits) / lookups if lookups else 0.0
+
+
+class EmbeddingCache:
+    """
+    Content-addressed cache of embedding vectors.
+
+    Vectors are keyed by the embedding model, the requested dimensions and a hash of the text.
+    Recently used vectors are kept in an in-memory LRU tier. Every vector is also appended to a
+    flat float32 file on disk, which is memory-mapped for lookups, with a small text index
+    mapping keys to their offset. Embeddings are deterministic, so entries never expire.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.EMBEDDING_CACHE_PATH,
+        max_entries: int = settings.EMBEDDING_CACHE_MAX_ENTRIES,
+    ):
+        """
+        Initialize the embedding cache.
+
+        Args:
+            path: Directory the cache is persisted to. An empty path keeps it in memory only.
+            max_entries: Maximum number of vectors kept in the in-memory tier
+        """
+        self.path = path
+        self.max_entries = max(1, max_entries)
+        self.stats = EmbeddingCacheStats()
+
+        self._memory: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._index: Dict[str, Tuple[int, int]] = {}
+        self._size = 0
+        self._mmap: Optional[np.memmap] = None
+        self._lock = threading.Lock()
+        if path:
+            self._load()
+
+    def get_many(
+        self, model: str, dimensions: Optional[int], texts: Sequence[str]
+    ) -> List[Optional[np.ndarray]]:
+        """
+        Look up cached embeddings.
+
+        Args:
+            model: Embedding model
+            dimensions: Requested embedding dimensions (None for the model default)
+            texts: Texts to look up
+
+        Returns:
+            List[Optional[np.ndarray]]: The cached vector of each text, or None on a miss
+        """
+        with self._lock:
+            return [self._get(cache_key(model, dimensions, text)) for text in texts]
+
+    def set_many(
+        self, model: str, dimensions: Optional[int], texts: Sequence[str], vectors: np.ndarray
+    ) -> None:
+        """
+        Cache embeddings.
+
+        Args:
+            model: Embedding model
+            dimensions: Requested embedding dimensions (None for the model default)
+            texts: Embedded texts
+            vectors: Embedding of each text, one row per text
+        """
+        new: List[Tuple[str, np.ndarray]] = []
+        with self._lock:
+            for text, vector in zip(texts, vectors):
+                key = cache_key(model, dimensions, text)
+                vector = np.asarray(vector, dtype=np.float32)
+                if key not in self._index and key not in self._memory:
+                    new.append((key, vector))
+                self._remember(key, vector)
+            if self.path and new:
+                self._append(new)
+
+    def clear(self) -> None:
+        """Drop every cached vector."""
+        with self._lock:
+            self._memory.clear()
+            self._index.clear()
+            self._size = 0
+            self._mmap = None
+            if self.path:
+                for name in (VECTORS_FILE, INDEX_FILE):
+                    file = os.path.join(self.path, name)
+                    if os.path.exists(file):
+                        os.remove(file)
+
+    def __len__(self) -> int:
+        return len(self._index) if self.path else len(self._memory)
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _get(self, key: str) -> Optional[np.ndarray]:
+        """Look up one vector in memory, then on disk. Caller holds the lock."""
+        vector = self._memory.get(key)
+        if vector is not None:
+            self._memory.move_to_end(key)
+            self.stats.memory_hits += 1
+            return vector
+
+        location = self._index.get(key)
+        if location is None:
+            self.stats.misses += 1
+            return None
+
+        offset, dimension = location
+        if self._mmap is None or self._mmap.shape[0] < self._size:
+            self._mmap = np.memmap(
+                os.path.join(self.path, VECTORS_FILE), dtype=np.float32, mode="r"
+            )
+        vector = np.array(self._mmap[offset : offset + dimension])
+        self._remember(key, vector)
+        self.stats.disk_hits += 1
+        return vector
+
+    def _remember(self, key: str, vector: np.ndarray) -> None:
+        """Put a vector in the in-memory LRU tier. Caller holds the lock."""
+        self._memory[key] = vector
+        self._memory.move_to_end(key)
+        while len(self._memory) > self.max_entries:
+            self._memory.popitem(last=False)
+
+    def _append(self, entries: List[Tuple[str, np.ndarray]]) -> None:
+        """Append vectors to the files on disk. Caller holds the lock."""
+        try:
+            os.makedirs(self.path, exist_ok=True)
+            lines = []
+            with open(os.path.join(self.path, VECTORS_FILE), "ab") as vectors:
+                for key, vector in entries:
+                    vectors.write(vector.tobytes())
+                    lines.append(f"{key} {self._size} {vector.size}\n")
+                    self._index[key] = (self._size, vector.size)
+                    self._size += vector.size
+            # The index is written last, so it never points past the end of the vectors file
+            with open(os.path.join(self.path, INDEX_FILE), "a") as index:
+                index.writelines(lines)
+        except OSError as e:
+            logger.warning(f"Could not persist embeddings to {self.path}: {e}")
+
+    def _load(self) -> None:
+        """Load the index of the vectors persisted on disk."""
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        index_path = os.path.join(self.path, INDEX_FILE)
+        if not os.path.exists(vectors_path) or not os.path.exists(index_path):
+            return
+
+        self._size = os.path.getsize(vectors_path) // np.dtype(np.float32).itemsize
+        with open(index_path) as index:
+            for line in index:
+                parts = line.split()
+                if len(parts) != 3:
+                    continue
+                key, offset, dimension = parts[0], int(parts[1]), int(parts[2])
+                if offset + dimension <= self._size:
+                    self._index[key] = (offset, dimension)
+        logger.debug(f"Loaded {len(self._index)} cached embeddings from {self.path}")
+
+
+def cache_key(model: str, dimensions: Optional[int], text: str) -> str:
+    """Return the cache key of a text embedded by `model` with `dimensions`."""
+    digest = hashlib.sha256(text.encode()).hexdigest()
+    return hashlib.sha256(f"{model}:{dimensions or ''}:{digest}".encode()).hexdigest()
+
+
+_embedding_cache: Optional[EmbeddingCache] = None
+_embedding_cache_lock = threading.Lock()
+
+
+def get_embedding_cache() -> EmbeddingCache:
+    """Get the process-wide embedding cache."""
+    global _embedding_cache
+    with _embedding_cache_lock:
+        if _embedding_cache is None:
+            _embedding_cache = EmbeddingCache()
+        return _embedding_cache
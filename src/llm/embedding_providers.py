@@ -0,0 +1,288 @@
+import asyncio
+import base64
+import hashlib
+import math
+import re
+from abc import ABC, abstractmethod
+from collections import Counter
+from typing import Any, Callable, Hashable, List, Optional, Tuple, Union
+
+import numpy as np
+from loguru import logger
+from openai import AsyncOpenAI
+
+from src.core.config import settings
+from src.core.defs import EmbeddingProviderType
+from src.llm.clients import get_openai_client
+from src.llm.model_registry import ModelKey, get_embedding_model_registry
+
+#: Words of a text, lower-cased
+_WORD_PATTERN = re.compile(r"\w+")
+
+
+class EmbeddingProvider(ABC):
+    """
+    Interface of the embedding backends used by `EmbeddingGenerator`.
+
+    Providers with the same `key` are interchangeable, so their requests can be batched and
+    de-duplicated together.
+    """
+
+    #: Model identifier, part of the embedding cache key
+    model: str
+
+    #: Size embeddings are shortened to, or None for the model's size
+    dimensions: Optional[int] = None
+
+    @property
+    def key(self) -> Tuple[Hashable, ...]:
+        """Identity of the provider for batching and request de-duplication."""
+        return (type(self).__name__, self.model, self.dimensions)
+
+    @abstractmethod
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """
+        Embed texts.
+
+        Args:
+            texts: Texts to embed
+
+        Returns:
+            np.ndarray: float32 array with one row per text
+        """
+
+    def __eq__(self, other: object) -> bool:
+        return isinstance(other, EmbeddingProvider) and self.key == other.key
+
+    def __hash__(self) -> int:
+        return hash(self.key)
+
+
+class OpenAIEmbeddingProvider(EmbeddingProvider):
+    """Embeddings from OpenAI's text embedding models."""
+
+    def __init__(
+        self,
+        client: Optional[AsyncOpenAI] = None,
+        model: str = settings.OPENAI_EMBEDDING_MODEL,
+        dimensions: Optional[int] = settings.EMBEDDING_DIMENSIONS or None,
+    ):
+        """
+        Initialize the OpenAI embedding provider.
+
+        Args:
+            client: AsyncOpenAI client instance. Defaults to the shared OpenAI client.
+            model: The OpenAI model to use for embeddings
+            dimensions: Size to shorten embeddings to (text-embedding-3 models only)
+        """
+        self.client = client or get_openai_client()
+        self.model = model
+        self.dimensions = dimensions
+
+    @property
+    def key(self) -> Tuple[Hashable, ...]:
+        """Identity of the provider, including the API client it sends requests with."""
+        return (*super().key, id(self.client))
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Request float32 embeddings for `texts` from the API."""
+        if self.dimensions:
+            response = await self.client.embeddings.create(
+                model=self.model, input=texts, dimensions=self.dimensions, encoding_format="base64"
+            )
+        else:
+            response = await self.client.embeddings.create(
+                model=self.model, input=texts, encoding_format="base64"
+            )
+
+        # Extract embeddings from response
+        return np.stack([_decode(data.embedding) for data in response.data])
+
+
+class HashingEmbeddingProvider(EmbeddingProvider):
+    """
+    Feature-hashing embeddings computed on the CPU, without a model or network access.
+
+    Words and word bigrams are hashed into `dimensions` buckets with a signed hash and weighted
+    by their log term frequency. Texts sharing vocabulary get similar vectors, so similarity
+    is lexical rather than semantic.
+    """
+
+    model = "hashing"
+
+    def __init__(
+        self, dimensions: int = settings.EMBEDDING_DIMENSIONS or settings.MEMORY_VECTOR_SIZE
+    ):
+        """
+        Initialize the hashing embedding provider.
+
+        Args:
+            dimensions: Size of the embeddings
+        """
+        self.dimensions = dimensions
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` in a worker thread."""
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` in the calling thread."""
+        assert self.dimensions is not None
+        embeddings = np.zeros((len(texts), self.dimensions), dtype=np.float32)
+        for row, text in enumerate(texts):
+            words = _WORD_PATTERN.findall(text.lower())
+            features = Counter(words + [f"{a} {b}" for a, b in zip(words, words[1:])])
+            for feature, count in features.items():
+                digest = int.from_bytes(
+                    hashlib.blake2b(feature.encode(), digest_size=8).digest(), "little"
+                )
+                sign = 1.0 if digest >> 63 else -1.0
+                embeddings[row, digest % self.dimensions] += sign * (1.0 + math.log(count))
+
+        norms = np.linalg.norm(embeddings, axis=1, keepdims=True)
+        return embeddings / np.where(norms == 0, 1.0, norms)
+
+
+class TransformerEmbeddingProvider(EmbeddingProvider):
+    """
+    Mean-pooled embeddings of a small local transformer, e.g. a sentence-transformers model
+    directory such as all-MiniLM-L6-v2, run on the CPU.
+
+    The model is loaded once into the embedding model registry, apart from the Llama models.
+    The embedding size is the model's hidden size, checked against the memory vector size
+    when the model loads.
+    """
+
+    def __init__(
+        self,
+        model_path: str = settings.EMBEDDING_LOCAL_MODEL_PATH,
+        vector_size: int = settings.MEMORY_VECTOR_SIZE,
+    ):
+        """
+        Initialize the transformer embedding provider.
+
+        Args:
+            model_path: Local directory of the model and its tokenizer
+            vector_size: Size of the memory vectors the embeddings are stored as
+
+        Raises:
+            ValueError: If no model path is configured
+        """
+        if not model_path:
+            raise ValueError("EMBEDDING_LOCAL_MODEL_PATH must be set for local embeddings")
+        self.model = model_path
+        self.vector_size = vector_size
+
+    async def embed(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` in a worker thread."""
+        return await asyncio.to_thread(self.embed_sync, texts)
+
+    def embed_sync(self, texts: List[str]) -> np.ndarray:
+        """Embed `texts` in the calling thread."""
+        import torch
+
+        loaded = get_embedding_model_registry().get(self._registry_key, self._load)
+        inputs = loaded.tokenizer(texts, padding=True, truncation=True, return_tensors="pt")
+        with torch.no_grad():
+            hidden = loaded.model(**inputs).last_hidden_state
+
+        # Average the token states, ignoring padding
+        mask = inputs["attention_mask"].unsqueeze(-1).to(hidden.dtype)
+        pooled = (hidden * mask).sum(dim=1) / mask.sum(dim=1).clamp(min=1e-9)
+        pooled = torch.nn.functional.normalize(pooled, dim=1)
+        return pooled.numpy().astype(np.float32)
+
+    @property
+    def _registry_key(self) -> ModelKey:
+        return (self.model, "float32", "cpu")
+
+    def _load(self) -> Tuple[Any, Any]:
+        """
+        Load the model and tokenizer from disk.
+
+        Raises:
+            ValueError: If the model's hidden size isn't the memory vector size
+        """
+        from transformers import AutoModel, AutoTokenizer
+
+        model = AutoModel.from_pretrained(self.model)
+        hidden_size = getattr(model.config, "hidden_size", None)
+        if hidden_size is not None and hidden_size != self.vector_size:
+            raise ValueError(
+                f"Embedding model {self.model} has hidden size {hidden_size}, but the memory "
+                f"vector size is {self.vector_size}"
+            )
+        tokenizer = AutoTokenizer.from_pretrained(self.model)
+        model.eval()
+        return model, tokenizer
+
+
+def create_embedding_provider(
+    provider_type: EmbeddingProviderType = settings.EMBEDDING_PROVIDER,
+    client: Optional[AsyncOpenAI] = None,
+    model: str = settings.OPENAI_EMBEDDING_MODEL,
+    dimensions: Optional[int] = settings.EMBEDDING_DIMENSIONS or None,
+) -> EmbeddingProvider:
+    """
+    Create an embedding provider.
+
+    Args:
+        provider_type: Type of the provider
+        client: AsyncOpenAI client instance (OpenAI only)
+        model: The OpenAI model to use for embeddings (OpenAI only)
+        dimensions: Size of the embeddings. Defaults to the model's size for OpenAI and to
+            `MEMORY_VECTOR_SIZE` for hashing. Ignored by local transformers.
+
+    Returns:
+        EmbeddingProvider: The embedding provider
+
+    Raises:
+        ValueError: If the provider type is unsupported
+    """
+    if provider_type == EmbeddingProviderType.OPENAI:
+        return OpenAIEmbeddingProvider(client=client, model=model, dimensions=dimensions)
+    if provider_type == EmbeddingProviderType.HASHING:
+        return HashingEmbeddingProvider(dimensions=dimensions or settings.MEMORY_VECTOR_SIZE)
+    if provider_type == EmbeddingProviderType.TRANSFORMERS:
+        if dimensions:
+            logger.warning("EMBEDDING_DIMENSIONS is ignored by local transformer embeddings")
+        return TransformerEmbeddingProvider(
+            vector_size=settings.EMBEDDING_DIMENSIONS or settings.MEMORY_VECTOR_SIZE
+        )
+    raise ValueError(f"Unsupported embedding provider: {provider_type}")
+
+
+def embedding_token_counter(
+    provider_type: EmbeddingProviderType = settings.EMBEDDING_PROVIDER,
+    model_path: str = settings.EMBEDDING_LOCAL_MODEL_PATH,
+) -> Optional[Callable[[str], int]]:
+    """
+    Return a token counter of the embedding model's tokenizer, if it is available locally.
+
+    Only local transformer models ship their tokenizer. OpenAI's tokenizers are downloaded on
+    first use, so their token counts are left to the approximation of `TextChunker`.
+
+    Args:
+        provider_type: Type of the embedding provider
+        model_path: Local directory of the transformer model and its tokenizer
+
+    Returns:
+        Optional[Callable[[str], int]]: The token counter, or None to approximate token counts
+    """
+    if provider_type != EmbeddingProviderType.TRANSFORMERS or not model_path:
+        return None
+    try:
+        from transformers import AutoTokenizer
+
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+    except Exception as e:
+        logger.warning(f"Could not load the tokenizer of {model_path}, approximating tokens: {e}")
+        return None
+    return lambda text: len(tokenizer.encode(text, add_special_tokens=False))
+
+
+def _decode(embedding: Union[str, List[float]]) -> np.ndarray:
+    """Decode a base64 embedding straight into a float32 array, skipping float parsing."""
+    if isinstance(embedding, str):
+        return np.frombuffer(base64.b64decode(embedding), dtype=np.float32)
+    return np.asarray(embedding, dtype=np.float32)
@@ -1,40 +1,88 @@
-from typing import List, Union
+import asyncio
+from typing import Hashable, List, Optional, Union, cast
 
 import numpy as np
 from loguru import logger
 from openai import AsyncOpenAI
 
 from src.core.config import settings
-from src.llm.llm import get_oai_client
+from src.core.defs import EmbeddingDtype
+from src.llm.batcher import RequestBatcher
+from src.llm.embedding_cache import EmbeddingCache
+from src.llm.embedding_providers import EmbeddingProvider, create_embedding_provider
+from src.llm.singleflight import SingleFlight, request_key
+
+#: Identical in-flight embedding requests share one upstream call
+_embedding_flights: SingleFlight[np.ndarray] = SingleFlight("embeddings")
+
+#: Texts of concurrent callers are coalesced into one embeddings request
+_embedding_batcher: Optional[RequestBatcher[str, np.ndarray]] = None
+
+
+def estimate_tokens(text: str) -> int:
+    """Estimate the number of tokens of a text, erring on the high side."""
+    return len(text.encode()) // 3 + 1
 
 
 class EmbeddingGenerator:
-    """A class to generate embeddings using OpenAI's text embedding models."""
+    """A class to generate embeddings with the configured embedding provider."""
 
     def __init__(
         self,
-        client: AsyncOpenAI = get_oai_client(),
+        client: Optional[AsyncOpenAI] = None,
         model: str = settings.OPENAI_EMBEDDING_MODEL,
+        cache: Optional[EmbeddingCache] = None,
+        dimensions: Optional[int] = settings.EMBEDDING_DIMENSIONS or None,
+        dtype: EmbeddingDtype = settings.EMBEDDING_DTYPE,
+        provider: Optional[EmbeddingProvider] = None,
     ):
         """
         Initialize the embedding generator.
 
         Args:
-            client: AsyncOpenAI client instance
+            client: AsyncOpenAI client instance. Defaults to the shared OpenAI client.
             model: The OpenAI model to use for embeddings
+            cache: Embedding cache. Without a cache every text is sent to the provider.
+            dimensions: Size to shorten embeddings to (text-embedding-3 models only). Defaults
+                to the model's size.
+            dtype: Floating point type of the returned embeddings
+            provider: Embedding provider. Defaults to the `EMBEDDING_PROVIDER` setting, created
+                from `client`, `model` and `dimensions`.
         """
-        self.client = client
-        self.model = model
+        self.provider = provider or create_embedding_provider(
+            settings.EMBEDDING_PROVIDER, client=client, model=model, dimensions=dimensions
+        )
+        self.cache = cache
+        self.dtype = np.dtype(EmbeddingDtype(dtype).value)
+
+    @property
+    def client(self) -> Optional[AsyncOpenAI]:
+        """API client of the provider, if it uses one."""
+        return getattr(self.provider, "client", None)
+
+    @property
+    def model(self) -> str:
+        """Embedding model of the provider."""
+        return self.provider.model
+
+    @property
+    def dimensions(self) -> Optional[int]:
+        """Size embeddings are shortened to, or None for the model's size."""
+        return self.provider.dimensions
 
     async def get_embedding(self, text: Union[str, List[str]]) -> np.ndarray:
         """
         Get embeddings for a single text or list of texts.
 
+        Cached texts are answered from the cache and only the remaining texts are sent to the
+        provider. Texts requested concurrently by different callers are batched into one
+        provider call, and identical texts that are already in flight share one result.
+
         Args:
             text: Single string or list of strings to get embeddings for
 
         Returns:
-            numpy array of embeddings
+            numpy array of embeddings, one row per text, in the generator's dtype
 
         Raises:
             ValueError: If input text is empty
@@ -46,14 +94,54 @@ class EmbeddingGenerator:
         # Convert single string to list for consistent handling
         texts = [text] if isinstance(text, str) else text
 
-        try:
-            logger.debug(f"Getting embeddings for {len(texts)} texts")
-            response = await self.client.embeddings.create(model=self.model, input=texts)
+        if self.cache is None:
+            return (await self._fetch(texts)).astype(self.dtype, copy=False)
+
+        cached = self.cache.get_many(self.model, self.dimensions, texts)
+        missing = list(dict.fromkeys(t for t, vector in zip(texts, cached) if vector is None))
+        if missing:
+            fetched = await self._fetch(missing)
+            self.cache.set_many(self.model, self.dimensions, missing, fetched)
+            rows = dict(zip(missing, fetched))
+            cached = [rows[t] if vector is None else vector for t, vector in zip(texts, cached)]
+        else:
+            logger.debug(f"Embeddings for {len(texts)} texts answered from the cache")
+        return np.stack(cached).astype(self.dtype, copy=False)  # type: ignore[arg-type]
+
+    async def _fetch(self, texts: List[str]) -> np.ndarray:
+        """Request embeddings for `texts` through the shared batcher."""
+        rows = await asyncio.gather(*(self._fetch_one(text) for text in texts))
+        return np.stack(rows)
+
+    async def _fetch_one(self, text: str) -> np.ndarray:
+        """Request the embedding of one text, sharing identical in-flight requests."""
+        key = request_key(self.provider.key, text)
+        return await _embedding_flights.do(
+            key, lambda: _get_batcher().submit(text, group=self.provider)
+        )
+
+
+async def _embed_batch(group: Hashable, texts: List[str]) -> List[np.ndarray]:
+    """Embed a batch of texts collected from concurrent callers, one row per text."""
+    provider = cast(EmbeddingProvider, group)
+    try:
+        logger.debug(f"Getting embeddings for {len(texts)} texts")
+        return list(await provider.embed(texts))
+    except Exception as e:
+        logger.error(f"Error getting embeddings: {str(e)}")
+        raise
 
-            # Extract embeddings from response
-            embeddings = [data.embedding for data in response.data]
-            return np.array(embeddings)
 
-        except Exception as e:
-            logger.error(f"Error getting embeddings: {str(e)}")
-            raise
+def _get_batcher() -> RequestBatcher[str, np.ndarray]:
+    """Get the process-wide batcher in front of the embedding providers."""
+    global _embedding_batcher
+    if _embedding_batcher is None:
+        _embedding_batcher = RequestBatcher(
+            _embed_batch,
+            max_batch_size=settings.EMBEDDING_BATCH_MAX_SIZE,
+            max_wait_ms=settings.EMBEDDING_BATCH_MAX_WAIT_MS,
+            name="embedding-batcher",
+            weigher=estimate_tokens,
+            max_batch_weight=settings.EMBEDDING_BATCH_MAX_TOKENS,
+        )
+    return _embedding_batcher
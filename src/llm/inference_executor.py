@@ -0,0 +1,186 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass
+from typing import Callable, Optional, TypeVar
+
+from loguru import logger
+
+from src.core.config import settings
+from src.core.exceptions import LLMError
+
+T = TypeVar("T")
+
+#: Blocking inference job. Receives an event that is set when the caller cancels.
+InferenceJob = Callable[[threading.Event], T]
+
+
+@dataclass
+class InferenceStats:
+    """Cumulative timings of the jobs run by an inference executor."""
+
+    completed: int = 0
+    failed: int = 0
+    cancelled: int = 0
+    rejected: int = 0
+    total_queue_wait: float = 0.0
+    total_run_time: float = 0.0
+
+
+class InferenceExecutor:
+    """
+    Bounded thread pool for blocking local model inference.
+
+    Jobs run off the event loop on at most `max_concurrency` worker threads. At most
+    `max_queue_size` jobs may wait for a free worker; further submissions are rejected.
+    Time spent waiting in the queue is reported separately from time spent running.
+    """
+
+    def __init__(
+        self,
+        max_concurrency: int = settings.LLAMA_MAX_CONCURRENCY,
+        max_queue_size: int = settings.LLAMA_MAX_QUEUE_SIZE,
+        name: str = "inference",
+    ):
+        """
+        Initialize the inference executor.
+
+        Args:
+            max_concurrency: Maximum number of jobs running at the same time
+            max_queue_size: Maximum number of jobs waiting for a free worker
+            name: Name used for worker threads and log messages
+        """
+        self.max_concurrency = max(1, max_concurrency)
+        self.max_queue_size = max(0, max_queue_size)
+        self.name = name
+        self.stats = InferenceStats()
+
+        self._pool = ThreadPoolExecutor(
+            max_workers=self.max_concurrency, thread_name_prefix=f"{name}-worker"
+        )
+        self._lock = threading.Lock()
+        self._queued = 0
+        self._running = 0
+        self._closed = False
+
+    @property
+    def queued(self) -> int:
+        """Number of jobs waiting for a free worker."""
+        return self._queued
+
+    @property
+    def closed(self) -> bool:
+        """Whether the executor has been shut down."""
+        return self._closed
+
+    async def run(self, job: InferenceJob[T]) -> T:
+        """
+        Run a blocking job on a worker thread and wait for its result.
+
+        If the awaiting task is cancelled, a queued job is dropped and a running job is
+        signalled through its cancel event so it can stop early.
+
+        Args:
+            job: Callable receiving a cancel event and returning the job result
+
+        Returns:
+            T: The job result
+
+        Raises:
+            LLMError: If the executor is shut down or its queue is full
+        """
+        with self._lock:
+            if self._closed:
+                raise LLMError(f"{self.name} executor is shut down")
+            if self._queued + self._running >= self.max_concurrency + self.max_queue_size:
+                self.stats.rejected += 1
+                raise LLMError(
+                    f"{self.name} queue is full ({self._queued} jobs waiting), try again later"
+                )
+            self._queued += 1
+
+        cancel_event = threading.Event()
+        submitted_at = time.monotonic()
+        timings: dict = {}
+
+        def wrapper() -> T:
+            started_at = time.monotonic()
+            with self._lock:
+                self._queued -= 1
+                self._running += 1
+            timings["queue_wait"] = started_at - submitted_at
+            try:
+                if cancel_event.is_set():
+                    raise asyncio.CancelledError()
+                return job(cancel_event)
+            finally:
+                timings["run_time"] = time.monotonic() - started_at
+                with self._lock:
+                    self._running -= 1
+
+        future = self._pool.submit(wrapper)
+        try:
+            result = await asyncio.wrap_future(future)
+        except asyncio.CancelledError:
+            cancel_event.set()
+            if future.cancel():
+                # The job never reached a worker
+                with self._lock:
+                    self._queued -= 1
+            self.stats.cancelled += 1
+            logger.debug(f"{self.name} job cancelled")
+            raise
+        except Exception:
+            self.stats.failed += 1
+            self._record(timings)
+            raise
+
+        self.stats.completed += 1
+        self._record(timings)
+        return result
+
+    def shutdown(self, wait: bool = False) -> None:
+        """
+        Stop accepting jobs and release the worker threads.
+
+        Args:
+            wait: Block until running jobs have finished
+        """
+        with self._lock:
+            self._closed = True
+        self._pool.shutdown(wait=wait, cancel_futures=True)
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _record(self, timings: dict) -> None:
+        """Accumulate and log the timings of a finished job."""
+        queue_wait = timings.get("queue_wait", 0.0)
+        run_time = timings.get("run_time", 0.0)
+        self.stats.total_queue_wait += queue_wait
+        self.stats.total_run_time += run_time
+        logger.debug(f"{self.name} job finished: queue wait {queue_wait:.3f}s, run {run_time:.3f}s")
+
+
+_executor: Optional[InferenceExecutor] = None
+_executor_lock = threading.Lock()
+
+
+def get_inference_executor() -> InferenceExecutor:
+    """Get the process-wide executor for local model inference."""
+    global _executor
+    with _executor_lock:
+        if _executor is None or _executor.closed:
+            _executor = InferenceExecutor(name="llama")
+        return _executor
+
+
+def shutdown_inference_executor() -> None:
+    """Shut down the process-wide inference executor, if one was started."""
+    global _executor
+    with _executor_lock:
+        if _executor is not None:
+            _executor.shutdown()
+            _executor = None
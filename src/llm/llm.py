@@ -1,4 +1,5 @@
-from typing import Any, Dict, List
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Dict, List, Optional
 
 import openai
 from loguru import logger
@@ -6,10 +7,17 @@ from loguru import logger
 from src.core.config import settings
 from src.core.defs import LLMProviderType
 from src.core.exceptions import LLMError
-from src.llm.providers.anthropic import call_anthropic
-from src.llm.providers.llama import call_llama
-from src.llm.providers.oai import call_openai
-from src.llm.providers.xai import call_xai
+from src.llm.cache import ResponseCache, get_response_cache
+from src.llm.clients import get_openai_client
+from src.llm.providers.anthropic import call_anthropic, stream_anthropic
+from src.llm.providers.llama import call_llama, stream_llama
+from src.llm.providers.oai import call_openai, stream_openai
+from src.llm.providers.xai import call_xai, stream_xai
+from src.llm.router import LLMRouter
+from src.llm.singleflight import SingleFlight, request_key
+
+#: Identical in-flight requests share one upstream call
+_response_flights: SingleFlight[str] = SingleFlight("llm")
 
 
 class LLM:
@@ -17,18 +25,37 @@ class LLM:
     LLM class for generating responses from the LLM backend.
     """
 
-    def __init__(self):
+    def __init__(self, cache: Optional[ResponseCache] = None):
         """
         Initialize the LLM class based on the selected provider from settings.
-        Supported providers: 'openai', 'anthropic', 'xai'
+        Supported providers: 'openai', 'anthropic', 'xai', 'llama'
+
+        Args:
+            cache: Response cache. Defaults to the shared cache if `LLM_CACHE_ENABLED` is set.
         """
         self.provider = settings.LLM_PROVIDER
         logger.debug(f"Using LLM provider: {self.provider}")
 
+        if cache is None and settings.LLM_CACHE_ENABLED:
+            cache = get_response_cache()
+        self.cache = cache
+
+        #: Route across providers if fallback providers are configured
+        self.router: Optional[LLMRouter] = None
+        if settings.LLM_FALLBACK_PROVIDERS:
+            self.router = LLMRouter(
+                [self.provider, *settings.LLM_FALLBACK_PROVIDERS],
+                call=self._call,
+                stream=self._stream,
+            )
+
     async def generate_response(self, messages: List[Dict[str, Any]], **kwargs) -> str:
         """
         Generate a response from the LLM backend based on the provider.
 
+        Responses are served from and stored in the response cache, if one is configured.
+        Identical requests that are already in flight share one upstream call and its result.
+
         Args:
             messages: A list of dicts, each containing 'role' and 'content'.
             kwargs: Additional parameters (e.g., model, temperature).
@@ -36,26 +63,131 @@ class LLM:
         Returns:
             str: LLM response text
         """
-        # Add system message with agent's personality and goal if not present
-        if not messages or messages[0].get("role") != "system":
-            system_message = {
-                "role": "system",
-                "content": f"{settings.AGENT_PERSONALITY}\n\n{settings.AGENT_GOAL}",
-            }
-            messages = [system_message] + messages
+        messages = self._with_system_message(messages)
+
+        key = request_key(self.provider, self._default_model(), messages, kwargs)
+        return await _response_flights.do(key, lambda: self._generate(messages, **kwargs))
+
+    async def _generate(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        """Generate a response, using the response cache if one is configured."""
+        if self.cache is None:
+            return await self._call_provider(messages, **kwargs)
+
+        params = {key: value for key, value in kwargs.items() if key != "model"}
+        model = kwargs.get("model", self._default_model())
+        cached = await self.cache.get(self.provider, model, messages, **params)
+        if cached is not None:
+            return cached
+
+        response = await self._call_provider(messages, **kwargs)
+        await self.cache.set(self.provider, model, messages, response, **params)
+        return response
 
-        if self.provider == LLMProviderType.OPENAI:
+    async def stream_response(
+        self, messages: List[Dict[str, Any]], **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """
+        Stream a response from the LLM backend based on the provider.
+
+        Consumers can stop early: closing the generator (e.g. with `contextlib.aclosing`)
+        aborts the provider request, saving tokens and time.
+
+        With fallback providers configured, the stream is routed like `generate_response`: a
+        provider that fails before its first delta falls back to the next one. A cached
+        response is yielded at once, and a response streamed to the end is cached.
+
+        Args:
+            messages: A list of dicts, each containing 'role' and 'content'.
+            kwargs: Additional parameters (e.g., model, temperature).
+
+        Yields:
+            str: Text deltas of the response as they arrive.
+        """
+        messages = self._with_system_message(messages)
+
+        params = {key: value for key, value in kwargs.items() if key != "model"}
+        model = kwargs.get("model", self._default_model())
+        if self.cache is not None:
+            cached = await self.cache.get(self.provider, model, messages, **params)
+            if cached is not None:
+                yield cached
+                return
+
+        stream = (
+            self.router.stream(messages, **kwargs)
+            if self.router is not None
+            else self._stream(self.provider, messages, **kwargs)
+        )
+        deltas = []
+        async with aclosing(stream):
+            async for delta in stream:
+                deltas.append(delta)
+                yield delta
+
+        if self.cache is not None:
+            await self.cache.set(self.provider, model, messages, "".join(deltas), **params)
+
+    async def _call_provider(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        """Generate a response with the configured provider, or through the router."""
+        if self.router is not None:
+            return await self.router.generate(messages, **kwargs)
+        return await self._call(self.provider, messages, **kwargs)
+
+    async def _call(
+        self, provider: LLMProviderType, messages: List[Dict[str, Any]], **kwargs
+    ) -> str:
+        """Generate a response with the given provider."""
+        if provider == LLMProviderType.OPENAI:
             return await call_openai(messages, **kwargs)
-        elif self.provider == LLMProviderType.ANTHROPIC:
+        elif provider == LLMProviderType.ANTHROPIC:
             return await call_anthropic(messages, **kwargs)
-        elif self.provider == LLMProviderType.XAI:
+        elif provider == LLMProviderType.XAI:
             return await call_xai(messages, **kwargs)
-        elif self.provider == LLMProviderType.LLAMA:
+        elif provider == LLMProviderType.LLAMA:
             return await call_llama(messages, **kwargs)
         else:
-            raise LLMError(f"Unknown LLM provider: {self.provider}")
+            raise LLMError(f"Unknown LLM provider: {provider}")
+
+    async def _stream(
+        self, provider: LLMProviderType, messages: List[Dict[str, Any]], **kwargs
+    ) -> AsyncGenerator[str, None]:
+        """Stream a response with the given provider."""
+        stream: AsyncGenerator[str, None]
+        if provider == LLMProviderType.OPENAI:
+            stream = stream_openai(messages, **kwargs)
+        elif provider == LLMProviderType.ANTHROPIC:
+            stream = stream_anthropic(messages, **kwargs)
+        elif provider == LLMProviderType.XAI:
+            stream = stream_xai(messages, **kwargs)
+        elif provider == LLMProviderType.LLAMA:
+            stream = stream_llama(messages, **kwargs)
+        else:
+            raise LLMError(f"Unknown LLM provider: {provider}")
+
+        async with aclosing(stream):
+            async for delta in stream:
+                yield delta
+
+    def _default_model(self) -> str:
+        """Return the model the provider uses when none is given."""
+        return {
+            LLMProviderType.OPENAI: settings.OPENAI_MODEL,
+            LLMProviderType.ANTHROPIC: settings.ANTHROPIC_MODEL,
+            LLMProviderType.XAI: settings.XAI_MODEL,
+            LLMProviderType.LLAMA: settings.LLAMA_MODEL_PATH,
+        }.get(self.provider, "")
+
+    def _with_system_message(self, messages: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """Add a system message with the agent's personality and goal if not present."""
+        if not messages or messages[0].get("role") != "system":
+            system_message = {
+                "role": "system",
+                "content": f"{settings.AGENT_PERSONALITY}\n\n{settings.AGENT_GOAL}",
+            }
+            messages = [system_message] + messages
+        return messages
 
 
 #: OpenAI client. Used for embedding generation.
-def get_oai_client():
-    return openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+def get_oai_client() -> openai.AsyncOpenAI:
+    return get_openai_client(api_key=settings.OPENAI_API_KEY)
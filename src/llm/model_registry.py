@@ -0,0 +1,271 @@
+import gc
+import threading
+import time
+from collections import OrderedDict
+from dataclasses import dataclass, field
+from typing import Any, Callable, Dict, List, Optional, Tuple
+
+from loguru import logger
+
+from src.core.config import settings
+
+#: Registry key: (model_path, torch_dtype, device_map)
+ModelKey = Tuple[str, str, str]
+
+#: Loader returning a `(model, tokenizer)` pair for a registry key
+ModelLoader = Callable[[], Tuple[Any, Any]]
+
+
+@dataclass
+class LoadedModel:
+    """A model and its tokenizer kept resident by the registry."""
+
+    key: ModelKey
+    model: Any
+    tokenizer: Any
+    loaded_at: float = field(default_factory=time.monotonic)
+    last_used: float = field(default_factory=time.monotonic)
+
+
+def get_available_memory_bytes() -> Optional[int]:
+    """
+    Return the amount of RAM available to new allocations.
+
+    Returns:
+        Optional[int]: Available memory in bytes, or None if it cannot be determined.
+    """
+    try:
+        with open("/proc/meminfo") as meminfo:
+            for line in meminfo:
+                if line.startswith("MemAvailable:"):
+                    return int(line.split()[1]) * 1024
+    except (OSError, ValueError, IndexError):
+        pass
+    return None
+
+
+class ModelRegistry:
+    """
+    Process-wide registry of locally loaded models.
+
+    Models are loaded lazily on first use, kept resident between calls and evicted in LRU
+    order when the registry is full, when available RAM runs low, or after an idle timeout.
+    """
+
+    def __init__(
+        self,
+        max_models: int = settings.LLAMA_MAX_LOADED_MODELS,
+        idle_timeout: float = settings.LLAMA_MODEL_IDLE_TIMEOUT,
+        min_free_memory_gb: float = settings.LLAMA_MIN_FREE_MEMORY_GB,
+    ):
+        """
+        Initialize the model registry.
+
+        Args:
+            max_models: Maximum number of models kept resident at the same time
+            idle_timeout: Seconds after which an unused model is unloaded (0 disables)
+            min_free_memory_gb: Evict models while available RAM is below this value (0 disables)
+        """
+        self.max_models = max(1, max_models)
+        self.idle_timeout = idle_timeout
+        self.min_free_memory_gb = min_free_memory_gb
+
+        self._models: "OrderedDict[ModelKey, LoadedModel]" = OrderedDict()
+        self._lock = threading.RLock()
+        self._load_locks: Dict[ModelKey, threading.Lock] = {}
+        self._unload_callbacks: List[Callable[[ModelKey], None]] = []
+        self._reaper: Optional[threading.Thread] = None
+
+    def get(self, key: ModelKey, loader: ModelLoader) -> LoadedModel:
+        """
+        Return the resident model for `key`, loading it with `loader` if necessary.
+
+        Concurrent callers asking for the same key wait for a single load.
+
+        Args:
+            key: Registry key of the model
+            loader: Callable returning a `(model, tokenizer)` pair
+
+        Returns:
+            LoadedModel: The resident model entry
+        """
+        self.evict_idle()
+
+        with self._lock:
+            entry = self._touch(key)
+            if entry:
+                return entry
+            load_lock = self._load_locks.setdefault(key, threading.Lock())
+
+        with load_lock:
+            # Another caller may have finished loading while we were waiting
+            with self._lock:
+                entry = self._touch(key)
+                if entry:
+                    return entry
+                self._make_room()
+
+            logger.info(f"Loading model {key[0]} (dtype={key[1]}, device_map={key[2]})")
+            started = time.monotonic()
+            model, tokenizer = loader()
+            entry = LoadedModel(key=key, model=model, tokenizer=tokenizer)
+
+            with self._lock:
+                self._models[key] = entry
+                self._load_locks.pop(key, None)
+            logger.info(f"Model {key[0]} loaded in {time.monotonic() - started:.1f}s")
+
+        self._start_reaper()
+        return entry
+
+    def is_loaded(self, key: ModelKey) -> bool:
+        """Check whether the model for `key` is resident."""
+        with self._lock:
+            return key in self._models
+
+    def loaded_keys(self) -> List[ModelKey]:
+        """Return the keys of all resident models, least recently used first."""
+        with self._lock:
+            return list(self._models)
+
+    def unload(self, key: ModelKey) -> bool:
+        """
+        Unload the model for `key`.
+
+        Args:
+            key: Registry key of the model
+
+        Returns:
+            bool: True if a resident model was unloaded
+        """
+        with self._lock:
+            unloaded = self._models.pop(key, None) is not None
+        if unloaded:
+            self._release([key])
+        return unloaded
+
+    def unload_all(self) -> None:
+        """Unload every resident model."""
+        with self._lock:
+            keys = list(self._models)
+            self._models.clear()
+        if keys:
+            self._release(keys)
+
+    def evict_idle(self) -> None:
+        """Unload models that have not been used within the idle timeout."""
+        if self.idle_timeout <= 0:
+            return
+        deadline = time.monotonic() - self.idle_timeout
+        with self._lock:
+            idle = [key for key, entry in self._models.items() if entry.last_used < deadline]
+        for key in idle:
+            logger.info(f"Unloading idle model {key[0]}")
+            self.unload(key)
+
+    def add_unload_callback(self, callback: Callable[[ModelKey], None]) -> None:
+        """Register a callback invoked with the key of every model that gets unloaded."""
+        self._unload_callbacks.append(callback)
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _touch(self, key: ModelKey) -> Optional[LoadedModel]:
+        """Mark `key` as most recently used and return its entry. Caller holds the lock."""
+        entry = self._models.get(key)
+        if entry:
+            entry.last_used = time.monotonic()
+            self._models.move_to_end(key)
+        return entry
+
+    def _make_room(self) -> None:
+        """Evict LRU models until there is a free slot and enough RAM. Caller holds the lock."""
+        while self._models and (len(self._models) >= self.max_models or self._under_pressure()):
+            key, _ = self._models.popitem(last=False)
+            logger.info(f"Evicting model {key[0]} to make room for a new one")
+            # Release one model at a time so the memory check sees the reclaimed RAM
+            self._release([key])
+
+    def _under_pressure(self) -> bool:
+        """Check whether available RAM is below the configured threshold."""
+        if self.min_free_memory_gb <= 0:
+            return False
+        available = get_available_memory_bytes()
+        if available is None:
+            return False
+        return available < self.min_free_memory_gb * 1024**3
+
+    def _release(self, keys: List[ModelKey]) -> None:
+        """
+        Notify unload callbacks and return the memory of unloaded models to the system.
+
+        In-flight generations keep their own references, so memory is reclaimed once they finish.
+        """
+        for key in keys:
+            for callback in self._unload_callbacks:
+                try:
+                    callback(key)
+                except Exception as e:
+                    logger.warning(f"Model unload callback failed: {e}")
+        gc.collect()
+        try:
+            import torch
+
+            if torch.cuda.is_available():
+                torch.cuda.empty_cache()
+        except ImportError:
+            pass
+
+    def _start_reaper(self) -> None:
+        """Start the background thread that unloads idle models."""
+        if self.idle_timeout <= 0:
+            return
+        with self._lock:
+            if self._reaper is not None:
+                return
+            self._reaper = threading.Thread(
+                target=self._reap, name="model-registry-reaper", daemon=True
+            )
+            self._reaper.start()
+
+    def _reap(self) -> None:
+        """Periodically evict idle models until the registry is empty."""
+        interval = min(self.idle_timeout, 60)
+        while True:
+            time.sleep(interval)
+            self.evict_idle()
+            with self._lock:
+                if not self._models:
+                    self._reaper = None
+                    return
+
+
+_registry: Optional[ModelRegistry] = None
+_registry_lock = threading.Lock()
+
+
+def get_model_registry() -> ModelRegistry:
+    """Get the process-wide model registry."""
+    global _registry
+    with _registry_lock:
+        if _registry is None:
+            _registry = ModelRegistry()
+        return _registry
+
+
+_embedding_registry: Optional[ModelRegistry] = None
+
+
+def get_embedding_model_registry() -> ModelRegistry:
+    """
+    Get the process-wide registry of local embedding models.
+
+    Embedding models are kept apart from the Llama models, so alternating embedding and
+    generation calls don't evict each other under `LLAMA_MAX_LOADED_MODELS`.
+    """
+    global _embedding_registry
+    with _registry_lock:
+        if _embedding_registry is None:
+            _embedding_registry = ModelRegistry(max_models=1)
+        return _embedding_registry
@@ -0,0 +1,131 @@
+import copy
+import hashlib
+import threading
+from collections import OrderedDict
+from dataclasses import dataclass
+from typing import Any, Optional, Tuple
+
+import torch
+from loguru import logger
+from transformers import DynamicCache
+
+from src.core.config import settings
+from src.llm.model_registry import LoadedModel, ModelKey, get_model_registry
+
+
+@dataclass
+class _PrefixEntry:
+    """Prefilled key/value cache of a prompt prefix."""
+
+    input_ids: torch.Tensor
+    past_key_values: Any
+
+
+class PrefixCache:
+    """
+    Cache of prefilled key/value states for shared prompt prefixes.
+
+    Entries are keyed by the model and a hash of the prefix text, so a changed system prompt
+    never reuses stale states. Entries of a model are dropped when the model is unloaded.
+    """
+
+    def __init__(self, max_entries: int = settings.LLAMA_PREFIX_CACHE_SIZE):
+        """
+        Initialize the prefix cache.
+
+        Args:
+            max_entries: Maximum number of cached prefixes (0 disables the cache)
+        """
+        self.max_entries = max_entries
+        self.hits = 0
+        self.misses = 0
+
+        self._entries: "OrderedDict[Tuple[ModelKey, str], _PrefixEntry]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    @property
+    def enabled(self) -> bool:
+        """Whether prefixes are cached at all."""
+        return self.max_entries > 0
+
+    def get_past_key_values(
+        self, loaded: LoadedModel, prefix: str, input_ids: torch.Tensor
+    ) -> Optional[Any]:
+        """
+        Return a private copy of the cached states for `prefix`, prefilling them on a miss.
+
+        Args:
+            loaded: The resident model and tokenizer
+            prefix: Prompt prefix shared across requests
+            input_ids: Token ids of the full prompt (batch size 1)
+
+        Returns:
+            Optional[Any]: Key/value states to pass to `generate`, or None if the tokenized
+            prompt does not start with the tokenized prefix.
+        """
+        if not self.enabled or not prefix:
+            return None
+
+        key = (loaded.key, hashlib.sha256(prefix.encode()).hexdigest())
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry:
+                self._entries.move_to_end(key)
+
+        if entry is None:
+            entry = self._prefill(loaded, prefix)
+            with self._lock:
+                self._entries[key] = entry
+                while len(self._entries) > self.max_entries:
+                    self._entries.popitem(last=False)
+            self.misses += 1
+        else:
+            self.hits += 1
+
+        # Token boundaries may differ when the prefix is tokenized on its own
+        prefix_length = entry.input_ids.shape[1]
+        if input_ids.shape[1] <= prefix_length or not torch.equal(
+            input_ids[0, :prefix_length], entry.input_ids[0].to(input_ids.device)
+        ):
+            logger.debug("Prompt does not start with the cached prefix tokens, skipping cache")
+            return None
+
+        # `generate` extends the cache in place, so every request gets its own copy
+        return copy.deepcopy(entry.past_key_values)
+
+    def invalidate(self, model_key: Optional[ModelKey] = None) -> None:
+        """
+        Drop cached prefixes.
+
+        Args:
+            model_key: Only drop prefixes of this model. Drops everything if omitted.
+        """
+        with self._lock:
+            if model_key is None:
+                self._entries.clear()
+                return
+            for key in [key for key in self._entries if key[0] == model_key]:
+                del self._entries[key]
+
+    def _prefill(self, loaded: LoadedModel, prefix: str) -> _PrefixEntry:
+        """Run the model over `prefix` once and keep its key/value states."""
+        model, tokenizer = loaded.model, loaded.tokenizer
+        inputs = tokenizer(prefix, return_tensors="pt").to(model.device)
+        with torch.no_grad():
+            outputs = model(**inputs, past_key_values=DynamicCache(), use_cache=True)
+        logger.debug(f"Prefilled prompt prefix of {inputs['input_ids'].shape[1]} tokens")
+        return _PrefixEntry(input_ids=inputs["input_ids"], past_key_values=outputs.past_key_values)
+
+
+_prefix_cache: Optional[PrefixCache] = None
+_prefix_cache_lock = threading.Lock()
+
+
+def get_prefix_cache() -> PrefixCache:
+    """Get the process-wide prompt prefix cache."""
+    global _prefix_cache
+    with _prefix_cache_lock:
+        if _prefix_cache is None:
+            _prefix_cache = PrefixCache()
+            get_model_registry().add_unload_callback(_prefix_cache.invalidate)
+        return _prefix_cache
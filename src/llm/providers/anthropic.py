@@ -1,52 +1,114 @@
-from typing import Dict, List
+from typing import Any, AsyncGenerator, Dict, List, Tuple
 
-from anthropic import AI_PROMPT, HUMAN_PROMPT, Anthropic
 from loguru import logger
 
 from src.core.config import settings
 from src.core.exceptions import LLMError
+from src.llm.clients import get_anthropic_client
 
 
-async def call_anthropic(messages: List[Dict[str, str]], **kwargs) -> str:
+def _to_anthropic_messages(
+    messages: List[Dict[str, str]],
+) -> Tuple[str, List[Dict[str, str]]]:
     """
-    Call the Anthropic Claude API.
+    Split chat messages into Anthropic's system prompt and alternating user/assistant turns.
+
+    System messages are joined into the system prompt and consecutive messages of the same role
+    are merged.
 
     Args:
         messages: A list of dicts with 'role' and 'content'.
-        kwargs: Additional parameters (e.g., model, temperature).
 
     Returns:
-        str: Response content from Anthropic.
-    """
-    #: Anthropic client
-    anthropic_client = Anthropic(api_key=settings.ANTHROPIC_API_KEY)
-
-    model = kwargs.get("model", settings.ANTHROPIC_MODEL)
-    temperature = kwargs.get("temperature", 0.7)
+        Tuple[str, List[Dict[str, str]]]: The system prompt and the conversation turns.
 
-    # Convert `messages` into Anthropic's prompt format
-    conversation = ""
+    Raises:
+        LLMError: If there are no user or assistant messages
+    """
+    system_parts: List[str] = []
+    turns: List[Dict[str, str]] = []
     for m in messages:
         if m["role"] == "system":
-            conversation += f"(System) {m['content']}\n\n"
-        elif m["role"] == "user":
-            conversation += f"{HUMAN_PROMPT} {m['content']}\n\n"
+            system_parts.append(m["content"])
+            continue
+        role = "user" if m["role"] == "user" else "assistant"
+        if turns and turns[-1]["role"] == role:
+            turns[-1]["content"] += f"\n\n{m['content']}"
         else:
-            conversation += f"{AI_PROMPT} {m['content']}\n\n"
-    conversation += AI_PROMPT
+            turns.append({"role": role, "content": m["content"]})
+
+    if not turns:
+        raise LLMError("Anthropic requires at least one user or assistant message")
+    return "\n\n".join(system_parts), turns
+
+
+def _request_params(messages: List[Dict[str, str]], **kwargs) -> Dict[str, Any]:
+    """Build the Messages API parameters for a chat conversation."""
+    system, turns = _to_anthropic_messages(messages)
+    params: Dict[str, Any] = {
+        "model": kwargs.get("model", settings.ANTHROPIC_MODEL),
+        "messages": turns,
+        "temperature": kwargs.get("temperature", 0.7),
+        "max_tokens": kwargs.get("max_tokens", settings.ANTHROPIC_MAX_TOKENS),
+    }
+    if system:
+        params["system"] = system
+    return params
 
-    logger.debug(f"Calling Anthropic with model={model}, conversation={conversation}")
+
+async def call_anthropic(messages: List[Dict[str, str]], **kwargs) -> str:
+    """
+    Call the Anthropic Messages API.
+
+    Args:
+        messages: A list of dicts with 'role' and 'content'.
+        kwargs: Additional parameters (e.g., model, temperature, max_tokens).
+
+    Returns:
+        str: Response content from Anthropic.
+    """
+    #: Shared Anthropic client
+    anthropic_client = get_anthropic_client()
+
+    params = _request_params(messages, **kwargs)
+    logger.debug(
+        f"Calling Anthropic with model={params['model']}, temperature={params['temperature']}, "
+        f"messages={params['messages']}"
+    )
 
     try:
-        response = anthropic_client.completions.create(
-            prompt=conversation,
-            model=model,
-            temperature=temperature,
-            max_tokens_to_sample=1024,
-        )
-        content = response.completion.strip()
+        response = await anthropic_client.messages.create(**params)
+        content = "".join(
+            block.text for block in response.content if getattr(block, "type", None) == "text"
+        ).strip()
         logger.debug(f"Anthropic response: {content}")
         return content
     except Exception as e:
         logger.error(f"Anthropic call failed: {e}")
         raise LLMError("Error during Anthropic API call") from e
+
+
+async def stream_anthropic(messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+    """
+    Stream a response from the Anthropic Messages API.
+
+    Args:
+        messages: A list of dicts with 'role' and 'content'.
+        kwargs: Additional parameters (e.g., model, temperature, max_tokens).
+
+    Yields:
+        str: Text chunks of the response as they arrive.
+    """
+    #: Shared Anthropic client
+    anthropic_client = get_anthropic_client()
+
+    params = _request_params(messages, **kwargs)
+    logger.debug(f"Streaming Anthropic with model={params['model']}")
+
+    try:
+        async with anthropic_client.messages.stream(**params) as stream:
+            async for text in stream.text_stream:
+                yield text
+    except Exception as e:
+        logger.error(f"Anthropic stream failed: {e}")
+        raise LLMError("Error during Anthropic API call") from e
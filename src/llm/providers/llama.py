@@ -1,12 +1,26 @@
+import asyncio
+import threading
+from dataclasses import dataclass
 from pathlib import Path
-from typing import Dict, List
+from typing import Any, AsyncGenerator, Callable, Dict, Hashable, List, Optional, Tuple
 
 import torch
 from loguru import logger
-from transformers import AutoModelForCausalLM, AutoTokenizer
+from transformers import (
+    AutoModelForCausalLM,
+    AutoTokenizer,
+    StoppingCriteria,
+    StoppingCriteriaList,
+    TextStreamer,
+)
+from transformers.generation.streamers import BaseStreamer
 
 from src.core.config import settings
 from src.core.exceptions import LLMError
+from src.llm.batcher import RequestBatcher
+from src.llm.inference_executor import get_inference_executor, shutdown_inference_executor
+from src.llm.model_registry import LoadedModel, ModelKey, get_model_registry
+from src.llm.prefix_cache import get_prefix_cache
 
 
 def validate_llama_setup(model_path: str) -> None:
@@ -41,10 +55,342 @@ def validate_llama_setup(model_path: str) -> None:
         )
 
 
+def _resolve_device_map(model_path: str, device_map: str) -> str:
+    """
+    Pick the device map for a model based on the available GPU memory.
+
+    Args:
+        model_path: Path to the Llama model directory
+        device_map: Requested device map
+
+    Returns:
+        str: The device map to load the model with
+    """
+    if torch.cuda.is_available():
+        gpu_memory = torch.cuda.get_device_properties(0).total_memory
+        gpu_memory_gb = gpu_memory / (1024**3)  # Convert to GB
+
+        # Estimate memory requirements based on model size
+        model_size = Path(model_path).name.lower()
+        required_memory = 0
+
+        if "70b" in model_size:
+            required_memory = 140
+        elif "405b" in model_size:
+            required_memory = 780
+        elif "8b" in model_size:
+            required_memory = 16
+
+        # Set device based on available memory
+        if gpu_memory_gb >= required_memory:
+            return "cuda"  # Use GPU if enough memory
+
+        logger.warning(
+            f"Insufficient GPU memory ({gpu_memory_gb:.1f}GB) for {model_size} model "
+            f"(requires {required_memory}GB). Falling back to CPU."
+        )
+        return "cpu"
+
+    logger.info("CUDA not available, using CPU")
+    return "cpu"
+
+
+def _model_key(model_path: str, device_map: str, torch_dtype: str) -> ModelKey:
+    """Build the model registry key for the given model path and loading options."""
+    return (model_path, str(torch_dtype), _resolve_device_map(model_path, device_map))
+
+
+def _load_llama(key: ModelKey) -> Tuple[Any, Any]:
+    """
+    Validate the model files and load the Llama model and tokenizer.
+
+    Args:
+        key: Model registry key (model_path, torch_dtype, device_map)
+
+    Returns:
+        Tuple[Any, Any]: The loaded model and tokenizer
+
+    Raises:
+        LLMError: If model files are missing or loading fails
+    """
+    model_path, torch_dtype, device_map = key
+
+    # Validate model setup before loading
+    validate_llama_setup(model_path)
+
+    try:
+        tokenizer = AutoTokenizer.from_pretrained(model_path)
+    except Exception as e:
+        raise LLMError(f"Failed to load Llama tokenizer: {str(e)}")
+
+    # Batched generation needs left padding; Llama tokenizers ship without a pad token
+    tokenizer.padding_side = "left"
+    if tokenizer.pad_token is None:
+        tokenizer.pad_token = tokenizer.eos_token
+
+    try:
+        model = AutoModelForCausalLM.from_pretrained(
+            model_path, torch_dtype=torch_dtype, device_map=device_map
+        )
+    except Exception as e:
+        raise LLMError(f"Failed to load Llama model: {str(e)}")
+
+    return model, tokenizer
+
+
+def get_llama(model_path: str, device_map: str = "auto", torch_dtype: str = "auto") -> LoadedModel:
+    """
+    Get a resident Llama model from the process-wide model registry, loading it if needed.
+
+    Args:
+        model_path: Path to the Llama model directory
+        device_map: Requested device map. Falls back to CPU if the GPU is too small.
+        torch_dtype: Precision to load the weights with
+
+    Returns:
+        LoadedModel: The resident model and tokenizer
+    """
+    key = _model_key(model_path, device_map, torch_dtype)
+    return get_model_registry().get(key, lambda: _load_llama(key))
+
+
+async def warmup_llama(
+    model_path: Optional[str] = None, device_map: str = "auto", torch_dtype: str = "auto"
+) -> None:
+    """
+    Load the Llama model ahead of the first request.
+
+    Loading runs on the inference executor so the event loop stays responsive.
+
+    Args:
+        model_path: Path to the Llama model directory. Defaults to `settings.LLAMA_MODEL_PATH`.
+        device_map: Requested device map
+        torch_dtype: Precision to load the weights with
+    """
+    path = model_path or settings.LLAMA_MODEL_PATH
+    await get_inference_executor().run(lambda _: get_llama(path, device_map, torch_dtype))
+
+
+def unload_llama(model_path: Optional[str] = None) -> None:
+    """
+    Unload resident Llama models.
+
+    Args:
+        model_path: Only unload models loaded from this path. Unloads everything and stops the
+            inference workers if omitted.
+    """
+    registry = get_model_registry()
+    if model_path is None:
+        registry.unload_all()
+        shutdown_inference_executor()
+        return
+    for key in registry.loaded_keys():
+        if key[0] == model_path:
+            registry.unload(key)
+
+
+class _CancelledCriteria(StoppingCriteria):
+    """Stop generation as soon as the caller cancels the request."""
+
+    def __init__(self, cancel_event: threading.Event):
+        self.cancel_event = cancel_event
+
+    def __call__(self, input_ids: torch.LongTensor, scores: torch.FloatTensor, **kwargs) -> bool:
+        return self.cancel_event.is_set()
+
+
+@dataclass(frozen=True)
+class _LlamaRequest:
+    """A formatted prompt and its shared system-prompt prefix."""
+
+    prompt: str
+    prefix: str
+
+
+def _format_messages(messages: List[Dict[str, str]]) -> str:
+    """Format chat messages into Llama prompt lines."""
+    prompt = ""
+    for msg in messages:
+        if msg["role"] == "system":
+            prompt += f"System: {msg['content']}\n"
+        elif msg["role"] == "user":
+            prompt += f"User: {msg['content']}\n"
+        else:
+            prompt += f"Assistant: {msg['content']}\n"
+    return prompt
+
+
+def _build_request(messages: List[Dict[str, str]]) -> _LlamaRequest:
+    """Format chat messages into a Llama prompt, keeping the leading system messages as prefix."""
+    system_count = 0
+    while system_count < len(messages) and messages[system_count]["role"] == "system":
+        system_count += 1
+    return _LlamaRequest(
+        prompt=_format_messages(messages) + "Assistant:",
+        prefix=_format_messages(messages[:system_count]),
+    )
+
+
+def _context_window(model_path: str) -> int:
+    """Return the context window limit based on the model size."""
+    model_size = Path(model_path).name.lower()
+    if "8b" in model_size:
+        return 2048
+    elif "70b" in model_size:
+        return 4096
+    elif "405b" in model_size:
+        return 8192
+    return 2048  # Default
+
+
+@dataclass(frozen=True)
+class _GenerationOptions:
+    """Generation options. Requests can only share a batch if their options are equal."""
+
+    model_path: str
+    device_map: str
+    torch_dtype: str
+    max_tokens: int
+    temperature: float
+    top_p: float
+
+    @classmethod
+    def from_kwargs(cls, **kwargs) -> "_GenerationOptions":
+        return cls(
+            model_path=kwargs.get("model_path", settings.LLAMA_MODEL_PATH),
+            device_map=kwargs.get("device_map", "auto"),
+            torch_dtype=str(kwargs.get("torch_dtype", "auto")),
+            max_tokens=kwargs.get("max_tokens", settings.LLAMA_MAX_TOKENS),
+            temperature=kwargs.get("temperature", 0.7),
+            top_p=kwargs.get("top_p", 0.9),
+        )
+
+
+def _prefix_past_key_values(loaded: LoadedModel, request: _LlamaRequest, input_ids: Any) -> Any:
+    """Return cached key/value states of the request's prefix, or None to prefill fully."""
+    if not request.prefix:
+        return None
+    try:
+        return get_prefix_cache().get_past_key_values(loaded, request.prefix, input_ids)
+    except Exception as e:
+        logger.warning(f"Llama prefix cache unavailable, prefilling the full prompt: {e}")
+        return None
+
+
+def _generate(
+    loaded: LoadedModel,
+    requests: List[_LlamaRequest],
+    options: _GenerationOptions,
+    cancel_event: threading.Event,
+    streamer: Optional[BaseStreamer] = None,
+) -> Tuple[int, Any]:
+    """Tokenize the prompts and run `generate`. Returns the padded prompt length and outputs."""
+    model, tokenizer = loaded.model, loaded.tokenizer
+    inputs = tokenizer(
+        [request.prompt for request in requests],
+        return_tensors="pt",
+        max_length=_context_window(options.model_path),
+        truncation=True,
+        padding=True,
+    ).to(model.device)
+    generate_kwargs: Dict[str, Any] = {}
+    if len(requests) == 1:
+        past_key_values = _prefix_past_key_values(loaded, requests[0], inputs["input_ids"])
+        if past_key_values is not None:
+            generate_kwargs["past_key_values"] = past_key_values
+    if streamer is not None:
+        generate_kwargs["streamer"] = streamer
+    outputs = model.generate(
+        **inputs,
+        **generate_kwargs,
+        max_new_tokens=options.max_tokens,
+        temperature=options.temperature,
+        do_sample=True,
+        top_p=options.top_p,
+        pad_token_id=tokenizer.eos_token_id,
+        eos_token_id=tokenizer.eos_token_id,
+        stopping_criteria=StoppingCriteriaList([_CancelledCriteria(cancel_event)]),
+    )
+    return inputs["input_ids"].shape[1], outputs
+
+
+def _generate_batch(
+    requests: List[_LlamaRequest], options: _GenerationOptions, cancel_event: threading.Event
+) -> List[Any]:
+    """
+    Load (if needed) the Llama model and generate responses for a batch of prompts.
+
+    Blocks until generation ends. Prompts are left-padded to a common length and decoded
+    in one `generate` call. A single prompt reuses the prefilled key/value states of its
+    system-prompt prefix; left padding shifts the prefix positions, so batches prefill fully.
+
+    Args:
+        requests: Formatted prompts and their system-prompt prefixes
+        options: Generation options shared by every prompt in the batch
+        cancel_event: Event set when every caller has cancelled, to stop generation early
+
+    Returns:
+        List[Any]: Response content for each prompt, or an `LLMError` for prompts that failed
+
+    Raises:
+        LLMError: If model loading or inference fails
+    """
+    loaded = get_llama(
+        options.model_path, device_map=options.device_map, torch_dtype=options.torch_dtype
+    )
+    tokenizer = loaded.tokenizer
+
+    # Generate response
+    try:
+        prompt_length, outputs = _generate(loaded, requests, options, cancel_event)
+        responses = [
+            tokenizer.decode(outputs[i][prompt_length:], skip_special_tokens=True)
+            for i in range(len(requests))
+        ]
+    except Exception as e:
+        raise LLMError(f"Llama inference failed: {str(e)}")
+
+    # Extract assistant's response
+    contents: List[Any] = []
+    for response in responses:
+        content = response.split("Assistant:")[-1].strip()
+        contents.append(content or LLMError("Llama generated empty response"))
+    return contents
+
+
+async def _run_batch(options: Hashable, requests: List[_LlamaRequest]) -> List[Any]:
+    """Run one batch of prompts on the inference executor."""
+    assert isinstance(options, _GenerationOptions)
+    return await get_inference_executor().run(
+        lambda cancel_event: _generate_batch(requests, options, cancel_event)
+    )
+
+
+_batcher: Optional[RequestBatcher[_LlamaRequest, str]] = None
+
+
+def _get_batcher() -> RequestBatcher[_LlamaRequest, str]:
+    """Get the process-wide request batcher in front of the local model."""
+    global _batcher
+    if _batcher is None:
+        _batcher = RequestBatcher(
+            _run_batch,
+            max_batch_size=settings.LLAMA_BATCH_MAX_SIZE,
+            max_wait_ms=settings.LLAMA_BATCH_MAX_WAIT_MS,
+            name="llama-batcher",
+        )
+    return _batcher
+
+
 async def call_llama(messages: List[Dict[str, str]], **kwargs) -> str:
     """
     Call the Llama model for text generation.
 
+    The model is loaded once and kept resident in the process-wide model registry. Concurrent
+    requests with the same generation options are coalesced into one batched `generate` call,
+    which runs on the inference executor so the event loop is never blocked. The key/value
+    states of the system prompt are computed once and reused across requests.
+
     Args:
         messages: A list of dicts with 'role' and 'content'.
         kwargs: Additional parameters (e.g., model, temperature).
@@ -53,107 +399,13 @@ async def call_llama(messages: List[Dict[str, str]], **kwargs) -> str:
         str: Response content from Llama.
 
     Raises:
-        LLMError: If model loading or inference fails
+        LLMError: If model loading or inference fails, or the inference queue is full
     """
-    model_path = kwargs.get("model_path", settings.LLAMA_MODEL_PATH)
-    max_tokens = kwargs.get("max_tokens", settings.LLAMA_MAX_TOKENS)
-    temperature = kwargs.get("temperature", 0.7)
-
     try:
-        # Validate model setup before loading
-        validate_llama_setup(model_path)
-
-        # Check available memory and adjust device map
-        device_map = kwargs.get("device_map", "auto")
-
-        if torch.cuda.is_available():
-            gpu_memory = torch.cuda.get_device_properties(0).total_memory
-            gpu_memory_gb = gpu_memory / (1024**3)  # Convert to GB
-
-            # Estimate memory requirements based on model size
-            model_size = Path(model_path).name.lower()
-            required_memory = 0
-
-            if "70b" in model_size:
-                required_memory = 140
-            elif "405b" in model_size:
-                required_memory = 780
-            elif "8b" in model_size:
-                required_memory = 16
-
-            # Set device based on available memory
-            if gpu_memory_gb >= required_memory:
-                device_map = "cuda"  # Use GPU if enough memory
-            else:
-                logger.warning(
-                    f"Insufficient GPU memory ({gpu_memory_gb:.1f}GB) for {model_size} model "
-                    f"(requires {required_memory}GB). Falling back to CPU."
-                )
-                device_map = "cpu"
-        else:
-            logger.info("CUDA not available, using CPU")
-            device_map = "cpu"
-
-        # Load model and tokenizer
-        try:
-            tokenizer = AutoTokenizer.from_pretrained(model_path)
-        except Exception as e:
-            raise LLMError(f"Failed to load Llama tokenizer: {str(e)}")
-
-        try:
-            model = AutoModelForCausalLM.from_pretrained(
-                model_path, torch_dtype="auto", device_map=device_map
-            )
-        except Exception as e:
-            raise LLMError(f"Failed to load Llama model: {str(e)}")
-
-        # Format messages into prompt
-        prompt = ""
-        for msg in messages:
-            if msg["role"] == "system":
-                prompt += f"System: {msg['content']}\n"
-            elif msg["role"] == "user":
-                prompt += f"User: {msg['content']}\n"
-            else:
-                prompt += f"Assistant: {msg['content']}\n"
-        prompt += "Assistant:"
-
-        logger.debug(f"Calling Llama with prompt: {prompt}")
-
-        # Add context window limits based on model size
-        model_size = Path(model_path).name.lower()
-        if "8b" in model_size:
-            max_length = 2048
-        elif "70b" in model_size:
-            max_length = 4096
-        elif "405b" in model_size:
-            max_length = 8192
-        else:
-            max_length = 2048  # Default
-
-        # Generate response
-        try:
-            inputs = tokenizer(
-                prompt, return_tensors="pt", max_length=max_length, truncation=True
-            ).to(model.device)
-            outputs = model.generate(
-                **inputs,
-                max_new_tokens=max_tokens,
-                temperature=temperature,
-                do_sample=True,
-                top_p=kwargs.get("top_p", 0.9),
-                pad_token_id=tokenizer.eos_token_id,
-                eos_token_id=tokenizer.eos_token_id,
-            )
-            response = tokenizer.decode(outputs[0], skip_special_tokens=True)
-        except Exception as e:
-            raise LLMError(f"Llama inference failed: {str(e)}")
-
-        # Extract assistant's response
-        content = response.split("Assistant:")[-1].strip()
-        if not content:
-            raise LLMError("Llama generated empty response")
+        request = _build_request(messages)
+        logger.debug(f"Calling Llama with prompt: {request.prompt}")
 
+        content = await _get_batcher().submit(request, _GenerationOptions.from_kwargs(**kwargs))
         logger.debug(f"Llama response: {content}")
         return content
 
@@ -162,3 +414,82 @@ async def call_llama(messages: List[Dict[str, str]], **kwargs) -> str:
     except Exception as e:
         logger.error(f"Unexpected error in Llama call: {e}")
         raise LLMError("Error during Llama model inference") from e
+
+
+class _CallbackStreamer(TextStreamer):
+    """Hand decoded text to a callback as generation produces it."""
+
+    def __init__(self, tokenizer: Any, on_text: Callable[[str], None]):
+        super().__init__(tokenizer, skip_prompt=True, skip_special_tokens=True)
+        self.on_text = on_text
+
+    def on_finalized_text(self, text: str, stream_end: bool = False) -> None:
+        if text:
+            self.on_text(text)
+
+
+def _generate_stream(
+    request: _LlamaRequest,
+    options: _GenerationOptions,
+    cancel_event: threading.Event,
+    on_text: Callable[[str], None],
+) -> None:
+    """
+    Load (if needed) the Llama model and generate a response, passing text to `on_text`.
+
+    Blocks until generation ends or `cancel_event` is set.
+
+    Raises:
+        LLMError: If model loading or inference fails
+    """
+    loaded = get_llama(
+        options.model_path, device_map=options.device_map, torch_dtype=options.torch_dtype
+    )
+    try:
+        streamer = _CallbackStreamer(loaded.tokenizer, on_text)
+        _generate(loaded, [request], options, cancel_event, streamer=streamer)
+    except Exception as e:
+        raise LLMError(f"Llama inference failed: {str(e)}")
+
+
+async def stream_llama(messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+    """
+    Stream a response from the Llama model.
+
+    Generation runs on the inference executor and decoded text is handed back to the event loop
+    as it is produced. Closing the generator early stops generation.
+
+    Args:
+        messages: A list of dicts with 'role' and 'content'.
+        kwargs: Additional parameters (e.g., model, temperature).
+
+    Yields:
+        str: Text deltas of the response as they are generated.
+
+    Raises:
+        LLMError: If model loading or inference fails, or the inference queue is full
+    """
+    request = _build_request(messages)
+    options = _GenerationOptions.from_kwargs(**kwargs)
+    logger.debug(f"Streaming Llama with prompt: {request.prompt}")
+
+    loop = asyncio.get_running_loop()
+    chunks: asyncio.Queue[Optional[str]] = asyncio.Queue()
+
+    def on_text(text: str) -> None:
+        loop.call_soon_threadsafe(chunks.put_nowait, text)
+
+    task = asyncio.ensure_future(
+        get_inference_executor().run(
+            lambda cancel_event: _generate_stream(request, options, cancel_event, on_text)
+        )
+    )
+    task.add_done_callback(lambda _: chunks.put_nowait(None))
+    try:
+        while (text := await chunks.get()) is not None:
+            yield text
+        await task
+    finally:
+        # Cancelling the job sets its cancel event, which stops `generate`
+        if not task.done():
+            task.cancel()
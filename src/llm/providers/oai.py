@@ -1,10 +1,11 @@
-from typing import Dict, List
+from typing import AsyncGenerator, Dict, List, cast
 
-import openai
 from loguru import logger
+from openai.types.chat import ChatCompletionMessageParam
 
 from src.core.config import settings
 from src.core.exceptions import LLMError
+from src.llm.clients import get_openai_client
 
 
 async def call_openai(messages: List[Dict[str, str]], **kwargs) -> str:
@@ -18,8 +19,8 @@ async def call_openai(messages: List[Dict[str, str]], **kwargs) -> str:
     Returns:
         str: Response content from OpenAI.
     """
-    #: OpenAI client
-    openai_client = openai.AsyncOpenAI(api_key=settings.OPENAI_API_KEY)
+    #: Shared OpenAI client
+    openai_client = get_openai_client()
 
     model = kwargs.get("model", settings.OPENAI_MODEL)
     temperature = kwargs.get("temperature", 0.2)
@@ -43,3 +44,40 @@ async def call_openai(messages: List[Dict[str, str]], **kwargs) -> str:
     except Exception as e:
         logger.error(f"OpenAI call failed: {e}")
         raise LLMError("Error during OpenAI API call") from e
+
+
+async def stream_openai(messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+    """
+    Stream a response from the OpenAI ChatCompletion endpoint.
+
+    Closing the generator early closes the HTTP stream, which stops generation.
+
+    Args:
+        messages: A list of dicts with 'role' and 'content'.
+        kwargs: Additional parameters (e.g., model, temperature).
+
+    Yields:
+        str: Text deltas of the response as they arrive.
+    """
+    #: Shared OpenAI client
+    openai_client = get_openai_client()
+
+    model = kwargs.get("model", settings.OPENAI_MODEL)
+    temperature = kwargs.get("temperature", 0.2)
+
+    logger.debug(f"Streaming OpenAI with model={model}, temperature={temperature}")
+
+    try:
+        stream = await openai_client.chat.completions.create(
+            model=model,
+            messages=cast(List[ChatCompletionMessageParam], messages),
+            temperature=temperature,
+            stream=True,
+        )
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error(f"OpenAI stream failed: {e}")
+        raise LLMError("Error during OpenAI API call") from e
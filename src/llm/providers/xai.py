@@ -1,10 +1,11 @@
-from typing import Dict, List
+from typing import AsyncGenerator, Dict, List, cast
 
-import openai
 from loguru import logger
+from openai.types.chat import ChatCompletionMessageParam
 
 from src.core.config import settings
 from src.core.exceptions import LLMError
+from src.llm.clients import get_xai_client
 
 
 async def call_xai(messages: List[Dict[str, str]], **kwargs) -> str:
@@ -18,8 +19,8 @@ async def call_xai(messages: List[Dict[str, str]], **kwargs) -> str:
     Returns:
         str: Response content from xAI.
     """
-    #: OpenAI client
-    client = openai.AsyncOpenAI(api_key=settings.XAI_API_KEY)
+    #: Shared xAI client
+    client = get_xai_client()
 
     model = kwargs.get("model", settings.XAI_MODEL)
     temperature = kwargs.get("temperature", 0.2)
@@ -41,3 +42,40 @@ async def call_xai(messages: List[Dict[str, str]], **kwargs) -> str:
     except Exception as e:
         logger.error(f"xAI call failed: {e}")
         raise LLMError("Error during xAI API call") from e
+
+
+async def stream_xai(messages: List[Dict[str, str]], **kwargs) -> AsyncGenerator[str, None]:
+    """
+    Stream a response from the xAI ChatCompletion endpoint.
+
+    Closing the generator early closes the HTTP stream, which stops generation.
+
+    Args:
+        messages: A list of dicts with 'role' and 'content'.
+        kwargs: Additional parameters (e.g., model, temperature).
+
+    Yields:
+        str: Text deltas of the response as they arrive.
+    """
+    #: Shared xAI client
+    client = get_xai_client()
+
+    model = kwargs.get("model", settings.XAI_MODEL)
+    temperature = kwargs.get("temperature", 0.2)
+
+    logger.debug(f"Streaming xAI with model={model}, temperature={temperature}")
+
+    try:
+        stream = await client.chat.completions.create(
+            model=model,
+            messages=cast(List[ChatCompletionMessageParam], messages),
+            temperature=temperature,
+            stream=True,
+        )
+        async with stream:
+            async for chunk in stream:
+                if chunk.choices and chunk.choices[0].delta.content:
+                    yield chunk.choices[0].delta.content
+    except Exception as e:
+        logger.error(f"xAI stream failed: {e}")
+        raise LLMError("Error during xAI API call") from e
@@ -0,0 +1,322 @@
+import asyncio
+import threading
+import time
+from collections import deque
+from contextlib import aclosing
+from typing import Any, AsyncGenerator, Awaitable, Callable, Deque, Dict, List, Optional, Set
+
+import numpy as np
+from loguru import logger
+
+from src.core.config import settings
+from src.core.defs import LLMProviderType
+from src.core.exceptions import LLMError
+
+#: Provider call: (provider, messages, kwargs) -> response
+ProviderCall = Callable[..., Awaitable[str]]
+
+#: Provider stream: (provider, messages, kwargs) -> text deltas of the response
+ProviderStream = Callable[..., AsyncGenerator[str, None]]
+
+#: Success rate floor when inflating latencies by error rates, so failing providers stay ranked
+MIN_SUCCESS_RATE = 0.05
+
+
+class ProviderStats:
+    """
+    Rolling latency and error statistics of one provider, with a circuit breaker.
+
+    The circuit opens after `failure_threshold` consecutive failures and rejects the provider
+    for `reset_timeout` seconds. After that one trial request is let through: a success closes
+    the circuit, a failure opens it again.
+    """
+
+    def __init__(
+        self,
+        window: int = settings.LLM_ROUTER_WINDOW,
+        failure_threshold: int = settings.LLM_CIRCUIT_FAILURE_THRESHOLD,
+        reset_timeout: float = settings.LLM_CIRCUIT_RESET_TIMEOUT,
+    ):
+        """
+        Initialize the provider statistics.
+
+        Args:
+            window: Number of recent requests the statistics are computed over
+            failure_threshold: Consecutive failures that open the circuit
+            reset_timeout: Seconds the circuit stays open before a trial request
+        """
+        self.failure_threshold = max(1, failure_threshold)
+        self.reset_timeout = reset_timeout
+
+        self._latencies: Deque[float] = deque(maxlen=window)
+        self._outcomes: Deque[bool] = deque(maxlen=window)
+        self._consecutive_failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+
+    @property
+    def samples(self) -> int:
+        """Number of successful requests in the window."""
+        return len(self._latencies)
+
+    @property
+    def p50(self) -> float:
+        """Median latency in seconds of recent successful requests (0 without samples)."""
+        return float(np.percentile(self._latencies, 50)) if self._latencies else 0.0
+
+    @property
+    def p95(self) -> float:
+        """95th percentile latency in seconds of recent successful requests (0 without samples)."""
+        return float(np.percentile(self._latencies, 95)) if self._latencies else 0.0
+
+    @property
+    def error_rate(self) -> float:
+        """Share of recent requests that failed."""
+        return self._outcomes.count(False) / len(self._outcomes) if self._outcomes else 0.0
+
+    @property
+    def expected_latency(self) -> float:
+        """
+        Median latency inflated by the error rate, approximating the time to a successful
+        response when failed requests are retried (infinite without samples).
+        """
+        if not self._latencies:
+            return float("inf")
+        return self.p50 / max(1.0 - self.error_rate, MIN_SUCCESS_RATE)
+
+    @property
+    def circuit_open(self) -> bool:
+        """Whether the provider is currently rejected."""
+        return self._opened_at is not None
+
+    def available(self) -> bool:
+        """Check whether a request may be sent, claiming the trial slot of a half-open circuit."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            if self._trial_in_flight or time.monotonic() - self._opened_at < self.reset_timeout:
+                return False
+            self._trial_in_flight = True
+            return True
+
+    def record_success(self, latency: float) -> None:
+        """Record a successful request and close the circuit."""
+        with self._lock:
+            self._latencies.append(latency)
+            self._outcomes.append(True)
+            self._consecutive_failures = 0
+            self._opened_at = None
+            self._trial_in_flight = False
+
+    def record_failure(self) -> None:
+        """Record a failed request, opening the circuit after too many in a row."""
+        with self._lock:
+            self._outcomes.append(False)
+            self._consecutive_failures += 1
+            if self._trial_in_flight or self._consecutive_failures >= self.failure_threshold:
+                self._opened_at = time.monotonic()
+            self._trial_in_flight = False
+
+    def release(self) -> None:
+        """Give back a trial slot whose request was cancelled before it finished."""
+        with self._lock:
+            self._trial_in_flight = False
+
+
+class LLMRouter:
+    """
+    Route requests across LLM providers by latency and health.
+
+    Providers with an open circuit are skipped and the rest are tried fastest first, by rolling
+    p50 latency inflated by their error rate. Providers without latency samples come after the
+    measured ones, in configured order, so traffic doesn't move to an unmeasured fallback. If
+    the first provider hasn't answered after `hedge_delay` seconds, the same request is sent to
+    the next provider and the first response wins. Failed requests fall back to the next
+    provider.
+
+    Streams are routed the same way, without hedging. A stream that fails before its first
+    delta falls back to the next provider; once deltas were yielded, errors are raised.
+    """
+
+    def __init__(
+        self,
+        providers: List[LLMProviderType],
+        call: ProviderCall,
+        stats: Optional[Dict[LLMProviderType, ProviderStats]] = None,
+        hedge_delay: float = settings.LLM_ROUTER_HEDGE_DELAY,
+        stream: Optional[ProviderStream] = None,
+    ):
+        """
+        Initialize the router.
+
+        Args:
+            providers: Providers to route between. The first one is the preferred provider and
+                the only one that receives the `model` parameter.
+            call: Async callable sending a request to a provider
+            stats: Shared provider statistics. Defaults to the process-wide statistics.
+            hedge_delay: Seconds to wait before hedging with the next provider (0 disables)
+            stream: Async generator function streaming a request from a provider, used by
+                `stream`
+        """
+        self.providers = list(dict.fromkeys(providers))
+        self.call = call
+        self.stream_call = stream
+        self.stats = stats if stats is not None else get_provider_stats()
+        self.hedge_delay = hedge_delay
+        for provider in self.providers:
+            self.stats.setdefault(provider, ProviderStats())
+
+    def rank(self) -> List[LLMProviderType]:
+        """Return the providers in the order they should be tried, fastest first."""
+        order = {provider: i for i, provider in enumerate(self.providers)}
+        return sorted(
+            self.providers,
+            key=lambda p: (self.stats[p].circuit_open, self.stats[p].expected_latency, order[p]),
+        )
+
+    async def generate(self, messages: List[Dict[str, Any]], **kwargs) -> str:
+        """
+        Generate a response with the fastest healthy provider.
+
+        Args:
+            messages: A list of dicts, each containing 'role' and 'content'.
+            kwargs: Additional parameters (e.g., model, temperature).
+
+        Returns:
+            str: LLM response text
+
+        Raises:
+            LLMError: If every provider failed or is unavailable
+        """
+        candidates = iter(self.rank())
+        pending: Set[asyncio.Task] = set()
+        last_error: Optional[BaseException] = None
+        hedged = False
+
+        def launch() -> bool:
+            for provider in candidates:
+                if self.stats[provider].available():
+                    task = asyncio.ensure_future(self._attempt(provider, messages, **kwargs))
+                    pending.add(task)
+                    return True
+                logger.debug(f"Skipping LLM provider {provider.value}: circuit open")
+            return False
+
+        try:
+            launch()
+            while pending:
+                timeout = self.hedge_delay if self.hedge_delay > 0 and not hedged else None
+                done, _ = await asyncio.wait(
+                    pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED
+                )
+                if not done:
+                    hedged = True
+                    if launch():
+                        logger.debug(f"No response after {self.hedge_delay}s, hedging request")
+                    continue
+
+                for task in done:
+                    pending.discard(task)
+                    if task.exception() is None:
+                        return task.result()
+                    last_error = task.exception()
+                if not pending:
+                    launch()
+        finally:
+            for task in pending:
+                task.cancel()
+
+        raise LLMError("No LLM provider could handle the request") from last_error
+
+    async def stream(self, messages: List[Dict[str, Any]], **kwargs) -> AsyncGenerator[str, None]:
+        """
+        Stream a response from the fastest healthy provider.
+
+        Args:
+            messages: A list of dicts, each containing 'role' and 'content'.
+            kwargs: Additional parameters (e.g., model, temperature).
+
+        Yields:
+            str: Text deltas of the response as they arrive.
+
+        Raises:
+            LLMError: If every provider failed before its first delta or is unavailable
+        """
+        if self.stream_call is None:
+            raise LLMError("The LLM router has no stream call")
+
+        last_error: Optional[BaseException] = None
+        for provider in self.rank():
+            stats = self.stats[provider]
+            if not stats.available():
+                logger.debug(f"Skipping LLM provider {provider.value}: circuit open")
+                continue
+
+            provider_kwargs = dict(kwargs)
+            if provider != self.providers[0]:
+                # Model names are provider specific
+                provider_kwargs.pop("model", None)
+            started = time.monotonic()
+            received = False
+            try:
+                async with aclosing(
+                    self.stream_call(provider, messages, **provider_kwargs)
+                ) as stream:
+                    async for delta in stream:
+                        received = True
+                        yield delta
+            except Exception as e:
+                stats.record_failure()
+                logger.warning(f"LLM provider {provider.value} stream failed: {e}")
+                if received:
+                    raise
+                last_error = e
+                continue
+            except BaseException:
+                # Cancelled, or closed by the consumer
+                if received:
+                    stats.record_success(time.monotonic() - started)
+                else:
+                    stats.release()
+                raise
+
+            stats.record_success(time.monotonic() - started)
+            return
+
+        raise LLMError("No LLM provider could handle the request") from last_error
+
+    async def _attempt(
+        self, provider: LLMProviderType, messages: List[Dict[str, Any]], **kwargs
+    ) -> str:
+        """Send the request to one provider and record the outcome."""
+        if provider != self.providers[0]:
+            # Model names are provider specific
+            kwargs.pop("model", None)
+
+        stats = self.stats[provider]
+        started = time.monotonic()
+        try:
+            response = await self.call(provider, messages, **kwargs)
+        except asyncio.CancelledError:
+            stats.release()
+            raise
+        except Exception as e:
+            stats.record_failure()
+            logger.warning(f"LLM provider {provider.value} failed: {e}")
+            raise
+
+        stats.record_success(time.monotonic() - started)
+        logger.debug(
+            f"LLM provider {provider.value} answered in {time.monotonic() - started:.2f}s "
+            f"(p50 {stats.p50:.2f}s, p95 {stats.p95:.2f}s, errors {stats.error_rate:.0%})"
+        )
+        return response
+
+
+_provider_stats: Dict[LLMProviderType, ProviderStats] = {}
+
+
+def get_provider_stats() -> Dict[LLMProviderType, ProviderStats]:
+    """Get the process-wide provider statistics."""
+    return _provider_stats
@@ -0,0 +1,85 @@
+import asyncio
+import functools
+import hashlib
+import json
+from dataclasses import dataclass
+from typing import Any, Awaitable, Callable, Dict, Generic, TypeVar
+
+from loguru import logger
+
+T = TypeVar("T")
+
+
+def request_key(*parts: Any) -> str:
+    """Return a stable hash of JSON-serializable request parts."""
+    return hashlib.sha256(json.dumps(parts, sort_keys=True, default=str).encode()).hexdigest()
+
+
+@dataclass
+class _Call(Generic[T]):
+    """An in-flight upstream call and the number of callers waiting for it."""
+
+    task: "asyncio.Task[T]"
+    waiters: int = 0
+
+
+class SingleFlight(Generic[T]):
+    """
+    De-duplicate identical in-flight requests.
+
+    The first caller for a key starts the upstream call; callers arriving with the same key
+    while it is running wait for that call and receive the same result (or exception). The
+    upstream call is cancelled only once every waiting caller has been cancelled.
+    """
+
+    def __init__(self, name: str = "singleflight"):
+        """
+        Initialize the single-flight group.
+
+        Args:
+            name: Name used in log messages
+        """
+        self.name = name
+        self.calls = 0
+        self.shared = 0
+
+        self._inflight: Dict[str, _Call[T]] = {}
+
+    async def do(self, key: str, fn: Callable[[], Awaitable[T]]) -> T:
+        """
+        Run `fn` for `key`, or join the identical call that is already running.
+
+        Args:
+            key: Request key, e.g. from `request_key`
+            fn: Callable starting the upstream call
+
+        Returns:
+            T: Result of the upstream call, shared by every caller with the same key
+        """
+        call = self._inflight.get(key)
+        if call is None:
+            call = _Call(task=asyncio.ensure_future(fn()))
+            self._inflight[key] = call
+            call.task.add_done_callback(functools.partial(self._forget, key, call))
+            self.calls += 1
+        else:
+            self.shared += 1
+            logger.debug(f"{self.name}: joining in-flight request ({self.shared} shared so far)")
+
+        call.waiters += 1
+        try:
+            return await asyncio.shield(call.task)
+        except asyncio.CancelledError:
+            if call.task.cancelled():
+                raise
+            call.waiters -= 1
+            if call.waiters == 0:
+                # Nobody is waiting anymore; new callers must not join the cancelled call
+                self._forget(key, call, call.task)
+                call.task.cancel()
+            raise
+
+    def _forget(self, key: str, call: _Call[T], _: asyncio.Future) -> None:
+        """Drop a finished call, unless a newer call already replaced it."""
+        if self._inflight.get(key) is call:
+            del self._inflight[key]
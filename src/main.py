@@ -3,6 +3,10 @@ import asyncio
 from loguru import logger
 
 from src.agent import Agent
+from src.core.config import settings
+from src.core.defs import LLMProviderType
+from src.llm.clients import close_clients
+from src.llm.providers.llama import unload_llama, warmup_llama
 from src.utils import log_settings
 
 # Configure logging
@@ -20,11 +24,19 @@ async def async_main():
     agent = Agent()
 
     try:
+        # Load local model weights before the first action needs them
+        if settings.LLM_PROVIDER == LLMProviderType.LLAMA:
+            await warmup_llama()
+
         # Start the async runtime loop
         await agent.start_runtime_loop()
     except Exception as global_error:
         logger.critical(f"Fatal error in the runtime: {global_error}")
     finally:
+        # Store memories still waiting in the write buffer
+        await agent.memory_module.close()
+        unload_llama()
+        await close_clients()
         logger.info("Agent runtime has stopped.")
 
 
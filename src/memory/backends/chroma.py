@@ -1,17 +1,212 @@
+import asyncio
+import dataclasses
+import functools
+import time
 import uuid
 from abc import ABC, abstractmethod
+from concurrent.futures import ThreadPoolExecutor
+from dataclasses import dataclass, field
 from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional, Sequence
+from typing import Any, Callable, Dict, List, Optional, Sequence, TypeVar, Union, cast
 
 import chromadb
+import numpy as np
 from chromadb.config import Settings
 from loguru import logger
 
 from src.core.config import settings
+from src.core.exceptions import MemoryError as MemoryBackendError
+
+T = TypeVar("T")
+
+#: Embedding vector, a numpy array (float32 or float16) or a list of floats
+Vector = Union[np.ndarray, List[float]]
+
+#: Payload field holding the store time as Unix seconds, for time range filters and ordering
+TIMESTAMP_UNIX_FIELD = "timestamp_unix"
+
+#: Seconds of the newest time slice fetched by `ChromaBackend.recent`, doubled for each older one
+RECENT_FIRST_SLICE = 60.0
+
+#: Number of time slices `ChromaBackend.recent` fetches before fetching all older memories
+RECENT_MAX_SLICES = 20
+
+
+def as_float_list(vector: Vector) -> List[float]:
+    """Convert a vector to a list of floats for clients that don't accept numpy arrays."""
+    if isinstance(vector, np.ndarray):
+        return cast(List[float], vector.astype(np.float32).tolist())
+    return vector
+
+
+def _as_float32(vector: Vector) -> Sequence[float]:
+    """Widen float16 arrays to the float32 ChromaDB stores."""
+    if isinstance(vector, np.ndarray):
+        return cast(Sequence[float], vector.astype(np.float32, copy=False))
+    return vector
+
+
+@dataclass
+class MemoryRecord:
+    """A memory entry with its embedding, as written to a backend."""
+
+    event: str
+    action: str
+    outcome: str
+    embedding: Vector
+    metadata: Optional[Dict[str, Any]] = None
+
+
+@dataclass
+class MemoryFilter:
+    """
+    Conditions on memory payloads, applied by the backends before ranking.
+
+    `fields` maps payload fields to a required value, or to a list, tuple or set of accepted
+    values. `exclude` maps payload fields to rejected values in the same way; memories without
+    the field are not rejected. `since` (inclusive) and `until` (exclusive) bound the time a
+    memory was stored.
+    """
+
+    fields: Dict[str, Any] = field(default_factory=dict)
+    since: Optional[datetime] = None
+    until: Optional[datetime] = None
+    exclude: Dict[str, Any] = field(default_factory=dict)
+
+    def matches(self, payload: Dict[str, Any]) -> bool:
+        """Check whether a memory payload satisfies the filter."""
+        for key, value in self.fields.items():
+            if key not in payload:
+                return False
+            if is_multi_value(value):
+                if payload[key] not in value:
+                    return False
+            elif payload[key] != value:
+                return False
+        for key, value in self.exclude.items():
+            if key in payload and (
+                payload[key] in value if is_multi_value(value) else payload[key] == value
+            ):
+                return False
+        if self.since is None and self.until is None:
+            return True
+        stored_at = payload_time(payload)
+        if stored_at is None:
+            return False
+        return (self.since is None or stored_at >= self.since.timestamp()) and (
+            self.until is None or stored_at < self.until.timestamp()
+        )
+
+
+def memory_payloads(records: Sequence[MemoryRecord]) -> List[Dict[str, Any]]:
+    """Build the payloads stored with memory entries, stamped with the current time."""
+    now = datetime.now(timezone.utc)
+    timestamp = now.isoformat()
+    return [
+        {
+            **(record.metadata or {}),
+            "event": record.event,
+            "action": record.action,
+            "outcome": record.outcome,
+            "timestamp": timestamp,
+            TIMESTAMP_UNIX_FIELD: now.timestamp(),
+        }
+        for record in records
+    ]
+
+
+def payload_time(payload: Dict[str, Any]) -> Optional[float]:
+    """
+    Return the time a memory was stored as Unix seconds, from its `timestamp_unix` field or,
+    for memories stored before that field existed, its ISO `timestamp`.
+    """
+    if TIMESTAMP_UNIX_FIELD in payload:
+        return float(payload[TIMESTAMP_UNIX_FIELD])
+    try:
+        stored_at = datetime.fromisoformat(payload["timestamp"])
+    except (KeyError, TypeError, ValueError):
+        return None
+    if stored_at.tzinfo is None:
+        stored_at = stored_at.replace(tzinfo=timezone.utc)
+    return stored_at.timestamp()
+
+
+def is_multi_value(value: Any) -> bool:
+    """Check whether a filter value lists several accepted values."""
+    return isinstance(value, (list, tuple, set))
 
 
 class MemoryBackend(ABC):
-    """Abstract base class for memory backends."""
+    """
+    Abstract base class for memory backends.
+
+    Blocking client calls go through `_run`, which runs them on the backend's own worker
+    threads so that a slow vector store doesn't block the event loop. Writes go through
+    `_run_write`, which waits for them without a timeout: a worker thread can't be stopped, so
+    a write that timed out would still commit while its caller retries it.
+    """
+
+    #: Maximum number of client calls running at the same time
+    max_concurrency: int = settings.MEMORY_BACKEND_MAX_CONCURRENCY
+
+    #: Seconds to wait for a read, including the wait for a free worker (0 waits forever)
+    timeout: float = settings.MEMORY_BACKEND_TIMEOUT
+
+    _executor: Optional[ThreadPoolExecutor] = None
+
+    async def _run(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking client call on a worker thread and wait for its result.
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments of `func`
+            **kwargs: Keyword arguments of `func`
+
+        Returns:
+            T: The result of `func`
+
+        Raises:
+            MemoryBackendError: If the call doesn't finish within `timeout` seconds
+        """
+        try:
+            return await asyncio.wait_for(self._submit(func, *args, **kwargs), self.timeout or None)
+        except asyncio.TimeoutError:
+            raise MemoryBackendError(
+                f"{type(self).__name__} call timed out after {self.timeout} seconds"
+            )
+
+    async def _run_write(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> T:
+        """
+        Run a blocking write on a worker thread and wait until it has finished, without a
+        timeout, so that a write reported as failed was not committed.
+
+        Args:
+            func: Blocking callable
+            *args: Positional arguments of `func`
+            **kwargs: Keyword arguments of `func`
+
+        Returns:
+            T: The result of `func`
+        """
+        return await self._submit(func, *args, **kwargs)
+
+    def _submit(self, func: Callable[..., T], *args: Any, **kwargs: Any) -> "asyncio.Future[T]":
+        """Submit a blocking call to the backend's worker threads."""
+        if self._executor is None:
+            self._executor = ThreadPoolExecutor(
+                max_workers=max(1, self.max_concurrency),
+                thread_name_prefix=f"{type(self).__name__}-io",
+            )
+        return asyncio.get_running_loop().run_in_executor(
+            self._executor, functools.partial(func, *args, **kwargs)
+        )
+
+    async def close(self) -> None:
+        """Shut down the worker threads. Calls still running are not waited for."""
+        if self._executor is not None:
+            self._executor.shutdown(wait=False, cancel_futures=True)
+            self._executor = None
 
     @abstractmethod
     async def store(
@@ -19,15 +214,52 @@ class MemoryBackend(ABC):
         event: str,
         action: str,
         outcome: str,
-        embedding: List[float],
+        embedding: Vector,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
         """Store a memory entry with its embedding."""
         pass
 
+    async def store_many(self, records: List[MemoryRecord]) -> None:
+        """Store several memory entries. Backends override this with a bulk write."""
+        for record in records:
+            await self.store(
+                event=record.event,
+                action=record.action,
+                outcome=record.outcome,
+                embedding=record.embedding,
+                metadata=record.metadata,
+            )
+
     @abstractmethod
-    async def search(self, query_vector: List[float], top_k: int = 3) -> List[Dict[str, Any]]:
-        """Search for similar memories using a query vector."""
+    async def search(
+        self,
+        query_vector: Vector,
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        """Search for similar memories matching a filter using a query vector."""
+        pass
+
+    async def search_many(
+        self,
+        query_vectors: List[Vector],
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """Search for similar memories of several query vectors. Backends override this."""
+        return [await self.search(vector, top_k, memory_filter) for vector in query_vectors]
+
+    @abstractmethod
+    async def recent(
+        self, top_k: int = 3, memory_filter: Optional[MemoryFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """Return the most recently stored memories matching a filter, newest first."""
+        pass
+
+    @abstractmethod
+    async def delete(self, memory_filter: MemoryFilter) -> None:
+        """Delete the memories matching a non-empty filter."""
         pass
 
 
@@ -38,8 +270,20 @@ class ChromaBackend(MemoryBackend):
         self,
         collection_name: str = settings.MEMORY_COLLECTION_NAME,
         persist_directory: str = settings.MEMORY_PERSIST_DIRECTORY,
+        vector_size: Optional[int] = None,
     ):
-        """Initialize ChromaDB backend."""
+        """
+        Initialize ChromaDB backend.
+
+        Args:
+            collection_name: Name of the collection
+            persist_directory: Directory to persist the data
+            vector_size: Expected size of the embeddings. An existing collection with vectors
+                of another size is rejected.
+
+        Raises:
+            ValueError: If the collection holds vectors of another size
+        """
         self.client = chromadb.Client(
             Settings(persist_directory=persist_directory, is_persistent=True)
         )
@@ -54,12 +298,20 @@ class ChromaBackend(MemoryBackend):
             logger.error(f"Error initializing ChromaDB: {e}")
             raise
 
+        if vector_size:
+            existing = self.collection.peek(limit=1).get("embeddings")
+            if existing is not None and len(existing) and len(existing[0]) != vector_size:
+                raise ValueError(
+                    f"ChromaDB collection '{collection_name}' stores vectors of size "
+                    f"{len(existing[0])}, but the configured size is {vector_size}"
+                )
+
     async def store(
         self,
         event: str,
         action: str,
         outcome: str,
-        embedding: List[float],
+        embedding: Vector,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
         """
@@ -72,55 +324,190 @@ class ChromaBackend(MemoryBackend):
             embedding: Embedding of the memory
             metadata: Additional metadata to store
         """
-        point_id = str(uuid.uuid4())
-        timestamp = datetime.now(timezone.utc).isoformat()
+        await self.store_many([MemoryRecord(event, action, outcome, embedding, metadata)])
 
-        document = f"{event} {action} {outcome}"
-        metadata = metadata or {}
-        metadata.update(
-            {"event": event, "action": action, "outcome": outcome, "timestamp": timestamp}
-        )
+    async def store_many(self, records: List[MemoryRecord]) -> None:
+        """
+        Store several memory entries in ChromaDB with one `add` call.
+
+        Args:
+            records: Memory entries with their embeddings
+        """
+        if not records:
+            return
+        ids = [str(uuid.uuid4()) for _ in records]
+        metadatas = memory_payloads(records)
 
         try:
-            # Convert embedding to the expected type
-            embedding_seq: Sequence[float] = embedding
-            self.collection.add(
-                ids=[point_id],
-                embeddings=[embedding_seq],
-                documents=[document],
-                metadatas=[metadata],
+            await self._run_write(
+                self.collection.add,
+                ids=ids,
+                embeddings=[_as_float32(record.embedding) for record in records],
+                documents=[f"{r.event} {r.action} {r.outcome}" for r in records],
+                metadatas=cast(Any, metadatas),
             )
-            logger.debug(f"Stored memory in ChromaDB: {point_id}")
+            logger.debug(f"Stored {len(ids)} memories in ChromaDB")
         except Exception as e:
             logger.error(f"Error storing memory in ChromaDB: {e}")
             raise
 
-    async def search(self, query_vector: List[float], top_k: int = 3) -> List[Dict[str, Any]]:
+    async def search(
+        self,
+        query_vector: Vector,
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Search for similar memories in ChromaDB.
 
         Args:
             query_vector: Query vector
             top_k: Number of results to return
+            memory_filter: Conditions the results must satisfy, passed as a `where` clause
 
         Returns:
             List[Dict[str, Any]]: List of similar memories
         """
+        return (await self.search_many([query_vector], top_k, memory_filter))[0]
+
+    async def search_many(
+        self,
+        query_vectors: List[Vector],
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar memories of several query vectors with one `query` call.
+
+        Args:
+            query_vectors: Query vectors
+            top_k: Number of results to return per query
+            memory_filter: Conditions the results must satisfy, passed as a `where` clause
+
+        Returns:
+            List[List[Dict[str, Any]]]: Similar memories of each query
+        """
+        if not query_vectors:
+            return []
         try:
-            # Convert query_vector to the expected type
-            query_vector_seq: Sequence[float] = query_vector
-            results = self.collection.query(query_embeddings=[query_vector_seq], n_results=top_k)
+            query_kwargs: Dict[str, Any] = {}
+            where = _chroma_where(memory_filter)
+            if where is not None:
+                query_kwargs["where"] = where
+            results = await self._run(
+                self.collection.query,
+                query_embeddings=[_as_float32(vector) for vector in query_vectors],
+                n_results=top_k,
+                **query_kwargs,
+            )
 
             # Format results to match the expected output
-            formatted_results = []
+            formatted_results: List[List[Dict[str, Any]]] = [[] for _ in query_vectors]
             if results and "metadatas" in results and results["metadatas"]:
                 metadatas = results["metadatas"]
-                if isinstance(metadatas, list) and len(metadatas) > 0:
-                    for metadata in metadatas[0]:
-                        if isinstance(metadata, dict):
-                            formatted_results.append(metadata)
+                if isinstance(metadatas, list):
+                    for formatted, query_metadatas in zip(formatted_results, metadatas):
+                        formatted.extend(m for m in query_metadatas if isinstance(m, dict))
 
             return formatted_results
         except Exception as e:
             logger.error(f"Error searching memory in ChromaDB: {e}")
+            return [[] for _ in query_vectors]
+
+    async def recent(
+        self, top_k: int = 3, memory_filter: Optional[MemoryFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the most recently stored memories in ChromaDB, without a query vector.
+
+        ChromaDB can't sort by metadata, so memories are fetched in time slices going back from
+        `until` (or now), each twice as long as the previous one, until `top_k` are found, and
+        sorted here. Only the slices up to the newest `top_k` memories are fetched, instead of
+        every matching memory. After `RECENT_MAX_SLICES` slices (about two years), the rest is
+        fetched at once, together with memories stored without a `timestamp_unix` field.
+
+        Args:
+            top_k: Number of memories to return
+            memory_filter: Conditions the memories must satisfy, passed as a `where` clause
+
+        Returns:
+            List[Dict[str, Any]]: The newest matching memories, newest first
+        """
+        memory_filter = memory_filter or MemoryFilter()
+        end = memory_filter.until.timestamp() if memory_filter.until else time.time()
+        floor = memory_filter.since.timestamp() if memory_filter.since else None
+        try:
+            found: List[Dict[str, Any]] = []
+            span = RECENT_FIRST_SLICE
+            for _ in range(RECENT_MAX_SLICES):
+                start = end - span if floor is None else max(end - span, floor)
+                found.extend(
+                    await self._get_metadatas(
+                        dataclasses.replace(
+                            memory_filter,
+                            since=datetime.fromtimestamp(start, tz=timezone.utc),
+                            until=datetime.fromtimestamp(end, tz=timezone.utc),
+                        )
+                    )
+                )
+                if len(found) >= top_k or start == floor:
+                    break
+                end, span = start, span * 2
+            else:
+                found = await self._get_metadatas(memory_filter)
+
+            found.sort(key=lambda m: payload_time(m) or 0.0, reverse=True)
+            return [dict(m) for m in found[:top_k]]
+        except Exception as e:
+            logger.error(f"Error fetching recent memories from ChromaDB: {e}")
             return []
+
+    async def _get_metadatas(self, memory_filter: MemoryFilter) -> List[Dict[str, Any]]:
+        """Fetch the metadata of every memory matching a filter, without vectors."""
+        get_kwargs: Dict[str, Any] = {}
+        where = _chroma_where(memory_filter)
+        if where is not None:
+            get_kwargs["where"] = where
+        results = await self._run(self.collection.get, include=["metadatas"], **get_kwargs)
+        return [m for m in (results.get("metadatas") or []) if isinstance(m, dict)]
+
+    async def delete(self, memory_filter: MemoryFilter) -> None:
+        """
+        Delete the memories matching a filter from ChromaDB.
+
+        Args:
+            memory_filter: Conditions of the memories to delete, passed as a `where` clause
+
+        Raises:
+            ValueError: If the filter is empty, which would delete every memory
+        """
+        where = _chroma_where(memory_filter)
+        if where is None:
+            raise ValueError("Refusing to delete memories without a filter")
+        try:
+            await self._run_write(self.collection.delete, where=where)
+            logger.debug(f"Deleted memories matching {where} from ChromaDB")
+        except Exception as e:
+            logger.error(f"Error deleting memories from ChromaDB: {e}")
+            raise
+
+
+def _chroma_where(memory_filter: Optional[MemoryFilter]) -> Optional[Dict[str, Any]]:
+    """Translate a memory filter into a ChromaDB `where` clause, or None if it is empty."""
+    if memory_filter is None:
+        return None
+    conditions: List[Dict[str, Any]] = [
+        {key: {"$in": list(value)} if is_multi_value(value) else {"$eq": value}}
+        for key, value in memory_filter.fields.items()
+    ]
+    conditions.extend(
+        {key: {"$nin": list(value)} if is_multi_value(value) else {"$ne": value}}
+        for key, value in memory_filter.exclude.items()
+    )
+    if memory_filter.since is not None:
+        conditions.append({TIMESTAMP_UNIX_FIELD: {"$gte": memory_filter.since.timestamp()}})
+    if memory_filter.until is not None:
+        conditions.append({TIMESTAMP_UNIX_FIELD: {"$lt": memory_filter.until.timestamp()}})
+    if not conditions:
+        return None
+    return conditions[0] if len(conditions) == 1 else {"$and": conditions}
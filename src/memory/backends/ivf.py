@@ -0,0 +1,153 @@
+import math
+import os
+from typing import List, Optional
+
+import numpy as np
+
+#: Number of rows assigned to centroids per matrix product
+ASSIGN_CHUNK_ROWS = 65536
+
+#: Number of training vectors sampled per list
+TRAIN_SAMPLES_PER_LIST = 64
+
+
+class IVFIndex:
+    """
+    Inverted file index over normalized vectors for approximate nearest-neighbour search.
+
+    Vectors are clustered around `n_lists` centroids with spherical k-means, and each row is
+    kept in the list of its nearest centroid. A search only scores the rows in the lists of
+    the `nprobe` centroids closest to the query, about `nprobe / n_lists` of all rows. More
+    probes give better recall at the cost of speed. Rows added after training are put in
+    the list of their nearest centroid; the centroids themselves only change with a retrain.
+    """
+
+    def __init__(self, centroids: np.ndarray):
+        """
+        Initialize an empty index.
+
+        Args:
+            centroids: Normalized float32 centroids, one row per list
+        """
+        self.centroids = centroids.astype(np.float32, copy=False)
+        self.assignments = np.empty(0, dtype=np.int32)
+        self._lists: List[np.ndarray] = [np.empty(0, dtype=np.int64) for _ in centroids]
+        self._sizes = np.zeros(len(centroids), dtype=np.int64)
+
+    @property
+    def n_lists(self) -> int:
+        """Number of lists (centroids)."""
+        return len(self.centroids)
+
+    def __len__(self) -> int:
+        return len(self.assignments)
+
+    @classmethod
+    def train(
+        cls,
+        vectors: np.ndarray,
+        n_lists: int = 0,
+        iterations: int = 10,
+        seed: int = 0,
+    ) -> "IVFIndex":
+        """
+        Cluster vectors with spherical k-means and index them.
+
+        Args:
+            vectors: Normalized vectors, one per row. Row `i` is indexed as id `i`.
+            n_lists: Number of lists. Defaults to about the square root of the number of rows.
+            iterations: Number of k-means iterations
+            seed: Seed of the random sampling
+
+        Returns:
+            IVFIndex: Index holding every row of `vectors`
+        """
+        rng = np.random.default_rng(seed)
+        n_lists = min(n_lists or max(1, int(math.sqrt(len(vectors)))), len(vectors))
+        sample_size = min(len(vectors), n_lists * TRAIN_SAMPLES_PER_LIST)
+        sample = np.asarray(
+            vectors[np.sort(rng.choice(len(vectors), sample_size, replace=False))],
+            dtype=np.float32,
+        )
+
+        centroids = sample[rng.choice(len(sample), n_lists, replace=False)].copy()
+        for _ in range(iterations):
+            assignment = np.argmax(sample @ centroids.T, axis=1)
+            sums = np.zeros_like(centroids)
+            np.add.at(sums, assignment, sample)
+            counts = np.bincount(assignment, minlength=n_lists)
+
+            # Lists that lost all their vectors restart from a random sample
+            empty = counts == 0
+            sums[empty] = sample[rng.choice(len(sample), int(empty.sum()))]
+            norms = np.linalg.norm(sums, axis=1, keepdims=True)
+            centroids = sums / np.where(norms == 0, 1.0, norms)
+
+        index = cls(centroids)
+        index.add(vectors)
+        return index
+
+    def add(self, vectors: np.ndarray) -> None:
+        """
+        Index the next rows, with ids continuing after the rows already indexed.
+
+        Args:
+            vectors: Normalized vectors, one per row
+        """
+        assignments = np.concatenate(
+            [
+                np.argmax(np.asarray(vectors[i : i + ASSIGN_CHUNK_ROWS]) @ self.centroids.T, axis=1)
+                for i in range(0, len(vectors), ASSIGN_CHUNK_ROWS)
+            ]
+            or [np.empty(0, dtype=np.int64)]
+        ).astype(np.int32)
+        self._extend_lists(len(self.assignments), assignments)
+        self.assignments = np.concatenate([self.assignments, assignments])
+
+    def probe(self, query: np.ndarray, nprobe: int) -> np.ndarray:
+        """
+        Return the ids of the rows in the lists closest to a query.
+
+        Args:
+            query: Normalized query vector
+            nprobe: Number of lists to search
+
+        Returns:
+            np.ndarray: Candidate row ids
+        """
+        nprobe = min(max(1, nprobe), self.n_lists)
+        scores = self.centroids @ query
+        lists = np.argpartition(-scores, nprobe - 1)[:nprobe]
+        return np.concatenate([self._lists[c][: self._sizes[c]] for c in lists])
+
+    def save(self, path: str) -> None:
+        """Persist the centroids and list assignments to a `.npz` file."""
+        tmp_path = f"{path}.tmp.npz"
+        np.savez(tmp_path, centroids=self.centroids, assignments=self.assignments)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["IVFIndex"]:
+        """Load an index persisted by `save`, or return None if there is none."""
+        if not os.path.exists(path):
+            return None
+        with np.load(path) as data:
+            index = cls(data["centroids"])
+            assignments = data["assignments"].astype(np.int32)
+        index._extend_lists(0, assignments)
+        index.assignments = assignments
+        return index
+
+    def _extend_lists(self, first_id: int, assignments: np.ndarray) -> None:
+        """Append ids `first_id, first_id + 1, ...` to their assigned lists."""
+        ids = np.arange(first_id, first_id + len(assignments), dtype=np.int64)
+        order = np.argsort(assignments, kind="stable")
+        lists, starts, counts = np.unique(assignments[order], return_index=True, return_counts=True)
+        for c, start, count in zip(lists, starts, counts):
+            size = self._sizes[c]
+            if size + count > len(self._lists[c]):
+                grown = np.empty(max(2 * len(self._lists[c]), size + count, 16), dtype=np.int64)
+                grown[:size] = self._lists[c][:size]
+                self._lists[c] = grown
+            self._lists[c][size : size + count] = ids[order[start : start + count]]
+            self._sizes[c] = size + count
@@ -0,0 +1,767 @@
+import json
+import os
+import threading
+from collections import defaultdict
+from typing import IO, Any, Dict, List, Optional, Sequence, cast
+
+import numpy as np
+from loguru import logger
+
+from src.core.config import settings
+from src.core.defs import VectorQuantization
+from src.memory.backends.chroma import (
+    MemoryBackend,
+    MemoryFilter,
+    MemoryRecord,
+    Vector,
+    is_multi_value,
+    memory_payloads,
+    payload_time,
+)
+from src.memory.backends.ivf import IVFIndex
+from src.memory.backends.quantization import ProductQuantizer, ScalarQuantizer, default_subvectors
+from src.memory.file_lock import lock_exclusively
+
+#: File holding the vectors as a preallocated float32 matrix
+VECTORS_FILE = "vectors.f32"
+
+#: File holding one JSON payload per stored vector, in row order
+PAYLOADS_FILE = "payloads.jsonl"
+
+#: File holding the vector size and the capacity of the vectors file
+META_FILE = "meta.json"
+
+#: File holding the approximate nearest-neighbour index
+INDEX_FILE = "ivf.npz"
+
+#: File holding the product quantization codebooks
+PQ_FILE = "pq.npy"
+
+#: File locked while a backend has the store open
+LOCK_FILE = "store.lock"
+
+#: File committing a compaction whose rewritten files are complete, finished on the next load
+COMPACT_FILE = "compact.json"
+
+#: Number of memories from which the product quantizer is trained
+PQ_MIN_TRAIN_SIZE = 1024
+
+#: Number of rows encoded per step when quantizing stored vectors
+ENCODE_CHUNK_ROWS = 65536
+
+
+class LocalBackend(MemoryBackend):
+    """
+    In-process memory backend on a NumPy matrix, for single-node deployments.
+
+    Vectors are normalized and kept as rows of a preallocated float32 matrix, which doubles
+    in size when full. Searches score every stored vector with one matrix product and pick the
+    top results with `argpartition`. The matrix is memory-mapped from a file, and payloads are
+    appended to a JSONL file whose line `i` belongs to row `i`, so only fully written entries
+    are loaded after a crash.
+
+    With `ann_index`, stores of at least `ann_min_size` memories are searched through an IVF
+    index (see `IVFIndex`) instead of scoring every row. The index is trained in a background
+    thread, and retrained whenever the store has grown by `ann_rebuild_growth` since the last
+    training.
+
+    With `quantization`, searches scan compact codes of the vectors held in memory (int8
+    codes, or product quantization codes once `PQ_MIN_TRAIN_SIZE` memories are stored) and
+    re-score the best `top_k * rerank_factor` candidates with the full vectors. The float32
+    matrix stays on disk as the source of truth, and only re-scored rows are read from it.
+    Without a `path` the float32 matrix is held in memory as well, so quantization adds the
+    codes on top of it instead of saving memory.
+
+    Filtered searches are pre-filtered through columnar indexes kept in memory: an array of
+    store times, and the rows of every value of the `indexed_fields`. Only the matching rows
+    are scored, so selective filters make searches cheaper rather than emptier.
+
+    Deleting memories compacts the store: the remaining rows are rewritten to new files, which
+    replace the old ones once a commit marker is written, so a crash leaves either the old or
+    the compacted store.
+
+    A persisted store is locked while it is open, as backends appending to the same files
+    would overwrite each other's rows. Share one backend, see `get_memory_module`.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.MEMORY_LOCAL_PATH,
+        vector_size: int = settings.MEMORY_VECTOR_SIZE,
+        initial_capacity: int = settings.MEMORY_LOCAL_INITIAL_CAPACITY,
+        ann_index: bool = settings.MEMORY_LOCAL_ANN_INDEX,
+        ann_lists: int = settings.MEMORY_LOCAL_ANN_LISTS,
+        ann_nprobe: int = settings.MEMORY_LOCAL_ANN_NPROBE,
+        ann_min_size: int = settings.MEMORY_LOCAL_ANN_MIN_SIZE,
+        ann_rebuild_growth: float = settings.MEMORY_LOCAL_ANN_REBUILD_GROWTH,
+        quantization: VectorQuantization = settings.MEMORY_QUANTIZATION,
+        rerank_factor: int = settings.MEMORY_QUANTIZATION_RERANK,
+        pq_subvectors: int = settings.MEMORY_PQ_SUBVECTORS,
+        indexed_fields: Sequence[str] = settings.MEMORY_FILTER_INDEX_FIELDS,
+    ):
+        """
+        Initialize the local backend.
+
+        Args:
+            path: Directory the memories are persisted to. An empty path keeps them in memory
+                only.
+            vector_size: Size of the embeddings
+            initial_capacity: Number of rows preallocated for a new store
+            ann_index: Search large stores through an approximate nearest-neighbour index
+            ann_lists: Number of index lists. 0 picks about the square root of the number of
+                memories.
+            ann_nprobe: Number of index lists searched per query. More is slower but finds
+                more of the true nearest neighbours.
+            ann_min_size: Number of memories from which the index is used
+            ann_rebuild_growth: Factor by which the store grows before the index is retrained
+            quantization: Quantization of the vectors scanned by searches
+            rerank_factor: Re-score this many times `top_k` quantized candidates with the full
+                vectors (0 disables)
+            pq_subvectors: Number of product quantization subvectors. 0 picks one per 16
+                dimensions.
+            indexed_fields: Payload fields with a pre-filter index. Filters on other fields
+                scan the payloads of the rows left by the indexed conditions.
+
+        Raises:
+            ValueError: If the persisted store holds vectors of another size
+            MemoryError: If the persisted store is already open in another backend
+        """
+        self.path = path
+        self.vector_size = vector_size
+        self.payloads: List[Dict[str, Any]] = []
+        self._capacity = max(1, initial_capacity)
+        self._lock = threading.RLock()
+        self._lock_file: Optional[IO[str]] = None
+
+        self.ann_index = ann_index
+        self.ann_lists = ann_lists
+        self.ann_nprobe = ann_nprobe
+        self.ann_min_size = max(1, ann_min_size)
+        self.ann_rebuild_growth = max(1.0, ann_rebuild_growth)
+        self.index: Optional[IVFIndex] = None
+        self._trained_size = 0
+        self._rebuild_thread: Optional[threading.Thread] = None
+        self._generation = 0
+
+        self.quantization = VectorQuantization(quantization)
+        if not path and self.quantization != VectorQuantization.NONE:
+            logger.warning(
+                "The local memory store isn't persisted, so its float32 vectors stay in memory "
+                "and quantization adds its codes on top of them"
+            )
+        self.rerank_factor = max(0, rerank_factor)
+        self.pq_subvectors = pq_subvectors or default_subvectors(vector_size)
+        self.pq: Optional[ProductQuantizer] = None
+        self._codes: Optional[np.ndarray] = None
+        self._scales: Optional[np.ndarray] = None
+
+        self._times = np.zeros(0, dtype=np.float64)
+        self._field_rows: Dict[str, Dict[Any, List[int]]] = {
+            field: defaultdict(list) for field in indexed_fields
+        }
+
+        if path:
+            os.makedirs(path, exist_ok=True)
+            self._lock_store()
+            try:
+                self._load()
+            except Exception:
+                self._unlock_store()
+                raise
+        self._vectors = self._allocate(self._capacity)
+        self._times = np.zeros(self._capacity, dtype=np.float64)
+        self._index_payloads(0, len(self.payloads))
+        self._load_codes()
+        if ann_index:
+            self._load_index()
+        logger.debug(f"Local memory store holds {len(self)} memories")
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    async def store(
+        self,
+        event: str,
+        action: str,
+        outcome: str,
+        embedding: Vector,
+        metadata: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Store a memory entry in the local store.
+
+        Args:
+            event: Event description
+            action: Action taken (is fromed from the ActionName enum)
+            outcome: Result of the action
+            embedding: Embedding of the memory
+            metadata: Additional metadata to store
+        """
+        await self.store_many([MemoryRecord(event, action, outcome, embedding, metadata)])
+
+    async def store_many(self, records: List[MemoryRecord]) -> None:
+        """
+        Store several memory entries in the local store.
+
+        Args:
+            records: Memory entries with their embeddings
+        """
+        if not records:
+            return
+        payloads = memory_payloads(records)
+        vectors = _normalize(np.stack([np.asarray(r.embedding) for r in records]))
+        if vectors.shape[1] != self.vector_size:
+            raise ValueError(
+                f"Embeddings of size {vectors.shape[1]} don't match the local store's vector "
+                f"size {self.vector_size}"
+            )
+        await self._run_write(self._append, vectors, payloads)
+        logger.debug(f"Stored {len(payloads)} memories in the local store")
+
+    async def search(
+        self,
+        query_vector: Vector,
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for similar memories in the local store.
+
+        Args:
+            query_vector: Query vector
+            top_k: Number of results to return
+            memory_filter: Conditions the results must satisfy, applied before scoring
+
+        Returns:
+            List[Dict[str, Any]]: List of similar memories
+        """
+        return (await self.search_many([query_vector], top_k, memory_filter))[0]
+
+    async def search_many(
+        self,
+        query_vectors: List[Vector],
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar memories of several query vectors with one matrix product.
+
+        Args:
+            query_vectors: Query vectors
+            top_k: Number of results to return per query
+            memory_filter: Conditions the results must satisfy, applied before scoring
+
+        Returns:
+            List[List[Dict[str, Any]]]: Similar memories of each query
+        """
+        if not query_vectors:
+            return []
+        try:
+            queries = _normalize(np.stack([np.asarray(v) for v in query_vectors]))
+            return await self._run(self._top_k, queries, top_k, memory_filter)
+        except Exception as e:
+            logger.error(f"Error searching memory in the local store: {e}")
+            return [[] for _ in query_vectors]
+
+    async def recent(
+        self, top_k: int = 3, memory_filter: Optional[MemoryFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the most recently stored memories in the local store, without a query vector.
+
+        Args:
+            top_k: Number of memories to return
+            memory_filter: Conditions the memories must satisfy
+
+        Returns:
+            List[Dict[str, Any]]: The newest matching memories, newest first
+        """
+        try:
+            return await self._run(self._recent_payloads, top_k, memory_filter)
+        except Exception as e:
+            logger.error(f"Error fetching recent memories from the local store: {e}")
+            return []
+
+    async def delete(self, memory_filter: MemoryFilter) -> None:
+        """
+        Delete the memories matching a filter and compact the local store.
+
+        Args:
+            memory_filter: Conditions of the memories to delete
+
+        Raises:
+            ValueError: If the filter is empty, which would delete every memory
+        """
+        if memory_filter == MemoryFilter():
+            raise ValueError("Refusing to delete memories without a filter")
+        deleted = await self._run_write(self._delete, memory_filter)
+        logger.debug(f"Deleted {deleted} memories from the local store")
+
+    def rebuild_index(self) -> None:
+        """Train a new IVF index on every stored memory and swap it in."""
+        with self._lock:
+            count = len(self.payloads)
+            vectors = self._vectors
+            generation = self._generation
+        if count == 0:
+            return
+
+        # Training reads rows that are never written again, so it runs without the lock
+        index = IVFIndex.train(vectors[:count], n_lists=self.ann_lists)
+        with self._lock:
+            if self._generation != generation:
+                # The store was compacted while training, so the index would map the wrong rows
+                return
+            # Index the memories stored while training
+            index.add(self._vectors[count : len(self.payloads)])
+            self.index = index
+            self._trained_size = count
+            if self.path:
+                index.save(os.path.join(self.path, INDEX_FILE))
+        logger.debug(f"Trained the local memory index on {count} memories")
+
+    async def close(self) -> None:
+        """Persist the index and shut down the worker threads."""
+        with self._lock:
+            if self.path and self.index is not None:
+                self.index.save(os.path.join(self.path, INDEX_FILE))
+        await super().close()
+        self._unlock_store()
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _lock_store(self) -> None:
+        """Lock the store directory, failing if another backend has it open."""
+        self._lock_file = lock_exclusively(
+            os.path.join(self.path, LOCK_FILE), f"The local memory store {self.path}"
+        )
+
+    def _unlock_store(self) -> None:
+        """Release the lock of the store directory."""
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+
+    def _top_k(
+        self, queries: np.ndarray, top_k: int, memory_filter: Optional[MemoryFilter] = None
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Return the payloads of the `top_k` best-scoring vectors of each query matching a filter,
+        best first.
+        """
+        with self._lock:
+            # Compaction replaces the payload list, so the rows resolve against this one
+            payloads = self.payloads
+            count = len(payloads)
+            rows: Optional[List[List[int]]] = None
+            if count == 0 or top_k <= 0:
+                return [[] for _ in queries]
+            if memory_filter is not None:
+                rows = self._filtered_top_k(queries, top_k, count, memory_filter)
+            elif self.index is not None and count >= self.ann_min_size:
+                index = self.index
+                rows = [
+                    self._search_rows(query, top_k, count, index.probe(query, self.ann_nprobe))
+                    for query in queries
+                ]
+            elif self._codes is not None:
+                rows = [self._search_rows(query, top_k, count) for query in queries]
+            else:
+                scores = queries @ self._vectors[:count].T
+
+        if rows is None:
+            k = min(top_k, count)
+            top = np.argpartition(-scores, k - 1, axis=1)[:, :k]
+            top_scores = np.take_along_axis(scores, top, axis=1)
+            order = np.argsort(-top_scores, axis=1)
+            rows = cast(List[List[int]], np.take_along_axis(top, order, axis=1).tolist())
+        return [[payloads[row] for row in query_rows] for query_rows in rows]
+
+    def _filtered_top_k(
+        self, queries: np.ndarray, top_k: int, count: int, memory_filter: MemoryFilter
+    ) -> List[List[int]]:
+        """Score only the rows matching a filter. Caller holds the lock."""
+        rows = self._filter_rows(memory_filter, count)
+        if self.index is not None and len(rows) >= self.ann_min_size:
+            # Too many matches to score them all, search them through the index
+            index = self.index
+            return [
+                self._search_rows(
+                    query,
+                    top_k,
+                    count,
+                    np.intersect1d(index.probe(query, self.ann_nprobe), rows, assume_unique=True),
+                )
+                for query in queries
+            ]
+        return [self._search_rows(query, top_k, count, rows) for query in queries]
+
+    def _recent_payloads(
+        self, top_k: int, memory_filter: Optional[MemoryFilter]
+    ) -> List[Dict[str, Any]]:
+        """Return the payloads of the `top_k` newest memories matching a filter, newest first."""
+        with self._lock:
+            count = len(self.payloads)
+            rows = (
+                np.arange(count)
+                if memory_filter is None
+                else self._filter_rows(memory_filter, count)
+            )
+            times = self._times[rows]
+            top = _top_indices(times, top_k)
+            # Memories stored by the same write share a time, list the later rows first
+            top = top[np.lexsort((rows[top], times[top]))[::-1]]
+            return [self.payloads[row] for row in rows[top].tolist()]
+
+    def _filter_rows(self, memory_filter: MemoryFilter, count: int) -> np.ndarray:
+        """
+        Return the rows below `count` matching a filter, in ascending order. Caller holds the
+        lock.
+        """
+        indexed: Optional[np.ndarray] = None
+        unindexed: Dict[str, Any] = {}
+        unindexed_exclude: Dict[str, Any] = {}
+        for key, value in memory_filter.fields.items():
+            postings = self._field_rows.get(key)
+            if postings is None:
+                unindexed[key] = value
+                continue
+            matched = _posting_rows(postings, value)
+            indexed = (
+                matched if indexed is None else np.intersect1d(indexed, matched, assume_unique=True)
+            )
+        rows = np.arange(count) if indexed is None else indexed[indexed < count]
+        for key, value in memory_filter.exclude.items():
+            postings = self._field_rows.get(key)
+            if postings is None:
+                unindexed_exclude[key] = value
+            else:
+                rows = np.setdiff1d(rows, _posting_rows(postings, value), assume_unique=True)
+
+        if memory_filter.since is not None:
+            rows = rows[self._times[rows] >= memory_filter.since.timestamp()]
+        if memory_filter.until is not None:
+            rows = rows[self._times[rows] < memory_filter.until.timestamp()]
+        if unindexed or unindexed_exclude:
+            remaining = MemoryFilter(fields=unindexed, exclude=unindexed_exclude)
+            rows = np.array(
+                [row for row in rows if remaining.matches(self.payloads[row])], dtype=np.int64
+            )
+        return rows
+
+    def _delete(self, memory_filter: MemoryFilter) -> int:
+        """Delete the rows matching a filter and compact the store. Returns their number."""
+        with self._lock:
+            count = len(self.payloads)
+            deleted = self._filter_rows(memory_filter, count)
+            if len(deleted) == 0:
+                return 0
+            self._compact(np.setdiff1d(np.arange(count), deleted, assume_unique=True))
+            return len(deleted)
+
+    def _compact(self, keep: np.ndarray) -> None:
+        """Keep only the rows `keep`, moved to the front in order. Caller holds the lock."""
+        size = len(keep)
+        payloads = [self.payloads[row] for row in keep]
+        if self.path:
+            self._write_compacted(keep, payloads)
+            self._finish_compaction()
+            del self._vectors
+            self._vectors = self._allocate(self._capacity)
+        else:
+            self._vectors[:size] = self._vectors[keep]
+        self.payloads = payloads
+        if self._codes is not None:
+            self._codes[:size] = self._codes[keep]
+        if self._scales is not None:
+            self._scales[:size] = self._scales[keep]
+
+        self._times = np.zeros(self._capacity, dtype=np.float64)
+        self._field_rows = {field: defaultdict(list) for field in self._field_rows}
+        self._index_payloads(0, size)
+
+        # Row ids changed, so the index is trained again from scratch
+        self._generation += 1
+        self.index = None
+        self._trained_size = 0
+        if self.path and os.path.exists(os.path.join(self.path, INDEX_FILE)):
+            os.remove(os.path.join(self.path, INDEX_FILE))
+        if self.ann_index:
+            self._maybe_rebuild_index()
+
+    def _write_compacted(self, keep: np.ndarray, payloads: List[Dict[str, Any]]) -> None:
+        """Write the kept rows to temporary files, then commit them with the marker file."""
+        with open(os.path.join(self.path, f"{VECTORS_FILE}.tmp"), "wb") as file:
+            for first in range(0, len(keep), ENCODE_CHUNK_ROWS):
+                rows = keep[first : first + ENCODE_CHUNK_ROWS]
+                file.write(np.ascontiguousarray(self._vectors[rows]).tobytes())
+            file.truncate(self._capacity * self.vector_size * np.dtype(np.float32).itemsize)
+        with open(os.path.join(self.path, f"{PAYLOADS_FILE}.tmp"), "w") as file:
+            file.writelines(json.dumps(p, default=str) + "\n" for p in payloads)
+
+        marker_path = os.path.join(self.path, COMPACT_FILE)
+        with open(f"{marker_path}.tmp", "w") as file:
+            json.dump({"rows": len(keep)}, file)
+        os.replace(f"{marker_path}.tmp", marker_path)
+
+    def _finish_compaction(self) -> None:
+        """Move the files of a committed compaction into place, or drop uncommitted ones."""
+        marker_path = os.path.join(self.path, COMPACT_FILE)
+        committed = os.path.exists(marker_path)
+        for name in (VECTORS_FILE, PAYLOADS_FILE):
+            tmp_path = os.path.join(self.path, f"{name}.tmp")
+            if not os.path.exists(tmp_path):
+                continue
+            if committed:
+                os.replace(tmp_path, os.path.join(self.path, name))
+            else:
+                os.remove(tmp_path)
+        if committed:
+            os.remove(marker_path)
+
+    def _index_payloads(self, start: int, end: int) -> None:
+        """Add the payloads of rows `start` to `end` to the pre-filter indexes."""
+        for row in range(start, end):
+            payload = self.payloads[row]
+            self._times[row] = payload_time(payload) or 0.0
+            for field, postings in self._field_rows.items():
+                value = payload.get(field)
+                if value is None:
+                    continue
+                try:
+                    postings[value].append(row)
+                except TypeError:
+                    # Unhashable values can only be matched by scanning
+                    continue
+
+    def _search_rows(
+        self, query: np.ndarray, top_k: int, count: int, candidates: Optional[np.ndarray] = None
+    ) -> List[int]:
+        """
+        Return the `top_k` best rows among `candidates` (all rows if None). Caller holds the
+        lock.
+        """
+        rows = np.arange(count) if candidates is None else np.sort(candidates)
+        if self._codes is None:
+            scores = self._vectors[rows] @ query
+        else:
+            scores = self._approximate_scores(query, rows, candidates is None)
+            if self.rerank_factor:
+                # Re-score the best quantized candidates with the full vectors
+                rows = np.sort(rows[_top_indices(scores, top_k * self.rerank_factor)])
+                scores = self._vectors[rows] @ query
+        return cast(List[int], rows[_top_indices(scores, top_k)].tolist())
+
+    def _approximate_scores(
+        self, query: np.ndarray, rows: np.ndarray, all_rows: bool
+    ) -> np.ndarray:
+        """Score the quantized vectors of `rows`. Caller holds the lock."""
+        assert self._codes is not None
+        count = len(rows)
+        codes = self._codes[:count] if all_rows else self._codes[rows]
+        if self.pq is not None:
+            return self.pq.scores(query, codes)
+        assert self._scales is not None
+        scales = self._scales[:count] if all_rows else self._scales[rows]
+        return ScalarQuantizer.scores(query, codes, scales)
+
+    def _append(self, vectors: np.ndarray, payloads: List[Dict[str, Any]]) -> None:
+        """Append rows, growing the matrix when it is full."""
+        with self._lock:
+            start = len(self.payloads)
+            end = start + len(payloads)
+            if end > self._capacity:
+                self._grow(end)
+            self._vectors[start:end] = vectors
+
+            if self.path:
+                # Vectors are flushed before their payloads, so every payload has its vector
+                assert isinstance(self._vectors, np.memmap)
+                self._vectors.flush()
+                with open(os.path.join(self.path, PAYLOADS_FILE), "a") as file:
+                    file.writelines(json.dumps(p, default=str) + "\n" for p in payloads)
+            self.payloads.extend(payloads)
+            self._index_payloads(start, end)
+
+            if self._codes is not None:
+                self._encode_rows(start, end)
+            elif self.quantization == VectorQuantization.PQ and end >= PQ_MIN_TRAIN_SIZE:
+                self._train_pq()
+            if self.index is not None:
+                self.index.add(vectors)
+            if self.ann_index:
+                self._maybe_rebuild_index()
+
+    def _maybe_rebuild_index(self) -> None:
+        """Retrain the index in the background once the store has grown. Caller holds the lock."""
+        count = len(self.payloads)
+        if count < self.ann_min_size or (
+            self.index is not None and count < self._trained_size * self.ann_rebuild_growth
+        ):
+            return
+        if self._rebuild_thread is not None and self._rebuild_thread.is_alive():
+            return
+        self._rebuild_thread = threading.Thread(
+            target=self.rebuild_index, name="local-memory-index", daemon=True
+        )
+        self._rebuild_thread.start()
+
+    def _load_codes(self) -> None:
+        """Quantize the stored vectors, loading or training the product quantizer."""
+        if self.quantization == VectorQuantization.INT8:
+            self._codes = np.zeros((self._capacity, self.vector_size), dtype=np.int8)
+            self._scales = np.zeros(self._capacity, dtype=np.float32)
+            self._encode_rows(0, len(self.payloads))
+        elif self.quantization == VectorQuantization.PQ:
+            pq = ProductQuantizer.load(os.path.join(self.path, PQ_FILE)) if self.path else None
+            if pq is not None and pq.codebooks.shape[0] * pq.codebooks.shape[2] == self.vector_size:
+                self.pq = pq
+                self._codes = np.zeros((self._capacity, pq.n_subvectors), dtype=np.uint8)
+                self._encode_rows(0, len(self.payloads))
+            elif len(self.payloads) >= PQ_MIN_TRAIN_SIZE:
+                self._train_pq()
+
+    def _train_pq(self) -> None:
+        """Train the product quantizer on the stored vectors and encode them."""
+        count = len(self.payloads)
+        self.pq = ProductQuantizer.train(self._vectors[:count], self.pq_subvectors)
+        self._codes = np.zeros((self._capacity, self.pq.n_subvectors), dtype=np.uint8)
+        self._encode_rows(0, count)
+        if self.path:
+            self.pq.save(os.path.join(self.path, PQ_FILE))
+        logger.debug(f"Trained the local memory product quantizer on {count} memories")
+
+    def _encode_rows(self, start: int, end: int) -> None:
+        """Quantize the vectors of rows `start` to `end`."""
+        assert self._codes is not None
+        for first in range(start, end, ENCODE_CHUNK_ROWS):
+            last = min(first + ENCODE_CHUNK_ROWS, end)
+            vectors = np.asarray(self._vectors[first:last])
+            if self.pq is not None:
+                self._codes[first:last] = self.pq.encode(vectors)
+            else:
+                assert self._scales is not None
+                self._codes[first:last], self._scales[first:last] = ScalarQuantizer.encode(vectors)
+
+    def _load_index(self) -> None:
+        """Load the persisted index and index the memories stored after it was saved."""
+        index = IVFIndex.load(os.path.join(self.path, INDEX_FILE)) if self.path else None
+        if index is None:
+            return
+        count = len(self.payloads)
+        if len(index) > count or index.centroids.shape[1] != self.vector_size:
+            logger.warning("Ignoring a local memory index that doesn't match the stored memories")
+            return
+        index.add(self._vectors[len(index) : count])
+        self.index = index
+        self._trained_size = len(index)
+
+    def _grow(self, required: int) -> None:
+        """Double the capacity of the matrix until it holds `required` rows."""
+        capacity = self._capacity
+        while capacity < required:
+            capacity *= 2
+        if self.path:
+            assert isinstance(self._vectors, np.memmap)
+            self._vectors.flush()
+            del self._vectors
+            self._vectors = self._allocate(capacity)
+        else:
+            vectors = self._allocate(capacity)
+            vectors[: self._capacity] = self._vectors
+            self._vectors = vectors
+        if self._codes is not None:
+            self._codes = _grown(self._codes, capacity)
+        if self._scales is not None:
+            self._scales = _grown(self._scales, capacity)
+        self._times = _grown(self._times, capacity)
+        self._capacity = capacity
+        logger.debug(f"Grew the local memory store to {capacity} rows")
+
+    def _allocate(self, capacity: int) -> np.ndarray:
+        """Allocate a matrix of `capacity` rows, memory-mapped when persisted."""
+        if not self.path:
+            return np.zeros((capacity, self.vector_size), dtype=np.float32)
+
+        vectors_path = os.path.join(self.path, VECTORS_FILE)
+        size = capacity * self.vector_size * np.dtype(np.float32).itemsize
+        with open(vectors_path, "ab") as file:
+            if file.tell() < size:
+                file.truncate(size)
+        with open(os.path.join(self.path, META_FILE), "w") as file:
+            json.dump({"vector_size": self.vector_size, "capacity": capacity}, file)
+        return np.memmap(
+            vectors_path, dtype=np.float32, mode="r+", shape=(capacity, self.vector_size)
+        )
+
+    def _load(self) -> None:
+        """Load the persisted payloads and the capacity of the vectors file."""
+        self._finish_compaction()
+        meta_path = os.path.join(self.path, META_FILE)
+        if not os.path.exists(meta_path):
+            return
+        with open(meta_path) as file:
+            meta = json.load(file)
+        if meta["vector_size"] != self.vector_size:
+            raise ValueError(
+                f"Local memory store '{self.path}' stores vectors of size {meta['vector_size']}, "
+                f"but the configured size is {self.vector_size}"
+            )
+        self._capacity = max(self._capacity, meta["capacity"])
+
+        payloads_path = os.path.join(self.path, PAYLOADS_FILE)
+        if not os.path.exists(payloads_path):
+            return
+        valid_size = 0
+        with open(payloads_path, "rb") as file:
+            for line in file:
+                try:
+                    if not line.endswith(b"\n"):
+                        raise ValueError("incomplete line")
+                    self.payloads.append(json.loads(line))
+                except ValueError:
+                    # A write interrupted by a crash leaves a partial last line
+                    break
+                valid_size += len(line)
+                if len(self.payloads) == self._capacity:
+                    break
+        if valid_size < os.path.getsize(payloads_path):
+            logger.warning(f"Dropping incomplete entries at the end of {payloads_path}")
+            with open(payloads_path, "r+b") as file:
+                file.truncate(valid_size)
+
+
+def _top_indices(scores: np.ndarray, k: int) -> np.ndarray:
+    """Return the indices of the `k` highest scores, highest first."""
+    k = min(k, len(scores))
+    if k <= 0:
+        return np.empty(0, dtype=np.int64)
+    top = np.argpartition(-scores, k - 1)[:k]
+    return top[np.argsort(-scores[top])]
+
+
+def _posting_rows(postings: Dict[Any, List[int]], value: Any) -> np.ndarray:
+    """Return the sorted rows of a field value, or of any of a list of values."""
+    values = value if is_multi_value(value) else [value]
+    return np.unique(
+        np.concatenate(
+            [np.asarray(postings.get(v, []), dtype=np.int64) for v in values]
+            or [np.empty(0, dtype=np.int64)]
+        )
+    )
+
+
+def _grown(array: np.ndarray, capacity: int) -> np.ndarray:
+    """Copy an array into a zeroed array of `capacity` rows."""
+    grown = np.zeros((capacity, *array.shape[1:]), dtype=array.dtype)
+    grown[: len(array)] = array
+    return grown
+
+
+def _normalize(vectors: np.ndarray) -> np.ndarray:
+    """Scale float32 rows to unit length, so dot products are cosine similarities."""
+    vectors = vectors.astype(np.float32, copy=False)
+    norms = np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors / np.where(norms == 0, 1.0, norms)
@@ -1,6 +1,5 @@
 import uuid
-from datetime import datetime, timezone
-from typing import Any, Dict, List, Optional
+from typing import Any, Dict, List, Optional, Sequence
 
 from loguru import logger
 from qdrant_client import QdrantClient
@@ -8,11 +7,30 @@ from qdrant_client.http import models as qdrant_models
 from qdrant_client.http.models import Distance
 
 from src.core.config import settings
-from src.memory.backends.chroma import MemoryBackend
+from src.core.defs import EmbeddingDtype, VectorQuantization
+from src.memory.backends.chroma import (
+    TIMESTAMP_UNIX_FIELD,
+    MemoryBackend,
+    MemoryFilter,
+    MemoryRecord,
+    Vector,
+    as_float_list,
+    is_multi_value,
+    memory_payloads,
+    payload_time,
+)
+
+#: Number of points given a store time per request when backfilling `timestamp_unix`
+BACKFILL_BATCH_SIZE = 256
 
 
 class QdrantBackend(MemoryBackend):
-    """Qdrant-based memory backend."""
+    """
+    Qdrant-based memory backend.
+
+    Recency queries and time windows use the `timestamp_unix` payload field. Memories stored
+    before that field existed get it from their ISO `timestamp` when the collection is opened.
+    """
 
     def __init__(
         self,
@@ -20,31 +38,151 @@ class QdrantBackend(MemoryBackend):
         host: str = settings.MEMORY_HOST,
         port: int = settings.MEMORY_PORT,
         vector_size: int = settings.MEMORY_VECTOR_SIZE,
+        dtype: EmbeddingDtype = settings.EMBEDDING_DTYPE,
+        quantization: VectorQuantization = settings.MEMORY_QUANTIZATION,
+        rerank_factor: int = settings.MEMORY_QUANTIZATION_RERANK,
+        indexed_fields: Sequence[str] = settings.MEMORY_FILTER_INDEX_FIELDS,
     ):
-        """Initialize Qdrant backend."""
+        """
+        Initialize Qdrant backend.
+
+        Args:
+            collection_name: Name of the collection
+            host: Qdrant host
+            port: Qdrant port
+            vector_size: Size of the embeddings
+            dtype: Floating point type vectors are stored in when the collection is created
+            quantization: Quantization of the vectors kept in RAM by Qdrant. Scalar
+                quantization stores int8 vectors, product quantization compresses them 16x.
+            rerank_factor: Re-score this many times `top_k` quantized candidates with the full
+                vectors (0 disables)
+            indexed_fields: Payload fields given a keyword index for filtered search. The
+                store time always gets a range index, for time windows and recency ordering.
+
+        Raises:
+            ValueError: If the existing collection stores vectors of another size
+        """
         self.client = QdrantClient(host=host, port=port)
         self.collection_name = collection_name
         self.vector_size = vector_size
+        self.quantization = VectorQuantization(quantization)
+        self.rerank_factor = max(0, rerank_factor)
+        quantization_config = _quantization_config(self.quantization)
 
         # Create collection if not exists
         try:
-            self.client.get_collection(collection_name)
+            collection = self.client.get_collection(collection_name)
             logger.debug(f"Collection '{collection_name}' already exists in Qdrant.")
         except Exception:
             logger.debug(f"Creating collection '{collection_name}' in Qdrant.")
             self.client.recreate_collection(
                 collection_name=collection_name,
                 vectors_config=qdrant_models.VectorParams(
-                    size=vector_size, distance=Distance.COSINE
+                    size=vector_size,
+                    distance=Distance.COSINE,
+                    datatype=(
+                        qdrant_models.Datatype.FLOAT16
+                        if dtype == EmbeddingDtype.FLOAT16
+                        else qdrant_models.Datatype.FLOAT32
+                    ),
                 ),
+                quantization_config=quantization_config,
+            )
+            self._create_payload_indexes(indexed_fields, existing={})
+            return
+
+        vectors = collection.config.params.vectors
+        if isinstance(vectors, qdrant_models.VectorParams) and vectors.size != vector_size:
+            raise ValueError(
+                f"Qdrant collection '{collection_name}' stores vectors of size {vectors.size}, "
+                f"but the configured size is {vector_size}"
+            )
+        if quantization_config is not None and collection.config.quantization_config is None:
+            logger.debug(f"Enabling {self.quantization.value} quantization in Qdrant.")
+            self.client.update_collection(
+                collection_name=collection_name, quantization_config=quantization_config
             )
+        self._create_payload_indexes(indexed_fields, existing=collection.payload_schema or {})
+        self._backfill_store_times()
+
+    def _create_payload_indexes(self, fields: Sequence[str], existing: Dict[str, Any]) -> None:
+        """Create the payload indexes used by filters and recency ordering that are missing."""
+        schemas = {field: qdrant_models.PayloadSchemaType.KEYWORD for field in fields}
+        schemas[TIMESTAMP_UNIX_FIELD] = qdrant_models.PayloadSchemaType.FLOAT
+        for field, schema in schemas.items():
+            if field in existing:
+                continue
+            try:
+                self.client.create_payload_index(
+                    collection_name=self.collection_name, field_name=field, field_schema=schema
+                )
+            except Exception as e:
+                logger.warning(f"Could not create the Qdrant payload index on '{field}': {e}")
+
+    def _backfill_store_times(self) -> None:
+        """Set the `timestamp_unix` field of memories stored without it, from `timestamp`."""
+        missing = qdrant_models.Filter(
+            must=[
+                qdrant_models.IsEmptyCondition(
+                    is_empty=qdrant_models.PayloadField(key=TIMESTAMP_UNIX_FIELD)
+                )
+            ]
+        )
+        backfilled = 0
+        offset = None
+        try:
+            while True:
+                points, offset = self.client.scroll(
+                    collection_name=self.collection_name,
+                    scroll_filter=missing,
+                    limit=BACKFILL_BATCH_SIZE,
+                    offset=offset,
+                    with_payload=["timestamp"],
+                    with_vectors=False,
+                )
+                if points:
+                    self.client.batch_update_points(
+                        collection_name=self.collection_name,
+                        update_operations=[
+                            qdrant_models.SetPayloadOperation(
+                                set_payload=qdrant_models.SetPayload(
+                                    # Memories without a valid timestamp sort as the oldest
+                                    payload={
+                                        TIMESTAMP_UNIX_FIELD: payload_time(point.payload or {})
+                                        or 0.0
+                                    },
+                                    points=[point.id],
+                                )
+                            )
+                            for point in points
+                        ],
+                    )
+                    backfilled += len(points)
+                if offset is None:
+                    break
+        except Exception as e:
+            logger.warning(f"Could not backfill the store times of Qdrant memories: {e}")
+        if backfilled:
+            logger.info(f"Backfilled the store time of {backfilled} Qdrant memories")
+
+    @property
+    def _search_params(self) -> Optional[qdrant_models.SearchParams]:
+        """Search parameters re-scoring quantized candidates with the full vectors."""
+        if self.quantization == VectorQuantization.NONE:
+            return None
+        return qdrant_models.SearchParams(
+            quantization=qdrant_models.QuantizationSearchParams(
+                rescore=self.rerank_factor > 0,
+                oversampling=float(self.rerank_factor) if self.rerank_factor > 1 else None,
+            )
+        )
 
     async def store(
         self,
         event: str,
         action: str,
         outcome: str,
-        embedding: List[float],
+        embedding: Vector,
         metadata: Optional[Dict[str, Any]] = None,
     ) -> None:
         """
@@ -57,52 +195,219 @@ class QdrantBackend(MemoryBackend):
             embedding: Embedding of the memory
             metadata: Additional metadata to store
         """
-        point_id = str(uuid.uuid4())
-        timestamp = datetime.now(timezone.utc).isoformat()
-
-        payload = {
-            "event": event,
-            "action": action,
-            "outcome": outcome,
-            "timestamp": timestamp,
-        }
-        if metadata:
-            payload.update(metadata)
+        await self.store_many([MemoryRecord(event, action, outcome, embedding, metadata)])
+
+    async def store_many(self, records: List[MemoryRecord]) -> None:
+        """
+        Store several memory entries in Qdrant with one batch upsert.
+
+        Args:
+            records: Memory entries with their embeddings
+        """
+        if not records:
+            return
+        points = [
+            qdrant_models.PointStruct(
+                id=str(uuid.uuid4()),
+                vector=as_float_list(record.embedding),
+                payload=payload,
+            )
+            for record, payload in zip(records, memory_payloads(records))
+        ]
 
         try:
-            self.client.upsert(
-                collection_name=self.collection_name,
-                points=[
-                    qdrant_models.PointStruct(
-                        id=point_id,
-                        vector=embedding,
-                        payload=payload,
-                    )
-                ],
+            await self._run_write(
+                self.client.upsert, collection_name=self.collection_name, points=points
             )
-            logger.debug(f"Stored memory in Qdrant: {point_id}")
+            logger.debug(f"Stored {len(points)} memories in Qdrant")
         except Exception as e:
             logger.error(f"Error storing memory in Qdrant: {e}")
             raise
 
-    async def search(self, query_vector: List[float], top_k: int = 3) -> List[Dict[str, Any]]:
+    async def search(
+        self,
+        query_vector: Vector,
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[Dict[str, Any]]:
         """
         Search for similar memories in Qdrant.
 
         Args:
             query_vector: Query vector
             top_k: Number of results to return
+            memory_filter: Conditions the results must satisfy, passed as a payload filter
 
         Returns:
             List[Dict[str, Any]]: List of similar memories
         """
         try:
-            search_result = self.client.search(
+            search_kwargs: Dict[str, Any] = {}
+            if self._search_params is not None:
+                search_kwargs["search_params"] = self._search_params
+            query_filter = _qdrant_filter(memory_filter)
+            if query_filter is not None:
+                search_kwargs["query_filter"] = query_filter
+            search_result = await self._run(
+                self.client.search,
                 collection_name=self.collection_name,
-                query_vector=query_vector,
+                query_vector=as_float_list(query_vector),
                 limit=top_k,
+                **search_kwargs,
             )
             return [point.payload for point in search_result if point.payload]
         except Exception as e:
             logger.error(f"Error searching memory in Qdrant: {e}")
             return []
+
+    async def search_many(
+        self,
+        query_vectors: List[Vector],
+        top_k: int = 3,
+        memory_filter: Optional[MemoryFilter] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for similar memories of several query vectors with one `search_batch` call.
+
+        Args:
+            query_vectors: Query vectors
+            top_k: Number of results to return per query
+            memory_filter: Conditions the results must satisfy, passed as a payload filter
+
+        Returns:
+            List[List[Dict[str, Any]]]: Similar memories of each query
+        """
+        if not query_vectors:
+            return []
+        query_filter = _qdrant_filter(memory_filter)
+        try:
+            batch_result = await self._run(
+                self.client.search_batch,
+                collection_name=self.collection_name,
+                requests=[
+                    qdrant_models.SearchRequest(
+                        vector=as_float_list(vector),
+                        limit=top_k,
+                        with_payload=True,
+                        params=self._search_params,
+                        filter=query_filter,
+                    )
+                    for vector in query_vectors
+                ],
+            )
+            return [[point.payload for point in points if point.payload] for points in batch_result]
+        except Exception as e:
+            logger.error(f"Error searching memory in Qdrant: {e}")
+            return [[] for _ in query_vectors]
+
+    async def recent(
+        self, top_k: int = 3, memory_filter: Optional[MemoryFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the most recently stored memories in Qdrant, without a query vector.
+
+        Points are scrolled in descending order of the store time through its range index.
+
+        Args:
+            top_k: Number of memories to return
+            memory_filter: Conditions the memories must satisfy, passed as a payload filter
+
+        Returns:
+            List[Dict[str, Any]]: The newest matching memories, newest first
+        """
+        try:
+            points, _ = await self._run(
+                self.client.scroll,
+                collection_name=self.collection_name,
+                scroll_filter=_qdrant_filter(memory_filter),
+                limit=top_k,
+                order_by=qdrant_models.OrderBy(
+                    key=TIMESTAMP_UNIX_FIELD, direction=qdrant_models.Direction.DESC
+                ),
+                with_payload=True,
+                with_vectors=False,
+            )
+            return [point.payload for point in points if point.payload]
+        except Exception as e:
+            logger.error(f"Error fetching recent memories from Qdrant: {e}")
+            return []
+
+    async def delete(self, memory_filter: MemoryFilter) -> None:
+        """
+        Delete the memories matching a filter from Qdrant.
+
+        Args:
+            memory_filter: Conditions of the memories to delete, passed as a payload filter
+
+        Raises:
+            ValueError: If the filter is empty, which would delete every memory
+        """
+        points_filter = _qdrant_filter(memory_filter)
+        if points_filter is None:
+            raise ValueError("Refusing to delete memories without a filter")
+        try:
+            await self._run_write(
+                self.client.delete,
+                collection_name=self.collection_name,
+                points_selector=qdrant_models.FilterSelector(filter=points_filter),
+            )
+            logger.debug("Deleted memories matching a filter from Qdrant")
+        except Exception as e:
+            logger.error(f"Error deleting memories from Qdrant: {e}")
+            raise
+
+
+def _qdrant_filter(memory_filter: Optional[MemoryFilter]) -> Optional[qdrant_models.Filter]:
+    """Translate a memory filter into a Qdrant payload filter, or None if it is empty."""
+    if memory_filter is None:
+        return None
+    conditions: List[qdrant_models.Condition] = [
+        _field_condition(key, value) for key, value in memory_filter.fields.items()
+    ]
+    if memory_filter.since is not None or memory_filter.until is not None:
+        conditions.append(
+            qdrant_models.FieldCondition(
+                key=TIMESTAMP_UNIX_FIELD,
+                range=qdrant_models.Range(
+                    gte=memory_filter.since.timestamp() if memory_filter.since else None,
+                    lt=memory_filter.until.timestamp() if memory_filter.until else None,
+                ),
+            )
+        )
+    excluded: List[qdrant_models.Condition] = [
+        _field_condition(key, value) for key, value in memory_filter.exclude.items()
+    ]
+    if not conditions and not excluded:
+        return None
+    return qdrant_models.Filter(must=conditions or None, must_not=excluded or None)
+
+
+def _field_condition(key: str, value: Any) -> qdrant_models.FieldCondition:
+    """Condition matching a payload field against a value or a list of values."""
+    return qdrant_models.FieldCondition(
+        key=key,
+        match=(
+            qdrant_models.MatchAny(any=list(value))
+            if is_multi_value(value)
+            else qdrant_models.MatchValue(value=value)
+        ),
+    )
+
+
+def _quantization_config(
+    quantization: VectorQuantization,
+) -> Optional[qdrant_models.QuantizationConfig]:
+    """Return the Qdrant quantization config of a quantization mode."""
+    if quantization == VectorQuantization.INT8:
+        return qdrant_models.ScalarQuantization(
+            scalar=qdrant_models.ScalarQuantizationConfig(
+                type=qdrant_models.ScalarType.INT8, quantile=0.99, always_ram=True
+            )
+        )
+    if quantization == VectorQuantization.PQ:
+        return qdrant_models.ProductQuantization(
+            product=qdrant_models.ProductQuantizationConfig(
+                compression=qdrant_models.CompressionRatio.X16, always_ram=True
+            )
+        )
+    return None
@@ -0,0 +1,196 @@
+import os
+from typing import Optional, Tuple
+
+import numpy as np
+
+#: Number of rows scored per step, bounding the temporary float32 copy of the codes
+SCORE_CHUNK_ROWS = 4096
+
+#: Number of centroids per product quantization subspace, so codes fit in one byte
+PQ_CENTROIDS = 256
+
+#: Number of training vectors sampled per product quantization centroid
+PQ_SAMPLES_PER_CENTROID = 32
+
+
+class ScalarQuantizer:
+    """
+    int8 scalar quantization with one scale per vector.
+
+    Each vector is stored as int8 codes of its components divided by its largest absolute
+    component, plus that float32 scale, i.e. `d + 4` bytes instead of `4 * d`. The quantizer
+    needs no training, so vectors can be encoded as soon as they are stored.
+    """
+
+    @staticmethod
+    def encode(vectors: np.ndarray) -> Tuple[np.ndarray, np.ndarray]:
+        """
+        Quantize vectors.
+
+        Args:
+            vectors: float32 vectors, one per row
+
+        Returns:
+            Tuple[np.ndarray, np.ndarray]: int8 codes, one row per vector, and the float32
+                scale of each vector
+        """
+        vectors = np.asarray(vectors, dtype=np.float32)
+        scales = np.abs(vectors).max(axis=1) / 127.0
+        safe = np.where(scales == 0, 1.0, scales)
+        codes = np.clip(np.rint(vectors / safe[:, None]), -127, 127).astype(np.int8)
+        return codes, scales.astype(np.float32)
+
+    @staticmethod
+    def scores(query: np.ndarray, codes: np.ndarray, scales: np.ndarray) -> np.ndarray:
+        """
+        Score quantized vectors against a full-precision query.
+
+        Args:
+            query: float32 query vector
+            codes: int8 codes, one row per vector
+            scales: Scale of each vector
+
+        Returns:
+            np.ndarray: Approximate dot product of the query with each vector
+        """
+        scores = np.empty(len(codes), dtype=np.float32)
+        for i in range(0, len(codes), SCORE_CHUNK_ROWS):
+            chunk = codes[i : i + SCORE_CHUNK_ROWS].astype(np.float32)
+            scores[i : i + SCORE_CHUNK_ROWS] = chunk @ query
+        return scores * scales
+
+
+class ProductQuantizer:
+    """
+    Product quantization into one byte per subvector.
+
+    Vectors are split into `n_subvectors` equal parts, and each part is replaced by the index
+    of the nearest of 256 centroids learned with k-means for that part. A query is scored
+    against the codes through a table of its dot products with every centroid, without
+    decoding the vectors.
+    """
+
+    def __init__(self, codebooks: np.ndarray):
+        """
+        Initialize the quantizer.
+
+        Args:
+            codebooks: float32 centroids of shape (n_subvectors, 256, subvector size)
+        """
+        self.codebooks = codebooks.astype(np.float32, copy=False)
+
+    @property
+    def n_subvectors(self) -> int:
+        """Number of subvectors, i.e. bytes per encoded vector."""
+        return self.codebooks.shape[0]
+
+    @classmethod
+    def train(
+        cls, vectors: np.ndarray, n_subvectors: int, iterations: int = 10, seed: int = 0
+    ) -> "ProductQuantizer":
+        """
+        Learn the centroids of each subspace with k-means.
+
+        Args:
+            vectors: Training vectors, one per row. At least 256 are needed.
+            n_subvectors: Number of subvectors. Must divide the vector size.
+            iterations: Number of k-means iterations
+            seed: Seed of the random sampling
+
+        Returns:
+            ProductQuantizer: The trained quantizer
+
+        Raises:
+            ValueError: If there are fewer than 256 vectors or `n_subvectors` doesn't divide
+                the vector size
+        """
+        n, dim = vectors.shape
+        if n < PQ_CENTROIDS:
+            raise ValueError(f"Product quantization needs at least {PQ_CENTROIDS} vectors")
+        if n_subvectors <= 0 or dim % n_subvectors:
+            raise ValueError(f"{n_subvectors} subvectors don't divide the vector size {dim}")
+
+        rng = np.random.default_rng(seed)
+        sample_size = min(n, PQ_CENTROIDS * PQ_SAMPLES_PER_CENTROID)
+        sample = np.asarray(
+            vectors[np.sort(rng.choice(n, sample_size, replace=False))], dtype=np.float32
+        ).reshape(sample_size, n_subvectors, -1)
+
+        codebooks = np.empty((n_subvectors, PQ_CENTROIDS, dim // n_subvectors), np.float32)
+        for j in range(n_subvectors):
+            part = sample[:, j]
+            centroids = part[rng.choice(sample_size, PQ_CENTROIDS, replace=False)].copy()
+            for _ in range(iterations):
+                assignment = _nearest(part, centroids)
+                sums = np.zeros_like(centroids)
+                np.add.at(sums, assignment, part)
+                counts = np.bincount(assignment, minlength=PQ_CENTROIDS)
+                # Centroids that lost all their vectors restart from a random sample
+                empty = counts == 0
+                sums[empty] = part[rng.choice(sample_size, int(empty.sum()))]
+                counts[empty] = 1
+                centroids = sums / counts[:, None]
+            codebooks[j] = centroids
+        return cls(codebooks)
+
+    def encode(self, vectors: np.ndarray) -> np.ndarray:
+        """
+        Quantize vectors.
+
+        Args:
+            vectors: float32 vectors, one per row
+
+        Returns:
+            np.ndarray: uint8 codes of shape (n, n_subvectors)
+        """
+        parts = np.asarray(vectors, dtype=np.float32).reshape(len(vectors), self.n_subvectors, -1)
+        codes = np.empty((len(vectors), self.n_subvectors), dtype=np.uint8)
+        for j in range(self.n_subvectors):
+            codes[:, j] = _nearest(parts[:, j], self.codebooks[j])
+        return codes
+
+    def scores(self, query: np.ndarray, codes: np.ndarray) -> np.ndarray:
+        """
+        Score quantized vectors against a full-precision query.
+
+        Args:
+            query: float32 query vector
+            codes: uint8 codes, one row per vector
+
+        Returns:
+            np.ndarray: Approximate dot product of the query with each vector
+        """
+        # Dot product of each query part with each centroid of its subspace
+        table = np.einsum("jkd,jd->jk", self.codebooks, query.reshape(self.n_subvectors, -1))
+        subspaces = np.arange(self.n_subvectors)
+        scores = np.empty(len(codes), dtype=np.float32)
+        for i in range(0, len(codes), SCORE_CHUNK_ROWS):
+            chunk = codes[i : i + SCORE_CHUNK_ROWS]
+            scores[i : i + SCORE_CHUNK_ROWS] = table[subspaces, chunk].sum(axis=1)
+        return scores
+
+    def save(self, path: str) -> None:
+        """Persist the codebooks to a `.npy` file."""
+        tmp_path = f"{path}.tmp.npy"
+        np.save(tmp_path, self.codebooks)
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> Optional["ProductQuantizer"]:
+        """Load a quantizer persisted by `save`, or return None if there is none."""
+        if not os.path.exists(path):
+            return None
+        return cls(np.load(path))
+
+
+def default_subvectors(dim: int) -> int:
+    """Return the number of subvectors of about 16 dimensions each that divides `dim`."""
+    target = max(1, dim // 16)
+    return min((n for n in range(1, dim + 1) if dim % n == 0), key=lambda n: (abs(n - target), -n))
+
+
+def _nearest(vectors: np.ndarray, centroids: np.ndarray) -> np.ndarray:
+    """Return the index of the nearest centroid (by Euclidean distance) of each vector."""
+    # |v - c|^2 = |v|^2 - 2 v.c + |c|^2, and |v|^2 doesn't change the nearest centroid
+    distances = (centroids**2).sum(axis=1) - 2 * vectors @ centroids.T
+    return np.argmin(distances, axis=1)
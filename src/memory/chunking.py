@@ -0,0 +1,120 @@
+import math
+import re
+from dataclasses import dataclass
+from typing import Callable, Iterator, List, Optional, Tuple
+
+from src.core.config import settings
+
+#: Words with their trailing whitespace
+_PIECE_PATTERN = re.compile(r"\S+\s*")
+
+#: Piece ending a sentence or paragraph
+_SENTENCE_END = re.compile(r"([.!?:;]\s+|\n\s*)$")
+
+
+def approximate_tokens(text: str) -> int:
+    """Approximate the number of tokens of a text (about 4 bytes per token)."""
+    return max(1, math.ceil(len(text.strip().encode()) / 4))
+
+
+@dataclass(frozen=True)
+class Chunk:
+    """A chunk of a longer text."""
+
+    text: str
+    index: int
+    start: int
+    end: int
+
+
+class TextChunker:
+    """
+    Split long texts into overlapping chunks of at most `max_tokens` tokens.
+
+    Chunks are cut between words, preferably at the end of a sentence or paragraph, and
+    consecutive chunks share about `overlap_tokens` tokens so that context spanning a cut is
+    not lost. Token counts come from `count_tokens`, e.g. the `len(tokenizer.encode(text))` of
+    the embedding model's tokenizer.
+    """
+
+    def __init__(
+        self,
+        max_tokens: int = settings.MEMORY_CHUNK_MAX_TOKENS,
+        overlap_tokens: int = settings.MEMORY_CHUNK_OVERLAP_TOKENS,
+        count_tokens: Optional[Callable[[str], int]] = None,
+    ):
+        """
+        Initialize the chunker.
+
+        Args:
+            max_tokens: Maximum number of tokens in a chunk
+            overlap_tokens: Number of tokens repeated at the start of the next chunk, at most
+                half of `max_tokens`
+            count_tokens: Callable returning the number of tokens of a text. Defaults to an
+                approximation of 4 bytes per token.
+        """
+        self.max_tokens = max(1, max_tokens)
+        self.overlap_tokens = min(max(0, overlap_tokens), self.max_tokens // 2)
+        self.count_tokens = count_tokens or approximate_tokens
+
+    def needs_chunking(self, text: str) -> bool:
+        """Check whether a text is longer than one chunk."""
+        return self.count_tokens(text) > self.max_tokens
+
+    def chunks(self, text: str) -> Iterator[Chunk]:
+        """
+        Lazily split a text into chunks.
+
+        Args:
+            text: Text to split
+
+        Yields:
+            Chunk: The chunks in order
+        """
+        pieces = self._pieces(text)
+        start, index = 0, 0
+        while start < len(pieces):
+            end, tokens = start, 0
+            while end < len(pieces) and (
+                end == start or tokens + pieces[end][2] <= self.max_tokens
+            ):
+                tokens += pieces[end][2]
+                end += 1
+
+            if end < len(pieces):
+                # Prefer a sentence boundary in the second half of the chunk
+                for k in range(end - 1, start + (end - start) // 2 - 1, -1):
+                    if k > start and _SENTENCE_END.search(text[pieces[k][0] : pieces[k][1]]):
+                        end = k + 1
+                        break
+
+            first, last = pieces[start][0], pieces[end - 1][1]
+            yield Chunk(text=text[first:last].strip(), index=index, start=first, end=last)
+            index += 1
+            if end >= len(pieces):
+                return
+
+            # Step back so the next chunk starts with the overlap
+            next_start, overlap = end, 0
+            while next_start - 1 > start and overlap + pieces[next_start - 1][2] <= (
+                self.overlap_tokens
+            ):
+                next_start -= 1
+                overlap += pieces[next_start][2]
+            start = next_start
+
+    def _pieces(self, text: str) -> List[Tuple[int, int, int]]:
+        """Split a text into (start, end, tokens) pieces no longer than one chunk."""
+        pieces = []
+        for match in _PIECE_PATTERN.finditer(text):
+            start, end = match.span()
+            tokens = self.count_tokens(match.group())
+            if tokens <= self.max_tokens:
+                pieces.append((start, end, tokens))
+                continue
+            # A single "word" longer than a chunk (e.g. minified code) is cut by characters
+            width = max(1, (end - start) * self.max_tokens // tokens)
+            for offset in range(start, end, width):
+                piece_end = min(offset + width, end)
+                pieces.append((offset, piece_end, self.count_tokens(text[offset:piece_end])))
+        return pieces
@@ -0,0 +1,31 @@
+import fcntl
+from typing import IO
+
+from src.core.exceptions import MemoryError
+
+
+def lock_exclusively(path: str, resource: str) -> IO[str]:
+    """
+    Open and lock a lock file, failing fast if it is already locked.
+
+    The lock is held until the returned file is closed or the process exits, so a crash never
+    leaves it behind. Locks are taken per open file, so a second owner in the same process is
+    refused as well.
+
+    Args:
+        path: Lock file
+        resource: Description of the locked resource, used in the error message
+
+    Returns:
+        IO[str]: The open lock file
+
+    Raises:
+        MemoryError: If the lock file is already locked
+    """
+    lock_file = open(path, "w")
+    try:
+        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except OSError:
+        lock_file.close()
+        raise MemoryError(f"{resource} is already open in another memory module")
+    return lock_file
@@ -0,0 +1,325 @@
+import asyncio
+import heapq
+import json
+import math
+import os
+import re
+import threading
+from collections import Counter, defaultdict
+from typing import Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from src.core.config import settings
+from src.memory.backends.chroma import MemoryFilter, MemoryRecord, memory_payloads
+
+#: Words of a text, lower-cased
+_WORD_PATTERN = re.compile(r"\w+")
+
+#: Payload fields whose text is indexed
+INDEXED_FIELDS = ("event", "action", "outcome")
+
+#: Field of the file lines listing the numbers of deleted documents
+DELETED_FIELD = "_deleted"
+
+#: Share of the file's documents that may be deleted before it is compacted
+COMPACTION_THRESHOLD = 0.5
+
+
+def tokenize(text: str) -> List[str]:
+    """Split a text into lower-cased word tokens."""
+    return _WORD_PATTERN.findall(text.lower())
+
+
+class BM25Index:
+    """
+    Inverted index scoring memories with Okapi BM25.
+
+    Every stored memory's `event`, `action` and `outcome` text is tokenized into postings
+    as it is stored, so keyword queries are answered locally without an embedding request.
+    Memory payloads are appended to a JSONL file and re-indexed on startup. Deletes append a
+    tombstone line listing the removed documents, and the file is compacted to the remaining
+    memories once most of its lines are deleted. The file is written from a worker thread, see
+    `add` and `delete`, and should be opened by one index only, see `get_lexical_index`.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.MEMORY_LEXICAL_PATH,
+        k1: float = 1.2,
+        b: float = 0.75,
+    ):
+        """
+        Initialize the BM25 index.
+
+        Args:
+            path: JSONL file the indexed memories are persisted to. An empty path keeps them
+                in memory only.
+            k1: Term frequency saturation
+            b: Document length normalization
+        """
+        self.path = path
+        self.k1 = k1
+        self.b = b
+        #: Indexed payloads by document number, the order of their lines in the file
+        self.payloads: Dict[int, Dict[str, Any]] = {}
+        self._postings: Dict[str, Dict[int, int]] = defaultdict(dict)
+        self._lengths: Dict[int, int] = {}
+        self._total_length = 0
+        self._next_doc = 0
+        #: Guards the postings, held by searches
+        self._lock = threading.Lock()
+        #: Serializes the writes to the file, so its lines are in document order
+        self._file_lock = threading.Lock()
+        if path and os.path.exists(path):
+            if self._load():
+                self._compact()
+
+    def __len__(self) -> int:
+        return len(self.payloads)
+
+    async def add(self, records: Sequence[MemoryRecord]) -> None:
+        """
+        Index memories, appending them to the file from a worker thread.
+
+        Args:
+            records: Memory entries, as written to the backend. Their embeddings are ignored.
+        """
+        await asyncio.to_thread(self._add, memory_payloads(records))
+
+    async def delete(self, memory_filter: MemoryFilter) -> int:
+        """
+        Remove the memories matching a filter, appending a tombstone from a worker thread.
+
+        Args:
+            memory_filter: Conditions of the memories to remove
+
+        Returns:
+            int: Number of removed memories
+        """
+        return await asyncio.to_thread(self._delete, memory_filter)
+
+    def search(
+        self, query: str, top_k: int = 3, memory_filter: Optional[MemoryFilter] = None
+    ) -> List[Dict[str, Any]]:
+        """
+        Find the memories best matching the words of a query.
+
+        Args:
+            query: Query text
+            top_k: Number of results to return
+            memory_filter: Conditions the results must satisfy
+
+        Returns:
+            List[Dict[str, Any]]: Matching memory payloads, best first
+        """
+        return [payload for _, payload in self.search_with_scores(query, top_k, memory_filter)]
+
+    def search_with_scores(
+        self, query: str, top_k: int = 3, memory_filter: Optional[MemoryFilter] = None
+    ) -> List[Tuple[float, Dict[str, Any]]]:
+        """Find the memories best matching the words of a query, with their BM25 scores."""
+        with self._lock:
+            count = len(self.payloads)
+            if count == 0 or top_k <= 0:
+                return []
+            average_length = self._total_length / count
+            scores: Dict[int, float] = defaultdict(float)
+            for term in set(tokenize(query)):
+                postings = self._postings.get(term)
+                if not postings:
+                    continue
+                idf = math.log(1 + (count - len(postings) + 0.5) / (len(postings) + 0.5))
+                for doc, tf in postings.items():
+                    norm = self.k1 * (1 - self.b + self.b * self._lengths[doc] / average_length)
+                    scores[doc] += idf * tf * (self.k1 + 1) / (tf + norm)
+            if memory_filter is not None:
+                scores = {
+                    doc: score
+                    for doc, score in scores.items()
+                    if memory_filter.matches(self.payloads[doc])
+                }
+            best = heapq.nlargest(top_k, scores.items(), key=lambda item: (item[1], item[0]))
+            return [(score, self.payloads[doc]) for doc, score in best]
+
+    def _add(self, payloads: List[Dict[str, Any]]) -> None:
+        """Index payloads and append them to the file."""
+        with self._file_lock:
+            with self._lock:
+                for payload in payloads:
+                    self._index(payload)
+            self._append(payloads)
+
+    def _delete(self, memory_filter: MemoryFilter) -> int:
+        """Remove the payloads matching a filter, then append a tombstone or compact the file."""
+        with self._file_lock:
+            with self._lock:
+                docs = [doc for doc, p in self.payloads.items() if memory_filter.matches(p)]
+                for doc in docs:
+                    self._unindex(doc)
+            if not docs:
+                return 0
+            self._append([{DELETED_FIELD: docs}])
+            if self._next_doc - len(self.payloads) > COMPACTION_THRESHOLD * self._next_doc:
+                self._compact()
+        return len(docs)
+
+    def _append(self, lines: List[Dict[str, Any]]) -> None:
+        """Append lines to the file. Caller holds the file lock."""
+        if not self.path:
+            return
+        try:
+            with open(self.path, "a") as file:
+                file.writelines(json.dumps(line, default=str) + "\n" for line in lines)
+        except OSError as e:
+            logger.warning(f"Could not persist the lexical index to {self.path}: {e}")
+
+    def _compact(self) -> None:
+        """
+        Rewrite the file with the remaining payloads only and renumber them to match.
+
+        Called with the file lock held, or before the index is shared. If the file can't be
+        rewritten, it is kept with its tombstones and the documents keep their numbers.
+        """
+        with self._lock:
+            payloads = [self.payloads[doc] for doc in sorted(self.payloads)]
+        if self.path:
+            try:
+                tmp_path = f"{self.path}.tmp"
+                with open(tmp_path, "w") as file:
+                    file.writelines(json.dumps(p, default=str) + "\n" for p in payloads)
+                os.replace(tmp_path, self.path)
+            except OSError as e:
+                logger.warning(f"Could not compact the lexical index {self.path}: {e}")
+                return
+        with self._lock:
+            self.payloads = {}
+            self._postings = defaultdict(dict)
+            self._lengths = {}
+            self._total_length = 0
+            self._next_doc = 0
+            for payload in payloads:
+                self._index(payload)
+
+    def _index(self, payload: Dict[str, Any]) -> None:
+        """Add a payload to the postings as the next document. Caller holds the lock."""
+        doc = self._next_doc
+        self._next_doc += 1
+        terms = _terms(payload)
+        for term, tf in terms.items():
+            self._postings[term][doc] = tf
+        length = sum(terms.values())
+        self._lengths[doc] = length
+        self._total_length += length
+        self.payloads[doc] = payload
+
+    def _unindex(self, doc: int) -> None:
+        """Remove a document from the postings. Caller holds the lock."""
+        payload = self.payloads.pop(doc, None)
+        if payload is None:
+            return
+        for term in _terms(payload):
+            postings = self._postings.get(term)
+            if postings is not None:
+                postings.pop(doc, None)
+                if not postings:
+                    del self._postings[term]
+        self._total_length -= self._lengths.pop(doc)
+
+    def _load(self) -> bool:
+        """
+        Re-index the memories persisted to the JSONL file, applying its tombstones.
+
+        Returns:
+            bool: Whether the file should be compacted, because it has damaged lines, whose
+                documents would be numbered differently than when they were written, or
+                mostly deleted memories
+        """
+        damaged = False
+        with open(self.path) as file:
+            for line in file:
+                try:
+                    payload = json.loads(line)
+                except json.JSONDecodeError:
+                    # A write interrupted by a crash leaves a partial line
+                    damaged = True
+                    continue
+                if DELETED_FIELD in payload:
+                    for doc in payload[DELETED_FIELD]:
+                        self._unindex(doc)
+                else:
+                    self._index(payload)
+        logger.debug(f"Loaded {len(self.payloads)} memories into the lexical index")
+        deleted = self._next_doc - len(self.payloads)
+        return damaged or deleted > COMPACTION_THRESHOLD * self._next_doc
+
+
+def _terms(payload: Dict[str, Any]) -> Counter:
+    """Count the indexed words of a payload."""
+    return Counter(
+        term for field in INDEXED_FIELDS for term in tokenize(str(payload.get(field, "")))
+    )
+
+
+_lexical_indexes: Dict[str, BM25Index] = {}
+_lexical_indexes_lock = threading.Lock()
+
+
+def get_lexical_index(path: str = settings.MEMORY_LEXICAL_PATH) -> BM25Index:
+    """
+    Get the process-wide keyword index persisted to a file.
+
+    Indexes writing the same file would number their documents differently and overwrite
+    each other's lines, so one is shared per path. An empty path gives a new in-memory index.
+
+    Args:
+        path: JSONL file the indexed memories are persisted to
+
+    Returns:
+        BM25Index: The keyword index of the file
+    """
+    if not path:
+        return BM25Index(path="")
+    with _lexical_indexes_lock:
+        if path not in _lexical_indexes:
+            _lexical_indexes[path] = BM25Index(path=path)
+        return _lexical_indexes[path]
+
+
+def memory_key(memory: Dict[str, Any]) -> Hashable:
+    """Identity of a memory across backends and indexes, from its content."""
+    return (
+        memory.get("event"),
+        memory.get("action"),
+        memory.get("outcome"),
+        memory.get("parent_id"),
+        memory.get("chunk_index"),
+    )
+
+
+def reciprocal_rank_fusion(
+    rankings: Sequence[List[Dict[str, Any]]], top_k: int, k: int = settings.MEMORY_SEARCH_RRF_K
+) -> List[Dict[str, Any]]:
+    """
+    Merge ranked result lists with reciprocal rank fusion.
+
+    Each memory scores `1 / (k + rank)` in every list it appears in, so memories ranked high
+    by several retrievers come first without comparing their incompatible raw scores.
+
+    Args:
+        rankings: Result lists, best first
+        top_k: Number of results to return
+        k: Rank offset damping the weight of the top ranks
+
+    Returns:
+        List[Dict[str, Any]]: The fused results, best first
+    """
+    scores: Dict[Hashable, float] = defaultdict(float)
+    memories: Dict[Hashable, Dict[str, Any]] = {}
+    for ranking in rankings:
+        for rank, memory in enumerate(ranking, start=1):
+            key = memory_key(memory)
+            scores[key] += 1.0 / (k + rank)
+            memories.setdefault(key, memory)
+    best = sorted(scores, key=lambda key: scores[key], reverse=True)[:top_k]
+    return [memories[key] for key in best]
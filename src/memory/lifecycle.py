@@ -0,0 +1,454 @@
+import asyncio
+import math
+import time
+from collections import OrderedDict
+from dataclasses import dataclass
+from datetime import datetime, timezone
+from typing import TYPE_CHECKING, Any, Dict, Hashable, List, Optional, Sequence, Tuple
+
+from loguru import logger
+
+from src.core.config import settings
+from src.core.defs import RollupSummarizer
+from src.llm.llm import LLM
+from src.memory.backends.chroma import MemoryFilter, payload_time
+from src.memory.signal_index import normalize_signal, signal_key
+
+if TYPE_CHECKING:
+    from src.memory.memory_module import MemoryModule
+
+#: Action of the digests that replace rolled-up memories
+DIGEST_ACTION = "memory_digest"
+
+#: Number of grouped lines of an extractive digest
+DIGEST_LINES = 10
+
+#: Number of grouped lines given to the LLM to summarize
+LLM_DIGEST_INPUT_LINES = 50
+
+#: Maximum number of characters of an outcome quoted in a digest
+DIGEST_OUTCOME_CHARS = 200
+
+#: Seconds below which a window with too many memories is no longer split
+MIN_ROLLUP_WINDOW = 1.0
+
+#: Resolution of the stored memory times, in seconds
+TIMESTAMP_RESOLUTION = 1e-6
+
+
+@dataclass
+class HotEntry:
+    """A recent memory in the hot tier, with the number of times it occurred."""
+
+    event: str
+    action: str
+    outcome: str
+    metadata: Dict[str, Any]
+    first_seen: float
+    last_seen: float
+    count: int = 1
+
+    @property
+    def match_fields(self) -> Dict[str, Any]:
+        """Payload fields identifying the stored copy of the memory."""
+        scalars = {
+            key: value
+            for key, value in self.metadata.items()
+            if isinstance(value, (str, int, float, bool))
+        }
+        return {**scalars, "event": self.event, "action": self.action, "outcome": self.outcome}
+
+
+class MemoryLifecycleManager:
+    """
+    Keep the memory store bounded: merge repeated memories and roll up old ones into digests.
+
+    Recent memories are tracked in a hot tier in RAM. They are stored as usual, but a memory
+    that repeats one still in the hot tier (same normalized event, action, outcome and
+    metadata) is only counted, without an embedding request or a write. When an entry leaves
+    the hot tier, after `hot_ttl` seconds without repeats or when more than `hot_max_entries`
+    are tracked, its stored copy in the backend (the cold tier) is replaced by one aggregate
+    with its `count`, `first_seen` and `last_seen`. The aggregates are written by a background
+    task, so storing a memory never waits for them.
+
+    Memories older than `rollup_age` are rolled up per `rollup_window` into one digest memory
+    each, summarized extractively (the most frequent kinds of memories with their counts) or
+    by the LLM, and deleted. Digests and memories of the `keep_actions`, such as ingested
+    documents, are never rolled up. Both run as a background task every `interval` seconds.
+    """
+
+    def __init__(
+        self,
+        memory: "MemoryModule",
+        hot_max_entries: int = settings.MEMORY_HOT_MAX_ENTRIES,
+        hot_ttl: float = settings.MEMORY_HOT_TTL,
+        rollup_age: float = settings.MEMORY_ROLLUP_AGE,
+        rollup_window: float = settings.MEMORY_ROLLUP_WINDOW,
+        rollup_max_entries: int = settings.MEMORY_ROLLUP_MAX_ENTRIES,
+        rollup_windows_per_run: int = settings.MEMORY_ROLLUP_WINDOWS_PER_RUN,
+        summarizer: RollupSummarizer = settings.MEMORY_ROLLUP_SUMMARIZER,
+        keep_actions: Sequence[str] = settings.MEMORY_ROLLUP_KEEP_ACTIONS,
+        interval: float = settings.MEMORY_LIFECYCLE_INTERVAL,
+    ):
+        """
+        Initialize the lifecycle manager.
+
+        Args:
+            memory: Memory module whose memories are managed
+            hot_max_entries: Maximum number of memories in the hot tier
+            hot_ttl: Seconds a memory stays in the hot tier after it last occurred
+            rollup_age: Seconds after which memories are rolled up (0 disables rollups).
+                At least `hot_ttl`, so hot memories are never rolled up.
+            rollup_window: Seconds of memories summarized by one digest
+            rollup_max_entries: Maximum number of memories summarized by one digest. Windows
+                holding more are split.
+            rollup_windows_per_run: Maximum number of digests written per run
+            summarizer: Summarizer of the digests
+            keep_actions: Actions whose memories are never rolled up, e.g. ingested documents
+            interval: Seconds between background runs (0 disables them)
+        """
+        self.memory = memory
+        self.hot_max_entries = max(1, hot_max_entries)
+        self.hot_ttl = hot_ttl
+        self.rollup_age = max(rollup_age, hot_ttl) if rollup_age > 0 else 0.0
+        self.rollup_window = max(MIN_ROLLUP_WINDOW, rollup_window)
+        self.rollup_max_entries = max(1, rollup_max_entries)
+        self.rollup_windows_per_run = max(1, rollup_windows_per_run)
+        self.summarizer = RollupSummarizer(summarizer)
+        self.keep_actions = list(keep_actions)
+        self.interval = interval
+
+        self._hot: "OrderedDict[str, HotEntry]" = OrderedDict()
+        self._lock = asyncio.Lock()
+        self._timer: Optional[asyncio.Task] = None
+        #: Repeated entries that left the hot tier, with their keys, waiting to be aggregated
+        self._evicted: List[Tuple[str, HotEntry]] = []
+        self._aging_lock = asyncio.Lock()
+        self._aging: Optional[asyncio.Task] = None
+
+    def __len__(self) -> int:
+        return len(self._hot)
+
+    async def admit(
+        self, event: str, action: str, outcome: str, metadata: Optional[Dict[str, Any]] = None
+    ) -> bool:
+        """
+        Track a memory about to be stored in the hot tier.
+
+        Args:
+            event: Event description
+            action: Action taken
+            outcome: Result of the action
+            metadata: Additional metadata
+
+        Returns:
+            bool: True if the memory repeats a hot one and was merged into it, so it must not
+                be stored
+        """
+        metadata = dict(metadata or {})
+        key = signal_key(f"{event}\n{action}\n{outcome}\n{sorted(metadata.items())}")
+        now = time.time()
+        async with self._lock:
+            entry = self._hot.get(key)
+            if entry is not None and now - entry.last_seen <= self.hot_ttl:
+                entry.count += 1
+                entry.last_seen = now
+                self._hot.move_to_end(key)
+                merged = True
+            else:
+                if entry is not None:
+                    self._evict(key, self._hot.pop(key))
+                self._hot[key] = HotEntry(event, action, outcome, metadata, now, now)
+                while len(self._hot) > self.hot_max_entries:
+                    self._evict(*self._hot.popitem(last=False))
+                merged = False
+        if self._evicted:
+            self._start_aging()
+        self._start_timer()
+        return merged
+
+    async def age(self, max_idle: Optional[float] = None) -> int:
+        """
+        Move the hot entries that haven't repeated for `max_idle` seconds to the cold tier.
+
+        Args:
+            max_idle: Seconds without repeats. Defaults to `hot_ttl`; 0 moves every entry.
+
+        Returns:
+            int: Number of entries moved
+        """
+        cutoff = time.time() - (self.hot_ttl if max_idle is None else max_idle)
+        aged = 0
+        async with self._lock:
+            # Entries are ordered by their last occurrence, so the idle ones come first
+            while self._hot:
+                key, entry = next(iter(self._hot.items()))
+                if entry.last_seen > cutoff and max_idle != 0:
+                    break
+                del self._hot[key]
+                self._evict(key, entry)
+                aged += 1
+        await self._age_evicted()
+        return aged
+
+    async def roll_up(self, now: Optional[float] = None) -> int:
+        """
+        Replace the memories older than `rollup_age` by digests, newest window first.
+
+        Args:
+            now: Current Unix time. Defaults to the time of the call.
+
+        Returns:
+            int: Number of digests written
+        """
+        if self.rollup_age <= 0:
+            return 0
+        cutoff = (time.time() if now is None else now) - self.rollup_age
+        raw = {"action": [DIGEST_ACTION, *self.keep_actions]}
+        digests = 0
+        while digests < self.rollup_windows_per_run:
+            newest = await self.memory.backend.recent(
+                1, MemoryFilter(until=_datetime(cutoff), exclude=raw)
+            )
+            stored_at = payload_time(newest[0]) if newest else None
+            if stored_at is None:
+                break
+
+            start = math.floor(stored_at / self.rollup_window) * self.rollup_window
+            end = min(start + self.rollup_window, cutoff)
+            while True:
+                window = MemoryFilter(since=_datetime(start), until=_datetime(end), exclude=raw)
+                memories = await self.memory.backend.recent(self.rollup_max_entries + 1, window)
+                if len(memories) <= self.rollup_max_entries:
+                    break
+                if end - start <= MIN_ROLLUP_WINDOW:
+                    memories, start = await self._newest_memories(memories, start, raw)
+                    break
+                # Too many memories for one digest, roll up the newer half of the window first
+                start = (start + end) / 2
+            if not memories:
+                break
+
+            # The digest is stored first, so a failed deletion never loses memories
+            await self.memory.store_many([await self._digest(memories, start, end)])
+            await self.memory.delete(since=_datetime(start), until=_datetime(end), exclude=raw)
+            digests += 1
+        if digests:
+            logger.debug(f"Rolled up old memories into {digests} digests")
+        return digests
+
+    async def run_once(self) -> None:
+        """Age idle hot entries and roll up old memories."""
+        await self.age()
+        await self.roll_up()
+
+    async def close(self) -> None:
+        """Stop the background tasks and move every hot entry to the cold tier."""
+        if self._timer is not None and not self._timer.done():
+            self._timer.cancel()
+        self._timer = None
+        await self.age(max_idle=0)
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _evict(self, key: str, entry: HotEntry) -> None:
+        """Queue an entry that left the hot tier to be aggregated. Caller holds the lock."""
+        if entry.count > 1:
+            self._evicted.append((key, entry))
+
+    def _start_aging(self) -> None:
+        """Aggregate the evicted entries in a background task."""
+        if self._aging is None or self._aging.done():
+            self._aging = asyncio.ensure_future(self._age_in_background())
+
+    async def _age_in_background(self) -> None:
+        """Aggregate the evicted entries, logging failures."""
+        try:
+            await self._age_evicted()
+        except Exception as e:
+            logger.error(f"Error merging repeated memories: {e}")
+
+    async def _age_evicted(self) -> None:
+        """Aggregate the evicted entries, oldest first. A failed entry is dropped."""
+        async with self._aging_lock:
+            while self._evicted:
+                key, entry = self._evicted[0]
+                try:
+                    await self._age(key, entry)
+                finally:
+                    self._evicted.pop(0)
+
+    async def _age(self, key: str, entry: HotEntry) -> None:
+        """Replace the stored copy of a repeated memory by its aggregate."""
+        # The aggregate is stored first, so a failed write never loses the stored copy. Copies
+        # still buffered are stored before `until`, so the deletion finds them but not the
+        # aggregate. If the memory occurred again after it left the hot tier, its new copy is
+        # stored after that entry's `first_seen`, which then bounds the deletion.
+        await self.memory.flush()
+        async with self._lock:
+            newer = [e.first_seen for k, e in self._evicted[1:] if k == key]
+            if key in self._hot:
+                newer.append(self._hot[key].first_seen)
+        until = _datetime(min([time.time(), *newer]))
+        await self.memory.store_many(
+            [
+                {
+                    "event": entry.event,
+                    "action": entry.action,
+                    "outcome": entry.outcome,
+                    "metadata": {
+                        **entry.metadata,
+                        "count": entry.count,
+                        "first_seen": _datetime(entry.first_seen).isoformat(),
+                        "last_seen": _datetime(entry.last_seen).isoformat(),
+                    },
+                }
+            ]
+        )
+        await self.memory.delete(
+            filters=entry.match_fields, since=_datetime(entry.first_seen), until=until
+        )
+        logger.debug(f"Merged {entry.count} repeats of memory '{entry.event}'")
+
+    async def _newest_memories(
+        self, memories: List[Dict[str, Any]], start: float, raw: Dict[str, Any]
+    ) -> Tuple[List[Dict[str, Any]], float]:
+        """
+        Select the memories of a window too short to split that one digest summarizes.
+
+        Of the `rollup_max_entries + 1` newest memories of the window, the ones stored after
+        the oldest are summarized, and the window is moved to start after it, so the older
+        memories are kept for the next digest. If they were all stored at the same time, e.g.
+        by one batched write, every memory of that time is summarized instead.
+
+        Args:
+            memories: Newest memories of the window, newest first
+            start: Start of the window
+            raw: Payload fields of the memories that are never rolled up
+
+        Returns:
+            Tuple[List[Dict[str, Any]], float]: The summarized memories and the new start of
+                the window
+        """
+        oldest = payload_time(memories[-1]) or start
+        newer = [m for m in memories if (payload_time(m) or start) > oldest]
+        if newer:
+            return newer, oldest + TIMESTAMP_RESOLUTION
+        logger.warning(
+            f"More than {self.rollup_max_entries} memories stored at {oldest}, rolling them "
+            "up into one digest"
+        )
+        tied = MemoryFilter(
+            since=_datetime(oldest), until=_datetime(oldest + TIMESTAMP_RESOLUTION), exclude=raw
+        )
+        limit = len(memories)
+        while len(memories) >= limit:
+            limit *= 2
+            memories = await self.memory.backend.recent(limit, tied)
+        return memories, oldest
+
+    async def _digest(
+        self, memories: List[Dict[str, Any]], start: float, end: float
+    ) -> Dict[str, Any]:
+        """Summarize the memories of a window into a digest memory."""
+        total = sum(_memory_count(m) for m in memories if m.get("chunk_index") in (None, 0))
+        outcome = extractive_digest(memories)
+        if self.summarizer == RollupSummarizer.LLM:
+            prompt = (
+                "Summarize these memories of an autonomous agent in a few sentences. Keep "
+                "names, numbers and outcomes.\n\n"
+                f"{extractive_digest(memories, LLM_DIGEST_INPUT_LINES)}"
+            )
+            try:
+                outcome = await LLM().generate_response([{"role": "user", "content": prompt}])
+            except Exception as e:
+                logger.warning(f"Could not summarize memories with the LLM, using extracts: {e}")
+        window_start = _datetime(start).isoformat()
+        window_end = _datetime(end).isoformat()
+        return {
+            "event": f"Digest of {total} memories from {window_start} to {window_end}",
+            "action": DIGEST_ACTION,
+            "outcome": outcome,
+            "metadata": {"count": total, "window_start": window_start, "window_end": window_end},
+        }
+
+    def _start_timer(self) -> None:
+        """Start the background runs."""
+        if self.interval > 0 and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.ensure_future(self._run_periodically())
+
+    async def _run_periodically(self) -> None:
+        """Run every `interval` seconds."""
+        while True:
+            await asyncio.sleep(self.interval)
+            try:
+                await self.run_once()
+            except Exception as e:
+                logger.error(f"Error running the memory lifecycle manager: {e}")
+
+
+def extractive_digest(memories: List[Dict[str, Any]], lines: int = DIGEST_LINES) -> str:
+    """
+    Summarize memories as their most frequent kinds, one line each with its count.
+
+    Memories with the same action and normalized event and outcome are one kind, and chunks of
+    the same memory are quoted by their first chunk.
+
+    Args:
+        memories: Memory payloads, newest first
+        lines: Maximum number of kinds listed
+
+    Returns:
+        str: The digest text
+    """
+    kinds: Dict[Hashable, List[Any]] = {}
+    for memory in memories:
+        if memory.get("parent_id") is not None:
+            key: Hashable = ("chunks", memory["parent_id"])
+            if key not in kinds or memory.get("chunk_index", 0) < kinds[key][1].get(
+                "chunk_index", 0
+            ):
+                kinds[key] = [1, memory]
+            continue
+        key = (
+            memory.get("action"),
+            normalize_signal(str(memory.get("event", ""))),
+            normalize_signal(str(memory.get("outcome", ""))),
+        )
+        if key in kinds:
+            kinds[key][0] += _memory_count(memory)
+        else:
+            kinds[key] = [_memory_count(memory), memory]
+
+    ranked = sorted(kinds.values(), key=lambda kind: kind[0], reverse=True)
+    digest = [
+        f"- {memory.get('action')} x{count}: {memory.get('event')}: "
+        f"{_clip(str(memory.get('outcome', '')))}"
+        for count, memory in ranked[:lines]
+    ]
+    if len(ranked) > lines:
+        digest.append(f"- {len(ranked) - lines} other kinds of memories")
+    return "\n".join(digest)
+
+
+def _memory_count(memory: Dict[str, Any]) -> int:
+    """Number of occurrences a memory stands for, more than one for merged repeats."""
+    try:
+        return max(1, int(memory.get("count", 1)))
+    except (TypeError, ValueError):
+        return 1
+
+
+def _clip(text: str) -> str:
+    """Shorten a quoted outcome."""
+    text = " ".join(text.split())
+    if len(text) <= DIGEST_OUTCOME_CHARS:
+        return text
+    return text[: DIGEST_OUTCOME_CHARS - 3] + "..."
+
+
+def _datetime(timestamp: float) -> datetime:
+    """Convert Unix seconds to an aware UTC datetime."""
+    return datetime.fromtimestamp(timestamp, tz=timezone.utc)
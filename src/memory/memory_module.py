@@ -1,44 +1,78 @@
-from typing import Any, Dict, List, Optional, Union
+import asyncio
+import itertools
+import threading
+import uuid
+from datetime import datetime
+from typing import Any, Dict, List, Optional, Sequence
 
 from loguru import logger
 from openai import AsyncOpenAI
 
 from src.core.config import settings
-from src.core.defs import MemoryBackendType
+from src.core.defs import MemoryBackendType, SearchMode
+from src.llm.embedding_cache import get_embedding_cache
+from src.llm.embedding_providers import embedding_token_counter
 from src.llm.embeddings import EmbeddingGenerator
-from src.llm.llm import get_oai_client
-from src.memory.backends.chroma import ChromaBackend
+from src.memory.backends.chroma import ChromaBackend, MemoryBackend, MemoryFilter, MemoryRecord
+from src.memory.backends.local import LocalBackend
 from src.memory.backends.qdrant import QdrantBackend
+from src.memory.chunking import Chunk, TextChunker
+from src.memory.lexical import get_lexical_index, reciprocal_rank_fusion
+from src.memory.lifecycle import MemoryLifecycleManager
+from src.memory.write_buffer import WriteBehindBuffer
 
 
 class MemoryModule:
     def __init__(
         self,
-        openai_client: AsyncOpenAI = get_oai_client(),
+        openai_client: Optional[AsyncOpenAI] = None,
         backend_type: str = settings.MEMORY_BACKEND_TYPE,
         collection_name: str = settings.MEMORY_COLLECTION_NAME,
         host: str = settings.MEMORY_HOST,
         port: int = settings.MEMORY_PORT,
-        vector_size: int = settings.MEMORY_VECTOR_SIZE,
+        vector_size: int = settings.EMBEDDING_DIMENSIONS or settings.MEMORY_VECTOR_SIZE,
         persist_directory: str = settings.MEMORY_PERSIST_DIRECTORY,
+        local_path: str = settings.MEMORY_LOCAL_PATH,
+        write_behind: bool = settings.MEMORY_WRITE_BEHIND,
+        read_your_writes: bool = settings.MEMORY_READ_YOUR_WRITES,
+        lexical_index: bool = settings.MEMORY_LEXICAL_INDEX,
+        lifecycle: bool = settings.MEMORY_LIFECYCLE,
     ):
         """
         Initialize the memory module with the specified backend.
 
         Args:
-            openai_client: AsyncOpenAI client instance for embedding generation
-            backend_type: Type of memory backend to use (qdrant or chroma)
+            openai_client: AsyncOpenAI client instance for embedding generation. Defaults to
+                the shared OpenAI client.
+            backend_type: Type of memory backend to use (qdrant, chroma or local)
             collection_name: Name of the vector store collection
             host: Vector store host for Qdrant. Will be ignored for ChromaDB.
             port: Vector store port for Qdrant. Will be ignored for ChromaDB.
-            vector_size: Size of embedding vectors for Qdrant. Will be set automatically for ChromaDB.
+            vector_size: Size of embedding vectors. Defaults to `EMBEDDING_DIMENSIONS` when
+                embeddings are shortened, otherwise to `MEMORY_VECTOR_SIZE`.
             persist_directory: Directory to persist ChromaDB data. Will be ignored for Qdrant.
+            local_path: Directory to persist local backend data. Used only for the local backend.
+            write_behind: Buffer writes of `store` and store them in batches in the background
+            read_your_writes: Flush buffered writes before searching
+            lexical_index: Keep a BM25 keyword index of stored memories for hybrid and lexical
+                search
+            lifecycle: Merge repeated memories and roll up old ones into digests in the
+                background, see `MemoryLifecycleManager`
+
+        Raises:
+            ValueError: If the backend type is unsupported, or the vector size doesn't match the
+                embedding size or the existing collection
+            MemoryError: If the local store is already open in another memory module
         """
-        #: Initialize embedding generator
-        self.embedding_generator = EmbeddingGenerator(openai_client)
+        dimensions = settings.EMBEDDING_DIMENSIONS or None
+        if dimensions and dimensions != vector_size:
+            raise ValueError(
+                f"Embeddings are shortened to {dimensions} dimensions, but the memory vector "
+                f"size is {vector_size}"
+            )
 
         # Setup the vector store backend
-        self.backend: Union[QdrantBackend, ChromaBackend]
+        self.backend: MemoryBackend
         if backend_type == MemoryBackendType.QDRANT:
             self.backend = QdrantBackend(
                 collection_name=collection_name,
@@ -50,23 +84,59 @@ class MemoryModule:
             self.backend = ChromaBackend(
                 collection_name=collection_name,
                 persist_directory=persist_directory,
+                vector_size=vector_size,
             )
+        elif backend_type == MemoryBackendType.LOCAL:
+            self.backend = LocalBackend(path=local_path, vector_size=vector_size)
         else:
             raise ValueError(f"Unsupported backend type: {backend_type}")
         logger.debug(f"Memory backend initialized: {self.backend}")
 
+        #: Initialize embedding generator
+        self.embedding_generator = EmbeddingGenerator(
+            openai_client,
+            cache=get_embedding_cache() if settings.EMBEDDING_CACHE_ENABLED else None,
+            dimensions=dimensions,
+        )
+        self.chunker = TextChunker(count_tokens=embedding_token_counter())
+        self.ingest_batch_size = max(1, settings.MEMORY_INGEST_BATCH_SIZE)
+        self.write_buffer = WriteBehindBuffer(self._store_buffered) if write_behind else None
+        self.read_your_writes = read_your_writes
+        self.lexical_index = get_lexical_index() if lexical_index else None
+        self.lifecycle = MemoryLifecycleManager(self) if lifecycle else None
+
     async def store(
         self, event: str, action: str, outcome: str, metadata: Optional[Dict[str, Any]] = None
     ) -> None:
         """
         Store a memory entry with the specified backend.
 
+        Outcomes longer than one chunk are stored in chunks, see `ingest`. With write-behind
+        enabled, the entry is buffered and stored with the next flush, see `flush`. With the
+        lifecycle manager enabled, a repeat of a recent memory is only counted, see
+        `MemoryLifecycleManager`.
+
         Args:
             event: Event description
             action: Action taken (is fromed from the ActionName enum)
             outcome: Result of the action
             metadata: Additional metadata to store
         """
+        if self.lifecycle is not None and not self.chunker.needs_chunking(outcome):
+            if await self.lifecycle.admit(event, action, outcome, metadata):
+                logger.debug(f"Merged repeated memory: {event} {action}")
+                return
+
+        if self.write_buffer is not None:
+            await self.write_buffer.put(
+                {"event": event, "action": action, "outcome": outcome, "metadata": metadata}
+            )
+            return
+
+        if self.chunker.needs_chunking(outcome):
+            await self.ingest(event, action, outcome, metadata)
+            return
+
         logger.debug(f"Storing memory: {event} {action} {outcome}")
         text_to_embed = f"{event} {action} {outcome}"
         embedding = await self.embedding_generator.get_embedding(text_to_embed)
@@ -74,32 +144,469 @@ class MemoryModule:
             event=event,
             action=action,
             outcome=outcome,
-            embedding=embedding[0].tolist(),
+            embedding=embedding[0],
             metadata=metadata,
         )
+        await self._index_lexical(
+            [MemoryRecord(event, action, outcome, embedding=embedding[0], metadata=metadata)]
+        )
+
+    async def store_many(self, memories: List[Dict[str, Any]]) -> None:
+        """
+        Store several memory entries with one embedding request and one backend write.
+
+        Outcomes longer than one chunk are stored in chunks, see `ingest`.
+
+        Args:
+            memories: Memory entries, each a dict with the `event`, `action`, `outcome` and
+                optional `metadata` arguments of `store`
+        """
+        short = [m for m in memories if not self.chunker.needs_chunking(m["outcome"])]
+        if short:
+            await self._store_short(short)
+
+        for m in memories:
+            if self.chunker.needs_chunking(m["outcome"]):
+                await self.ingest(m["event"], m["action"], m["outcome"], m.get("metadata"))
+
+    async def ingest(
+        self,
+        event: str,
+        action: str,
+        text: str,
+        metadata: Optional[Dict[str, Any]] = None,
+        parent_id: Optional[str] = None,
+    ) -> str:
+        """
+        Store a long text, e.g. a whole file or LLM analysis, as chunks of one memory.
+
+        The text is split into overlapping chunks, which are embedded in batches and written
+        to the backend in bulk. Each chunk is stored as its own entry whose outcome is the
+        chunk text, tagged with `parent_id` and `chunk_index`. The next batch is embedded
+        while the previous one is being written.
+
+        Args:
+            event: Event description
+            action: Action taken
+            text: Text to store
+            metadata: Additional metadata stored with every chunk
+            parent_id: Identifier of the memory. Defaults to a random id.
 
-    async def search(self, query: str, top_k: int = 3) -> List[Dict[str, Any]]:
+        Returns:
+            str: The parent id of the stored chunks
         """
-        Search for similar memories using the specified backend.
+        parent_id = parent_id or str(uuid.uuid4())
+        write: Optional[asyncio.Task] = None
+        writing: List[MemoryRecord] = []
+        stored = 0
+        try:
+            for batch in itertools.batched(self.chunker.chunks(text), self.ingest_batch_size):
+                records = await self._chunk_records(event, action, batch, metadata, parent_id)
+                if write:
+                    await write
+                    await self._index_lexical(writing)
+                write = asyncio.ensure_future(self.backend.store_many(records))
+                writing = records
+                stored += len(batch)
+            if write:
+                await write
+                await self._index_lexical(writing)
+        finally:
+            if write and not write.done():
+                write.cancel()
+
+        logger.debug(f"Ingested memory {parent_id} in {stored} chunks")
+        return parent_id
+
+    async def search(
+        self,
+        query: str,
+        top_k: int = 3,
+        mode: Optional[SearchMode] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Search for memories matching a query.
+
+        Vector search ranks memories by embedding similarity, lexical search by BM25 keyword
+        score, without an embedding request. Hybrid search runs both and fuses the rankings
+        with reciprocal rank fusion. Lexical and hybrid search need the keyword index.
+
+        Filters are applied by the backend before ranking, so a filtered search returns the
+        best `top_k` matching memories, not the matching ones among the best `top_k`.
+
+        Hits on several chunks of the same memory are collapsed into the best-matching chunk.
 
         Args:
             query: Query to search for
             top_k: Number of results to return
+            mode: Retrieval to use. Defaults to hybrid with the keyword index, otherwise to
+                vector search.
+            filters: Payload fields the memories must have, mapped to the required value or to
+                a list of accepted values, e.g. `{"action": "analyze_news"}`
+            since: Only return memories stored at or after this time
+            until: Only return memories stored before this time
 
         Returns:
-            List[Dict[str, Any]]: List of similar memories
+            List[Dict[str, Any]]: List of matching memories
+
+        Raises:
+            ValueError: If lexical or hybrid search is requested without the keyword index
         """
-        logger.debug(f"Searching for memories: {query}")
-        query_vector = await self.embedding_generator.get_embedding(query)
-        return await self.backend.search(
-            query_vector=query_vector[0].tolist(),
+        mode = self._search_mode(mode)
+        memory_filter = _memory_filter(filters, since, until)
+        await self._flush_for_read()
+        logger.debug(f"Searching for memories ({mode.value}): {query}")
+        if mode == SearchMode.LEXICAL:
+            return self._lexical_search(query, top_k, memory_filter)
+
+        query_vector = (await self.embedding_generator.get_embedding(query))[0]
+        if mode == SearchMode.HYBRID:
+            return self._fuse(
+                await self.backend.search(
+                    query_vector=query_vector,
+                    top_k=self._search_depth(top_k),
+                    memory_filter=memory_filter,
+                ),
+                query,
+                top_k,
+                memory_filter,
+            )
+
+        results = await self.backend.search(
+            query_vector=query_vector,
             top_k=top_k,
+            memory_filter=memory_filter,
         )
+        collapsed = _collapse_chunks(results, top_k)
+        if len(collapsed) < top_k <= len(results):
+            # Chunks of the same memory took several places, look further for other memories
+            results = await self.backend.search(
+                query_vector=query_vector,
+                top_k=self._search_depth(top_k),
+                memory_filter=memory_filter,
+            )
+            collapsed = _collapse_chunks(results, top_k)
+        return collapsed
+
+    async def search_many(
+        self,
+        queries: List[str],
+        top_k: int = 3,
+        mode: Optional[SearchMode] = None,
+        filters: Optional[Dict[str, Any]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[List[Dict[str, Any]]]:
+        """
+        Search for memories matching several queries with at most one embedding request and
+        one backend search.
+
+        Args:
+            queries: Queries to search for
+            top_k: Number of results to return per query
+            mode: Retrieval to use, see `search`
+            filters: Payload fields the memories must have, see `search`
+            since: Only return memories stored at or after this time
+            until: Only return memories stored before this time
+
+        Returns:
+            List[List[Dict[str, Any]]]: Matching memories of each query
+
+        Raises:
+            ValueError: If lexical or hybrid search is requested without the keyword index
+        """
+        if not queries:
+            return []
+        mode = self._search_mode(mode)
+        memory_filter = _memory_filter(filters, since, until)
+        await self._flush_for_read()
+        logger.debug(f"Searching for memories of {len(queries)} queries ({mode.value})")
+        if mode == SearchMode.LEXICAL:
+            return [self._lexical_search(query, top_k, memory_filter) for query in queries]
+
+        query_vectors = list(await self.embedding_generator.get_embedding(queries))
+        if mode == SearchMode.HYBRID:
+            results = await self.backend.search_many(
+                query_vectors, self._search_depth(top_k), memory_filter
+            )
+            return [
+                self._fuse(result, query, top_k, memory_filter)
+                for result, query in zip(results, queries)
+            ]
+
+        results = await self.backend.search_many(query_vectors, top_k, memory_filter)
+        collapsed = [_collapse_chunks(result, top_k) for result in results]
+
+        # Chunks of the same memory took several places, look further for other memories
+        widen = [i for i, result in enumerate(results) if len(collapsed[i]) < top_k <= len(result)]
+        if widen:
+            wider = await self.backend.search_many(
+                [query_vectors[i] for i in widen], self._search_depth(top_k), memory_filter
+            )
+            for i, result in zip(widen, wider):
+                collapsed[i] = _collapse_chunks(result, top_k)
+        return collapsed
+
+    async def recent(
+        self,
+        top_k: int = 3,
+        filters: Optional[Dict[str, Any]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+    ) -> List[Dict[str, Any]]:
+        """
+        Return the most recently stored memories, without an embedding request.
+
+        Chunks of the same memory are collapsed into the newest one.
+
+        Args:
+            top_k: Number of memories to return
+            filters: Payload fields the memories must have, see `search`
+            since: Only return memories stored at or after this time
+            until: Only return memories stored before this time
+
+        Returns:
+            List[Dict[str, Any]]: The newest matching memories, newest first
+        """
+        memory_filter = _memory_filter(filters, since, until)
+        await self._flush_for_read()
+        logger.debug(f"Fetching the {top_k} most recent memories")
+        results = await self.backend.recent(top_k, memory_filter)
+        collapsed = _collapse_chunks(results, top_k)
+        if len(collapsed) < top_k <= len(results):
+            # Chunks of the same memory took several places, look further for other memories
+            results = await self.backend.recent(self._search_depth(top_k), memory_filter)
+            collapsed = _collapse_chunks(results, top_k)
+        return collapsed
+
+    async def delete(
+        self,
+        filters: Optional[Dict[str, Any]] = None,
+        since: Optional[datetime] = None,
+        until: Optional[datetime] = None,
+        exclude: Optional[Dict[str, Any]] = None,
+    ) -> None:
+        """
+        Delete the memories matching a filter from the backend and the keyword index.
+
+        Buffered writes are stored first, so that they are deleted too if they match.
+
+        Args:
+            filters: Payload fields the memories to delete have, see `search`
+            since: Only delete memories stored at or after this time
+            until: Only delete memories stored before this time
+            exclude: Payload fields mapped to values (or lists of values) of memories to keep
+
+        Raises:
+            ValueError: If no condition is given, which would delete every memory
+        """
+        memory_filter = _memory_filter(filters, since, until, exclude)
+        if memory_filter is None:
+            raise ValueError("Refusing to delete memories without a filter")
+        await self.flush()
+        await self.backend.delete(memory_filter)
+        if self.lexical_index is not None:
+            await self.lexical_index.delete(memory_filter)
+
+    async def flush(self) -> None:
+        """Store the buffered writes of `store` now."""
+        if self.write_buffer is not None:
+            await self.write_buffer.flush()
+
+    async def start(self) -> None:
+        """Start the background work, e.g. storing the writes recovered from the spill file."""
+        if self.write_buffer is not None:
+            self.write_buffer.start()
+
+    async def close(self) -> None:
+        """Store the buffered writes, stop flushing in the background and release the backend."""
+        if self.lifecycle is not None:
+            await self.lifecycle.close()
+        if self.write_buffer is not None:
+            await self.write_buffer.close()
+        await self.backend.close()
+
+    async def _store_short(self, memories: List[Dict[str, Any]]) -> None:
+        """Store memories of at most one chunk with one embedding request and one write."""
+        logger.debug(f"Storing {len(memories)} memories")
+        embeddings = await self.embedding_generator.get_embedding(
+            [f"{m['event']} {m['action']} {m['outcome']}" for m in memories]
+        )
+        records = [
+            MemoryRecord(
+                event=m["event"],
+                action=m["action"],
+                outcome=m["outcome"],
+                embedding=embedding,
+                metadata=m.get("metadata"),
+            )
+            for m, embedding in zip(memories, embeddings)
+        ]
+        await self.backend.store_many(records)
+        await self._index_lexical(records)
+
+    async def _store_buffered(self, entries: List[Dict[str, Any]]) -> List[Dict[str, Any]]:
+        """
+        Store the writes flushed from the write buffer, returning those that failed.
+
+        Short memories are written in one backend call, which is waited for without a timeout,
+        so a batch reported as failed wasn't committed unless the vector store itself failed
+        part-way through; its retry may then store some of them twice. Long memories are
+        ingested with their buffer entry id as `parent_id`, and the chunks of a failed earlier
+        attempt are deleted first, so their retries never store duplicates.
+        """
+        failed: List[Dict[str, Any]] = []
+        short = [e for e in entries if not self.chunker.needs_chunking(e["outcome"])]
+        if short:
+            try:
+                await self._store_short(short)
+            except Exception as e:
+                logger.error(f"Error storing {len(short)} buffered memories: {e}")
+                failed.extend(short)
+
+        for entry in entries:
+            if not self.chunker.needs_chunking(entry["outcome"]):
+                continue
+            try:
+                if entry.get("attempts"):
+                    chunks = MemoryFilter(fields={"parent_id": entry["id"]})
+                    await self.backend.delete(chunks)
+                    if self.lexical_index is not None:
+                        await self.lexical_index.delete(chunks)
+                await self.ingest(
+                    entry["event"],
+                    entry["action"],
+                    entry["outcome"],
+                    entry.get("metadata"),
+                    parent_id=entry.get("id"),
+                )
+            except Exception as e:
+                logger.error(f"Error storing buffered memory {entry.get('id')}: {e}")
+                failed.append(entry)
+        return failed
+
+    def _search_mode(self, mode: Optional[SearchMode]) -> SearchMode:
+        """Resolve the search mode, checking that the keyword index is there if needed."""
+        if mode is None:
+            return SearchMode.VECTOR if self.lexical_index is None else SearchMode.HYBRID
+        mode = SearchMode(mode)
+        if mode != SearchMode.VECTOR and self.lexical_index is None:
+            raise ValueError(f"{mode.value.capitalize()} search needs the lexical index")
+        return mode
+
+    def _lexical_search(
+        self, query: str, top_k: int, memory_filter: Optional[MemoryFilter]
+    ) -> List[Dict[str, Any]]:
+        """Rank memories by BM25 score, collapsing chunks of the same memory."""
+        assert self.lexical_index is not None
+        results = self.lexical_index.search(query, self._search_depth(top_k), memory_filter)
+        return _collapse_chunks(results, top_k)
+
+    def _fuse(
+        self,
+        vector_results: List[Dict[str, Any]],
+        query: str,
+        top_k: int,
+        memory_filter: Optional[MemoryFilter],
+    ) -> List[Dict[str, Any]]:
+        """Fuse vector results with the lexical results of a query, collapsing chunks."""
+        assert self.lexical_index is not None
+        lexical_results = self.lexical_index.search(query, self._search_depth(top_k), memory_filter)
+        fused = reciprocal_rank_fusion(
+            [vector_results, lexical_results], len(vector_results) + len(lexical_results)
+        )
+        return _collapse_chunks(fused, top_k)
+
+    @staticmethod
+    def _search_depth(top_k: int) -> int:
+        """Number of results fetched so that chunks of the same memory can be collapsed."""
+        return top_k * max(2, settings.MEMORY_CHUNK_SEARCH_OVERSAMPLE)
+
+    async def _index_lexical(self, records: List[MemoryRecord]) -> None:
+        """Add stored memories to the keyword index."""
+        if self.lexical_index is not None:
+            await self.lexical_index.add(records)
+
+    async def _flush_for_read(self) -> None:
+        """Flush buffered writes before a search when read-your-writes is enabled."""
+        if self.write_buffer is not None and self.read_your_writes and len(self.write_buffer):
+            await self.write_buffer.flush()
+
+    async def _chunk_records(
+        self,
+        event: str,
+        action: str,
+        chunks: Sequence[Chunk],
+        metadata: Optional[Dict[str, Any]],
+        parent_id: str,
+    ) -> List[MemoryRecord]:
+        """Embed a batch of chunks in one request."""
+        embeddings = await self.embedding_generator.get_embedding(
+            [f"{event} {action} {chunk.text}" for chunk in chunks]
+        )
+        return [
+            MemoryRecord(
+                event=event,
+                action=action,
+                outcome=chunk.text,
+                embedding=embedding,
+                metadata={**(metadata or {}), "parent_id": parent_id, "chunk_index": chunk.index},
+            )
+            for chunk, embedding in zip(chunks, embeddings)
+        ]
+
+
+def _memory_filter(
+    filters: Optional[Dict[str, Any]],
+    since: Optional[datetime],
+    until: Optional[datetime],
+    exclude: Optional[Dict[str, Any]] = None,
+) -> Optional[MemoryFilter]:
+    """Build the backend filter of search arguments, or None if they don't filter."""
+    if not filters and not exclude and since is None and until is None:
+        return None
+    return MemoryFilter(
+        fields=dict(filters or {}), since=since, until=until, exclude=dict(exclude or {})
+    )
+
+
+def _collapse_chunks(results: List[Dict[str, Any]], top_k: int) -> List[Dict[str, Any]]:
+    """Keep only the best-ranked chunk of every memory."""
+    collapsed: List[Dict[str, Any]] = []
+    seen = set()
+    for result in results:
+        parent_id = result.get("parent_id")
+        if parent_id is not None:
+            if parent_id in seen:
+                continue
+            seen.add(parent_id)
+        collapsed.append(result)
+        if len(collapsed) == top_k:
+            break
+    return collapsed
+
+
+_memory_modules: Dict[str, MemoryModule] = {}
+_memory_modules_lock = threading.Lock()
 
 
 def get_memory_module(
-    openai_client: AsyncOpenAI = get_oai_client(),
+    openai_client: Optional[AsyncOpenAI] = None,
     backend_type: str = settings.MEMORY_BACKEND_TYPE,
 ) -> MemoryModule:
-    """Get a memory module instance with the specified backend."""
-    return MemoryModule(openai_client=openai_client, backend_type=backend_type)
+    """
+    Get the process-wide memory module with the specified backend.
+
+    A module owns its backend's files, keyword index and write buffer, so callers share one
+    instead of opening the same store several times. `openai_client` is only used by the call
+    that creates the module.
+    """
+    with _memory_modules_lock:
+        if backend_type not in _memory_modules:
+            _memory_modules[backend_type] = MemoryModule(
+                openai_client=openai_client, backend_type=backend_type
+            )
+        return _memory_modules[backend_type]
@@ -0,0 +1,236 @@
+import hashlib
+import math
+import re
+import sqlite3
+import threading
+import time
+import unicodedata
+from typing import TYPE_CHECKING, Optional
+
+import numpy as np
+from loguru import logger
+
+from src.core.config import settings
+from src.memory.backends.chroma import payload_time
+
+if TYPE_CHECKING:
+    from src.memory.memory_module import MemoryModule
+
+#: Action of the memories stored for processed signals, whose events are the signals
+SIGNAL_ACTION = "analyze_signal"
+
+#: Runs of whitespace, collapsed when normalizing signals
+_WHITESPACE = re.compile(r"\s+")
+
+
+def normalize_signal(content: str) -> str:
+    """Normalize a signal so that copies differing in case, width or spacing match."""
+    return _WHITESPACE.sub(" ", unicodedata.normalize("NFKC", content).casefold()).strip()
+
+
+def signal_key(content: str) -> str:
+    """Return the key of a signal, a hash of its normalized content."""
+    return hashlib.sha256(normalize_signal(content).encode()).hexdigest()
+
+
+class BloomFilter:
+    """
+    Bloom filter over hex digest keys.
+
+    Answers "definitely not added" without false negatives, and "maybe added" with a false
+    positive rate of about `error_rate` while at most `capacity` keys have been added.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01):
+        """
+        Initialize an empty Bloom filter.
+
+        Args:
+            capacity: Expected number of keys
+            error_rate: Target false positive rate at `capacity` keys
+        """
+        capacity = max(1, capacity)
+        self.size = max(8, math.ceil(-capacity * math.log(error_rate) / math.log(2) ** 2))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = np.zeros((self.size + 7) // 8, dtype=np.uint8)
+
+    def add(self, key: str) -> None:
+        """Add a hex digest key."""
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[p >> 3] & (1 << (p & 7)) for p in self._positions(key))
+
+    def _positions(self, key: str) -> list:
+        """Bit positions of a key, by double hashing two 64-bit halves of its digest."""
+        first, second = int(key[:16], 16), int(key[16:32], 16) | 1
+        return [(first + i * second) % self.size for i in range(self.hashes)]
+
+
+class ProcessedSignalIndex:
+    """
+    Index of the signals that have already been processed.
+
+    Signals are keyed by a hash of their normalized content, so a lookup is one primary-key
+    query in a local SQLite store instead of an embedding request and a vector search. Keys
+    expire after a TTL. An in-memory Bloom filter in front of the store answers most lookups
+    of new signals without touching SQLite. An index created empty is seeded once from the
+    signals stored in memory, see `seed`.
+    """
+
+    def __init__(
+        self,
+        path: str = settings.SIGNAL_INDEX_PATH,
+        ttl: float = settings.SIGNAL_INDEX_TTL,
+        bloom_capacity: int = settings.SIGNAL_INDEX_BLOOM_CAPACITY,
+    ):
+        """
+        Initialize the processed-signal index.
+
+        Args:
+            path: SQLite file the index is persisted to. An empty path keeps it in memory only.
+            ttl: Seconds a signal is remembered as processed (0 never expires)
+            bloom_capacity: Expected number of signals of the Bloom filter (0 disables it)
+        """
+        self.path = path
+        self.ttl = ttl
+        self.bloom = BloomFilter(bloom_capacity) if bloom_capacity > 0 else None
+        self._lock = threading.Lock()
+        db = sqlite3.connect(path or ":memory:", check_same_thread=False)
+        db.execute(
+            "CREATE TABLE IF NOT EXISTS processed_signals (key TEXT PRIMARY KEY, processed_at REAL)"
+        )
+        self._db: Optional[sqlite3.Connection] = db
+        self.prune()
+        if self.bloom is not None:
+            for (key,) in db.execute("SELECT key FROM processed_signals"):
+                self.bloom.add(key)
+        self._seeded = False
+        logger.debug(f"Loaded {len(self)} processed signals from {path or 'memory'}")
+
+    async def seed(
+        self, memory: "MemoryModule", limit: int = settings.SIGNAL_INDEX_SEED_LIMIT
+    ) -> int:
+        """
+        Record the signals of unexpired `analyze_signal` memories as processed, if the index is
+        empty. Once memories were read or the index holds signals, later calls do nothing.
+
+        Memories are read without a time window, as memories stored before the `timestamp_unix`
+        field existed have only their ISO `timestamp`, and the TTL is applied here.
+
+        Args:
+            memory: Memory module the processed signals were stored in
+            limit: Maximum number of memories to read
+
+        Returns:
+            int: Number of seeded signals
+        """
+        if self._seeded or len(self) > 0:
+            self._seeded = True
+            return 0
+        memories = await memory.recent(top_k=limit, filters={"action": SIGNAL_ACTION})
+        rows = []
+        for m in memories:
+            processed_at = payload_time(m) or time.time()
+            if m.get("event") and not self._expired(processed_at):
+                rows.append((signal_key(m["event"]), processed_at))
+        with self._lock:
+            if self._db is None:
+                return 0
+            self._db.executemany("INSERT OR IGNORE INTO processed_signals VALUES (?, ?)", rows)
+            self._db.commit()
+            if self.bloom is not None:
+                for key, _ in rows:
+                    self.bloom.add(key)
+        # Nothing read may mean the backend failed, so an empty index tries again next time
+        self._seeded = bool(memories)
+        logger.info(f"Seeded the processed-signal index with {len(rows)} signals from memory")
+        return len(rows)
+
+    def seen(self, content: str) -> bool:
+        """
+        Check whether a signal has been processed and hasn't expired.
+
+        Args:
+            content: Signal content
+
+        Returns:
+            bool: True if the signal was processed before
+        """
+        key = signal_key(content)
+        if self.bloom is not None and key not in self.bloom:
+            return False
+        with self._lock:
+            if self._db is None:
+                return False
+            row = self._db.execute(
+                "SELECT processed_at FROM processed_signals WHERE key = ?", (key,)
+            ).fetchone()
+        return row is not None and not self._expired(row[0])
+
+    def add(self, content: str) -> None:
+        """
+        Record a signal as processed.
+
+        Args:
+            content: Signal content
+        """
+        key = signal_key(content)
+        with self._lock:
+            if self._db is None:
+                return
+            self._db.execute(
+                "INSERT OR REPLACE INTO processed_signals VALUES (?, ?)", (key, time.time())
+            )
+            self._db.commit()
+            if self.bloom is not None:
+                self.bloom.add(key)
+
+    def prune(self) -> int:
+        """
+        Delete expired signals.
+
+        Returns:
+            int: Number of deleted signals
+        """
+        if self.ttl <= 0:
+            return 0
+        with self._lock:
+            if self._db is None:
+                return 0
+            deleted = self._db.execute(
+                "DELETE FROM processed_signals WHERE processed_at < ?", (time.time() - self.ttl,)
+            ).rowcount
+            self._db.commit()
+        return deleted
+
+    def close(self) -> None:
+        """Close the SQLite store."""
+        with self._lock:
+            if self._db is not None:
+                self._db.close()
+                self._db = None
+
+    def __len__(self) -> int:
+        with self._lock:
+            if self._db is None:
+                return 0
+            return self._db.execute("SELECT COUNT(*) FROM processed_signals").fetchone()[0]
+
+    def _expired(self, processed_at: float) -> bool:
+        """Check whether a signal processed at `processed_at` is older than the TTL."""
+        return self.ttl > 0 and time.time() - processed_at > self.ttl
+
+
+_signal_index: Optional[ProcessedSignalIndex] = None
+_signal_index_lock = threading.Lock()
+
+
+def get_signal_index() -> ProcessedSignalIndex:
+    """Get the process-wide processed-signal index."""
+    global _signal_index
+    with _signal_index_lock:
+        if _signal_index is None:
+            _signal_index = ProcessedSignalIndex()
+        return _signal_index
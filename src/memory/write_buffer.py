@@ -0,0 +1,246 @@
+import asyncio
+import json
+import os
+import uuid
+from typing import IO, Any, Awaitable, Callable, Dict, List, Optional
+
+from loguru import logger
+
+from src.core.config import settings
+from src.core.exceptions import MemoryError
+from src.memory.file_lock import lock_exclusively
+
+#: Callable writing a batch of buffered memories. It returns the entries it couldn't write, or
+#: None if it wrote all of them; raising means none of them were written.
+FlushHandler = Callable[[List[Dict[str, Any]]], Awaitable[Optional[List[Dict[str, Any]]]]]
+
+
+class WriteBehindBuffer:
+    """
+    Buffer memory writes and flush them in batches in the background.
+
+    Entries are flushed once `flush_size` of them are waiting, every `flush_interval` seconds,
+    and on `close`. Every entry is also appended to a local spill file until it has been
+    flushed, so entries buffered when the process dies are flushed after the next start. When
+    `max_size` entries are waiting, new writes wait for a flush.
+
+    Every entry gets a stable `id`. Only the entries a flush couldn't write are retried, and
+    an entry that failed `max_attempts` flushes is moved to a dead-letter file, so one bad
+    entry can't keep the buffer full.
+
+    The spill file is locked while the buffer is open, as buffers sharing it would flush the
+    same recovered entries and erase each other's waiting entries.
+    """
+
+    def __init__(
+        self,
+        flush: FlushHandler,
+        max_size: int = settings.MEMORY_WRITE_BUFFER_SIZE,
+        flush_size: int = settings.MEMORY_WRITE_FLUSH_SIZE,
+        flush_interval: float = settings.MEMORY_WRITE_FLUSH_INTERVAL,
+        spill_path: str = settings.MEMORY_WRITE_SPILL_PATH,
+        max_attempts: int = settings.MEMORY_WRITE_MAX_ATTEMPTS,
+        dead_letter_path: str = settings.MEMORY_WRITE_DEAD_LETTER_PATH,
+    ):
+        """
+        Initialize the write-behind buffer.
+
+        Args:
+            flush: Async callable writing a batch of entries, e.g. `MemoryModule.store_many`
+            max_size: Maximum number of waiting entries
+            flush_size: Number of waiting entries that triggers a flush
+            flush_interval: Seconds between periodic flushes (0 disables them)
+            spill_path: File waiting entries are persisted to. An empty path disables it.
+            max_attempts: Number of failed flushes after which an entry is given up
+            dead_letter_path: File given up entries are appended to. An empty path drops them.
+
+        Raises:
+            MemoryError: If the spill file is already used by another buffer
+        """
+        self.flush_handler = flush
+        self.max_size = max(1, max_size)
+        self.flush_size = min(max(1, flush_size), self.max_size)
+        self.flush_interval = flush_interval
+        self.spill_path = spill_path
+        self.max_attempts = max(1, max_attempts)
+        self.dead_letter_path = dead_letter_path
+
+        self._pending: List[Dict[str, Any]] = []
+        self._flush_lock = asyncio.Lock()
+        self._flush_task: Optional[asyncio.Task] = None
+        self._timer: Optional[asyncio.Task] = None
+        self._spill_lock: Optional[IO[str]] = None
+        if spill_path:
+            self._spill_lock = lock_exclusively(
+                f"{spill_path}.lock", f"The memory write spill file {spill_path}"
+            )
+            self._pending = self._load_spill()
+        if self._pending:
+            self.start()
+
+    def __len__(self) -> int:
+        return len(self._pending)
+
+    def start(self) -> None:
+        """Start flushing waiting entries, e.g. those recovered from the spill file."""
+        try:
+            asyncio.get_running_loop()
+        except RuntimeError:
+            # Started again from `put` or `MemoryModule.start` once an event loop runs
+            return
+        if self._pending:
+            self._flush_in_background()
+        self._start_timer()
+
+    async def put(self, entry: Dict[str, Any]) -> None:
+        """
+        Buffer an entry.
+
+        Args:
+            entry: JSON-serializable entry. An `id` is added unless it has one.
+
+        Raises:
+            Exception: If the buffer is full and flushing it fails
+        """
+        if len(self._pending) >= self.max_size:
+            logger.debug("Memory write buffer full, flushing before accepting more writes")
+            try:
+                await self.flush(raise_errors=True)
+            except Exception:
+                # Entries given up by the flush may have made room
+                if len(self._pending) >= self.max_size:
+                    raise
+
+        entry = {**entry, "id": entry.get("id") or uuid.uuid4().hex}
+        self._pending.append(entry)
+        if self.spill_path:
+            self._append_spill(entry)
+
+        if len(self._pending) >= self.flush_size:
+            self._flush_in_background()
+        self._start_timer()
+
+    async def flush(self, raise_errors: bool = False) -> None:
+        """
+        Write all waiting entries.
+
+        Failed entries stay buffered and are retried with the next flush, with their `attempts`
+        counted, until they are given up after `max_attempts` flushes.
+
+        Args:
+            raise_errors: Raise flush errors instead of logging them
+        """
+        async with self._flush_lock:
+            if not self._pending:
+                return
+            batch = list(self._pending)
+            error: Optional[Exception] = None
+            try:
+                failed = await self.flush_handler(batch) or []
+            except Exception as e:
+                failed, error = batch, e
+            if failed and error is None:
+                error = MemoryError(f"Could not store {len(failed)} buffered memories")
+
+            # Entries added while the batch was being written stay buffered
+            retried = []
+            for entry in failed:
+                entry["attempts"] = entry.get("attempts", 0) + 1
+                if entry["attempts"] < self.max_attempts:
+                    retried.append(entry)
+                else:
+                    self._give_up(entry)
+            self._pending[: len(batch)] = retried
+            if self.spill_path:
+                self._rewrite_spill()
+
+            if error is not None:
+                logger.error(
+                    f"Error flushing {len(failed)} of {len(batch)} buffered memories: {error}"
+                )
+                if raise_errors:
+                    raise error
+            else:
+                logger.debug(f"Flushed {len(batch)} buffered memories")
+
+    async def close(self) -> None:
+        """Stop the periodic flush, write all waiting entries and release the spill file."""
+        for task in (self._timer, self._flush_task):
+            if task and not task.done():
+                task.cancel()
+        self._timer = self._flush_task = None
+        await self.flush()
+        if self._spill_lock is not None:
+            self._spill_lock.close()
+            self._spill_lock = None
+
+    # --------------------------------------------------------------
+    # Internals
+    # --------------------------------------------------------------
+
+    def _flush_in_background(self) -> None:
+        """Start a flush unless one is already running."""
+        if self._flush_task is None or self._flush_task.done():
+            self._flush_task = asyncio.ensure_future(self.flush())
+
+    def _start_timer(self) -> None:
+        """Start the periodic flush."""
+        if self.flush_interval > 0 and (self._timer is None or self._timer.done()):
+            self._timer = asyncio.ensure_future(self._flush_periodically())
+
+    async def _flush_periodically(self) -> None:
+        """Flush waiting entries every `flush_interval` seconds."""
+        while True:
+            await asyncio.sleep(self.flush_interval)
+            await self.flush()
+
+    def _give_up(self, entry: Dict[str, Any]) -> None:
+        """Move an entry that keeps failing to the dead-letter file."""
+        logger.error(
+            f"Giving up buffered memory {entry['id']} after {entry['attempts']} failed flushes"
+        )
+        if not self.dead_letter_path:
+            return
+        try:
+            with open(self.dead_letter_path, "a") as dead_letter:
+                dead_letter.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write memory dead-letter file {self.dead_letter_path}: {e}")
+
+    def _append_spill(self, entry: Dict[str, Any]) -> None:
+        """Append an entry to the spill file."""
+        try:
+            with open(self.spill_path, "a") as spill:
+                spill.write(json.dumps(entry, default=str) + "\n")
+        except OSError as e:
+            logger.warning(f"Could not write memory spill file {self.spill_path}: {e}")
+
+    def _rewrite_spill(self) -> None:
+        """Replace the spill file with the entries that are still waiting."""
+        try:
+            if not self._pending:
+                if os.path.exists(self.spill_path):
+                    os.remove(self.spill_path)
+                return
+            tmp_path = f"{self.spill_path}.tmp"
+            with open(tmp_path, "w") as spill:
+                spill.writelines(json.dumps(e, default=str) + "\n" for e in self._pending)
+            os.replace(tmp_path, self.spill_path)
+        except OSError as e:
+            logger.warning(f"Could not rewrite memory spill file {self.spill_path}: {e}")
+
+    def _load_spill(self) -> List[Dict[str, Any]]:
+        """Load entries left in the spill file by a previous run."""
+        if not os.path.exists(self.spill_path):
+            return []
+        entries = []
+        with open(self.spill_path) as spill:
+            for line in spill:
+                try:
+                    entries.append(json.loads(line))
+                except json.JSONDecodeError:
+                    # A write interrupted by a crash leaves a partial last line
+                    continue
+        if entries:
+            logger.info(f"Recovered {len(entries)} unflushed memories from {self.spill_path}")
+        return entries
@@ -84,6 +84,10 @@ class GitHubIntegration:
     ) -> None:
         """Process repository files and store as agent memories.
 
+        Each file is ingested in chunks, with the hash of its content as the memory id. Files
+        whose content is already stored are skipped, and the chunks of a previous version of a
+        changed file are replaced.
+
         Args:
             file_paths: List of file paths to process
             memory_module: Memory module instance for storing memories
@@ -100,13 +104,21 @@ class GitHubIntegration:
 
                 content = full_path.read_text()
                 file_hash = hashlib.sha256(content.encode()).hexdigest()
+                if await memory_module.recent(
+                    top_k=1, filters={"parent_id": file_hash, "path": file_path}
+                ):
+                    logger.debug(f"File already stored in memory: {file_path}")
+                    continue
 
-                # Store in memory if not exists
-                if not await memory_module.exists(file_hash):
-                    await memory_module.store(
-                        {"type": "file", "path": file_path, "content": content, "hash": file_hash}
-                    )
-                    logger.info(f"Stored memory for file: {file_path}")
+                await memory_module.delete(filters={"action": "store_file", "path": file_path})
+                await memory_module.ingest(
+                    event=f"Repository file {file_path}",
+                    action="store_file",
+                    text=content,
+                    metadata={"type": "file", "path": file_path, "hash": file_hash},
+                    parent_id=file_hash,
+                )
+                logger.info(f"Stored memory for file: {file_path}")
 
             except Exception as e:
                 logger.error(f"Failed to process file {file_path}: {str(e)}")
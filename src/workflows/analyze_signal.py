@@ -1,15 +1,79 @@
-from typing import Optional
+import re
+from contextlib import aclosing
+from typing import Dict, List, Optional
 
 from loguru import logger
 
 from src.llm.llm import LLM
 from src.memory.memory_module import MemoryModule, get_memory_module
+from src.memory.signal_index import SIGNAL_ACTION, ProcessedSignalIndex, get_signal_index
 from src.tools.get_signal import fetch_signal
 from src.tools.twitter import post_twitter_thread
 
+#: Maximum length of a tweet
+TWEET_MAX_LENGTH = 280
 
-async def analyze_signal(memory: MemoryModule = get_memory_module()) -> Optional[str]:
-    """Fetch a signal, analyze it with an LLM, and post the result on Twitter."""
+#: Tweet template. `{analysis}` is replaced by the LLM output.
+TWEET_TEMPLATE = "Breaking News:\n{analysis}\n#CryptoNews"
+
+#: Line prefix the LLM puts before the tweet text
+TWEET_MARKER = re.compile(r"^[ \t*]*tweet[ \t*]*:[ \t*]*", re.IGNORECASE | re.MULTILINE)
+
+#: Maximum number of characters streamed before the tweet marker, for models that write some
+#: analysis first
+TWEET_PREAMBLE_MAX_LENGTH = 2000
+
+
+async def stream_tweet_text(llm: LLM, messages: List[Dict[str, str]], max_length: int) -> str:
+    """
+    Stream an LLM response and stop generating once the tweet in it no longer fits.
+
+    The tweet is the text after the last line starting with `Tweet:`, so analysis the model
+    writes before it is skipped. A response without that line is taken as the tweet.
+
+    Args:
+        llm: LLM used for generation
+        messages: Prompt messages
+        max_length: Maximum number of characters of the tweet
+
+    Returns:
+        str: The tweet, truncated at a word boundary to at most `max_length` characters
+    """
+    response = ""
+    async with aclosing(llm.stream_response(messages)) as stream:
+        async for delta in stream:
+            response += delta
+            markers = list(TWEET_MARKER.finditer(response))
+            if markers and len(response[markers[-1].end() :].strip()) > max_length:
+                logger.debug(f"Tweet exceeds {max_length} characters, stopping generation")
+                break
+            if not markers and len(response) > max_length + TWEET_PREAMBLE_MAX_LENGTH:
+                logger.debug("No tweet in the response, stopping generation")
+                break
+
+    markers = list(TWEET_MARKER.finditer(response))
+    text = (response[markers[-1].end() :] if markers else response).strip()
+    if len(text) > max_length:
+        # Cut at the last word that fits, or mid-word if there is none
+        words = text[: max_length + 1].rsplit(maxsplit=1)
+        text = words[0].rstrip() if len(words) > 1 else text[:max_length]
+    return text
+
+
+async def analyze_signal(
+    memory: MemoryModule = get_memory_module(),
+    signal_index: Optional[ProcessedSignalIndex] = None,
+) -> Optional[str]:
+    """
+    Fetch a signal, analyze it with an LLM, and post the result on Twitter.
+
+    Args:
+        memory: Memory module used for context retrieval and to store the analysis
+        signal_index: Index of processed signals. Defaults to the process-wide index.
+
+    Returns:
+        Optional[str]: The ids of the posted tweets, or None if nothing was posted
+    """
     try:
         logger.info("Fetching signal...")
         signal = await fetch_signal()
@@ -19,38 +83,43 @@ async def analyze_signal(memory: MemoryModule = get_memory_module()) -> Optional
             logger.info(f"Received signal: {signal_content}")
 
             # Check if this signal was already processed
-            recent_signals = await memory.search(signal_content, top_k=1)
-            if recent_signals and recent_signals[0]["event"] == signal_content:
+            if signal_index is None:
+                signal_index = get_signal_index()
+            await signal_index.seed(memory)
+            if signal_index.seen(signal_content):
                 logger.info("Signal already processed, skipping analysis")
                 return None
 
             logger.info("New signal detected, analyzing...")
             # Retrieve recent memory for context
-            recent_memories = await memory.search("recent events", top_k=3)
+            recent_memories = await memory.recent(top_k=3)
             context = "\n".join([f"- {mem['event']}: {mem['outcome']}" for mem in recent_memories])
 
             # Prepare LLM prompt
             llm = LLM()
+            max_length = TWEET_MAX_LENGTH - len(TWEET_TEMPLATE.format(analysis=""))
             user_prompt = (
                 f"Context:\n{context}\n\nSignal:\n{signal_content}\n\n"
-                "Analyze the signal and provide insights. "
-                "Finally make a concise tweet about the signal with a maximum of 280 characters."
+                "Write a concise tweet with your insights on the signal, of at most "
+                f"{max_length} characters. Reply with the tweet only, on one line starting "
+                "with 'Tweet:'."
             )
             messages = [{"role": "user", "content": user_prompt}]
-            analysis = await llm.generate_response(messages)
+            analysis = await stream_tweet_text(llm, messages, max_length)
 
             # Prepare tweet
-            tweet_text = f"Breaking News:\n{analysis}\n#CryptoNews"
+            tweet_text = TWEET_TEMPLATE.format(analysis=analysis)
 
             # Publish tweet
             logger.info(f"Publishing tweet:\n{tweet_text}")
             result = await post_twitter_thread(tweets={"tweet1": tweet_text})
             logger.info("Tweet posted successfully!")
+            signal_index.add(signal_content)
 
             # Store the processed signal in memory
             await memory.store(
                 event=signal_content,
-                action="analyze_signal",
+                action=SIGNAL_ACTION,
                 outcome=f"Tweet posted: {tweet_text}",
                 metadata={"tweet_id": result},
             )
@@ -1,51 +1,130 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 
 from src.core.exceptions import LLMError
-from src.llm.providers.anthropic import call_anthropic
+from src.llm.providers.anthropic import call_anthropic, stream_anthropic
+
+
+def make_response(text: str) -> MagicMock:
+    """Create a Messages API response with one text block."""
+    block = MagicMock()
+    block.type = "text"
+    block.text = text
+    response = MagicMock()
+    response.content = [block]
+    return response
 
 
 @pytest.mark.asyncio
 async def test_call_anthropic_success():
     """Test a successful call to the Anthropic Claude API."""
-    mock_response = MagicMock()
-    mock_response.completion = "This is a mock response from Anthropic."
-
-    # Mock the Anthropic client and its `completions.create` method
+    # Mock the shared Anthropic client and its `messages.create` method
     mock_client = MagicMock()
-    mock_client.completions.create.return_value = mock_response
+    mock_client.messages.create = AsyncMock(
+        return_value=make_response("This is a mock response from Anthropic.")
+    )
 
-    with patch("src.llm.providers.anthropic.Anthropic", return_value=mock_client):
+    with patch("src.llm.providers.anthropic.get_anthropic_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
         result = await call_anthropic(messages, model="claude-2", temperature=0.5)
 
         assert result == "This is a mock response from Anthropic."
-        mock_client.completions.create.assert_called_once()
+        mock_client.messages.create.assert_awaited_once()
+        call_kwargs = mock_client.messages.create.call_args[1]
+        assert call_kwargs["model"] == "claude-2"
+        assert call_kwargs["temperature"] == 0.5
+        assert call_kwargs["messages"] == messages
+        assert "system" not in call_kwargs
+
+
+@pytest.mark.asyncio
+async def test_call_anthropic_structures_messages():
+    """Test that system messages become the system prompt and roles are preserved."""
+    mock_client = MagicMock()
+    mock_client.messages.create = AsyncMock(return_value=make_response("Response"))
+
+    with patch("src.llm.providers.anthropic.get_anthropic_client", return_value=mock_client):
+        messages = [
+            {"role": "system", "content": "Personality"},
+            {"role": "user", "content": "First"},
+            {"role": "user", "content": "Second"},
+            {"role": "assistant", "content": "Answer"},
+            {"role": "user", "content": "Follow-up"},
+        ]
+        await call_anthropic(messages)
+
+        call_kwargs = mock_client.messages.create.call_args[1]
+        assert call_kwargs["system"] == "Personality"
+        assert call_kwargs["messages"] == [
+            {"role": "user", "content": "First\n\nSecond"},
+            {"role": "assistant", "content": "Answer"},
+            {"role": "user", "content": "Follow-up"},
+        ]
 
 
 @pytest.mark.asyncio
 async def test_call_anthropic_no_content():
     """Test when Anthropic returns no content in the response."""
-    mock_response = MagicMock()
-    mock_response.completion = ""
-
     mock_client = MagicMock()
-    mock_client.completions.create.return_value = mock_response
+    mock_client.messages.create = AsyncMock(return_value=make_response(""))
 
-    with patch("src.llm.providers.anthropic.Anthropic", return_value=mock_client):
+    with patch("src.llm.providers.anthropic.get_anthropic_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
         await call_anthropic(messages)
 
 
+@pytest.mark.asyncio
+async def test_call_anthropic_requires_conversation():
+    """Test that a conversation without user or assistant messages is rejected."""
+    with patch("src.llm.providers.anthropic.get_anthropic_client"):
+        with pytest.raises(LLMError, match="at least one user or assistant message"):
+            await call_anthropic([{"role": "system", "content": "Personality"}])
+
+
 @pytest.mark.asyncio
 async def test_call_anthropic_exception():
     """Test when Anthropic raises an exception."""
     mock_client = MagicMock()
-    mock_client.completions.create.side_effect = Exception("API call failed")
+    mock_client.messages.create = AsyncMock(side_effect=Exception("API call failed"))
 
-    with patch("src.llm.providers.anthropic.Anthropic", return_value=mock_client):
+    with patch("src.llm.providers.anthropic.get_anthropic_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
 
         with pytest.raises(LLMError, match="Error during Anthropic API call"):
             await call_anthropic(messages)
+
+
+@pytest.mark.asyncio
+async def test_stream_anthropic_yields_text():
+    """Test that streamed text chunks are yielded as they arrive."""
+
+    async def text_stream():
+        for chunk in ["Hello", ", ", "world"]:
+            yield chunk
+
+    stream = MagicMock()
+    stream.text_stream = text_stream()
+    stream_manager = MagicMock()
+    stream_manager.__aenter__ = AsyncMock(return_value=stream)
+    stream_manager.__aexit__ = AsyncMock(return_value=False)
+    mock_client = MagicMock()
+    mock_client.messages.stream.return_value = stream_manager
+
+    with patch("src.llm.providers.anthropic.get_anthropic_client", return_value=mock_client):
+        messages = [{"role": "user", "content": "Test message"}]
+        chunks = [chunk async for chunk in stream_anthropic(messages)]
+
+    assert chunks == ["Hello", ", ", "world"]
+
+
+@pytest.mark.asyncio
+async def test_stream_anthropic_exception():
+    """Test that stream failures are raised as LLMError."""
+    mock_client = MagicMock()
+    mock_client.messages.stream.side_effect = Exception("API call failed")
+
+    with patch("src.llm.providers.anthropic.get_anthropic_client", return_value=mock_client):
+        with pytest.raises(LLMError, match="Error during Anthropic API call"):
+            async for _ in stream_anthropic([{"role": "user", "content": "Test message"}]):
+                pass
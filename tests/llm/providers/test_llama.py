@@ -1,9 +1,27 @@
+import asyncio
+import threading
+import time
+from contextlib import aclosing
 from unittest.mock import MagicMock, patch
 
 import pytest
 
 from src.core.exceptions import LLMError
-from src.llm.providers.llama import call_llama, validate_llama_setup
+from src.llm.providers.llama import (
+    call_llama,
+    stream_llama,
+    unload_llama,
+    validate_llama_setup,
+    warmup_llama,
+)
+
+
+@pytest.fixture(autouse=True)
+def reset_model_registry():
+    """Start every test with an empty model registry."""
+    unload_llama()
+    yield
+    unload_llama()
 
 
 @pytest.mark.asyncio
@@ -216,3 +234,181 @@ async def test_llama_error_recovery():
             await call_llama(messages)
 
         assert "not enough memory" in str(exc_info.value)
+
+
+@pytest.mark.asyncio
+async def test_call_llama_reuses_loaded_model(mock_llama_setup):
+    """Test that the model is loaded once and reused across calls."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_tokenizer.return_value.decode.return_value = "Assistant: Cached response"
+
+    messages = [{"role": "user", "content": "Test prompt"}]
+    await call_llama(messages, model_path="/path/to/llama-8b")
+    response = await call_llama(messages, model_path="/path/to/llama-8b")
+
+    assert response == "Cached response"
+    mock_tokenizer.assert_called_once()
+    mock_model.assert_called_once()
+    assert mock_model.return_value.generate.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_warmup_llama_preloads_model(mock_llama_setup):
+    """Test that warm-up loads the model so the first call doesn't."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_tokenizer.return_value.decode.return_value = "Assistant: Warm response"
+
+    await warmup_llama("/path/to/llama-8b")
+    mock_model.assert_called_once()
+
+    await call_llama([{"role": "user", "content": "Test"}], model_path="/path/to/llama-8b")
+    mock_model.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_unload_llama_forces_reload(mock_llama_setup):
+    """Test that unloading a model makes the next call load it again."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_tokenizer.return_value.decode.return_value = "Assistant: Response"
+    messages = [{"role": "user", "content": "Test"}]
+
+    await call_llama(messages, model_path="/path/to/llama-8b")
+    unload_llama("/path/to/llama-8b")
+    await call_llama(messages, model_path="/path/to/llama-8b")
+
+    assert mock_model.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_call_llama_generates_off_event_loop(mock_llama_setup):
+    """Test that generation runs on an inference worker thread and can be cancelled."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_tokenizer.return_value.decode.return_value = "Assistant: Response"
+    generate_threads = []
+
+    def generate(*args, **kwargs):
+        generate_threads.append(threading.get_ident())
+        return MagicMock()
+
+    mock_model.return_value.generate.side_effect = generate
+
+    await call_llama([{"role": "user", "content": "Test"}], model_path="/path/to/llama-8b")
+
+    assert generate_threads and generate_threads[0] != threading.get_ident()
+    generate_args = mock_model.return_value.generate.call_args[1]
+    assert "stopping_criteria" in generate_args
+
+
+@pytest.mark.asyncio
+async def test_concurrent_calls_are_batched(mock_llama_setup):
+    """Test that concurrent requests with equal options share one generate call."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_tokenizer.return_value.decode.side_effect = ["Response one", "Response two"]
+
+    responses = await asyncio.gather(
+        call_llama([{"role": "user", "content": "One"}], model_path="/path/to/llama-8b"),
+        call_llama([{"role": "user", "content": "Two"}], model_path="/path/to/llama-8b"),
+    )
+
+    assert responses == ["Response one", "Response two"]
+    mock_model.return_value.generate.assert_called_once()
+    prompts = mock_tokenizer.return_value.call_args[0][0]
+    assert prompts == ["User: One\nAssistant:", "User: Two\nAssistant:"]
+    assert mock_tokenizer.return_value.call_args[1]["padding"] is True
+
+
+@pytest.mark.asyncio
+async def test_calls_with_different_options_are_not_batched(mock_llama_setup):
+    """Test that requests with different generation options run separately."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_tokenizer.return_value.decode.return_value = "Response"
+    messages = [{"role": "user", "content": "Test"}]
+
+    await asyncio.gather(
+        call_llama(messages, model_path="/path/to/llama-8b", temperature=0.2),
+        call_llama(messages, model_path="/path/to/llama-8b", temperature=0.9),
+    )
+
+    assert mock_model.return_value.generate.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_system_prompt_reuses_prefix_cache(mock_llama_setup):
+    """Test that a lone request passes the cached system-prompt states to generate."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_tokenizer.return_value.decode.return_value = "Assistant: Response"
+    past_key_values = MagicMock()
+
+    with patch("src.llm.providers.llama.get_prefix_cache") as mock_cache:
+        mock_cache.return_value.get_past_key_values.return_value = past_key_values
+        await call_llama(
+            [{"role": "system", "content": "Be brief"}, {"role": "user", "content": "Test"}],
+            model_path="/path/to/llama-8b",
+        )
+
+    prefix = mock_cache.return_value.get_past_key_values.call_args[0][1]
+    assert prefix == "System: Be brief\n"
+    generate_args = mock_model.return_value.generate.call_args[1]
+    assert generate_args["past_key_values"] is past_key_values
+
+
+@pytest.mark.asyncio
+async def test_stream_llama_yields_generated_text(mock_llama_setup):
+    """Test that text produced by generate is streamed back to the event loop."""
+    mock_tokenizer, mock_model = mock_llama_setup
+
+    def generate(*args, **kwargs):
+        for text in ["Hello", ", world"]:
+            kwargs["streamer"].on_finalized_text(text)
+        return MagicMock()
+
+    mock_model.return_value.generate.side_effect = generate
+
+    chunks = [
+        chunk
+        async for chunk in stream_llama(
+            [{"role": "user", "content": "Test"}], model_path="/path/to/llama-8b"
+        )
+    ]
+
+    assert chunks == ["Hello", ", world"]
+
+
+@pytest.mark.asyncio
+async def test_stream_llama_stops_generation_when_closed(mock_llama_setup):
+    """Test that closing the stream early stops generation on the worker."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    stopped = threading.Event()
+
+    def generate(*args, **kwargs):
+        kwargs["streamer"].on_finalized_text("First")
+        stopping_criteria = kwargs["stopping_criteria"]
+        deadline = time.monotonic() + 5
+        while time.monotonic() < deadline:
+            if stopping_criteria[0](None, None):
+                stopped.set()
+                break
+            time.sleep(0.01)
+        return MagicMock()
+
+    mock_model.return_value.generate.side_effect = generate
+
+    stream = stream_llama([{"role": "user", "content": "Test"}], model_path="/path/to/llama-8b")
+    async with aclosing(stream):
+        first = await stream.__anext__()
+
+    assert first == "First"
+    assert await asyncio.to_thread(stopped.wait, 5)
+
+
+@pytest.mark.asyncio
+async def test_stream_llama_raises_inference_errors(mock_llama_setup):
+    """Test that generation failures surface as LLMError."""
+    mock_tokenizer, mock_model = mock_llama_setup
+    mock_model.return_value.generate.side_effect = RuntimeError("CUDA out of memory")
+
+    with pytest.raises(LLMError, match="Llama inference failed"):
+        async for _ in stream_llama(
+            [{"role": "user", "content": "Test"}], model_path="/path/to/llama-8b"
+        ):
+            pass
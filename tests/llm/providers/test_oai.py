@@ -3,7 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from src.core.exceptions import LLMError
-from src.llm.providers.oai import call_openai
+from src.llm.providers.oai import call_openai, stream_openai
 
 
 @pytest.mark.asyncio
@@ -22,8 +22,8 @@ async def test_call_openai_success():
     mock_client = AsyncMock()
     mock_client.chat.completions.create.return_value = mock_response
 
-    # Patch the AsyncOpenAI client constructor to return the mock client
-    with patch("src.llm.providers.oai.openai.AsyncOpenAI", return_value=mock_client):
+    # Patch the shared client getter to return the mock client
+    with patch("src.llm.providers.oai.get_openai_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
         result = await call_openai(messages, model="gpt-4", temperature=0.7)
 
@@ -50,7 +50,7 @@ async def test_call_openai_no_content():
     mock_client = AsyncMock()
     mock_client.chat.completions.create.return_value = mock_response
 
-    with patch("src.llm.providers.oai.openai.AsyncOpenAI", return_value=mock_client):
+    with patch("src.llm.providers.oai.get_openai_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
 
         with pytest.raises(LLMError):
@@ -63,8 +63,47 @@ async def test_call_openai_exception():
     mock_client = AsyncMock()
     mock_client.chat.completions.create.side_effect = Exception("API call failed")
 
-    with patch("src.llm.providers.oai.openai.AsyncOpenAI", return_value=mock_client):
+    with patch("src.llm.providers.oai.get_openai_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
 
         with pytest.raises(LLMError, match="Error during OpenAI API call"):
             await call_openai(messages)
+
+
+def make_chunk(content):
+    """Create a streamed chat completion chunk."""
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = content
+    return chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_openai_yields_deltas():
+    """Test that streamed deltas from OpenAI are yielded as they arrive."""
+    mock_stream = MagicMock()
+    mock_stream.__aiter__.return_value = [make_chunk(c) for c in ["Hello", None, ", world"]]
+    mock_stream.__aenter__ = AsyncMock(return_value=mock_stream)
+    mock_stream.__aexit__ = AsyncMock(return_value=False)
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.return_value = mock_stream
+
+    with patch("src.llm.providers.oai.get_openai_client", return_value=mock_client):
+        messages = [{"role": "user", "content": "Test message"}]
+        deltas = [delta async for delta in stream_openai(messages)]
+
+    assert deltas == ["Hello", ", world"]
+    assert mock_client.chat.completions.create.call_args[1]["stream"] is True
+    mock_stream.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_openai_exception():
+    """Test when the OpenAI stream raises an exception."""
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = Exception("API call failed")
+
+    with patch("src.llm.providers.oai.get_openai_client", return_value=mock_client):
+        with pytest.raises(LLMError, match="Error during OpenAI API call"):
+            async for _ in stream_openai([{"role": "user", "content": "Test message"}]):
+                pass
@@ -3,7 +3,7 @@ from unittest.mock import AsyncMock, MagicMock, patch
 import pytest
 
 from src.core.exceptions import LLMError
-from src.llm.providers.xai import call_xai
+from src.llm.providers.xai import call_xai, stream_xai
 
 
 @pytest.mark.asyncio
@@ -23,8 +23,8 @@ async def test_call_xai_success():
     mock_client = AsyncMock()
     mock_client.chat.completions.create.return_value = mock_response
 
-    # patch the openai client constructor
-    with patch("src.llm.providers.xai.openai.AsyncOpenAI", return_value=mock_client):
+    # patch the shared client getter
+    with patch("src.llm.providers.xai.get_xai_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
         result = await call_xai(messages, model="grok-2-latest", temperature=0.7)
 
@@ -51,7 +51,7 @@ async def test_call_xai_no_content():
     mock_client = AsyncMock()
     mock_client.chat.completions.create.return_value = mock_response
 
-    with patch("src.llm.providers.xai.openai.AsyncOpenAI", return_value=mock_client):
+    with patch("src.llm.providers.xai.get_xai_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
 
         with pytest.raises(LLMError):
@@ -64,8 +64,47 @@ async def test_call_xai_exception():
     mock_client = AsyncMock()
     mock_client.chat.completions.create.side_effect = Exception("API call failed")
 
-    with patch("src.llm.providers.xai.openai.AsyncOpenAI", return_value=mock_client):
+    with patch("src.llm.providers.xai.get_xai_client", return_value=mock_client):
         messages = [{"role": "user", "content": "Test message"}]
 
         with pytest.raises(LLMError, match="Error during xAI API call"):
             await call_xai(messages)
+
+
+def make_chunk(content):
+    """Create a streamed chat completion chunk."""
+    chunk = MagicMock()
+    chunk.choices = [MagicMock()]
+    chunk.choices[0].delta.content = content
+    return chunk
+
+
+@pytest.mark.asyncio
+async def test_stream_xai_yields_deltas():
+    """Test that streamed deltas from xAI are yielded as they arrive."""
+    mock_stream = MagicMock()
+    mock_stream.__aiter__.return_value = [make_chunk(c) for c in ["Hello", None, ", world"]]
+    mock_stream.__aenter__ = AsyncMock(return_value=mock_stream)
+    mock_stream.__aexit__ = AsyncMock(return_value=False)
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.return_value = mock_stream
+
+    with patch("src.llm.providers.xai.get_xai_client", return_value=mock_client):
+        messages = [{"role": "user", "content": "Test message"}]
+        deltas = [delta async for delta in stream_xai(messages)]
+
+    assert deltas == ["Hello", ", world"]
+    assert mock_client.chat.completions.create.call_args[1]["stream"] is True
+    mock_stream.__aexit__.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_stream_xai_exception():
+    """Test when the xAI stream raises an exception."""
+    mock_client = AsyncMock()
+    mock_client.chat.completions.create.side_effect = Exception("API call failed")
+
+    with patch("src.llm.providers.xai.get_xai_client", return_value=mock_client):
+        with pytest.raises(LLMError, match="Error during xAI API call"):
+            async for _ in stream_xai([{"role": "user", "content": "Test message"}]):
+                pass
@@ -0,0 +1,169 @@
+import asyncio
+
+import pytest
+
+from src.llm.batcher import RequestBatcher
+
+
+def make_batcher(calls, max_batch_size=4, max_wait_ms=20):
+    """Create a batcher whose handler upper-cases every item and records the batches."""
+
+    async def handler(group, items):
+        calls.append((group, list(items)))
+        return [item.upper() for item in items]
+
+    return RequestBatcher[str, str](handler, max_batch_size=max_batch_size, max_wait_ms=max_wait_ms)
+
+
+@pytest.mark.asyncio
+async def test_concurrent_requests_share_a_batch():
+    """Test that concurrent requests are coalesced and results routed to each caller."""
+    # arrange:
+    calls: list = []
+    batcher = make_batcher(calls)
+
+    # act:
+    results = await asyncio.gather(*(batcher.submit(item) for item in ["a", "b", "c"]))
+
+    # assert:
+    assert results == ["A", "B", "C"]
+    assert calls == [(None, ["a", "b", "c"])]
+
+
+@pytest.mark.asyncio
+async def test_full_batch_dispatches_without_waiting():
+    """Test that a batch is dispatched as soon as it reaches the maximum size."""
+    # arrange:
+    calls: list = []
+    batcher = make_batcher(calls, max_batch_size=2, max_wait_ms=10_000)
+
+    # act:
+    results = await asyncio.wait_for(
+        asyncio.gather(*(batcher.submit(item) for item in ["a", "b", "c", "d"])), timeout=1
+    )
+
+    # assert:
+    assert results == ["A", "B", "C", "D"]
+    assert [items for _, items in calls] == [["a", "b"], ["c", "d"]]
+
+
+@pytest.mark.asyncio
+async def test_groups_are_batched_separately():
+    """Test that only requests of the same group share a batch."""
+    # arrange:
+    calls: list = []
+    batcher = make_batcher(calls)
+
+    # act:
+    await asyncio.gather(
+        batcher.submit("a", group=1), batcher.submit("b", group=2), batcher.submit("c", group=1)
+    )
+
+    # assert:
+    assert sorted(calls) == [(1, ["a", "c"]), (2, ["b"])]
+
+
+@pytest.mark.asyncio
+async def test_batch_capped_by_weight():
+    """Test that a batch is dispatched before its total item weight exceeds the limit."""
+    # arrange:
+    calls: list = []
+
+    async def handler(group, items):
+        calls.append(items)
+        return items
+
+    batcher: RequestBatcher[str, str] = RequestBatcher(
+        handler, max_batch_size=10, max_wait_ms=10, weigher=len, max_batch_weight=5
+    )
+
+    # act:
+    results = await asyncio.gather(*(batcher.submit(item) for item in ["aa", "bb", "cc", "dddddd"]))
+
+    # assert:
+    assert results == ["aa", "bb", "cc", "dddddd"]
+    assert calls == [["aa", "bb"], ["cc"], ["dddddd"]]
+
+
+@pytest.mark.asyncio
+async def test_exception_result_fails_only_its_caller():
+    """Test that an exception returned for one item doesn't fail the rest of the batch."""
+
+    # arrange:
+    async def handler(group, items):
+        return [ValueError("bad") if item == "bad" else item for item in items]
+
+    batcher: RequestBatcher[str, str] = RequestBatcher(handler, max_batch_size=4, max_wait_ms=10)
+
+    # act:
+    results = await asyncio.gather(
+        batcher.submit("good"), batcher.submit("bad"), return_exceptions=True
+    )
+
+    # assert:
+    assert results[0] == "good"
+    assert isinstance(results[1], ValueError)
+
+
+@pytest.mark.asyncio
+async def test_handler_error_fails_whole_batch():
+    """Test that a handler error is raised in every caller of the batch."""
+
+    # arrange:
+    async def handler(group, items):
+        raise RuntimeError("model crashed")
+
+    batcher: RequestBatcher[str, str] = RequestBatcher(handler, max_batch_size=4, max_wait_ms=10)
+
+    # act:
+    results = await asyncio.gather(batcher.submit("a"), batcher.submit("b"), return_exceptions=True)
+
+    # assert:
+    assert all(isinstance(result, RuntimeError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelled_caller_is_dropped_from_pending_batch():
+    """Test that a caller cancelled during the batch window is not sent to the handler."""
+    # arrange:
+    calls: list = []
+    batcher = make_batcher(calls, max_wait_ms=50)
+    cancelled = asyncio.create_task(batcher.submit("a"))
+    kept = asyncio.create_task(batcher.submit("b"))
+    await asyncio.sleep(0)
+
+    # act:
+    cancelled.cancel()
+    result = await kept
+
+    # assert:
+    assert result == "B"
+    assert calls == [(None, ["b"])]
+
+
+@pytest.mark.asyncio
+async def test_running_batch_cancelled_when_all_callers_cancel():
+    """Test that the handler is cancelled once every caller of a running batch is gone."""
+    # arrange:
+    started = asyncio.Event()
+    handler_cancelled = asyncio.Event()
+
+    async def handler(group, items):
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            handler_cancelled.set()
+            raise
+        return items
+
+    batcher: RequestBatcher[str, str] = RequestBatcher(handler, max_batch_size=1, max_wait_ms=0)
+    task = asyncio.create_task(batcher.submit("a"))
+    await started.wait()
+
+    # act:
+    task.cancel()
+    await asyncio.sleep(0.01)
+
+    # assert:
+    assert handler_cancelled.is_set()
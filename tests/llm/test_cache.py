@@ -0,0 +1,162 @@
+import asyncio
+import sqlite3
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import numpy as np
+import pytest
+
+from src.llm.cache import ResponseCache
+
+MESSAGES = [{"role": "user", "content": "Latest crypto news"}]
+
+
+def make_embedder(vectors):
+    """Create an embedding generator returning the vector mapped to each prompt."""
+    generator = MagicMock()
+    generator.get_embedding = AsyncMock(
+        side_effect=lambda text: np.array([vectors[text]], dtype=np.float32)
+    )
+    return generator
+
+
+@pytest.mark.asyncio
+async def test_exact_hit():
+    """Test that an identical request is answered from the cache."""
+    # arrange:
+    cache = ResponseCache(path="", max_entries=10, ttl=0, semantic_threshold=0)
+    await cache.set("openai", "gpt-4o-mini", MESSAGES, "Cached", temperature=0.2)
+
+    # act:
+    hit = await cache.get("openai", "gpt-4o-mini", MESSAGES, temperature=0.2)
+    other_params = await cache.get("openai", "gpt-4o-mini", MESSAGES, temperature=0.9)
+    other_model = await cache.get("openai", "gpt-4o", MESSAGES, temperature=0.2)
+
+    # assert:
+    assert hit == "Cached"
+    assert other_params is None
+    assert other_model is None
+    assert (cache.stats.exact_hits, cache.stats.misses) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_expired_entry_is_a_miss():
+    """Test that responses older than the TTL are not served."""
+    # arrange:
+    cache = ResponseCache(path="", max_entries=10, ttl=60, semantic_threshold=0)
+    with patch("src.llm.cache.time.time", return_value=1000.0):
+        await cache.set("openai", "gpt-4o-mini", MESSAGES, "Cached")
+
+    # act:
+    with patch("src.llm.cache.time.time", return_value=1061.0):
+        result = await cache.get("openai", "gpt-4o-mini", MESSAGES)
+
+    # assert:
+    assert result is None
+    assert len(cache) == 0
+
+
+@pytest.mark.asyncio
+async def test_least_recently_used_entry_is_evicted():
+    """Test that the cache keeps at most `max_entries` responses."""
+    # arrange:
+    cache = ResponseCache(path="", max_entries=2, ttl=0, semantic_threshold=0)
+    first = [{"role": "user", "content": "first"}]
+    second = [{"role": "user", "content": "second"}]
+    third = [{"role": "user", "content": "third"}]
+    await cache.set("openai", "gpt", first, "1")
+    await cache.set("openai", "gpt", second, "2")
+    await cache.get("openai", "gpt", first)
+
+    # act:
+    await cache.set("openai", "gpt", third, "3")
+
+    # assert:
+    assert await cache.get("openai", "gpt", first) == "1"
+    assert await cache.get("openai", "gpt", second) is None
+    assert cache.stats.evictions == 1
+
+
+@pytest.mark.asyncio
+async def test_entries_survive_restart(tmp_path):
+    """Test that cached responses are loaded from disk by a new cache."""
+    # arrange:
+    path = str(tmp_path / "cache.sqlite3")
+    cache = ResponseCache(path=path, max_entries=10, ttl=0, semantic_threshold=0)
+    await cache.set("openai", "gpt-4o-mini", MESSAGES, "Persisted")
+    cache.close()
+
+    # act:
+    restarted = ResponseCache(path=path, max_entries=10, ttl=0, semantic_threshold=0)
+    result = await restarted.get("openai", "gpt-4o-mini", MESSAGES)
+
+    # assert:
+    assert result == "Persisted"
+
+
+@pytest.mark.asyncio
+async def test_expired_entries_are_deleted_off_the_event_loop(tmp_path):
+    """Test that expired responses are skipped on load and deleted from disk by a worker thread."""
+    # arrange:
+    path = str(tmp_path / "cache.sqlite3")
+    other = [{"role": "user", "content": "other"}]
+    with patch("src.llm.cache.time.time", return_value=1000.0):
+        cache = ResponseCache(path=path, max_entries=10, ttl=60, semantic_threshold=0)
+        await cache.set("openai", "gpt", MESSAGES, "Old")
+        cache.close()
+
+    # act:
+    with (
+        patch("src.llm.cache.time.time", return_value=1061.0),
+        patch("src.llm.cache.asyncio.to_thread", wraps=asyncio.to_thread) as to_thread,
+    ):
+        restarted = ResponseCache(path=path, max_entries=10, ttl=60, semantic_threshold=0)
+        loaded = len(restarted)
+        await restarted.set("openai", "gpt", other, "New")
+    rows = sqlite3.connect(path).execute("SELECT response FROM responses").fetchall()
+
+    # assert:
+    assert loaded == 0
+    assert to_thread.await_count == 1
+    assert rows == [("New",)]
+
+
+@pytest.mark.asyncio
+async def test_semantic_hit():
+    """Test that a similar prompt reuses the cached response above the threshold."""
+    # arrange:
+    embedder = make_embedder(
+        {
+            "Latest crypto news": [1.0, 0.0],
+            "Latest crypto news today": [0.99, 0.1],
+            "Weather forecast": [0.0, 1.0],
+        }
+    )
+    cache = ResponseCache(path="", ttl=0, semantic_threshold=0.95, embedding_generator=embedder)
+    await cache.set("openai", "gpt", MESSAGES, "Cached")
+
+    # act:
+    similar = await cache.get(
+        "openai", "gpt", [{"role": "user", "content": "Latest crypto news today"}]
+    )
+    unrelated = await cache.get("openai", "gpt", [{"role": "user", "content": "Weather forecast"}])
+
+    # assert:
+    assert similar == "Cached"
+    assert unrelated is None
+    assert (cache.stats.semantic_hits, cache.stats.misses) == (1, 1)
+
+
+@pytest.mark.asyncio
+async def test_semantic_tier_survives_embedding_errors():
+    """Test that a failing embedding call is treated as a miss."""
+    # arrange:
+    embedder = make_embedder({"Latest crypto news": [1.0, 0.0]})
+    cache = ResponseCache(path="", ttl=0, semantic_threshold=0.9, embedding_generator=embedder)
+    await cache.set("openai", "gpt", MESSAGES, "Cached")
+    embedder.get_embedding.side_effect = Exception("API down")
+
+    # act:
+    result = await cache.get("openai", "gpt", [{"role": "user", "content": "Other"}])
+
+    # assert:
+    assert result is None
@@ -0,0 +1,103 @@
+from unittest.mock import AsyncMock
+
+import anthropic
+import openai
+import pytest
+
+from src.core.config import settings
+from src.llm.clients import ClientManager, close_clients, get_openai_client, get_xai_client
+
+
+def test_get_openai_reuses_client():
+    """Test that calls to the same endpoint share one client."""
+    # arrange:
+    manager = ClientManager()
+
+    # act:
+    first = manager.get_openai("test-key")
+    second = manager.get_openai("test-key")
+
+    # assert:
+    assert isinstance(first, openai.AsyncOpenAI)
+    assert first is second
+
+
+def test_get_openai_separates_endpoints_and_keys():
+    """Test that a different base URL or API key gets its own client."""
+    # arrange:
+    manager = ClientManager()
+
+    # act:
+    default = manager.get_openai("test-key")
+    other_key = manager.get_openai("other-key")
+    other_url = manager.get_openai("test-key", "https://api.x.ai/v1")
+
+    # assert:
+    assert len({id(default), id(other_key), id(other_url)}) == 3
+    assert str(other_url.base_url).startswith("https://api.x.ai/v1")
+
+
+def test_client_uses_pool_limits():
+    """Test that clients are created with the configured connection pool."""
+    # arrange:
+    manager = ClientManager(max_connections=7, max_keepalive_connections=3, keepalive_expiry=5)
+
+    # act:
+    client = manager.get_openai("test-key")
+
+    # assert:
+    pool = client._client._transport._pool  # type: ignore[attr-defined]
+    assert pool._max_connections == 7
+    assert pool._max_keepalive_connections == 3
+    assert pool._keepalive_expiry == 5
+
+
+@pytest.mark.asyncio
+async def test_close_closes_every_client():
+    """Test that closing the manager closes its clients and forgets them."""
+    # arrange:
+    manager = ClientManager()
+    client = manager.get_openai("test-key")
+    client.close = AsyncMock()  # type: ignore[method-assign]
+
+    # act:
+    await manager.close()
+
+    # assert:
+    client.close.assert_awaited_once()
+    assert manager.get_openai("test-key") is not client
+
+
+@pytest.mark.asyncio
+async def test_shared_clients(monkeypatch):
+    """Test the process-wide OpenAI and xAI clients."""
+    # arrange:
+    monkeypatch.setattr(settings, "XAI_API_KEY", "xai-key")
+
+    # act:
+    oai_client = get_openai_client("oai-key")
+    xai_client = get_xai_client()
+
+    # assert:
+    assert get_openai_client("oai-key") is oai_client
+    assert xai_client.api_key == "xai-key"
+    assert str(xai_client.base_url).startswith(settings.XAI_BASE_URL)
+
+    await close_clients()
+    assert get_openai_client("oai-key") is not oai_client
+    await close_clients()
+
+
+def test_get_anthropic_reuses_client():
+    """Test that Anthropic calls share one client per API key."""
+    # arrange:
+    manager = ClientManager()
+
+    # act:
+    first = manager.get_anthropic("test-key")
+    second = manager.get_anthropic("test-key")
+
+    # assert:
+    assert isinstance(first, anthropic.AsyncAnthropic)
+    assert first is second
+    assert manager.get_anthropic("other-key") is not first
@@ -0,0 +1,84 @@
+import numpy as np
+
+from src.llm.embedding_cache import EmbeddingCache
+
+MODEL = "text-embedding-3-small"
+
+
+def test_memory_tier_hit_and_miss():
+    """Test that cached vectors are returned per text and unknown texts miss."""
+    # arrange:
+    cache = EmbeddingCache(path="", max_entries=10)
+    cache.set_many(MODEL, None, ["news"], np.array([[0.1, 0.2]]))
+
+    # act:
+    hit, miss = cache.get_many(MODEL, None, ["news", "recent events"])
+
+    # assert:
+    assert hit is not None
+    np.testing.assert_allclose(hit, [0.1, 0.2], rtol=1e-6)
+    assert hit.dtype == np.float32
+    assert miss is None
+    assert (cache.stats.memory_hits, cache.stats.misses) == (1, 1)
+
+
+def test_keys_include_model_and_dimensions():
+    """Test that the same text embedded by another model or size is a miss."""
+    # arrange:
+    cache = EmbeddingCache(path="", max_entries=10)
+    cache.set_many(MODEL, None, ["news"], np.array([[0.1, 0.2]]))
+
+    # act:
+    other_model = cache.get_many("text-embedding-3-large", None, ["news"])
+    other_dimensions = cache.get_many(MODEL, 256, ["news"])
+
+    # assert:
+    assert other_model == [None]
+    assert other_dimensions == [None]
+
+
+def test_least_recently_used_vector_leaves_memory():
+    """Test that the in-memory tier keeps at most `max_entries` vectors."""
+    # arrange:
+    cache = EmbeddingCache(path="", max_entries=1)
+
+    # act:
+    cache.set_many(MODEL, None, ["first", "second"], np.array([[1.0], [2.0]]))
+
+    # assert:
+    assert cache.get_many(MODEL, None, ["first"]) == [None]
+    assert len(cache) == 1
+
+
+def test_disk_tier_survives_restart(tmp_path):
+    """Test that vectors are read back from the memory-mapped file by a new cache."""
+    # arrange:
+    path = str(tmp_path / "embeddings")
+    cache = EmbeddingCache(path=path, max_entries=1)
+    cache.set_many(MODEL, None, ["news", "recent events"], np.array([[0.1, 0.2], [0.3, 0.4]]))
+
+    # act:
+    restarted = EmbeddingCache(path=path, max_entries=10)
+    vectors = restarted.get_many(MODEL, None, ["recent events", "news"])
+
+    # assert:
+    assert len(restarted) == 2
+    np.testing.assert_allclose(np.stack(vectors), [[0.3, 0.4], [0.1, 0.2]], rtol=1e-6)  # type: ignore[arg-type]
+    assert restarted.stats.disk_hits == 2
+
+
+def test_index_entries_past_the_vectors_file_are_ignored(tmp_path):
+    """Test that a truncated vectors file doesn't yield partial vectors."""
+    # arrange:
+    path = tmp_path / "embeddings"
+    cache = EmbeddingCache(path=str(path), max_entries=10)
+    cache.set_many(MODEL, None, ["news", "recent events"], np.array([[0.1, 0.2], [0.3, 0.4]]))
+    with open(path / "vectors.f32", "r+b") as vectors:
+        vectors.truncate(3 * 4)
+
+    # act:
+    restarted = EmbeddingCache(path=str(path), max_entries=10)
+
+    # assert:
+    assert restarted.get_many(MODEL, None, ["recent events"]) == [None]
+    assert restarted.get_many(MODEL, None, ["news"])[0] is not None
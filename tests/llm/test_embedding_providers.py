@@ -0,0 +1,139 @@
+from unittest.mock import MagicMock, patch
+
+import numpy as np
+import pytest
+import torch
+
+from src.core.defs import EmbeddingProviderType
+from src.llm.embedding_cache import EmbeddingCache
+from src.llm.embedding_providers import (
+    HashingEmbeddingProvider,
+    OpenAIEmbeddingProvider,
+    TransformerEmbeddingProvider,
+    create_embedding_provider,
+    embedding_token_counter,
+)
+from src.llm.embeddings import EmbeddingGenerator
+
+
+@pytest.mark.asyncio
+async def test_hashing_embeddings_are_deterministic_unit_vectors():
+    """Test that hashing embeddings are stable, normalized and of the configured size."""
+    # arrange:
+    provider = HashingEmbeddingProvider(dimensions=64)
+
+    # act:
+    first = await provider.embed(["Bitcoin price rises", ""])
+    second = await HashingEmbeddingProvider(dimensions=64).embed(["Bitcoin price rises"])
+
+    # assert:
+    assert first.shape == (2, 64)
+    assert first.dtype == np.float32
+    np.testing.assert_allclose(np.linalg.norm(first[0]), 1.0, rtol=1e-6)
+    np.testing.assert_array_equal(first[0], second[0])
+    assert not first[1].any()
+
+
+def test_hashing_embeddings_reflect_shared_vocabulary():
+    """Test that texts sharing words are more similar than unrelated texts."""
+    # arrange:
+    provider = HashingEmbeddingProvider(dimensions=256)
+
+    # act:
+    news, related, unrelated = provider.embed_sync(
+        ["bitcoin price rises after etf news", "bitcoin price news", "weather forecast for paris"]
+    )
+
+    # assert:
+    assert news @ related > news @ unrelated
+
+
+def test_create_embedding_provider():
+    """Test that the provider is selected by type."""
+    # act:
+    openai = create_embedding_provider(EmbeddingProviderType.OPENAI, client=MagicMock())
+    hashing = create_embedding_provider(EmbeddingProviderType.HASHING, dimensions=32)
+
+    # assert:
+    assert isinstance(openai, OpenAIEmbeddingProvider)
+    assert isinstance(hashing, HashingEmbeddingProvider)
+    assert hashing.dimensions == 32
+    with pytest.raises(ValueError, match="EMBEDDING_LOCAL_MODEL_PATH"):
+        create_embedding_provider(EmbeddingProviderType.TRANSFORMERS)
+
+
+def test_transformer_embeddings_are_mean_pooled():
+    """Test that token states are averaged over the attention mask and normalized."""
+    # arrange:
+    tokenizer = MagicMock(
+        return_value={
+            "input_ids": torch.tensor([[1, 2], [3, 0]]),
+            "attention_mask": torch.tensor([[1, 1], [1, 0]]),
+        }
+    )
+    model = MagicMock()
+    model.return_value.last_hidden_state = torch.tensor(
+        [[[3.0, 0.0], [0.0, 4.0]], [[0.0, 2.0], [9.0, 9.0]]]
+    )
+    registry = MagicMock()
+    registry.get.return_value = MagicMock(model=model, tokenizer=tokenizer)
+    provider = TransformerEmbeddingProvider(model_path="/models/minilm")
+
+    # act:
+    with patch("src.llm.embedding_providers.get_embedding_model_registry", return_value=registry):
+        result = provider.embed_sync(["first", "second"])
+
+    # assert:
+    registry.get.assert_called_once()
+    assert registry.get.call_args.args[0] == ("/models/minilm", "float32", "cpu")
+    np.testing.assert_allclose(result, [[0.6, 0.8], [0.0, 1.0]], rtol=1e-6)
+
+
+def test_transformer_model_of_another_size_is_refused():
+    """Test that a model whose hidden size isn't the memory vector size fails when it loads."""
+    # arrange:
+    model = MagicMock()
+    model.config.hidden_size = 384
+    provider = TransformerEmbeddingProvider(model_path="/models/minilm", vector_size=1536)
+
+    # act & assert:
+    with (
+        patch("transformers.AutoModel.from_pretrained", return_value=model),
+        pytest.raises(ValueError, match="hidden size 384"),
+    ):
+        provider._load()
+
+
+def test_embedding_token_counter_uses_local_tokenizers():
+    """Test that tokens are counted by a local model's tokenizer, and estimated otherwise."""
+    # arrange:
+    tokenizer = MagicMock()
+    tokenizer.encode.return_value = [1, 2, 3]
+
+    # act:
+    with patch("transformers.AutoTokenizer.from_pretrained", return_value=tokenizer):
+        local = embedding_token_counter(EmbeddingProviderType.TRANSFORMERS, "/models/minilm")
+    remote = embedding_token_counter(EmbeddingProviderType.OPENAI, "/models/minilm")
+
+    # assert:
+    assert local is not None and local("three word text") == 3
+    assert remote is None
+
+
+@pytest.mark.asyncio
+async def test_generator_with_local_provider_uses_cache():
+    """Test that a local provider shares the generator's caching."""
+    # arrange:
+    provider = HashingEmbeddingProvider(dimensions=16)
+    cache = EmbeddingCache(path="", max_entries=10)
+    generator = EmbeddingGenerator(provider=provider, cache=cache)
+
+    # act:
+    first = await generator.get_embedding(["news", "recent events"])
+    with patch.object(provider, "embed", side_effect=AssertionError("not cached")):
+        second = await generator.get_embedding("recent events")
+
+    # assert:
+    assert generator.client is None
+    assert generator.model == "hashing"
+    np.testing.assert_array_equal(second[0], first[1])
@@ -1,3 +1,5 @@
+import asyncio
+import base64
 from unittest.mock import AsyncMock, MagicMock
 
 import numpy as np
@@ -7,6 +9,8 @@ from openai import AsyncOpenAI
 from openai.types.create_embedding_response import CreateEmbeddingResponse, Embedding
 
 from src.core.config import settings
+from src.core.defs import EmbeddingDtype
+from src.llm.embedding_cache import EmbeddingCache
 from src.llm.embeddings import EmbeddingGenerator
 
 
@@ -74,11 +78,11 @@ async def test_get_embedding_single_text(embedding_generator, mock_logger):
 
     # assert:
     embedding_generator.client.embeddings.create.assert_called_once_with(
-        model=embedding_generator.model, input=[text]
+        model=embedding_generator.model, input=[text], encoding_format="base64"
     )
-    mock_debug.assert_called_once_with("Getting embeddings for 1 texts")
+    mock_debug.assert_any_call("Getting embeddings for 1 texts")
     assert isinstance(result, np.ndarray)
-    np.testing.assert_array_equal(result, np.array([mock_embedding]))
+    np.testing.assert_allclose(result, np.array([mock_embedding]))
 
 
 @pytest.mark.asyncio
@@ -97,11 +101,11 @@ async def test_get_embedding_multiple_texts(embedding_generator, mock_logger):
 
     # assert:
     embedding_generator.client.embeddings.create.assert_called_once_with(
-        model=embedding_generator.model, input=texts
+        model=embedding_generator.model, input=texts, encoding_format="base64"
     )
-    mock_debug.assert_called_once_with("Getting embeddings for 3 texts")
+    mock_debug.assert_any_call("Getting embeddings for 3 texts")
     assert isinstance(result, np.ndarray)
-    np.testing.assert_array_equal(result, np.array(mock_embeddings))
+    np.testing.assert_allclose(result, np.array(mock_embeddings))
 
 
 @pytest.mark.asyncio
@@ -150,4 +154,98 @@ async def test_get_embedding_response_processing(embedding_generator):
     # assert:
     assert isinstance(result, np.ndarray)
     assert result.shape == (1, len(mock_embedding))
-    np.testing.assert_array_equal(result[0], np.array(mock_embedding))
+    np.testing.assert_allclose(result[0], np.array(mock_embedding))
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call(
+    embedding_generator, mock_openai_client
+):
+    """Test that identical in-flight embedding requests share one API call."""
+    # arrange:
+    mock_embedding = [0.1, 0.2, 0.3]
+
+    async def create(**kwargs):
+        await asyncio.sleep(0.01)
+        return create_mock_embedding_response([mock_embedding])
+
+    mock_openai_client.embeddings.create.side_effect = create
+
+    # act:
+    results = await asyncio.gather(
+        embedding_generator.get_embedding("recent events"),
+        embedding_generator.get_embedding("recent events"),
+    )
+
+    # assert:
+    assert mock_openai_client.embeddings.create.await_count == 1
+    for result in results:
+        np.testing.assert_allclose(result, np.array([mock_embedding]))
+
+
+@pytest.mark.asyncio
+async def test_cache_sends_only_missing_texts(mock_openai_client):
+    """Test that cached texts are not re-embedded and results keep the input order."""
+    # arrange:
+    cache = EmbeddingCache(path="", max_entries=10)
+    generator = EmbeddingGenerator(client=mock_openai_client, model="model", cache=cache)
+    cache.set_many("model", None, ["news"], np.array([[1.0, 0.0]]))
+    mock_openai_client.embeddings.create.return_value = create_mock_embedding_response([[0.0, 1.0]])
+
+    # act:
+    result = await generator.get_embedding(["recent events", "news", "recent events"])
+    again = await generator.get_embedding("recent events")
+
+    # assert:
+    mock_openai_client.embeddings.create.assert_called_once_with(
+        model="model", input=["recent events"], encoding_format="base64"
+    )
+    np.testing.assert_allclose(result, [[0.0, 1.0], [1.0, 0.0], [0.0, 1.0]])
+    np.testing.assert_allclose(again, [[0.0, 1.0]])
+
+
+@pytest.mark.asyncio
+async def test_concurrent_callers_share_one_batch(embedding_generator, mock_openai_client):
+    """Test that texts of concurrent callers are sent in one request and routed back per caller."""
+
+    # arrange:
+    async def create(model, input, encoding_format):
+        return create_mock_embedding_response([[float(len(text))] for text in input])
+
+    mock_openai_client.embeddings.create.side_effect = create
+
+    # act:
+    store, search = await asyncio.gather(
+        embedding_generator.get_embedding("stored event"),
+        embedding_generator.get_embedding(["news", "recent events"]),
+    )
+
+    # assert:
+    mock_openai_client.embeddings.create.assert_called_once_with(
+        model=embedding_generator.model,
+        input=["stored event", "news", "recent events"],
+        encoding_format="base64",
+    )
+    np.testing.assert_allclose(store, [[12.0]])
+    np.testing.assert_allclose(search, [[4.0], [13.0]])
+
+
+@pytest.mark.asyncio
+async def test_shortened_float16_embeddings(mock_openai_client):
+    """Test that shortened embeddings are requested as base64 and returned as float16."""
+    # arrange:
+    generator = EmbeddingGenerator(
+        client=mock_openai_client, model="model", dimensions=2, dtype=EmbeddingDtype.FLOAT16
+    )
+    encoded = base64.b64encode(np.array([0.5, 0.25], dtype=np.float32).tobytes()).decode()
+    mock_openai_client.embeddings.create.return_value = create_mock_embedding_response([encoded])
+
+    # act:
+    result = await generator.get_embedding("news")
+
+    # assert:
+    mock_openai_client.embeddings.create.assert_called_once_with(
+        model="model", input=["news"], dimensions=2, encoding_format="base64"
+    )
+    assert result.dtype == np.float16
+    np.testing.assert_allclose(result, [[0.5, 0.25]])
@@ -0,0 +1,169 @@
+import asyncio
+import threading
+import time
+
+import pytest
+
+from src.core.exceptions import LLMError
+from src.llm.inference_executor import (
+    InferenceExecutor,
+    get_inference_executor,
+    shutdown_inference_executor,
+)
+
+
+@pytest.fixture
+def executor():
+    """Create an inference executor with a single worker."""
+    executor = InferenceExecutor(max_concurrency=1, max_queue_size=1, name="test")
+    yield executor
+    executor.shutdown(wait=True)
+
+
+@pytest.mark.asyncio
+async def test_run_returns_result(executor):
+    """Test that a job result is returned to the caller."""
+    # act:
+    result = await executor.run(lambda cancel_event: 42)
+
+    # assert:
+    assert result == 42
+    assert executor.stats.completed == 1
+
+
+@pytest.mark.asyncio
+async def test_run_does_not_block_event_loop(executor):
+    """Test that blocking jobs leave the event loop free."""
+    # arrange:
+    ticks = 0
+
+    async def ticker():
+        nonlocal ticks
+        while True:
+            ticks += 1
+            await asyncio.sleep(0.01)
+
+    ticker_task = asyncio.create_task(ticker())
+
+    # act:
+    await executor.run(lambda cancel_event: time.sleep(0.2))
+    ticker_task.cancel()
+
+    # assert:
+    assert ticks >= 5
+
+
+@pytest.mark.asyncio
+async def test_run_propagates_errors(executor):
+    """Test that job errors are raised in the caller."""
+
+    # arrange:
+    def failing_job(cancel_event):
+        raise ValueError("boom")
+
+    # act/assert:
+    with pytest.raises(ValueError, match="boom"):
+        await executor.run(failing_job)
+    assert executor.stats.failed == 1
+
+
+@pytest.mark.asyncio
+async def test_queue_full_rejects(executor):
+    """Test that jobs beyond the concurrency and queue limits are rejected."""
+    # arrange:
+    release = threading.Event()
+    running = asyncio.create_task(executor.run(lambda cancel_event: release.wait(1)))
+    queued = asyncio.create_task(executor.run(lambda cancel_event: None))
+    await asyncio.sleep(0.05)
+
+    # act/assert:
+    with pytest.raises(LLMError, match="queue is full"):
+        await executor.run(lambda cancel_event: None)
+
+    release.set()
+    await asyncio.gather(running, queued)
+    assert executor.stats.rejected == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_signals_running_job(executor):
+    """Test that cancelling the caller sets the running job's cancel event."""
+    # arrange:
+    observed = threading.Event()
+
+    def job(cancel_event):
+        if cancel_event.wait(1):
+            observed.set()
+
+    task = asyncio.create_task(executor.run(job))
+    await asyncio.sleep(0.05)
+
+    # act:
+    task.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await task
+
+    # assert:
+    assert observed.wait(1)
+    assert executor.stats.cancelled == 1
+
+
+@pytest.mark.asyncio
+async def test_cancel_drops_queued_job(executor):
+    """Test that a cancelled job never runs if it was still queued."""
+    # arrange:
+    release = threading.Event()
+    ran = threading.Event()
+    running = asyncio.create_task(executor.run(lambda cancel_event: release.wait(1)))
+    queued = asyncio.create_task(executor.run(lambda cancel_event: ran.set()))
+    await asyncio.sleep(0.05)
+
+    # act:
+    queued.cancel()
+    with pytest.raises(asyncio.CancelledError):
+        await queued
+    release.set()
+    await running
+
+    # assert:
+    assert not ran.is_set()
+    assert executor.queued == 0
+
+
+@pytest.mark.asyncio
+async def test_stats_separate_queue_wait_from_run_time(executor):
+    """Test that queue wait and run time are tracked separately."""
+    # act:
+    first = asyncio.create_task(executor.run(lambda cancel_event: time.sleep(0.1)))
+    second = asyncio.create_task(executor.run(lambda cancel_event: None))
+    await asyncio.gather(first, second)
+
+    # assert:
+    assert executor.stats.total_run_time >= 0.1
+    assert executor.stats.total_queue_wait >= 0.05
+
+
+@pytest.mark.asyncio
+async def test_shutdown_rejects_new_jobs(executor):
+    """Test that a shut down executor rejects new jobs."""
+    # act:
+    executor.shutdown()
+
+    # assert:
+    with pytest.raises(LLMError, match="shut down"):
+        await executor.run(lambda cancel_event: None)
+
+
+def test_get_inference_executor_recreated_after_shutdown():
+    """Test that the process-wide executor is recreated after shutdown."""
+    # arrange:
+    first = get_inference_executor()
+
+    # act:
+    shutdown_inference_executor()
+    second = get_inference_executor()
+
+    # assert:
+    assert first is not second
+    assert first.closed
+    assert not second.closed
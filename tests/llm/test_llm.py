@@ -1,3 +1,4 @@
+import asyncio
 from unittest.mock import AsyncMock, MagicMock, patch
 
 import openai
@@ -7,6 +8,7 @@ from loguru import logger
 from src.core.config import settings
 from src.core.defs import LLMProviderType
 from src.core.exceptions import LLMError
+from src.llm.cache import ResponseCache
 from src.llm.llm import LLM, get_oai_client
 
 
@@ -154,3 +156,186 @@ async def test_generate_response_with_kwargs(llm):
 
         # assert:
         mock_call.assert_called_once_with(mock_call.call_args[0][0], **kwargs)
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "provider,stream_function",
+    [
+        (LLMProviderType.OPENAI, "src.llm.llm.stream_openai"),
+        (LLMProviderType.ANTHROPIC, "src.llm.llm.stream_anthropic"),
+        (LLMProviderType.XAI, "src.llm.llm.stream_xai"),
+        (LLMProviderType.LLAMA, "src.llm.llm.stream_llama"),
+    ],
+)
+async def test_stream_response(mock_settings, provider, stream_function):
+    """Test response streaming with different providers."""
+    # arrange:
+    mock_settings.LLM_PROVIDER = provider
+    messages = [{"role": "user", "content": "Hello"}]
+    streamed_messages = []
+
+    async def stream(messages, **kwargs):
+        streamed_messages.extend(messages)
+        for delta in ["Hel", "lo"]:
+            yield delta
+
+    with patch(stream_function, stream):
+        llm = LLM()
+
+        # act:
+        deltas = [delta async for delta in llm.stream_response(messages)]
+
+    # assert:
+    assert deltas == ["Hel", "lo"]
+    assert streamed_messages[0]["role"] == "system"
+    assert streamed_messages[1:] == messages
+
+
+@pytest.mark.asyncio
+async def test_stream_response_closes_provider_stream(llm):
+    """Test that stopping early closes the provider stream."""
+    # arrange:
+    closed = []
+
+    async def stream(messages, **kwargs):
+        try:
+            for delta in ["one", "two", "three"]:
+                yield delta
+        finally:
+            closed.append(True)
+
+    with patch("src.llm.llm.stream_openai", stream):
+        # act:
+        response = llm.stream_response([{"role": "user", "content": "Hello"}])
+        first = await response.__anext__()
+        await response.aclose()
+
+    # assert:
+    assert first == "one"
+    assert closed == [True]
+
+
+@pytest.mark.asyncio
+async def test_stream_response_invalid_provider(mock_settings):
+    """Test streaming error handling for invalid provider."""
+    # arrange:
+    mock_settings.LLM_PROVIDER = "invalid_provider"
+    llm = LLM()
+
+    # act/assert:
+    with pytest.raises(LLMError, match="Unknown LLM provider: invalid_provider"):
+        async for _ in llm.stream_response([{"role": "user", "content": "Hello"}]):
+            pass
+
+
+@pytest.mark.asyncio
+async def test_generate_response_uses_cache(mock_settings):
+    """Test that a repeated request is answered from the response cache."""
+    # arrange:
+    cache = ResponseCache(path="", max_entries=10, ttl=0, semantic_threshold=0)
+    llm = LLM(cache=cache)
+    messages = [{"role": "user", "content": "Hello"}]
+
+    with patch("src.llm.llm.call_openai", AsyncMock(return_value="Fresh")) as mock_call:
+        # act:
+        first = await llm.generate_response(messages, temperature=0.2)
+        second = await llm.generate_response(messages, temperature=0.2)
+        third = await llm.generate_response(messages, temperature=0.9)
+
+    # assert:
+    assert first == second == third == "Fresh"
+    assert mock_call.await_count == 2
+    assert cache.stats.exact_hits == 1
+
+
+@pytest.mark.asyncio
+async def test_generate_response_falls_back(mock_settings, monkeypatch):
+    """Test that the LLM class falls back when the configured provider fails."""
+    # arrange:
+    monkeypatch.setattr(settings, "LLM_FALLBACK_PROVIDERS", [LLMProviderType.ANTHROPIC])
+    monkeypatch.setattr("src.llm.router._provider_stats", {})
+    messages = [{"role": "user", "content": "Hello"}]
+
+    with (
+        patch("src.llm.llm.call_openai", AsyncMock(side_effect=LLMError("outage"))),
+        patch("src.llm.llm.call_anthropic", AsyncMock(return_value="Anthropic response")),
+    ):
+        # act:
+        response = await LLM().generate_response(messages)
+
+    # assert:
+    assert response == "Anthropic response"
+
+
+@pytest.mark.asyncio
+async def test_stream_response_falls_back(mock_settings, monkeypatch):
+    """Test that a stream falls back when the configured provider fails before its first delta."""
+    # arrange:
+    monkeypatch.setattr(settings, "LLM_FALLBACK_PROVIDERS", [LLMProviderType.ANTHROPIC])
+    monkeypatch.setattr("src.llm.router._provider_stats", {})
+    messages = [{"role": "user", "content": "Hello"}]
+
+    async def failing(messages, **kwargs):
+        raise LLMError("outage")
+        yield
+
+    async def answering(messages, **kwargs):
+        yield "Anthropic "
+        yield "response"
+
+    with (
+        patch("src.llm.llm.stream_openai", failing),
+        patch("src.llm.llm.stream_anthropic", answering),
+    ):
+        # act:
+        deltas = [delta async for delta in LLM().stream_response(messages)]
+
+    # assert:
+    assert deltas == ["Anthropic ", "response"]
+
+
+@pytest.mark.asyncio
+async def test_stream_response_uses_cache(mock_settings):
+    """Test that a fully streamed response is cached, and a cached one is yielded at once."""
+    # arrange:
+    cache = ResponseCache(path="", max_entries=10, ttl=0, semantic_threshold=0)
+    llm = LLM(cache=cache)
+    messages = [{"role": "user", "content": "Hello"}]
+    streamed = []
+
+    async def stream(messages, **kwargs):
+        streamed.append(True)
+        yield "Fresh "
+        yield "response"
+
+    with patch("src.llm.llm.stream_openai", stream):
+        # act:
+        first = [delta async for delta in llm.stream_response(messages)]
+        second = [delta async for delta in llm.stream_response(messages)]
+
+    # assert:
+    assert first == ["Fresh ", "response"]
+    assert second == ["Fresh response"]
+    assert streamed == [True]
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call(llm):
+    """Test that identical in-flight requests share one provider call."""
+    # arrange:
+    messages = [{"role": "user", "content": "Hello"}]
+
+    async def call(messages, **kwargs):
+        await asyncio.sleep(0.01)
+        return "Shared response"
+
+    with patch("src.llm.llm.call_openai", AsyncMock(side_effect=call)) as mock_call:
+        # act:
+        responses = await asyncio.gather(
+            llm.generate_response(messages), llm.generate_response(messages)
+        )
+
+    # assert:
+    assert responses == ["Shared response", "Shared response"]
+    assert mock_call.await_count == 1
@@ -0,0 +1,159 @@
+import threading
+import time
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from src.llm.model_registry import (
+    ModelRegistry,
+    get_available_memory_bytes,
+    get_embedding_model_registry,
+    get_model_registry,
+)
+
+
+def make_loader(calls):
+    """Create a loader that records every load."""
+
+    def loader():
+        calls.append(1)
+        return MagicMock(), MagicMock()
+
+    return loader
+
+
+def test_get_loads_once():
+    """Test that a model is loaded lazily and then reused."""
+    # arrange:
+    registry = ModelRegistry(max_models=1, idle_timeout=0, min_free_memory_gb=0)
+    calls: list = []
+    key = ("/models/llama", "auto", "cpu")
+
+    # act:
+    first = registry.get(key, make_loader(calls))
+    second = registry.get(key, make_loader(calls))
+
+    # assert:
+    assert first is second
+    assert len(calls) == 1
+    assert registry.is_loaded(key)
+
+
+def test_concurrent_get_loads_once():
+    """Test that concurrent callers share a single load."""
+    # arrange:
+    registry = ModelRegistry(max_models=1, idle_timeout=0, min_free_memory_gb=0)
+    calls: list = []
+    key = ("/models/llama", "auto", "cpu")
+
+    def slow_loader():
+        time.sleep(0.05)
+        return make_loader(calls)()
+
+    # act:
+    threads = [threading.Thread(target=registry.get, args=(key, slow_loader)) for _ in range(4)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    # assert:
+    assert len(calls) == 1
+
+
+def test_lru_eviction_when_full():
+    """Test that the least recently used model is evicted when the registry is full."""
+    # arrange:
+    registry = ModelRegistry(max_models=2, idle_timeout=0, min_free_memory_gb=0)
+    unloaded: list = []
+    registry.add_unload_callback(unloaded.append)
+    key_a = ("/models/a", "auto", "cpu")
+    key_b = ("/models/b", "auto", "cpu")
+    key_c = ("/models/c", "auto", "cpu")
+    calls: list = []
+
+    # act:
+    registry.get(key_a, make_loader(calls))
+    registry.get(key_b, make_loader(calls))
+    registry.get(key_a, make_loader(calls))  # a becomes most recently used
+    registry.get(key_c, make_loader(calls))
+
+    # assert:
+    assert registry.loaded_keys() == [key_a, key_c]
+    assert unloaded == [key_b]
+
+
+def test_evict_idle():
+    """Test that models unused for longer than the idle timeout are unloaded."""
+    # arrange:
+    registry = ModelRegistry(max_models=2, idle_timeout=10, min_free_memory_gb=0)
+    key = ("/models/llama", "auto", "cpu")
+    with patch.object(registry, "_start_reaper"):
+        entry = registry.get(key, make_loader([]))
+    entry.last_used -= 11
+
+    # act:
+    registry.evict_idle()
+
+    # assert:
+    assert not registry.is_loaded(key)
+
+
+def test_evict_on_memory_pressure():
+    """Test that resident models are evicted when available RAM is low."""
+    # arrange:
+    registry = ModelRegistry(max_models=4, idle_timeout=0, min_free_memory_gb=8)
+    key_a = ("/models/a", "auto", "cpu")
+    key_b = ("/models/b", "auto", "cpu")
+    registry.get(key_a, make_loader([]))
+
+    # act:
+    with patch("src.llm.model_registry.get_available_memory_bytes", return_value=1024**3):
+        registry.get(key_b, make_loader([]))
+
+    # assert:
+    assert registry.loaded_keys() == [key_b]
+
+
+def test_unload_all():
+    """Test unloading every resident model."""
+    # arrange:
+    registry = ModelRegistry(max_models=2, idle_timeout=0, min_free_memory_gb=0)
+    registry.get(("/models/a", "auto", "cpu"), make_loader([]))
+    registry.get(("/models/b", "auto", "cpu"), make_loader([]))
+
+    # act:
+    registry.unload_all()
+
+    # assert:
+    assert registry.loaded_keys() == []
+
+
+def test_failed_load_is_not_cached():
+    """Test that a failing loader doesn't leave a broken entry behind."""
+    # arrange:
+    registry = ModelRegistry(max_models=1, idle_timeout=0, min_free_memory_gb=0)
+    key = ("/models/llama", "auto", "cpu")
+    failing_loader = MagicMock(side_effect=RuntimeError("not enough memory"))
+
+    # act/assert:
+    with pytest.raises(RuntimeError, match="not enough memory"):
+        registry.get(key, failing_loader)
+    assert not registry.is_loaded(key)
+
+
+def test_get_available_memory_bytes():
+    """Test that available memory is reported as a positive number or None."""
+    available = get_available_memory_bytes()
+    assert available is None or available > 0
+
+
+def test_get_model_registry_is_shared():
+    """Test that the process-wide registry is a singleton."""
+    assert get_model_registry() is get_model_registry()
+
+
+def test_embedding_models_have_their_own_registry():
+    """Test that embedding models don't take a slot of the Llama model registry."""
+    assert get_embedding_model_registry() is get_embedding_model_registry()
+    assert get_embedding_model_registry() is not get_model_registry()
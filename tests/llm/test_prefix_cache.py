@@ -0,0 +1,139 @@
+from unittest.mock import MagicMock, patch
+
+import torch
+
+from src.llm.model_registry import LoadedModel, ModelRegistry
+from src.llm.prefix_cache import PrefixCache, get_prefix_cache
+
+PREFIX = "System: You are a helpful assistant\n"
+PREFIX_IDS = torch.tensor([[1, 2, 3]])
+PROMPT_IDS = torch.tensor([[1, 2, 3, 4, 5]])
+
+
+def make_loaded(key=("/models/llama", "auto", "cpu")):
+    """Create a resident model whose tokenizer maps the prefix to `PREFIX_IDS`."""
+    inputs = MagicMock()
+    inputs.__getitem__.side_effect = lambda name: PREFIX_IDS
+    inputs.keys.return_value = ["input_ids"]
+    tokenizer = MagicMock(return_value=MagicMock(to=MagicMock(return_value=inputs)))
+
+    model = MagicMock()
+    model.return_value.past_key_values = {"layers": [1, 2, 3]}
+    return LoadedModel(key=key, model=model, tokenizer=tokenizer)
+
+
+def test_prefix_is_prefilled_once():
+    """Test that the prefix is prefilled on the first request and reused afterwards."""
+    # arrange:
+    cache = PrefixCache(max_entries=2)
+    loaded = make_loaded()
+
+    # act:
+    first = cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+    second = cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+
+    # assert:
+    assert first == {"layers": [1, 2, 3]}
+    assert second == first
+    assert loaded.model.call_count == 1
+    assert (cache.misses, cache.hits) == (1, 1)
+
+
+def test_each_request_gets_its_own_copy():
+    """Test that generation extending a returned cache doesn't corrupt the stored one."""
+    # arrange:
+    cache = PrefixCache(max_entries=2)
+    loaded = make_loaded()
+    first = cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+    assert first is not None
+
+    # act:
+    first["layers"].append(4)
+    second = cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+
+    # assert:
+    assert second == {"layers": [1, 2, 3]}
+
+
+def test_token_boundary_mismatch_skips_cache():
+    """Test that a prompt not starting with the prefix tokens is prefilled fully."""
+    # arrange:
+    cache = PrefixCache(max_entries=2)
+    loaded = make_loaded()
+
+    # act:
+    mismatch = cache.get_past_key_values(loaded, PREFIX, torch.tensor([[1, 9, 3, 4]]))
+    prefix_only = cache.get_past_key_values(loaded, PREFIX, PREFIX_IDS)
+
+    # assert:
+    assert mismatch is None
+    assert prefix_only is None
+
+
+def test_least_recently_used_prefix_is_evicted():
+    """Test that the cache keeps at most `max_entries` prefixes."""
+    # arrange:
+    cache = PrefixCache(max_entries=1)
+    loaded = make_loaded()
+
+    # act:
+    cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+    cache.get_past_key_values(loaded, "System: Other\n", PROMPT_IDS)
+    cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+
+    # assert:
+    assert loaded.model.call_count == 3
+
+
+def test_disabled_cache_returns_none():
+    """Test that a cache of size 0 never prefills."""
+    # arrange:
+    cache = PrefixCache(max_entries=0)
+    loaded = make_loaded()
+
+    # act:
+    result = cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+
+    # assert:
+    assert result is None
+    loaded.model.assert_not_called()
+
+
+def test_invalidate_drops_only_the_given_model():
+    """Test that invalidating one model keeps prefixes of other models."""
+    # arrange:
+    cache = PrefixCache(max_entries=4)
+    small = make_loaded(("/models/llama-8b", "auto", "cpu"))
+    large = make_loaded(("/models/llama-70b", "auto", "cpu"))
+    cache.get_past_key_values(small, PREFIX, PROMPT_IDS)
+    cache.get_past_key_values(large, PREFIX, PROMPT_IDS)
+
+    # act:
+    cache.invalidate(small.key)
+    cache.get_past_key_values(small, PREFIX, PROMPT_IDS)
+    cache.get_past_key_values(large, PREFIX, PROMPT_IDS)
+
+    # assert:
+    assert small.model.call_count == 2
+    assert large.model.call_count == 1
+
+
+def test_unloading_model_invalidates_its_prefixes():
+    """Test that the shared prefix cache forgets a model unloaded from the registry."""
+    # arrange:
+    registry = ModelRegistry(max_models=1, idle_timeout=0, min_free_memory_gb=0)
+    loaded = make_loaded()
+    with (
+        patch("src.llm.prefix_cache._prefix_cache", None),
+        patch("src.llm.prefix_cache.get_model_registry", return_value=registry),
+    ):
+        cache = get_prefix_cache()
+        registry.get(loaded.key, lambda: (loaded.model, loaded.tokenizer))
+        cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+
+        # act:
+        registry.unload(loaded.key)
+        cache.get_past_key_values(loaded, PREFIX, PROMPT_IDS)
+
+    # assert:
+    assert loaded.model.call_count == 2
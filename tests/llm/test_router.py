@@ -0,0 +1,265 @@
+import asyncio
+from contextlib import aclosing
+from unittest.mock import patch
+
+import pytest
+
+from src.core.defs import LLMProviderType
+from src.core.exceptions import LLMError
+from src.llm.router import LLMRouter, ProviderStats
+
+OPENAI = LLMProviderType.OPENAI
+ANTHROPIC = LLMProviderType.ANTHROPIC
+XAI = LLMProviderType.XAI
+MESSAGES = [{"role": "user", "content": "Hello"}]
+
+
+def make_call(behaviour):
+    """Create a provider call that sleeps and answers (or raises) per provider."""
+    calls = []
+
+    async def call(provider, messages, **kwargs):
+        calls.append((provider, kwargs))
+        delay, result = behaviour[provider]
+        await asyncio.sleep(delay)
+        if isinstance(result, Exception):
+            raise result
+        return result
+
+    return call, calls
+
+
+def make_router(providers, behaviour, **kwargs):
+    """Create a router with its own statistics."""
+    call, calls = make_call(behaviour)
+    stats = {
+        provider: ProviderStats(window=10, failure_threshold=2, reset_timeout=60)
+        for provider in providers
+    }
+    return LLMRouter(providers, call=call, stats=stats, **kwargs), calls
+
+
+def test_provider_stats_percentiles():
+    """Test rolling latency percentiles and error rate."""
+    # arrange:
+    stats = ProviderStats(window=4, failure_threshold=10, reset_timeout=60)
+
+    # act:
+    for latency in [5.0, 1.0, 2.0, 3.0, 4.0]:
+        stats.record_success(latency)
+    stats.record_failure()
+
+    # assert:
+    assert stats.samples == 4
+    assert stats.p50 == 2.5
+    assert 3.8 < stats.p95 <= 4.0
+    assert stats.error_rate == 0.25
+
+
+def test_circuit_breaker_opens_and_half_opens():
+    """Test that the circuit opens after consecutive failures and lets one trial through."""
+    # arrange:
+    stats = ProviderStats(window=10, failure_threshold=2, reset_timeout=30)
+
+    with patch("src.llm.router.time.monotonic", return_value=100.0):
+        stats.record_failure()
+        assert stats.available()
+        stats.record_failure()
+
+        # act/assert: open
+        assert stats.circuit_open
+        assert not stats.available()
+
+    with patch("src.llm.router.time.monotonic", return_value=131.0):
+        # half-open: exactly one trial request
+        assert stats.available()
+        assert not stats.available()
+        stats.record_success(1.0)
+
+    assert not stats.circuit_open
+    assert stats.available()
+
+
+@pytest.mark.asyncio
+async def test_router_prefers_fastest_provider():
+    """Test that providers are ranked by rolling p50 latency."""
+    # arrange:
+    router, calls = make_router(
+        [OPENAI, ANTHROPIC], {OPENAI: (0, "openai"), ANTHROPIC: (0, "anthropic")}
+    )
+    router.stats[OPENAI].record_success(3.0)
+    router.stats[ANTHROPIC].record_success(1.0)
+
+    # act:
+    response = await router.generate(MESSAGES)
+
+    # assert:
+    assert router.rank() == [ANTHROPIC, OPENAI]
+    assert response == "anthropic"
+
+
+def test_router_ranks_unmeasured_providers_last():
+    """Test that unmeasured fallbacks don't outrank a measured primary."""
+    # arrange:
+    router, _ = make_router([OPENAI, XAI, ANTHROPIC], {})
+
+    # act:
+    router.stats[OPENAI].record_success(2.0)
+
+    # assert:
+    assert router.rank() == [OPENAI, XAI, ANTHROPIC]
+
+
+def test_router_ranks_by_error_rate():
+    """Test that a fast but failing provider is ranked after a slower reliable one."""
+    # arrange:
+    router, _ = make_router([OPENAI, ANTHROPIC], {})
+    router.stats[OPENAI].record_success(1.0)
+    router.stats[ANTHROPIC].record_success(1.5)
+
+    # act:
+    router.stats[OPENAI].record_failure()
+
+    # assert:
+    assert router.stats[OPENAI].expected_latency == 2.0
+    assert router.rank() == [ANTHROPIC, OPENAI]
+
+
+@pytest.mark.asyncio
+async def test_router_falls_back_on_error():
+    """Test that a failed request is retried on the next provider."""
+    # arrange:
+    router, calls = make_router(
+        [OPENAI, ANTHROPIC], {OPENAI: (0, Exception("outage")), ANTHROPIC: (0, "anthropic")}
+    )
+
+    # act:
+    response = await router.generate(MESSAGES, model="gpt-4", temperature=0.2)
+
+    # assert:
+    assert response == "anthropic"
+    assert calls == [
+        (OPENAI, {"model": "gpt-4", "temperature": 0.2}),
+        (ANTHROPIC, {"temperature": 0.2}),
+    ]
+    assert router.stats[OPENAI].error_rate == 1.0
+
+
+@pytest.mark.asyncio
+async def test_router_skips_open_circuit():
+    """Test that a provider with an open circuit is not called."""
+    # arrange:
+    router, calls = make_router(
+        [OPENAI, ANTHROPIC], {OPENAI: (0, "openai"), ANTHROPIC: (0, "anthropic")}
+    )
+    router.stats[OPENAI].record_failure()
+    router.stats[OPENAI].record_failure()
+
+    # act:
+    response = await router.generate(MESSAGES)
+
+    # assert:
+    assert response == "anthropic"
+    assert [provider for provider, _ in calls] == [ANTHROPIC]
+
+
+@pytest.mark.asyncio
+async def test_router_hedges_slow_provider():
+    """Test that a slow request is hedged and the first response wins."""
+    # arrange:
+    router, calls = make_router(
+        [OPENAI, ANTHROPIC],
+        {OPENAI: (1.0, "openai"), ANTHROPIC: (0, "anthropic")},
+        hedge_delay=0.05,
+    )
+
+    # act:
+    response = await router.generate(MESSAGES)
+
+    # assert:
+    assert response == "anthropic"
+    assert [provider for provider, _ in calls] == [OPENAI, ANTHROPIC]
+    # The cancelled request counts neither as a success nor as a failure
+    assert router.stats[OPENAI].samples == 0
+    assert router.stats[OPENAI].error_rate == 0.0
+
+
+@pytest.mark.asyncio
+async def test_router_raises_when_all_providers_fail():
+    """Test that an LLMError is raised once every provider failed."""
+    # arrange:
+    router, _ = make_router(
+        [OPENAI, XAI], {OPENAI: (0, Exception("outage")), XAI: (0, Exception("outage"))}
+    )
+
+    # act/assert:
+    with pytest.raises(LLMError, match="No LLM provider could handle the request"):
+        await router.generate(MESSAGES)
+
+
+def make_stream(behaviour):
+    """Create a provider stream that yields deltas, then raises if given an error, per provider."""
+    calls = []
+
+    async def stream(provider, messages, **kwargs):
+        calls.append((provider, kwargs))
+        deltas, error = behaviour[provider]
+        for delta in deltas:
+            yield delta
+        if error is not None:
+            raise error
+
+    return stream, calls
+
+
+@pytest.mark.asyncio
+async def test_router_stream_falls_back_before_the_first_delta():
+    """Test that a stream failing before its first delta is retried on the next provider."""
+    # arrange:
+    stream, calls = make_stream({OPENAI: ([], Exception("outage")), ANTHROPIC: (["a", "b"], None)})
+    router, _ = make_router([OPENAI, ANTHROPIC], {}, stream=stream)
+
+    # act:
+    deltas = [delta async for delta in router.stream(MESSAGES, model="gpt-4")]
+
+    # assert:
+    assert deltas == ["a", "b"]
+    assert calls == [(OPENAI, {"model": "gpt-4"}), (ANTHROPIC, {})]
+    assert router.stats[OPENAI].error_rate == 1.0
+    assert router.stats[ANTHROPIC].samples == 1
+
+
+@pytest.mark.asyncio
+async def test_router_stream_raises_after_the_first_delta():
+    """Test that a stream failing mid-response is not restarted on another provider."""
+    # arrange:
+    stream, calls = make_stream({OPENAI: (["a"], Exception("reset")), ANTHROPIC: (["b"], None)})
+    router, _ = make_router([OPENAI, ANTHROPIC], {}, stream=stream)
+    deltas = []
+
+    # act & assert:
+    with pytest.raises(Exception, match="reset"):
+        async for delta in router.stream(MESSAGES):
+            deltas.append(delta)
+    assert deltas == ["a"]
+    assert [provider for provider, _ in calls] == [OPENAI]
+    assert router.stats[OPENAI].error_rate == 1.0
+
+
+@pytest.mark.asyncio
+async def test_router_stream_skips_open_circuit():
+    """Test that streams skip providers with an open circuit and count early stops as success."""
+    # arrange:
+    stream, calls = make_stream({OPENAI: (["o"], None), ANTHROPIC: (["a", "b"], None)})
+    router, _ = make_router([OPENAI, ANTHROPIC], {}, stream=stream)
+    router.stats[OPENAI].record_failure()
+    router.stats[OPENAI].record_failure()
+
+    # act:
+    async with aclosing(router.stream(MESSAGES)) as deltas:
+        first = await deltas.__anext__()
+
+    # assert:
+    assert first == "a"
+    assert [provider for provider, _ in calls] == [ANTHROPIC]
+    assert router.stats[ANTHROPIC].samples == 1
@@ -0,0 +1,132 @@
+import asyncio
+
+import pytest
+
+from src.llm.singleflight import SingleFlight, request_key
+
+
+def test_request_key_is_stable():
+    """Test that equal request parts produce the same key regardless of dict order."""
+    # act/assert:
+    assert request_key("openai", {"a": 1, "b": 2}) == request_key("openai", {"b": 2, "a": 1})
+    assert request_key("openai", {"a": 1}) != request_key("xai", {"a": 1})
+
+
+@pytest.mark.asyncio
+async def test_concurrent_identical_requests_share_one_call():
+    """Test that identical in-flight requests share one upstream call and result."""
+    # arrange:
+    flights: SingleFlight[str] = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        await asyncio.sleep(0.01)
+        return "result"
+
+    # act:
+    results = await asyncio.gather(*(flights.do("key", fetch) for _ in range(5)))
+
+    # assert:
+    assert results == ["result"] * 5
+    assert len(calls) == 1
+    assert (flights.calls, flights.shared) == (1, 4)
+
+
+@pytest.mark.asyncio
+async def test_finished_request_is_not_reused():
+    """Test that a request made after the previous one finished calls upstream again."""
+    # arrange:
+    flights: SingleFlight[int] = SingleFlight()
+    calls = []
+
+    async def fetch():
+        calls.append(1)
+        return len(calls)
+
+    # act:
+    first = await flights.do("key", fetch)
+    second = await flights.do("key", fetch)
+
+    # assert:
+    assert (first, second) == (1, 2)
+
+
+@pytest.mark.asyncio
+async def test_errors_are_shared():
+    """Test that every waiting caller receives the upstream error."""
+    # arrange:
+    flights: SingleFlight[str] = SingleFlight()
+
+    async def fail():
+        await asyncio.sleep(0.01)
+        raise ValueError("upstream failed")
+
+    # act:
+    results = await asyncio.gather(
+        flights.do("key", fail), flights.do("key", fail), return_exceptions=True
+    )
+
+    # assert:
+    assert all(isinstance(result, ValueError) for result in results)
+
+
+@pytest.mark.asyncio
+async def test_cancelling_one_caller_keeps_call_for_others():
+    """Test that the upstream call survives until every caller has been cancelled."""
+    # arrange:
+    flights: SingleFlight[str] = SingleFlight()
+    started = asyncio.Event()
+    release = asyncio.Event()
+    cancelled = []
+
+    async def fetch():
+        started.set()
+        try:
+            await release.wait()
+        except asyncio.CancelledError:
+            cancelled.append(True)
+            raise
+        return "result"
+
+    first = asyncio.ensure_future(flights.do("key", fetch))
+    second = asyncio.ensure_future(flights.do("key", fetch))
+    await started.wait()
+
+    # act:
+    first.cancel()
+    await asyncio.sleep(0)
+    release.set()
+    result = await second
+
+    # assert:
+    assert result == "result"
+    assert first.cancelled()
+    assert cancelled == []
+
+
+@pytest.mark.asyncio
+async def test_cancelling_every_caller_cancels_call():
+    """Test that the upstream call is cancelled once nobody waits for it."""
+    # arrange:
+    flights: SingleFlight[str] = SingleFlight()
+    started = asyncio.Event()
+    cancelled = asyncio.Event()
+
+    async def fetch():
+        started.set()
+        try:
+            await asyncio.sleep(10)
+        except asyncio.CancelledError:
+            cancelled.set()
+            raise
+        return "result"
+
+    caller = asyncio.ensure_future(flights.do("key", fetch))
+    await started.wait()
+
+    # act:
+    caller.cancel()
+
+    # assert:
+    await asyncio.wait_for(cancelled.wait(), timeout=1)
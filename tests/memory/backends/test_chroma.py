@@ -1,9 +1,10 @@
 import uuid
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
 import pytest
 
-from src.memory.backends.chroma import ChromaBackend
+from src.memory.backends.chroma import ChromaBackend, MemoryFilter, MemoryRecord
 
 
 @pytest.fixture
@@ -117,3 +118,155 @@ async def test_search_memory_error(mock_chroma_backend, mock_chroma_collection):
 
     results = await mock_chroma_backend.search(query_vector, top_k=3)
     assert results == []
+
+
+def test_chroma_backend_rejects_vector_size_mismatch(mock_chroma_client, mock_chroma_collection):
+    """Test that an existing collection with vectors of another size is rejected."""
+    # arrange:
+    mock_chroma_client.get_or_create_collection.return_value = mock_chroma_collection
+    mock_chroma_collection.peek.return_value = {"embeddings": [[0.1] * 1536]}
+
+    # act/assert:
+    with patch("src.memory.backends.chroma.chromadb.Client", return_value=mock_chroma_client):
+        with pytest.raises(ValueError, match="stores vectors of size 1536"):
+            ChromaBackend(
+                collection_name="test_collection",
+                persist_directory="/mock/directory",
+                vector_size=256,
+            )
+
+
+@pytest.mark.asyncio
+async def test_store_many_adds_one_batch(mock_chroma_backend, mock_chroma_collection):
+    """Test that several memories are written with one add call."""
+    # arrange:
+    records = [
+        MemoryRecord("E1", "A1", "O1", [0.1, 0.2]),
+        MemoryRecord("E2", "A2", "O2", [0.3, 0.4], {"key": "value"}),
+    ]
+
+    # act:
+    await mock_chroma_backend.store_many(records)
+
+    # assert:
+    mock_chroma_collection.add.assert_called_once()
+    kwargs = mock_chroma_collection.add.call_args.kwargs
+    assert len(set(kwargs["ids"])) == 2
+    assert kwargs["documents"] == ["E1 A1 O1", "E2 A2 O2"]
+    assert kwargs["metadatas"][1]["key"] == "value"
+
+
+@pytest.mark.asyncio
+async def test_search_many_queries_once(mock_chroma_backend, mock_chroma_collection):
+    """Test that several queries are sent with one query call."""
+    # arrange:
+    mock_chroma_collection.query.return_value = {
+        "metadatas": [[{"event": "Event1"}], [{"event": "Event2"}, {"event": "Event3"}]]
+    }
+
+    # act:
+    results = await mock_chroma_backend.search_many([[0.1, 0.2], [0.3, 0.4]], top_k=2)
+
+    # assert:
+    mock_chroma_collection.query.assert_called_once_with(
+        query_embeddings=[[0.1, 0.2], [0.3, 0.4]], n_results=2
+    )
+    assert results == [[{"event": "Event1"}], [{"event": "Event2"}, {"event": "Event3"}]]
+
+
+@pytest.mark.asyncio
+async def test_search_with_filter_passes_where(mock_chroma_backend, mock_chroma_collection):
+    """Test that memory filters are translated into a where clause."""
+    # arrange:
+    mock_chroma_collection.query.return_value = {"metadatas": [[{"event": "Event1"}]]}
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    # act:
+    await mock_chroma_backend.search(
+        [0.1, 0.2],
+        top_k=1,
+        memory_filter=MemoryFilter(fields={"action": ["a", "b"], "state": "idle"}, since=since),
+    )
+
+    # assert:
+    assert mock_chroma_collection.query.call_args.kwargs["where"] == {
+        "$and": [
+            {"action": {"$in": ["a", "b"]}},
+            {"state": {"$eq": "idle"}},
+            {"timestamp_unix": {"$gte": since.timestamp()}},
+        ]
+    }
+
+
+@pytest.mark.asyncio
+async def test_recent_fetches_time_slices_until_enough(mock_chroma_backend, mock_chroma_collection):
+    """Test that recent memories are fetched in growing time slices and sorted newest first."""
+    # arrange:
+    until = datetime(2025, 1, 1, tzinfo=timezone.utc)
+    mock_chroma_collection.get.side_effect = [
+        {"metadatas": []},
+        {"metadatas": [{"event": "new", "timestamp_unix": 3.0}]},
+        {"metadatas": [{"event": "old", "timestamp_unix": 1.0}, {"event": "older"}]},
+    ]
+
+    # act:
+    results = await mock_chroma_backend.recent(
+        top_k=2, memory_filter=MemoryFilter(fields={"action": "analyze_news"}, until=until)
+    )
+
+    # assert:
+    assert mock_chroma_collection.get.call_count == 3
+    second = mock_chroma_collection.get.call_args_list[1].kwargs
+    assert second["where"] == {
+        "$and": [
+            {"action": {"$eq": "analyze_news"}},
+            {"timestamp_unix": {"$gte": until.timestamp() - 180}},
+            {"timestamp_unix": {"$lt": until.timestamp() - 60}},
+        ]
+    }
+    assert [r["event"] for r in results] == ["new", "old"]
+
+
+@pytest.mark.asyncio
+async def test_recent_falls_back_to_all_older_memories(mock_chroma_backend, mock_chroma_collection):
+    """Test that sparse collections are fetched at once, memories without store time included."""
+    # arrange:
+    mock_chroma_collection.get.side_effect = [
+        {"metadatas": []},
+        {
+            "metadatas": [
+                {"event": "old", "timestamp_unix": 1.0},
+                {"event": "legacy", "timestamp": "1970-01-01T00:00:02+00:00"},
+            ]
+        },
+    ]
+
+    # act:
+    with patch("src.memory.backends.chroma.RECENT_MAX_SLICES", 1):
+        results = await mock_chroma_backend.recent(top_k=2)
+
+    # assert:
+    mock_chroma_collection.get.assert_called_with(include=["metadatas"])
+    assert [r["event"] for r in results] == ["legacy", "old"]
+
+
+@pytest.mark.asyncio
+async def test_delete_passes_where_with_exclusions(mock_chroma_backend, mock_chroma_collection):
+    """Test that deletions are filtered, excluded values included, and never unfiltered."""
+    # arrange:
+    until = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    # act:
+    await mock_chroma_backend.delete(MemoryFilter(until=until, exclude={"action": "memory_digest"}))
+    with pytest.raises(ValueError):
+        await mock_chroma_backend.delete(MemoryFilter())
+
+    # assert:
+    mock_chroma_collection.delete.assert_called_once_with(
+        where={
+            "$and": [
+                {"action": {"$ne": "memory_digest"}},
+                {"timestamp_unix": {"$lt": until.timestamp()}},
+            ]
+        }
+    )
@@ -0,0 +1,65 @@
+import numpy as np
+
+from src.memory.backends.ivf import IVFIndex
+
+
+def _clustered_vectors(n_clusters=8, per_cluster=100, dim=16, seed=0):
+    """Normalized vectors scattered around random cluster centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(n_clusters, dim))
+    vectors = np.repeat(centers, per_cluster, axis=0) + 0.1 * rng.normal(
+        size=(n_clusters * per_cluster, dim)
+    )
+    vectors /= np.linalg.norm(vectors, axis=1, keepdims=True)
+    return vectors.astype(np.float32)
+
+
+def test_probe_finds_nearest_neighbours():
+    """Test that probing a few lists finds the exact nearest neighbour of most queries."""
+    # arrange:
+    vectors = _clustered_vectors()
+    index = IVFIndex.train(vectors, n_lists=8)
+
+    # act:
+    hits = 0
+    for query in vectors[::10]:
+        candidates = index.probe(query, nprobe=2)
+        hits += int(np.argmax(vectors @ query)) in candidates
+
+    # assert:
+    assert len(index) == len(vectors)
+    assert hits >= 0.95 * len(vectors[::10])
+    assert len(index.probe(vectors[0], nprobe=2)) < len(vectors)
+
+
+def test_add_indexes_new_rows():
+    """Test that rows added after training are found by later probes."""
+    # arrange:
+    vectors = _clustered_vectors()
+    index = IVFIndex.train(vectors[:400], n_lists=4)
+
+    # act:
+    index.add(vectors[400:])
+
+    # assert:
+    assert len(index) == len(vectors)
+    assert 799 in index.probe(vectors[799], nprobe=1)
+
+
+def test_save_and_load(tmp_path):
+    """Test that a persisted index probes like the original."""
+    # arrange:
+    vectors = _clustered_vectors()
+    index = IVFIndex.train(vectors, n_lists=8)
+    path = str(tmp_path / "ivf.npz")
+
+    # act:
+    index.save(path)
+    loaded = IVFIndex.load(path)
+
+    # assert:
+    assert loaded is not None
+    np.testing.assert_array_equal(
+        np.sort(loaded.probe(vectors[5], nprobe=3)), np.sort(index.probe(vectors[5], nprobe=3))
+    )
+    assert IVFIndex.load(str(tmp_path / "missing.npz")) is None
@@ -0,0 +1,312 @@
+import json
+from datetime import datetime, timezone
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.core.defs import VectorQuantization
+from src.core.exceptions import MemoryError as MemoryBackendError
+from src.memory.backends.chroma import MemoryFilter, MemoryRecord
+from src.memory.backends.local import PAYLOADS_FILE, PQ_MIN_TRAIN_SIZE, LocalBackend
+
+
+@pytest.fixture
+def local_backend(tmp_path):
+    """Create a LocalBackend persisted to a temporary directory."""
+    return LocalBackend(path=str(tmp_path), vector_size=3, initial_capacity=2)
+
+
+@pytest.mark.asyncio
+async def test_search_returns_most_similar_first(local_backend):
+    """Test that search ranks memories by cosine similarity."""
+    # arrange:
+    await local_backend.store("E1", "A1", "O1", [1.0, 0.0, 0.0], {"key": "value"})
+    await local_backend.store("E2", "A2", "O2", np.array([0.0, 2.0, 0.0], dtype=np.float16))
+    await local_backend.store("E3", "A3", "O3", [0.7, 0.7, 0.0])
+
+    # act:
+    results = await local_backend.search([0.0, 1.0, 0.1], top_k=2)
+
+    # assert:
+    assert [r["event"] for r in results] == ["E2", "E3"]
+    assert results[0]["outcome"] == "O2"
+    assert "timestamp" in results[0]
+
+
+@pytest.mark.asyncio
+async def test_store_many_grows_the_matrix(local_backend):
+    """Test that the preallocated matrix grows when it is full."""
+    # arrange:
+    records = [MemoryRecord(f"E{i}", "A", "O", [1.0, float(i), 0.0]) for i in range(5)]
+
+    # act:
+    await local_backend.store_many(records)
+
+    # assert:
+    assert len(local_backend) == 5
+    assert local_backend._capacity == 8
+    results = await local_backend.search_many([[0.0, 1.0, 0.0], [1.0, 0.0, 0.0]], top_k=1)
+    assert [[r["event"] for r in result] for result in results] == [["E4"], ["E0"]]
+
+
+@pytest.mark.asyncio
+async def test_memories_are_reloaded_from_disk(tmp_path, local_backend):
+    """Test that stored memories survive a restart and partial writes are dropped."""
+    # arrange:
+    await local_backend.store_many(
+        [MemoryRecord(f"E{i}", "A", "O", [float(i), 1.0, 0.0]) for i in range(3)]
+    )
+    await local_backend.close()
+    with open(tmp_path / PAYLOADS_FILE, "a") as file:
+        file.write('{"event": "partial')
+
+    # act:
+    reloaded = LocalBackend(path=str(tmp_path), vector_size=3, initial_capacity=2)
+    await reloaded.store("E3", "A", "O", [0.0, 0.0, 1.0])
+
+    # assert:
+    assert len(reloaded) == 4
+    assert [r["event"] for r in await reloaded.search([2.0, 1.0, 0.0], top_k=1)] == ["E2"]
+    with open(tmp_path / PAYLOADS_FILE) as file:
+        assert [json.loads(line)["event"] for line in file] == ["E0", "E1", "E2", "E3"]
+
+
+@pytest.mark.asyncio
+async def test_search_empty_store(tmp_path):
+    """Test searching a store without memories."""
+    # arrange:
+    backend = LocalBackend(path="", vector_size=3)
+
+    # act:
+    results = await backend.search([1.0, 0.0, 0.0])
+
+    # assert:
+    assert results == []
+
+
+@pytest.mark.asyncio
+async def test_rejects_vector_size_mismatch(tmp_path, local_backend):
+    """Test that a persisted store with another vector size is rejected."""
+    # arrange:
+    await local_backend.close()
+
+    # act & assert:
+    with pytest.raises(ValueError, match="vectors of size 3"):
+        LocalBackend(path=str(tmp_path), vector_size=4)
+    LocalBackend(path=str(tmp_path), vector_size=3)
+
+
+@pytest.mark.asyncio
+async def test_store_is_opened_by_one_backend(tmp_path, local_backend):
+    """Test that a second backend on an open store fails instead of overwriting its rows."""
+    # act & assert:
+    with pytest.raises(MemoryBackendError, match="already open"):
+        LocalBackend(path=str(tmp_path), vector_size=3)
+    await local_backend.close()
+    assert len(LocalBackend(path=str(tmp_path), vector_size=3)) == 0
+
+
+@pytest.mark.asyncio
+async def test_ann_index_search(tmp_path):
+    """Test searching through the IVF index, including memories added after training."""
+    # arrange:
+    rng = np.random.default_rng(0)
+    centers = rng.normal(size=(4, 8))
+    vectors = np.repeat(centers, 50, axis=0) + 0.05 * rng.normal(size=(200, 8))
+    backend = LocalBackend(
+        path=str(tmp_path),
+        vector_size=8,
+        ann_index=True,
+        ann_lists=4,
+        ann_nprobe=1,
+        ann_min_size=100,
+        ann_rebuild_growth=100,
+    )
+    await backend.store_many(
+        [MemoryRecord(f"E{i}", "A", "O", vector) for i, vector in enumerate(vectors)]
+    )
+    assert backend._rebuild_thread is not None
+    backend._rebuild_thread.join()
+
+    # act:
+    await backend.store("new", "A", "O", centers[2])
+    results = await backend.search(centers[2], top_k=3)
+    await backend.close()
+    reloaded = LocalBackend(path=str(tmp_path), vector_size=8, ann_index=True, ann_min_size=100)
+
+    # assert:
+    assert backend.index is not None and len(backend.index) == 201
+    assert results[0]["event"] == "new"
+    assert all(100 <= int(r["event"][1:]) < 150 for r in results[1:])
+    assert reloaded.index is not None and len(reloaded.index) == 201
+
+
+def _clustered(n, dim, seed=0):
+    """Vectors scattered around a few cluster centers."""
+    rng = np.random.default_rng(seed)
+    centers = rng.normal(size=(20, dim))
+    return centers[rng.integers(0, 20, n)] + 0.6 * rng.normal(size=(n, dim))
+
+
+@pytest.mark.asyncio
+@pytest.mark.parametrize(
+    "quantization,rerank_factor,min_recall",
+    [
+        (VectorQuantization.INT8, 0, 0.9),
+        (VectorQuantization.INT8, 4, 0.99),
+        (VectorQuantization.PQ, 10, 0.9),
+    ],
+)
+async def test_quantized_search_recall(quantization, rerank_factor, min_recall):
+    """Test the recall of quantized searches against exact search."""
+    # arrange:
+    vectors = _clustered(PQ_MIN_TRAIN_SIZE + 500, 32)
+    queries = _clustered(20, 32, seed=1)
+    backend = LocalBackend(
+        path="", vector_size=32, quantization=quantization, rerank_factor=rerank_factor
+    )
+    await backend.store_many([MemoryRecord(str(i), "A", "O", v) for i, v in enumerate(vectors)])
+    normalized = vectors / np.linalg.norm(vectors, axis=1, keepdims=True)
+
+    # act:
+    hits = 0
+    for query in queries:
+        results = await backend.search(query, top_k=10)
+        exact = np.argsort(-(normalized @ query))[:10]
+        hits += len({int(r["event"]) for r in results} & {int(row) for row in exact})
+
+    # assert:
+    assert backend._codes is not None
+    assert hits / (10 * len(queries)) >= min_recall
+
+
+@pytest.mark.asyncio
+async def test_product_quantizer_is_persisted(tmp_path):
+    """Test that the trained product quantizer is reloaded with the store."""
+    # arrange:
+    backend = LocalBackend(path=str(tmp_path), vector_size=16, quantization=VectorQuantization.PQ)
+    vectors = _clustered(PQ_MIN_TRAIN_SIZE, 16)
+
+    # act:
+    await backend.store_many([MemoryRecord(str(i), "A", "O", v) for i, v in enumerate(vectors)])
+    await backend.close()
+    reloaded = LocalBackend(path=str(tmp_path), vector_size=16, quantization=VectorQuantization.PQ)
+
+    # assert:
+    assert backend.pq is not None and reloaded.pq is not None
+    assert backend._codes is not None and reloaded._codes is not None
+    np.testing.assert_array_equal(reloaded.pq.codebooks, backend.pq.codebooks)
+    np.testing.assert_array_equal(reloaded._codes[: len(vectors)], backend._codes[: len(vectors)])
+
+
+@pytest.mark.asyncio
+async def test_filtered_search_scores_only_matching_rows(local_backend):
+    """Test that filters are applied before ranking, on indexed and unindexed fields."""
+    # arrange:
+    await local_backend.store_many(
+        [
+            MemoryRecord("E0", "analyze_news", "O", [1.0, 0.0, 0.0], {"state": "idle"}),
+            MemoryRecord("E1", "check_signal", "O", [1.0, 0.1, 0.0], {"state": "idle"}),
+            MemoryRecord("E2", "analyze_news", "O", [0.0, 1.0, 0.0], {"source": "x"}),
+        ]
+    )
+
+    # act:
+    news = await local_backend.search(
+        [1.0, 0.0, 0.0], top_k=2, memory_filter=MemoryFilter(fields={"action": "analyze_news"})
+    )
+    sourced = await local_backend.search(
+        [1.0, 0.0, 0.0], top_k=2, memory_filter=MemoryFilter(fields={"source": "x"})
+    )
+    none = await local_backend.search(
+        [1.0, 0.0, 0.0], top_k=2, memory_filter=MemoryFilter(fields={"state": "missing"})
+    )
+
+    # assert:
+    assert [r["event"] for r in news] == ["E0", "E2"]
+    assert [r["event"] for r in sourced] == ["E2"]
+    assert none == []
+
+
+@pytest.mark.asyncio
+async def test_recent_returns_newest_matching_memories(tmp_path, local_backend):
+    """Test recency queries with filters and time windows, also after a restart."""
+    # arrange:
+    for i in range(4):
+        await local_backend.store(f"E{i}", "news" if i % 2 else "idle", "O", [1.0, 0.0, 0.0])
+    times = [p["timestamp_unix"] for p in local_backend.payloads]
+    await local_backend.close()
+    reloaded = LocalBackend(path=str(tmp_path), vector_size=3)
+    until = datetime.fromtimestamp(times[3], tz=timezone.utc)
+
+    # act:
+    latest = await reloaded.recent(top_k=2)
+    latest_news = await reloaded.recent(top_k=1, memory_filter=MemoryFilter({"action": "news"}))
+    windowed = await reloaded.recent(top_k=5, memory_filter=MemoryFilter(until=until))
+
+    # assert:
+    assert [r["event"] for r in latest] == ["E3", "E2"]
+    assert [r["event"] for r in latest_news] == ["E3"]
+    assert [r["event"] for r in windowed] == ["E2", "E1", "E0"]
+
+
+@pytest.mark.asyncio
+async def test_delete_compacts_the_store(tmp_path, local_backend):
+    """Test that deleted memories are gone from searches, recency queries and the files."""
+    # arrange:
+    await local_backend.store("E0", "idle", "O", [1.0, 0.0, 0.0])
+    await local_backend.store("E1", "news", "O", [0.0, 1.0, 0.0])
+    await local_backend.store("E2", "idle", "O", [0.0, 0.0, 1.0])
+
+    # act:
+    await local_backend.delete(MemoryFilter(exclude={"action": "news"}))
+    results = await local_backend.search([0.0, 1.0, 0.0], top_k=3)
+    await local_backend.store("E3", "idle", "O", [0.0, 0.0, 1.0])
+    await local_backend.close()
+    reloaded = LocalBackend(path=str(tmp_path), vector_size=3)
+    reloaded_results = await reloaded.search([0.0, 0.0, 1.0], top_k=3)
+
+    # assert:
+    assert [r["event"] for r in results] == ["E1"]
+    assert [r["event"] for r in reloaded_results] == ["E3", "E1"]
+    assert [r["event"] for r in await reloaded.recent(top_k=1)] == ["E3"]
+    with pytest.raises(ValueError):
+        await reloaded.delete(MemoryFilter())
+
+
+@pytest.mark.asyncio
+async def test_search_during_compaction_returns_the_scored_memories(local_backend):
+    """Test that rows scored before a compaction still resolve to the memories they scored."""
+    # arrange:
+    await local_backend.store("E0", "news", "O", [1.0, 0.0, 0.0])
+    await local_backend.store("E1", "idle", "O", [0.0, 1.0, 0.0])
+    argpartition = np.argpartition
+
+    def compacting_argpartition(*args, **kwargs):
+        local_backend._delete(MemoryFilter(fields={"action": "news"}))
+        return argpartition(*args, **kwargs)
+
+    # act:
+    with patch("src.memory.backends.local.np.argpartition", compacting_argpartition):
+        results = await local_backend.search([0.0, 1.0, 0.0], top_k=2)
+
+    # assert:
+    assert [r["event"] for r in results] == ["E1", "E0"]
+    assert [p["event"] for p in local_backend.payloads] == ["E1"]
+
+
+@pytest.mark.asyncio
+async def test_uncommitted_compaction_is_discarded(tmp_path, local_backend):
+    """Test that a compaction interrupted before its commit marker leaves the old store."""
+    # arrange:
+    await local_backend.store("E0", "idle", "O", [1.0, 0.0, 0.0])
+    await local_backend.close()
+    (tmp_path / f"{PAYLOADS_FILE}.tmp").write_text("")
+
+    # act:
+    reloaded = LocalBackend(path=str(tmp_path), vector_size=3)
+
+    # assert:
+    assert [p["event"] for p in reloaded.payloads] == ["E0"]
+    assert not (tmp_path / f"{PAYLOADS_FILE}.tmp").exists()
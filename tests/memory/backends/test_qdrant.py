@@ -1,8 +1,32 @@
+import asyncio
+import threading
+import time
 import uuid
+from datetime import datetime, timezone
 from unittest.mock import MagicMock, patch
 
+import numpy as np
 import pytest
+from qdrant_client.http.models import (
+    Datatype,
+    Direction,
+    Distance,
+    FieldCondition,
+    IsEmptyCondition,
+    MatchAny,
+    MatchValue,
+    OrderBy,
+    PayloadField,
+    PayloadSchemaType,
+    ProductQuantization,
+    Range,
+    ScalarQuantization,
+    ScalarType,
+    VectorParams,
+)
 
+from src.core.defs import EmbeddingDtype, VectorQuantization
+from src.memory.backends.chroma import MemoryFilter, MemoryRecord
 from src.memory.backends.qdrant import QdrantBackend
 
 
@@ -106,3 +130,294 @@ async def test_search_memory_no_results(mock_qdrant_backend, mock_qdrant_client)
         limit=3,
     )
     assert results == []
+
+
+def test_qdrant_backend_rejects_vector_size_mismatch(mock_qdrant_client):
+    """Test that an existing collection with vectors of another size is rejected."""
+    # arrange:
+    collection = MagicMock()
+    collection.config.params.vectors = VectorParams(size=1536, distance=Distance.COSINE)
+    mock_qdrant_client.get_collection.return_value = collection
+
+    # act/assert:
+    with patch("src.memory.backends.qdrant.QdrantClient", return_value=mock_qdrant_client):
+        with pytest.raises(ValueError, match="stores vectors of size 1536"):
+            QdrantBackend(collection_name="test_collection", vector_size=256)
+
+
+def test_qdrant_backend_creates_float16_collection(mock_qdrant_client):
+    """Test that a missing collection is created with the configured size and dtype."""
+    # arrange:
+    mock_qdrant_client.get_collection.side_effect = Exception("Not found")
+
+    # act:
+    with patch("src.memory.backends.qdrant.QdrantClient", return_value=mock_qdrant_client):
+        QdrantBackend(
+            collection_name="test_collection", vector_size=256, dtype=EmbeddingDtype.FLOAT16
+        )
+
+    # assert:
+    vectors_config = mock_qdrant_client.recreate_collection.call_args.kwargs["vectors_config"]
+    assert vectors_config.size == 256
+    assert vectors_config.datatype == Datatype.FLOAT16
+
+
+@pytest.mark.asyncio
+async def test_store_numpy_embedding(mock_qdrant_backend, mock_qdrant_client):
+    """Test that numpy embeddings are converted to floats for the Qdrant client."""
+    # act:
+    await mock_qdrant_backend.store(
+        "Event", "Action", "Outcome", np.array([0.5, 0.25], dtype=np.float16)
+    )
+
+    # assert:
+    point = mock_qdrant_client.upsert.call_args.kwargs["points"][0]
+    assert point.vector == [0.5, 0.25]
+
+
+@pytest.mark.asyncio
+async def test_store_many_upserts_one_batch(mock_qdrant_backend, mock_qdrant_client):
+    """Test that several memories are written with one upsert."""
+    # arrange:
+    records = [
+        MemoryRecord("E1", "A1", "O1", [0.1, 0.2]),
+        MemoryRecord("E2", "A2", "O2", np.array([0.3, 0.4]), {"key": "value"}),
+    ]
+
+    # act:
+    await mock_qdrant_backend.store_many(records)
+
+    # assert:
+    mock_qdrant_client.upsert.assert_called_once()
+    points = mock_qdrant_client.upsert.call_args.kwargs["points"]
+    assert [point.payload["outcome"] for point in points] == ["O1", "O2"]
+    assert points[1].payload["key"] == "value"
+
+
+@pytest.mark.asyncio
+async def test_search_many_uses_search_batch(mock_qdrant_backend, mock_qdrant_client):
+    """Test that several queries are sent with one search_batch call."""
+    # arrange:
+    mock_qdrant_client.search_batch.return_value = [
+        [MagicMock(payload={"event": "Event1"})],
+        [MagicMock(payload={"event": "Event2"}), MagicMock(payload=None)],
+    ]
+
+    # act:
+    results = await mock_qdrant_backend.search_many([[0.1, 0.2], [0.3, 0.4]], top_k=2)
+
+    # assert:
+    requests = mock_qdrant_client.search_batch.call_args.kwargs["requests"]
+    assert [request.limit for request in requests] == [2, 2]
+    assert results == [[{"event": "Event1"}], [{"event": "Event2"}]]
+
+
+@pytest.mark.asyncio
+async def test_slow_reads_time_out(mock_qdrant_backend, mock_qdrant_client):
+    """Test that reads from a slow Qdrant time out, and writes are waited for until they end."""
+    # arrange:
+    release = threading.Event()
+    mock_qdrant_client.search.side_effect = lambda **kwargs: release.wait(1)
+    mock_qdrant_client.upsert.side_effect = lambda **kwargs: release.wait(1)
+    mock_qdrant_backend.timeout = 0.05
+
+    # act & assert:
+    assert await mock_qdrant_backend.search([0.1, 0.2], top_k=1) == []
+    threading.Timer(0.2, release.set).start()
+    await mock_qdrant_backend.store("E", "A", "O", [0.1, 0.2])
+    assert release.is_set()
+    mock_qdrant_client.upsert.assert_called_once()
+    await mock_qdrant_backend.close()
+
+
+@pytest.mark.asyncio
+async def test_calls_run_off_the_event_loop(mock_qdrant_backend, mock_qdrant_client):
+    """Test that client calls run on worker threads, at most `max_concurrency` at a time."""
+    # arrange:
+    lock = threading.Lock()
+    running, peak, threads = [0], [0], set()
+
+    def search(**kwargs):
+        with lock:
+            running[0] += 1
+            peak[0] = max(peak[0], running[0])
+            threads.add(threading.get_ident())
+        time.sleep(0.02)
+        with lock:
+            running[0] -= 1
+        return []
+
+    mock_qdrant_client.search.side_effect = search
+    mock_qdrant_backend.max_concurrency = 2
+
+    # act:
+    await asyncio.gather(*(mock_qdrant_backend.search([0.1], top_k=1) for _ in range(6)))
+    await mock_qdrant_backend.close()
+
+    # assert:
+    assert peak[0] == 2
+    assert threading.get_ident() not in threads
+
+
+def test_qdrant_backend_creates_quantized_collection(mock_qdrant_client):
+    """Test that a missing collection is created with the configured quantization."""
+    # arrange:
+    mock_qdrant_client.get_collection.side_effect = Exception("Not found")
+
+    # act:
+    with patch("src.memory.backends.qdrant.QdrantClient", return_value=mock_qdrant_client):
+        QdrantBackend(collection_name="test_collection", quantization=VectorQuantization.INT8)
+
+    # assert:
+    config = mock_qdrant_client.recreate_collection.call_args.kwargs["quantization_config"]
+    assert isinstance(config, ScalarQuantization)
+    assert config.scalar.type == ScalarType.INT8
+
+
+def test_qdrant_backend_enables_quantization_on_existing_collection(mock_qdrant_client):
+    """Test that quantization is enabled on an existing collection without it."""
+    # arrange:
+    collection = MagicMock()
+    collection.config.params.vectors = VectorParams(size=768, distance=Distance.COSINE)
+    collection.config.quantization_config = None
+    mock_qdrant_client.get_collection.return_value = collection
+
+    # act:
+    with patch("src.memory.backends.qdrant.QdrantClient", return_value=mock_qdrant_client):
+        QdrantBackend(
+            collection_name="test_collection", vector_size=768, quantization=VectorQuantization.PQ
+        )
+
+    # assert:
+    config = mock_qdrant_client.update_collection.call_args.kwargs["quantization_config"]
+    assert isinstance(config, ProductQuantization)
+
+
+@pytest.mark.asyncio
+async def test_quantized_search_rescores(mock_qdrant_backend, mock_qdrant_client):
+    """Test that quantized searches ask Qdrant to re-score oversampled candidates."""
+    # arrange:
+    mock_qdrant_backend.quantization = VectorQuantization.INT8
+    mock_qdrant_backend.rerank_factor = 4
+    mock_qdrant_client.search.return_value = []
+
+    # act:
+    await mock_qdrant_backend.search([0.1, 0.2], top_k=3)
+
+    # assert:
+    params = mock_qdrant_client.search.call_args.kwargs["search_params"]
+    assert params.quantization.rescore is True
+    assert params.quantization.oversampling == 4.0
+
+
+def test_qdrant_backend_creates_payload_indexes(mock_qdrant_client):
+    """Test that a new collection gets payload indexes for filters and recency ordering."""
+    # arrange:
+    mock_qdrant_client.get_collection.side_effect = Exception("not found")
+
+    # act:
+    with patch("src.memory.backends.qdrant.QdrantClient", return_value=mock_qdrant_client):
+        QdrantBackend(collection_name="test_collection", vector_size=768, indexed_fields=["action"])
+
+    # assert:
+    schemas = {
+        call.kwargs["field_name"]: call.kwargs["field_schema"]
+        for call in mock_qdrant_client.create_payload_index.call_args_list
+    }
+    assert schemas == {
+        "action": PayloadSchemaType.KEYWORD,
+        "timestamp_unix": PayloadSchemaType.FLOAT,
+    }
+
+
+@pytest.mark.asyncio
+async def test_search_with_filter_passes_payload_filter(mock_qdrant_backend, mock_qdrant_client):
+    """Test that memory filters are translated into a Qdrant payload filter."""
+    # arrange:
+    mock_qdrant_client.search.return_value = []
+    until = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    # act:
+    await mock_qdrant_backend.search(
+        [0.1, 0.2],
+        top_k=1,
+        memory_filter=MemoryFilter(fields={"action": "analyze_news"}, until=until),
+    )
+
+    # assert:
+    query_filter = mock_qdrant_client.search.call_args.kwargs["query_filter"]
+    assert query_filter.must == [
+        FieldCondition(key="action", match=MatchValue(value="analyze_news")),
+        FieldCondition(key="timestamp_unix", range=Range(lt=until.timestamp())),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_recent_scrolls_by_store_time(mock_qdrant_backend, mock_qdrant_client):
+    """Test that recent memories are scrolled newest first without a query vector."""
+    # arrange:
+    mock_qdrant_client.scroll.return_value = ([MagicMock(payload={"event": "Event1"})], None)
+
+    # act:
+    results = await mock_qdrant_backend.recent(
+        top_k=1, memory_filter=MemoryFilter(fields={"state": ["idle", "default"]})
+    )
+
+    # assert:
+    kwargs = mock_qdrant_client.scroll.call_args.kwargs
+    assert kwargs["limit"] == 1
+    assert kwargs["order_by"] == OrderBy(key="timestamp_unix", direction=Direction.DESC)
+    assert kwargs["scroll_filter"].must == [
+        FieldCondition(key="state", match=MatchAny(any=["idle", "default"]))
+    ]
+    assert results == [{"event": "Event1"}]
+
+
+def test_existing_collection_backfills_store_times(mock_qdrant_client):
+    """Test that memories stored without `timestamp_unix` get it from their ISO timestamp."""
+    # arrange:
+    mock_qdrant_client.scroll.side_effect = [
+        ([MagicMock(id="a", payload={"timestamp": "2025-01-01T00:00:00+00:00"})], "b"),
+        ([MagicMock(id="b", payload={})], None),
+    ]
+
+    # act:
+    with patch("src.memory.backends.qdrant.QdrantClient", return_value=mock_qdrant_client):
+        QdrantBackend(collection_name="test_collection", vector_size=768)
+
+    # assert:
+    scroll_filter = mock_qdrant_client.scroll.call_args_list[0].kwargs["scroll_filter"]
+    assert scroll_filter.must == [IsEmptyCondition(is_empty=PayloadField(key="timestamp_unix"))]
+    operations = [
+        operation
+        for call in mock_qdrant_client.batch_update_points.call_args_list
+        for operation in call.kwargs["update_operations"]
+    ]
+    assert [(o.set_payload.points, o.set_payload.payload) for o in operations] == [
+        (["a"], {"timestamp_unix": datetime(2025, 1, 1, tzinfo=timezone.utc).timestamp()}),
+        (["b"], {"timestamp_unix": 0.0}),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_delete_selects_points_by_filter(mock_qdrant_backend, mock_qdrant_client):
+    """Test that deletions select points by payload filter, with exclusions as must_not."""
+    # arrange:
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    # act:
+    await mock_qdrant_backend.delete(
+        MemoryFilter(since=since, exclude={"action": ["memory_digest", "idle"]})
+    )
+    with pytest.raises(ValueError):
+        await mock_qdrant_backend.delete(MemoryFilter())
+
+    # assert:
+    selector = mock_qdrant_client.delete.call_args.kwargs["points_selector"]
+    assert selector.filter.must == [
+        FieldCondition(key="timestamp_unix", range=Range(gte=since.timestamp()))
+    ]
+    assert selector.filter.must_not == [
+        FieldCondition(key="action", match=MatchAny(any=["memory_digest", "idle"]))
+    ]
+    mock_qdrant_client.delete.assert_called_once()
@@ -0,0 +1,80 @@
+import numpy as np
+import pytest
+
+from src.memory.backends.quantization import ProductQuantizer, ScalarQuantizer, default_subvectors
+
+
+def _normalized(n, dim, seed=0):
+    """Random normalized float32 vectors."""
+    vectors = np.random.default_rng(seed).normal(size=(n, dim))
+    return (vectors / np.linalg.norm(vectors, axis=1, keepdims=True)).astype(np.float32)
+
+
+def test_scalar_quantizer_scores_close_to_exact():
+    """Test that int8 scores are close to exact dot products."""
+    # arrange:
+    vectors = _normalized(500, 64)
+    query = _normalized(1, 64, seed=1)[0]
+
+    # act:
+    codes, scales = ScalarQuantizer.encode(vectors)
+    scores = ScalarQuantizer.scores(query, codes, scales)
+
+    # assert:
+    assert codes.dtype == np.int8
+    assert codes.nbytes + scales.nbytes < vectors.nbytes / 3.5
+    np.testing.assert_allclose(scores, vectors @ query, atol=0.02)
+
+
+def test_scalar_quantizer_zero_vector():
+    """Test that zero vectors encode without dividing by zero."""
+    codes, scales = ScalarQuantizer.encode(np.zeros((1, 4), dtype=np.float32))
+    assert not codes.any() and not scales.any()
+
+
+def test_product_quantizer_scores_correlate_with_exact():
+    """Test that product quantization scores rank vectors like exact scores."""
+    # arrange:
+    vectors = _normalized(2000, 32)
+    query = vectors[0]
+
+    # act:
+    pq = ProductQuantizer.train(vectors, n_subvectors=8)
+    codes = pq.encode(vectors)
+    scores = pq.scores(query, codes)
+
+    # assert:
+    assert codes.shape == (2000, 8) and codes.dtype == np.uint8
+    assert np.corrcoef(scores, vectors @ query)[0, 1] > 0.8
+    assert np.argmax(scores) == 0
+
+
+def test_product_quantizer_save_and_load(tmp_path):
+    """Test that persisted codebooks encode like the originals."""
+    # arrange:
+    vectors = _normalized(300, 16)
+    pq = ProductQuantizer.train(vectors, n_subvectors=4, iterations=2)
+    path = str(tmp_path / "pq.npy")
+
+    # act:
+    pq.save(path)
+    loaded = ProductQuantizer.load(path)
+
+    # assert:
+    assert loaded is not None
+    np.testing.assert_array_equal(loaded.encode(vectors), pq.encode(vectors))
+
+
+def test_product_quantizer_rejects_bad_parameters():
+    """Test training with too few vectors or subvectors not dividing the size."""
+    with pytest.raises(ValueError, match="at least 256"):
+        ProductQuantizer.train(_normalized(10, 16), n_subvectors=4)
+    with pytest.raises(ValueError, match="don't divide"):
+        ProductQuantizer.train(_normalized(300, 16), n_subvectors=5)
+
+
+def test_default_subvectors():
+    """Test the default number of subvectors."""
+    assert default_subvectors(1536) == 96
+    assert default_subvectors(100) == 5
+    assert 100 % default_subvectors(100) == 0
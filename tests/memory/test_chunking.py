@@ -0,0 +1,66 @@
+from src.memory.chunking import TextChunker
+
+
+def count_words(text):
+    """Count one token per word."""
+    return max(1, len(text.split()))
+
+
+def test_short_text_is_one_chunk():
+    """Test that a text within the limit is returned as a single chunk."""
+    # arrange:
+    chunker = TextChunker(max_tokens=10, overlap_tokens=2, count_tokens=count_words)
+
+    # act:
+    chunks = list(chunker.chunks("just a few words"))
+
+    # assert:
+    assert not chunker.needs_chunking("just a few words")
+    assert [chunk.text for chunk in chunks] == ["just a few words"]
+
+
+def test_chunks_respect_limit_and_overlap():
+    """Test that chunks stay within the token limit and share the overlap."""
+    # arrange:
+    chunker = TextChunker(max_tokens=4, overlap_tokens=1, count_tokens=count_words)
+    text = "one two three four five six seven eight nine"
+
+    # act:
+    chunks = list(chunker.chunks(text))
+
+    # assert:
+    assert [chunk.text for chunk in chunks] == [
+        "one two three four",
+        "four five six seven",
+        "seven eight nine",
+    ]
+    assert [chunk.index for chunk in chunks] == [0, 1, 2]
+    assert all(text[chunk.start : chunk.end].strip() == chunk.text for chunk in chunks)
+
+
+def test_chunks_prefer_sentence_boundaries():
+    """Test that a chunk ends at a sentence boundary in its second half."""
+    # arrange:
+    chunker = TextChunker(max_tokens=6, overlap_tokens=0, count_tokens=count_words)
+
+    # act:
+    chunks = list(chunker.chunks("Prices rose sharply today. Analysts expect more gains soon."))
+
+    # assert:
+    assert [chunk.text for chunk in chunks] == [
+        "Prices rose sharply today.",
+        "Analysts expect more gains soon.",
+    ]
+
+
+def test_long_word_is_cut():
+    """Test that a word longer than a chunk is cut by characters."""
+    # arrange:
+    chunker = TextChunker(max_tokens=2, overlap_tokens=0)
+
+    # act:
+    chunks = list(chunker.chunks("x" * 40))
+
+    # assert:
+    assert "".join(chunk.text for chunk in chunks) == "x" * 40
+    assert all(chunker.count_tokens(chunk.text) <= 2 for chunk in chunks)
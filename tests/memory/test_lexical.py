@@ -0,0 +1,176 @@
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pytest
+
+from src.memory.backends.chroma import MemoryFilter, MemoryRecord
+from src.memory.lexical import (
+    BM25Index,
+    _lexical_indexes,
+    get_lexical_index,
+    reciprocal_rank_fusion,
+    tokenize,
+)
+
+
+def _record(event: str, outcome: str, **metadata) -> MemoryRecord:
+    return MemoryRecord(event, "post_tweet", outcome, np.zeros(3), metadata or None)
+
+
+def test_tokenize():
+    """Test that text is split into lower-cased words."""
+    assert tokenize("Bitcoin ETF, approved!") == ["bitcoin", "etf", "approved"]
+
+
+@pytest.mark.asyncio
+async def test_bm25_ranks_rare_terms_higher():
+    """Test that documents matching rarer query terms rank first."""
+    # arrange:
+    index = BM25Index(path="")
+    await index.add(
+        [
+            _record("news", "market update on bitcoin"),
+            _record("news", "market update on ethereum"),
+            _record("news", "market update"),
+        ]
+    )
+
+    # act:
+    results = index.search("ethereum market", top_k=2)
+
+    # assert:
+    assert [r["outcome"] for r in results] == [
+        "market update on ethereum",
+        "market update",
+    ]
+    assert results[0]["action"] == "post_tweet"
+    assert "timestamp" in results[0]
+
+
+@pytest.mark.asyncio
+async def test_bm25_without_matches_returns_nothing():
+    """Test that a query without known terms finds nothing."""
+    # arrange:
+    index = BM25Index(path="")
+    await index.add([_record("news", "market update")])
+
+    # act / assert:
+    assert index.search("solana") == []
+    assert BM25Index(path="").search("market") == []
+
+
+@pytest.mark.asyncio
+async def test_bm25_persists_memories(tmp_path):
+    """Test that indexed memories are reloaded, skipping a partial last line."""
+    # arrange:
+    path = tmp_path / "lexical.jsonl"
+    index = BM25Index(path=str(path))
+    await index.add([_record("news", "bitcoin halving", parent_id="p", chunk_index=0)])
+    with open(path, "a") as file:
+        file.write('{"event": "trunc')
+
+    # act:
+    reloaded = BM25Index(path=str(path))
+
+    # assert:
+    assert len(reloaded) == 1
+    assert reloaded.search("halving")[0]["parent_id"] == "p"
+
+
+def test_reciprocal_rank_fusion():
+    """Test that memories ranked by both retrievers come first."""
+    # arrange:
+    a, b, c = ({"event": e, "action": "x", "outcome": "y"} for e in "abc")
+
+    # act:
+    fused = reciprocal_rank_fusion([[a, b], [c, b]], top_k=3, k=60)
+
+    # assert:
+    assert fused == [b, a, c]
+
+
+@pytest.mark.asyncio
+async def test_bm25_applies_memory_filter():
+    """Test that lexical results are restricted to memories matching a filter."""
+    # arrange:
+    index = BM25Index(path="")
+    await index.add(
+        [_record("news", "bitcoin rally", state="idle"), _record("news", "bitcoin dip")]
+    )
+
+    # act:
+    results = index.search("bitcoin", memory_filter=MemoryFilter(fields={"state": "idle"}))
+
+    # assert:
+    assert [r["outcome"] for r in results] == ["bitcoin rally"]
+
+
+@pytest.mark.asyncio
+async def test_bm25_delete_survives_a_reload(tmp_path):
+    """Test that deleted memories are no longer found, also after a reload."""
+    # arrange:
+    path = str(tmp_path / "lexical.jsonl")
+    index = BM25Index(path=path)
+    await index.add([_record("E1", "bitcoin rallies"), _record("E2", "bitcoin dips", state="idle")])
+
+    # act:
+    removed = await index.delete(MemoryFilter(fields={"state": "idle"}))
+
+    # assert:
+    assert removed == 1
+    assert [p["event"] for p in index.search("bitcoin")] == ["E1"]
+    assert [p["event"] for p in BM25Index(path=path).search("bitcoin")] == ["E1"]
+
+
+@pytest.mark.asyncio
+async def test_bm25_delete_appends_a_tombstone(tmp_path):
+    """Test that a delete appends a tombstone line and compacts once most memories are gone."""
+    # arrange:
+    path = str(tmp_path / "lexical.jsonl")
+    index = BM25Index(path=path)
+    await index.add([_record(f"E{i}", "bitcoin", state=i) for i in range(4)])
+
+    # act:
+    await index.delete(MemoryFilter(fields={"state": 1}))
+    with open(path) as file:
+        tombstoned = [json.loads(line) for line in file]
+    await index.delete(MemoryFilter(fields={"state": [0, 2]}))
+    with open(path) as file:
+        compacted = [json.loads(line) for line in file]
+    await index.add([_record("E4", "bitcoin")])
+
+    # assert:
+    assert len(tombstoned) == 5
+    assert tombstoned[-1] == {"_deleted": [1]}
+    assert [p["event"] for p in compacted] == ["E3"]
+    assert sorted(p["event"] for p in index.search("bitcoin", top_k=5)) == ["E3", "E4"]
+    reloaded = BM25Index(path=path)
+    assert sorted(p["event"] for p in reloaded.search("bitcoin", top_k=5)) == ["E3", "E4"]
+
+
+def test_bm25_compacts_a_damaged_file(tmp_path):
+    """Test that a file with a partial line is rewritten on load, so tombstones stay aligned."""
+    # arrange:
+    path = tmp_path / "lexical.jsonl"
+    path.write_text('{"event": "E0", "outcome": "bitcoin"}\n{"event": "tr\n')
+
+    # act:
+    index = BM25Index(path=str(path))
+
+    # assert:
+    assert len(index) == 1
+    assert path.read_text() == '{"event": "E0", "outcome": "bitcoin"}\n'
+
+
+def test_lexical_index_is_shared_per_path(tmp_path):
+    """Test that the memory modules of a process share the keyword index of a file."""
+    # arrange:
+    path = str(tmp_path / "lexical.jsonl")
+
+    # act & assert:
+    with patch.dict(_lexical_indexes, clear=True):
+        index = get_lexical_index(path)
+        assert get_lexical_index(path) is index
+        assert get_lexical_index(str(tmp_path / "other.jsonl")) is not index
+        assert get_lexical_index("") is not get_lexical_index("")
@@ -0,0 +1,307 @@
+import asyncio
+import time
+from datetime import datetime, timezone
+from typing import Any, Dict, List
+from unittest.mock import AsyncMock, patch
+
+import numpy as np
+import pytest
+
+from src.core.defs import MemoryBackendType, RollupSummarizer
+from src.llm.embeddings import EmbeddingGenerator
+from src.memory.backends.chroma import MemoryRecord
+from src.memory.lifecycle import DIGEST_ACTION, MemoryLifecycleManager, extractive_digest
+from src.memory.memory_module import MemoryModule
+
+
+@pytest.fixture
+def mock_embedding_generator():
+    """Mock the EmbeddingGenerator, returning one vector per embedded text."""
+    generator = AsyncMock(spec=EmbeddingGenerator)
+    generator.get_embedding.side_effect = lambda text: np.ones(
+        (len(text) if isinstance(text, list) else 1, 3)
+    )
+    return generator
+
+
+@pytest.fixture
+def memory_module(mock_embedding_generator):
+    """Create a MemoryModule on an in-memory local backend."""
+    with patch(
+        "src.memory.memory_module.EmbeddingGenerator", return_value=mock_embedding_generator
+    ):
+        return MemoryModule(
+            backend_type=MemoryBackendType.LOCAL,
+            local_path="",
+            vector_size=3,
+            write_behind=False,
+            lexical_index=False,
+            lifecycle=False,
+        )
+
+
+def _lifecycle(memory: MemoryModule, **kwargs) -> MemoryLifecycleManager:
+    """Attach a lifecycle manager without background runs to a memory module."""
+    memory.lifecycle = MemoryLifecycleManager(memory, interval=0, **kwargs)
+    return memory.lifecycle
+
+
+async def _store_at(memory: MemoryModule, times: List[float]) -> None:
+    """Store one memory per given Unix time in the local backend."""
+    for stored_at in times:
+        stamp = datetime.fromtimestamp(stored_at, tz=timezone.utc)
+        payload = {"timestamp": stamp.isoformat(), "timestamp_unix": stamp.timestamp()}
+        with patch(
+            "src.memory.backends.local.memory_payloads",
+            lambda records: [
+                {"event": r.event, "action": r.action, "outcome": r.outcome, **payload}
+                for r in records
+            ],
+        ):
+            await memory.backend.store_many(
+                [MemoryRecord("tick", "idle", f"at {stored_at}", np.ones(3))]
+            )
+
+
+@pytest.mark.asyncio
+async def test_repeats_are_stored_once_and_aggregated(memory_module, mock_embedding_generator):
+    """Test that repeats of a hot memory are only counted, then stored as one aggregate."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module)
+
+    # act:
+    for _ in range(5):
+        await memory_module.store("tick", "idle", "Nothing to do", {"state": "default"})
+    stored_while_hot = list(memory_module.backend.payloads)
+    await lifecycle.close()
+
+    # assert:
+    assert len(stored_while_hot) == 1
+    assert mock_embedding_generator.get_embedding.call_count == 2
+    assert len(lifecycle) == 0
+    [aggregate] = memory_module.backend.payloads
+    assert aggregate["count"] == 5
+    assert aggregate["state"] == "default"
+    assert aggregate["first_seen"] <= aggregate["last_seen"]
+
+
+@pytest.mark.asyncio
+async def test_evicted_entries_leave_the_hot_tier(memory_module):
+    """Test that the oldest entries are aggregated when the hot tier is full."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module, hot_max_entries=1)
+
+    # act:
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await memory_module.store("news", "analyze_news", "Bitcoin rallies")
+    await lifecycle.run_once()
+
+    # assert:
+    assert len(lifecycle) == 1
+    assert [(p["event"], p.get("count")) for p in memory_module.backend.payloads] == [
+        ("news", None),
+        ("tick", 2),
+    ]
+
+
+@pytest.mark.asyncio
+async def test_aggregates_are_written_in_the_background(memory_module):
+    """Test that storing a memory doesn't wait for the aggregate of the entry it evicts."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module, hot_max_entries=1)
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await memory_module.store("tick", "idle", "Nothing to do")
+    release = asyncio.Event()
+    store_many = memory_module.store_many
+
+    async def slow_store_many(memories: List[Dict[str, Any]]) -> None:
+        await release.wait()
+        await store_many(memories)
+
+    # act:
+    with patch.object(memory_module, "store_many", side_effect=slow_store_many):
+        await asyncio.wait_for(memory_module.store("news", "analyze_news", "Bitcoin"), 1)
+        stored = [p.get("count") for p in memory_module.backend.payloads]
+        release.set()
+        await lifecycle.run_once()
+
+    # assert:
+    assert stored == [None, None]
+    assert [p.get("count") for p in memory_module.backend.payloads] == [None, 2]
+
+
+@pytest.mark.asyncio
+async def test_aggregate_keeps_the_copy_of_a_later_repeat(memory_module):
+    """Test that a memory occurring again after it left the hot tier keeps its new copy."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module, hot_ttl=0.2)
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await asyncio.sleep(0.3)
+
+    # act:
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await lifecycle.age()
+
+    # assert:
+    assert len(lifecycle) == 1
+    assert sorted(p.get("count", 1) for p in memory_module.backend.payloads) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_roll_up_of_a_crowded_window_keeps_the_rest(memory_module):
+    """Test that memories left out of the digest of a crowded window are not deleted."""
+    # arrange:
+    lifecycle = _lifecycle(
+        memory_module,
+        hot_ttl=0,
+        rollup_age=60,
+        rollup_window=1,
+        rollup_max_entries=2,
+        rollup_windows_per_run=1,
+    )
+    await _store_at(memory_module, [1000.1, 1000.2, 1000.3])
+
+    # act:
+    first = await lifecycle.roll_up(now=2000)
+    left = sorted(p["outcome"] for p in memory_module.backend.payloads if p["action"] == "idle")
+    second = await lifecycle.roll_up(now=2000)
+
+    # assert:
+    assert (first, second) == (1, 1)
+    assert left == ["at 1000.1"]
+    assert sorted(p["count"] for p in memory_module.backend.payloads) == [1, 2]
+
+
+@pytest.mark.asyncio
+async def test_roll_up_summarizes_memories_stored_at_once(memory_module):
+    """Test that a crowded window of memories stored at one time is rolled up as a whole."""
+    # arrange:
+    lifecycle = _lifecycle(
+        memory_module, hot_ttl=0, rollup_age=60, rollup_window=1, rollup_max_entries=2
+    )
+    await _store_at(memory_module, [1000.5, 1000.5, 1000.5, 1000.25])
+
+    # act:
+    digests = await lifecycle.roll_up(now=2000)
+
+    # assert:
+    assert digests == 2
+    assert sorted(p["count"] for p in memory_module.backend.payloads) == [1, 3]
+
+
+@pytest.mark.asyncio
+async def test_roll_up_replaces_old_memories_with_a_digest(memory_module):
+    """Test that memories older than the rollup age are replaced by one digest per window."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module, hot_ttl=0, rollup_age=60, rollup_window=1e9)
+    await memory_module.store("tick", "idle", "Nothing to do", {"count": 3})
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await memory_module.store("news", "analyze_news", "Bitcoin rallies")
+    later = time.time() + 3600
+
+    # act:
+    recent = await lifecycle.roll_up()
+    digests = await lifecycle.roll_up(now=later)
+    again = await lifecycle.roll_up(now=later)
+
+    # assert:
+    assert (recent, digests, again) == (0, 1, 0)
+    [digest] = memory_module.backend.payloads
+    assert digest["action"] == DIGEST_ACTION
+    assert digest["count"] == 5
+    assert digest["outcome"].splitlines()[0] == "- idle x4: tick: Nothing to do"
+
+
+@pytest.mark.asyncio
+async def test_failed_aggregate_keeps_the_stored_copy(memory_module):
+    """Test that the stored copy of a repeated memory is only deleted once its aggregate is."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module)
+    await memory_module.store("tick", "idle", "Nothing to do")
+    await memory_module.store("tick", "idle", "Nothing to do")
+
+    # act:
+    with (
+        patch.object(memory_module, "store_many", side_effect=RuntimeError("backend down")),
+        pytest.raises(RuntimeError),
+    ):
+        await lifecycle.close()
+
+    # assert:
+    assert [p["event"] for p in memory_module.backend.payloads] == ["tick"]
+
+
+@pytest.mark.asyncio
+async def test_roll_up_keeps_ingested_documents(memory_module):
+    """Test that memories of the kept actions, such as file chunks, are not rolled up."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module, hot_ttl=0, rollup_age=60, rollup_window=1e9)
+    await memory_module.ingest("Repository file a.py", "store_file", "print()", parent_id="h")
+    await memory_module.store("news", "analyze_news", "Bitcoin rallies")
+
+    # act:
+    digests = await lifecycle.roll_up(now=time.time() + 3600)
+
+    # assert:
+    assert digests == 1
+    assert sorted(p["action"] for p in memory_module.backend.payloads) == [
+        DIGEST_ACTION,
+        "store_file",
+    ]
+
+
+@pytest.mark.asyncio
+async def test_llm_digest_falls_back_to_extracts(memory_module):
+    """Test that LLM digests use the LLM's summary, and the extracts when the LLM fails."""
+    # arrange:
+    lifecycle = _lifecycle(memory_module, hot_ttl=0, rollup_age=60, summarizer=RollupSummarizer.LLM)
+    memories = [{"event": "tick", "action": "idle", "outcome": "Nothing to do"}]
+    llm = AsyncMock()
+    llm.generate_response.side_effect = ["The agent idled.", Exception("rate limited")]
+
+    # act:
+    with patch("src.memory.lifecycle.LLM", return_value=llm):
+        summarized = await lifecycle._digest(memories, 0.0, 60.0)
+        extracted = await lifecycle._digest(memories, 0.0, 60.0)
+
+    # assert:
+    assert summarized["outcome"] == "The agent idled."
+    assert extracted["outcome"] == "- idle x1: tick: Nothing to do"
+    assert summarized["metadata"]["window_end"] == "1970-01-01T00:01:00+00:00"
+
+
+def test_extractive_digest_groups_memories():
+    """Test that extracts group kinds of memories by count, and chunks by their memory."""
+    # arrange:
+    memories: List[Dict[str, Any]] = [
+        {"event": "tick", "action": "idle", "outcome": "Nothing to do"},
+        {"event": "Tick", "action": "idle", "outcome": "nothing  to do", "count": 2},
+        {
+            "event": "doc",
+            "action": "ingest",
+            "outcome": "part 2",
+            "parent_id": "p",
+            "chunk_index": 1,
+        },
+        {
+            "event": "doc",
+            "action": "ingest",
+            "outcome": "part 1",
+            "parent_id": "p",
+            "chunk_index": 0,
+        },
+        {"event": "news", "action": "analyze_news", "outcome": "x" * 300},
+    ]
+
+    # act:
+    digest = extractive_digest(memories, lines=2).splitlines()
+
+    # assert:
+    assert digest == [
+        "- idle x3: tick: Nothing to do",
+        "- ingest x1: doc: part 1",
+        "- 1 other kinds of memories",
+    ]
+    assert len(extractive_digest(memories[-1:])) < 250
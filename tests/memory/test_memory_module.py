@@ -1,13 +1,19 @@
+from datetime import datetime, timezone
 from unittest.mock import AsyncMock, patch
 
 import numpy as np
 import pytest
 
-from src.core.defs import MemoryBackendType
+from src.core.defs import MemoryBackendType, SearchMode
+from src.core.exceptions import MemoryError
 from src.llm.embeddings import EmbeddingGenerator
-from src.memory.backends.chroma import ChromaBackend
+from src.memory.backends.chroma import ChromaBackend, MemoryFilter
+from src.memory.backends.local import LocalBackend
 from src.memory.backends.qdrant import QdrantBackend
-from src.memory.memory_module import MemoryModule
+from src.memory.chunking import TextChunker
+from src.memory.lexical import BM25Index
+from src.memory.memory_module import MemoryModule, get_memory_module
+from src.memory.write_buffer import WriteBehindBuffer
 
 
 @pytest.fixture
@@ -86,13 +92,13 @@ async def test_store_memory_qdrant(memory_module_qdrant, mock_qdrant_backend):
     memory_module_qdrant.embedding_generator.get_embedding.assert_called_once_with(
         f"{event} {action} {outcome}"
     )
-    mock_qdrant_backend.store.assert_called_once_with(
-        event=event,
-        action=action,
-        outcome=outcome,
-        embedding=[0.1, 0.2, 0.3],
-        metadata=metadata,
-    )
+    mock_qdrant_backend.store.assert_called_once()
+    kwargs = mock_qdrant_backend.store.call_args.kwargs
+    assert (kwargs["event"], kwargs["action"], kwargs["outcome"]) == (event, action, outcome)
+    assert kwargs["metadata"] == metadata
+    # The embedding is handed over as a numpy array, without converting it to a list
+    assert isinstance(kwargs["embedding"], np.ndarray)
+    np.testing.assert_array_equal(kwargs["embedding"], [0.1, 0.2, 0.3])
 
 
 @pytest.mark.asyncio
@@ -108,13 +114,13 @@ async def test_store_memory_chroma(memory_module_chroma, mock_chroma_backend):
     memory_module_chroma.embedding_generator.get_embedding.assert_called_once_with(
         f"{event} {action} {outcome}"
     )
-    mock_chroma_backend.store.assert_called_once_with(
-        event=event,
-        action=action,
-        outcome=outcome,
-        embedding=[0.1, 0.2, 0.3],
-        metadata=metadata,
-    )
+    mock_chroma_backend.store.assert_called_once()
+    kwargs = mock_chroma_backend.store.call_args.kwargs
+    assert (kwargs["event"], kwargs["action"], kwargs["outcome"]) == (event, action, outcome)
+    assert kwargs["metadata"] == metadata
+    # The embedding is handed over as a numpy array, without converting it to a list
+    assert isinstance(kwargs["embedding"], np.ndarray)
+    np.testing.assert_array_equal(kwargs["embedding"], [0.1, 0.2, 0.3])
 
 
 @pytest.mark.asyncio
@@ -127,7 +133,10 @@ async def test_search_memory_qdrant(memory_module_qdrant, mock_qdrant_backend):
     results = await memory_module_qdrant.search(query, top_k)
 
     memory_module_qdrant.embedding_generator.get_embedding.assert_called_once_with(query)
-    mock_qdrant_backend.search.assert_called_once_with(query_vector=[0.1, 0.2, 0.3], top_k=top_k)
+    mock_qdrant_backend.search.assert_called_once()
+    kwargs = mock_qdrant_backend.search.call_args.kwargs
+    np.testing.assert_array_equal(kwargs["query_vector"], [0.1, 0.2, 0.3])
+    assert kwargs["top_k"] == top_k
     assert results == [{"event": "result_event"}]
 
 
@@ -141,5 +150,356 @@ async def test_search_memory_chroma(memory_module_chroma, mock_chroma_backend):
     results = await memory_module_chroma.search(query, top_k)
 
     memory_module_chroma.embedding_generator.get_embedding.assert_called_once_with(query)
-    mock_chroma_backend.search.assert_called_once_with(query_vector=[0.1, 0.2, 0.3], top_k=top_k)
+    mock_chroma_backend.search.assert_called_once()
+    kwargs = mock_chroma_backend.search.call_args.kwargs
+    np.testing.assert_array_equal(kwargs["query_vector"], [0.1, 0.2, 0.3])
+    assert kwargs["top_k"] == top_k
     assert results == [{"event": "result_event"}]
+
+
+def test_memory_module_rejects_dimension_mismatch():
+    """Test that shortened embeddings must match the memory vector size."""
+    with patch("src.memory.memory_module.settings.EMBEDDING_DIMENSIONS", 256):
+        with pytest.raises(ValueError, match="shortened to 256 dimensions"):
+            MemoryModule(backend_type=MemoryBackendType.QDRANT, vector_size=1536)
+
+
+@pytest.mark.asyncio
+async def test_ingest_stores_chunks_in_bulk(memory_module_qdrant, mock_qdrant_backend):
+    """Test that a long text is embedded in batches and written with its parent id."""
+    # arrange:
+    memory_module_qdrant.chunker = TextChunker(
+        max_tokens=2, overlap_tokens=0, count_tokens=lambda text: len(text.split())
+    )
+    memory_module_qdrant.ingest_batch_size = 2
+    memory_module_qdrant.embedding_generator.get_embedding.side_effect = lambda texts: np.ones(
+        (len(texts), 3)
+    )
+
+    # act:
+    parent_id = await memory_module_qdrant.ingest(
+        "Event", "Action", "a b c d e", metadata={"source": "test"}, parent_id="doc-1"
+    )
+
+    # assert:
+    assert parent_id == "doc-1"
+    assert memory_module_qdrant.embedding_generator.get_embedding.call_count == 2
+    batches = [call.args[0] for call in mock_qdrant_backend.store_many.call_args_list]
+    assert [[record.outcome for record in batch] for batch in batches] == [["a b", "c d"], ["e"]]
+    assert batches[1][0].metadata == {"source": "test", "parent_id": "doc-1", "chunk_index": 2}
+
+
+@pytest.mark.asyncio
+async def test_store_long_outcome_is_chunked(memory_module_qdrant, mock_qdrant_backend):
+    """Test that storing an outcome longer than one chunk goes through ingestion."""
+    # arrange:
+    memory_module_qdrant.chunker = TextChunker(max_tokens=2, overlap_tokens=0)
+    memory_module_qdrant.embedding_generator.get_embedding.side_effect = lambda texts: np.ones(
+        (len(texts), 3)
+    )
+
+    # act:
+    await memory_module_qdrant.store("Event", "Action", "a long analysis of the market")
+
+    # assert:
+    mock_qdrant_backend.store.assert_not_called()
+    mock_qdrant_backend.store_many.assert_called()
+
+
+@pytest.mark.asyncio
+async def test_search_collapses_chunks_of_same_memory(memory_module_qdrant, mock_qdrant_backend):
+    """Test that chunk hits are collapsed to their parent and the search is widened."""
+    # arrange:
+    mock_qdrant_backend.search.side_effect = [
+        [{"outcome": "a", "parent_id": "doc"}, {"outcome": "b", "parent_id": "doc"}],
+        [
+            {"outcome": "a", "parent_id": "doc"},
+            {"outcome": "b", "parent_id": "doc"},
+            {"outcome": "single"},
+        ],
+    ]
+
+    # act:
+    results = await memory_module_qdrant.search("query", top_k=2)
+
+    # assert:
+    assert results == [{"outcome": "a", "parent_id": "doc"}, {"outcome": "single"}]
+    assert mock_qdrant_backend.search.call_args_list[1].kwargs["top_k"] == 8
+
+
+@pytest.mark.asyncio
+async def test_store_many_uses_one_request(memory_module_qdrant, mock_qdrant_backend):
+    """Test that several memories are embedded and written in one round trip each."""
+    # arrange:
+    memory_module_qdrant.embedding_generator.get_embedding.side_effect = lambda texts: np.ones(
+        (len(texts), 3)
+    )
+
+    # act:
+    await memory_module_qdrant.store_many(
+        [
+            {"event": "E1", "action": "A1", "outcome": "O1"},
+            {"event": "E2", "action": "A2", "outcome": "O2", "metadata": {"key": "value"}},
+        ]
+    )
+
+    # assert:
+    memory_module_qdrant.embedding_generator.get_embedding.assert_called_once_with(
+        ["E1 A1 O1", "E2 A2 O2"]
+    )
+    mock_qdrant_backend.store_many.assert_called_once()
+    records = mock_qdrant_backend.store_many.call_args.args[0]
+    assert [record.outcome for record in records] == ["O1", "O2"]
+    assert records[1].metadata == {"key": "value"}
+
+
+@pytest.mark.asyncio
+async def test_search_many_uses_one_request(memory_module_chroma, mock_chroma_backend):
+    """Test that several queries are embedded and searched in one round trip each."""
+    # arrange:
+    memory_module_chroma.embedding_generator.get_embedding.return_value = np.ones((2, 3))
+    mock_chroma_backend.search_many.return_value = [[{"event": "a"}], [{"event": "b"}]]
+
+    # act:
+    results = await memory_module_chroma.search_many(["news", "recent events"], top_k=1)
+
+    # assert:
+    memory_module_chroma.embedding_generator.get_embedding.assert_called_once_with(
+        ["news", "recent events"]
+    )
+    mock_chroma_backend.search_many.assert_called_once()
+    assert results == [[{"event": "a"}], [{"event": "b"}]]
+
+
+@pytest.mark.asyncio
+async def test_write_behind_store_is_flushed_before_search(
+    mock_embedding_generator, mock_qdrant_backend
+):
+    """Test that buffered writes are stored in bulk and flushed before a search."""
+    # arrange:
+    with (
+        patch("src.memory.memory_module.QdrantBackend", return_value=mock_qdrant_backend),
+        patch("src.memory.memory_module.EmbeddingGenerator", return_value=mock_embedding_generator),
+        patch(
+            "src.memory.memory_module.WriteBehindBuffer",
+            lambda flush: WriteBehindBuffer(flush, flush_interval=0, spill_path=""),
+        ),
+    ):
+        module = MemoryModule(backend_type=MemoryBackendType.QDRANT, write_behind=True)
+    mock_qdrant_backend.search.return_value = []
+
+    # act:
+    await module.store("event", "action", "outcome")
+    mock_qdrant_backend.store_many.assert_not_awaited()
+    await module.search("query")
+    await module.close()
+
+    # assert:
+    mock_qdrant_backend.store.assert_not_awaited()
+    mock_qdrant_backend.store_many.assert_awaited_once()
+    records = mock_qdrant_backend.store_many.call_args.args[0]
+    assert [r.outcome for r in records] == ["outcome"]
+
+
+@pytest.mark.asyncio
+async def test_buffered_writes_report_failures(memory_module_qdrant, mock_qdrant_backend):
+    """Test that flushed writes return the failed entries, and retries replace stale chunks."""
+    # arrange:
+    memory_module_qdrant.chunker = TextChunker(max_tokens=2, overlap_tokens=0)
+    memory_module_qdrant.ingest = AsyncMock(side_effect=[RuntimeError("backend down"), "a"])
+    long_entry = {"id": "a", "event": "e", "action": "a", "outcome": "one two three four"}
+    short_entry = {"id": "b", "event": "e", "action": "a", "outcome": "one"}
+
+    # act:
+    failed = await memory_module_qdrant._store_buffered([short_entry, long_entry])
+    retried = await memory_module_qdrant._store_buffered([{**long_entry, "attempts": 1}])
+
+    # assert:
+    assert failed == [long_entry]
+    assert retried == []
+    mock_qdrant_backend.store_many.assert_awaited_once()
+    mock_qdrant_backend.delete.assert_awaited_once_with(MemoryFilter(fields={"parent_id": "a"}))
+    assert memory_module_qdrant.ingest.await_args_list[-1].kwargs["parent_id"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_memory_module_local_backend(mock_embedding_generator, tmp_path):
+    """Test storing and searching memories with the local backend."""
+    # arrange:
+    with patch(
+        "src.memory.memory_module.EmbeddingGenerator", return_value=mock_embedding_generator
+    ):
+        module = MemoryModule(
+            backend_type=MemoryBackendType.LOCAL, vector_size=3, local_path=str(tmp_path)
+        )
+
+    # act:
+    await module.store("event", "action", "outcome")
+    results = await module.search("query", top_k=1)
+    await module.close()
+
+    # assert:
+    assert isinstance(module.backend, LocalBackend)
+    assert results[0]["outcome"] == "outcome"
+
+
+@pytest.mark.asyncio
+async def test_local_store_is_opened_by_one_memory_module(mock_embedding_generator, tmp_path):
+    """Test that memory modules share the process-wide module instead of opening a store twice."""
+    # arrange:
+    with patch(
+        "src.memory.memory_module.EmbeddingGenerator", return_value=mock_embedding_generator
+    ):
+        module = MemoryModule(
+            backend_type=MemoryBackendType.LOCAL, vector_size=3, local_path=str(tmp_path)
+        )
+
+        # act & assert:
+        with pytest.raises(MemoryError, match="already open"):
+            MemoryModule(
+                backend_type=MemoryBackendType.LOCAL, vector_size=3, local_path=str(tmp_path)
+            )
+    with (
+        patch.dict("src.memory.memory_module._memory_modules", clear=True),
+        patch("src.memory.memory_module.MemoryModule", return_value=module) as module_class,
+    ):
+        assert get_memory_module(backend_type=MemoryBackendType.LOCAL) is module
+        assert get_memory_module(backend_type=MemoryBackendType.LOCAL) is module
+    module_class.assert_called_once()
+    await module.close()
+
+
+@pytest.fixture
+def memory_module_lexical(mock_embedding_generator, mock_qdrant_backend):
+    """Create a MemoryModule instance with QdrantBackend and an in-memory keyword index."""
+    with (
+        patch("src.memory.memory_module.QdrantBackend", return_value=mock_qdrant_backend),
+        patch("src.memory.memory_module.EmbeddingGenerator", return_value=mock_embedding_generator),
+        patch("src.memory.memory_module.get_lexical_index", lambda: BM25Index(path="")),
+    ):
+        return MemoryModule(backend_type=MemoryBackendType.QDRANT, lexical_index=True)
+
+
+@pytest.mark.asyncio
+async def test_lexical_search_needs_no_embedding(
+    memory_module_lexical, mock_embedding_generator, mock_qdrant_backend
+):
+    """Test that lexical search answers from the keyword index without an embedding request."""
+    # arrange:
+    await memory_module_lexical.store("news", "post_tweet", "bitcoin etf approved")
+    await memory_module_lexical.store("news", "post_tweet", "ethereum upgrade shipped")
+    mock_embedding_generator.get_embedding.reset_mock()
+
+    # act:
+    results = await memory_module_lexical.search("ethereum", top_k=1, mode=SearchMode.LEXICAL)
+
+    # assert:
+    mock_embedding_generator.get_embedding.assert_not_called()
+    mock_qdrant_backend.search.assert_not_called()
+    assert [r["outcome"] for r in results] == ["ethereum upgrade shipped"]
+
+
+@pytest.mark.asyncio
+async def test_hybrid_search_fuses_vector_and_lexical_results(
+    memory_module_lexical, mock_qdrant_backend
+):
+    """Test that hybrid search ranks memories found by both retrievers first."""
+    # arrange:
+    await memory_module_lexical.store("news", "post_tweet", "bitcoin etf approved")
+    await memory_module_lexical.store("news", "post_tweet", "ethereum upgrade shipped")
+    mock_qdrant_backend.search.return_value = [
+        {"event": "news", "action": "post_tweet", "outcome": "solana outage"},
+        {"event": "news", "action": "post_tweet", "outcome": "ethereum upgrade shipped"},
+    ]
+
+    # act:
+    results = await memory_module_lexical.search("ethereum upgrade", top_k=2)
+
+    # assert:
+    assert [r["outcome"] for r in results] == ["ethereum upgrade shipped", "solana outage"]
+
+
+@pytest.mark.asyncio
+async def test_lexical_search_without_index_fails(memory_module_qdrant):
+    """Test that lexical search is rejected without the keyword index."""
+    with pytest.raises(ValueError):
+        await memory_module_qdrant.search("query", mode=SearchMode.LEXICAL)
+
+
+@pytest.mark.asyncio
+async def test_search_passes_filters_to_backend(memory_module_qdrant, mock_qdrant_backend):
+    """Test that filter and time range arguments reach the backend as one memory filter."""
+    # arrange:
+    mock_qdrant_backend.search.return_value = []
+    since = datetime(2025, 1, 1, tzinfo=timezone.utc)
+
+    # act:
+    await memory_module_qdrant.search("query", filters={"action": "analyze_news"}, since=since)
+
+    # assert:
+    assert mock_qdrant_backend.search.call_args.kwargs["memory_filter"] == MemoryFilter(
+        fields={"action": "analyze_news"}, since=since
+    )
+
+
+@pytest.mark.asyncio
+async def test_recent_needs_no_embedding(
+    memory_module_qdrant, mock_embedding_generator, mock_qdrant_backend
+):
+    """Test that recency queries skip embeddings and collapse chunks of one memory."""
+    # arrange:
+    mock_qdrant_backend.recent.side_effect = [
+        [{"event": "a", "parent_id": "p"}, {"event": "b", "parent_id": "p"}],
+        [{"event": "a", "parent_id": "p"}, {"event": "b", "parent_id": "p"}, {"event": "c"}],
+    ]
+
+    # act:
+    results = await memory_module_qdrant.recent(top_k=2, filters={"action": "analyze_news"})
+
+    # assert:
+    mock_embedding_generator.get_embedding.assert_not_called()
+    assert mock_qdrant_backend.recent.call_args.args[1] == MemoryFilter(
+        fields={"action": "analyze_news"}
+    )
+    assert [r["event"] for r in results] == ["a", "c"]
+
+
+@pytest.mark.asyncio
+async def test_delete_needs_a_filter(memory_module_lexical, mock_qdrant_backend):
+    """Test that deletions reach the backend and the keyword index, and need a filter."""
+    # arrange:
+    await memory_module_lexical.store("news", "post_tweet", "bitcoin etf approved")
+
+    # act:
+    await memory_module_lexical.delete(filters={"action": "post_tweet"})
+    with pytest.raises(ValueError):
+        await memory_module_lexical.delete()
+
+    # assert:
+    mock_qdrant_backend.delete.assert_called_once_with(
+        MemoryFilter(fields={"action": "post_tweet"})
+    )
+    assert len(memory_module_lexical.lexical_index) == 0
+
+
+@pytest.mark.asyncio
+async def test_lifecycle_merges_repeated_memories(mock_embedding_generator, mock_qdrant_backend):
+    """Test that a repeat of a recent memory is counted instead of embedded and stored."""
+    # arrange:
+    with (
+        patch("src.memory.memory_module.QdrantBackend", return_value=mock_qdrant_backend),
+        patch("src.memory.memory_module.EmbeddingGenerator", return_value=mock_embedding_generator),
+    ):
+        module = MemoryModule(backend_type=MemoryBackendType.QDRANT, lifecycle=True)
+
+    # act:
+    await module.store("tick", "idle", "nothing to do")
+    await module.store("tick", "idle", "Nothing  to do")
+
+    # assert:
+    mock_qdrant_backend.store.assert_called_once()
+    mock_embedding_generator.get_embedding.assert_called_once()
+    await module.close()
+    mock_qdrant_backend.delete.assert_called_once()
+    aggregate = mock_qdrant_backend.store_many.call_args.args[0][0]
+    assert aggregate.metadata["count"] == 2
@@ -0,0 +1,155 @@
+import time
+from datetime import datetime, timedelta, timezone
+from unittest.mock import AsyncMock, MagicMock, patch
+
+import pytest
+
+from src.memory.signal_index import BloomFilter, ProcessedSignalIndex, normalize_signal, signal_key
+
+
+def test_normalize_signal():
+    """Test that case, width and spacing differences are normalized away."""
+    assert normalize_signal("  BTC\tbreaks  ＡＴＨ\n") == "btc breaks ath"
+    assert signal_key("BTC breaks ATH") == signal_key("btc  breaks ath ")
+    assert signal_key("BTC breaks ATH") != signal_key("ETH breaks ATH")
+
+
+def test_bloom_filter():
+    """Test that added keys are found and the false positive rate stays low."""
+    # arrange:
+    bloom = BloomFilter(capacity=1000, error_rate=0.01)
+    keys = [signal_key(f"signal {i}") for i in range(1000)]
+
+    # act:
+    for key in keys:
+        bloom.add(key)
+    false_positives = sum(signal_key(f"other {i}") in bloom for i in range(1000))
+
+    # assert:
+    assert all(key in bloom for key in keys)
+    assert false_positives < 30
+
+
+def test_seen_after_add():
+    """Test that added signals are seen and other signals aren't."""
+    # arrange:
+    index = ProcessedSignalIndex(path="", ttl=0)
+
+    # act:
+    index.add("BTC breaks ATH")
+
+    # assert:
+    assert index.seen("btc breaks ath")
+    assert not index.seen("ETH breaks ATH")
+    assert len(index) == 1
+
+
+def test_signals_expire():
+    """Test that signals older than the TTL are no longer seen and are pruned."""
+    # arrange:
+    index = ProcessedSignalIndex(path="", ttl=60)
+    with patch("src.memory.signal_index.time.time", return_value=time.time() - 120):
+        index.add("old signal")
+    index.add("new signal")
+
+    # act & assert:
+    assert not index.seen("old signal")
+    assert index.seen("new signal")
+    assert index.prune() == 1
+    assert len(index) == 1
+
+
+def test_index_is_persisted(tmp_path):
+    """Test that processed signals survive a restart."""
+    # arrange:
+    path = str(tmp_path / "signals.sqlite3")
+    index = ProcessedSignalIndex(path=path)
+    index.add("BTC breaks ATH")
+    index.close()
+
+    # act:
+    reloaded = ProcessedSignalIndex(path=path)
+
+    # assert:
+    assert reloaded.seen("BTC breaks ATH")
+    assert reloaded.bloom is not None and signal_key("BTC breaks ATH") in reloaded.bloom
+    reloaded.close()
+
+
+def test_bloom_filter_skips_store_for_new_signals():
+    """Test that lookups of new signals are answered by the Bloom filter alone."""
+    # arrange:
+    index = ProcessedSignalIndex(path="", bloom_capacity=100)
+    index.close()
+
+    # act & assert:
+    assert not index.seen("never added")
+
+
+@pytest.mark.asyncio
+async def test_empty_index_is_seeded_once_from_memory():
+    """Test that an empty index records the signals of analyzed memories, and only once."""
+    # arrange:
+    index = ProcessedSignalIndex(path="", ttl=60)
+    memory = MagicMock()
+    now = datetime.now(timezone.utc)
+    memory.recent = AsyncMock(
+        return_value=[
+            {"event": "BTC breaks ATH", "action": "analyze_signal", "timestamp_unix": time.time()},
+            # Stored before the `timestamp_unix` field existed
+            {"event": "ETH breaks ATH", "action": "analyze_signal", "timestamp": now.isoformat()},
+            {
+                "event": "SOL breaks ATH",
+                "action": "analyze_signal",
+                "timestamp": (now - timedelta(minutes=5)).isoformat(),
+            },
+        ]
+    )
+
+    # act:
+    seeded = await index.seed(memory)
+    again = await index.seed(memory)
+
+    # assert:
+    assert (seeded, again) == (2, 0)
+    assert index.seen("btc breaks ath")
+    assert index.seen("ETH breaks ATH")
+    assert not index.seen("SOL breaks ATH")
+    memory.recent.assert_awaited_once()
+    assert memory.recent.await_args_list[0].kwargs == {
+        "top_k": 10000,
+        "filters": {"action": "analyze_signal"},
+    }
+
+
+@pytest.mark.asyncio
+async def test_seeding_is_retried_when_nothing_was_read():
+    """Test that an empty index reads memory again when the previous seeding found nothing."""
+    # arrange:
+    index = ProcessedSignalIndex(path="")
+    memory = MagicMock()
+    memory.recent = AsyncMock(side_effect=[[], [{"event": "BTC breaks ATH"}]])
+
+    # act:
+    seeded = [await index.seed(memory) for _ in range(3)]
+
+    # assert:
+    assert seeded == [0, 1, 0]
+    assert memory.recent.await_count == 2
+
+
+@pytest.mark.asyncio
+async def test_index_with_signals_is_not_seeded():
+    """Test that an index that already has signals doesn't read memory."""
+    # arrange:
+    index = ProcessedSignalIndex(path="")
+    index.add("BTC breaks ATH")
+    memory = MagicMock()
+    memory.recent = AsyncMock()
+
+    # act:
+    seeded = await index.seed(memory)
+
+    # assert:
+    assert seeded == 0
+    memory.recent.assert_not_called()
@@ -0,0 +1,196 @@
+import asyncio
+import json
+from unittest.mock import AsyncMock
+
+import pytest
+
+from src.core.exceptions import MemoryError
+from src.memory.write_buffer import WriteBehindBuffer
+
+
+def _entry(i):
+    return {"event": f"event {i}", "action": "action", "outcome": "outcome", "metadata": None}
+
+
+def _flushed(handler, call=-1):
+    """Entries passed to a flush handler call, without the fields added by the buffer."""
+    entries = handler.await_args_list[call].args[0]
+    return [{k: v for k, v in e.items() if k not in ("id", "attempts")} for e in entries]
+
+
+@pytest.mark.asyncio
+async def test_flushes_when_flush_size_is_reached():
+    """Test that a full batch of entries is flushed in the background."""
+    # arrange:
+    handler = AsyncMock()
+    buffer = WriteBehindBuffer(handler, max_size=10, flush_size=2, flush_interval=0, spill_path="")
+
+    # act:
+    await buffer.put(_entry(1))
+    await asyncio.sleep(0)
+    handler.assert_not_awaited()
+    await buffer.put(_entry(2))
+    await asyncio.sleep(0)
+
+    # assert:
+    handler.assert_awaited_once()
+    assert _flushed(handler) == [_entry(1), _entry(2)]
+    assert len(buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_flushes_periodically():
+    """Test that entries are flushed after the flush interval."""
+    # arrange:
+    handler = AsyncMock()
+    buffer = WriteBehindBuffer(
+        handler, max_size=10, flush_size=10, flush_interval=0.01, spill_path=""
+    )
+
+    # act:
+    await buffer.put(_entry(1))
+    await asyncio.sleep(0.05)
+    await buffer.close()
+
+    # assert:
+    handler.assert_awaited_once()
+    assert _flushed(handler) == [_entry(1)]
+
+
+@pytest.mark.asyncio
+async def test_full_buffer_waits_for_flush():
+    """Test that writes to a full buffer flush it first and raise its errors."""
+    # arrange:
+    handler = AsyncMock(side_effect=[RuntimeError("backend down"), None])
+    buffer = WriteBehindBuffer(handler, max_size=1, flush_size=1, flush_interval=0, spill_path="")
+    buffer._pending.append(_entry(1))
+
+    # act & assert:
+    with pytest.raises(RuntimeError):
+        await buffer.put(_entry(2))
+    assert len(buffer) == 1
+
+    await buffer.put(_entry(2))
+    await buffer.close()
+    assert _flushed(handler) == [_entry(2)]
+
+
+@pytest.mark.asyncio
+async def test_failed_flush_keeps_entries():
+    """Test that entries of a failed flush are retried with the next one."""
+    # arrange:
+    handler = AsyncMock(side_effect=[RuntimeError("backend down"), None])
+    buffer = WriteBehindBuffer(handler, max_size=10, flush_size=10, flush_interval=0, spill_path="")
+    await buffer.put(_entry(1))
+
+    # act:
+    await buffer.flush()
+    await buffer.flush()
+
+    # assert:
+    assert handler.await_count == 2
+    assert _flushed(handler, 1) == [_entry(1)]
+    assert len(buffer) == 0
+
+
+@pytest.mark.asyncio
+async def test_spill_file_recovers_unflushed_entries(tmp_path):
+    """Test that entries buffered by a previous run are loaded from the spill file."""
+    # arrange:
+    spill_path = str(tmp_path / "spill.jsonl")
+    crashed = WriteBehindBuffer(
+        AsyncMock(), max_size=10, flush_size=10, flush_interval=0, spill_path=spill_path
+    )
+    await crashed.put(_entry(1))
+    await crashed.put(_entry(2))
+    # The process died, releasing its lock on the spill file
+    assert crashed._spill_lock is not None
+    crashed._spill_lock.close()
+    with open(spill_path, "a") as spill:
+        spill.write('{"event": "partial')
+
+    # act:
+    handler = AsyncMock()
+    buffer = WriteBehindBuffer(
+        handler, max_size=10, flush_size=10, flush_interval=0, spill_path=spill_path
+    )
+    await buffer.close()
+
+    # assert:
+    handler.assert_awaited_once()
+    assert _flushed(handler) == [_entry(1), _entry(2)]
+    assert not (tmp_path / "spill.jsonl").exists()
+
+
+@pytest.mark.asyncio
+async def test_spill_file_is_used_by_one_buffer(tmp_path):
+    """Test that a second buffer on a spill file in use fails instead of flushing its entries."""
+    # arrange:
+    spill_path = str(tmp_path / "spill.jsonl")
+    handler = AsyncMock()
+    buffer = WriteBehindBuffer(
+        handler, max_size=10, flush_size=10, flush_interval=0, spill_path=spill_path
+    )
+    await buffer.put(_entry(1))
+
+    # act & assert:
+    with pytest.raises(MemoryError, match="already open"):
+        WriteBehindBuffer(
+            AsyncMock(), max_size=10, flush_size=10, flush_interval=0, spill_path=spill_path
+        )
+    await buffer.close()
+    reopened = WriteBehindBuffer(
+        AsyncMock(), max_size=10, flush_size=10, flush_interval=0, spill_path=spill_path
+    )
+    assert _flushed(handler) == [_entry(1)]
+    assert len(reopened) == 0
+    await reopened.close()
+
+
+@pytest.mark.asyncio
+async def test_recovered_entries_are_flushed_without_new_writes(tmp_path):
+    """Test that entries recovered from the spill file are flushed once the loop runs."""
+    # arrange:
+    spill_path = str(tmp_path / "spill.jsonl")
+    with open(spill_path, "w") as spill:
+        spill.write(json.dumps({**_entry(1), "id": "a"}) + "\n")
+    handler = AsyncMock()
+
+    # act:
+    WriteBehindBuffer(handler, max_size=10, flush_size=10, flush_interval=0, spill_path=spill_path)
+    await asyncio.sleep(0)
+
+    # assert:
+    assert _flushed(handler) == [_entry(1)]
+    assert handler.await_args_list[0].args[0][0]["id"] == "a"
+
+
+@pytest.mark.asyncio
+async def test_only_failed_entries_are_retried_then_given_up(tmp_path):
+    """Test that written entries aren't resent, and failing ones end in the dead-letter file."""
+    # arrange:
+    dead_letter_path = tmp_path / "dead.jsonl"
+    handler = AsyncMock(side_effect=lambda batch: [e for e in batch if e["event"] == "event 2"])
+    buffer = WriteBehindBuffer(
+        handler,
+        max_size=2,
+        flush_size=10,
+        flush_interval=0,
+        spill_path="",
+        max_attempts=2,
+        dead_letter_path=str(dead_letter_path),
+    )
+    await buffer.put(_entry(1))
+    await buffer.put(_entry(2))
+
+    # act:
+    await buffer.flush()
+    await buffer.put(_entry(3))
+    await buffer.flush()
+
+    # assert:
+    assert _flushed(handler, 0) == [_entry(1), _entry(2)]
+    assert _flushed(handler, 1) == [_entry(2), _entry(3)]
+    assert len(buffer) == 0
+    [dead] = [json.loads(line) for line in dead_letter_path.read_text().splitlines()]
+    assert (dead["event"], dead["attempts"]) == ("event 2", 2)
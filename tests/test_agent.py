@@ -30,8 +30,9 @@ def agent():
         # Make store method a coroutine
         agent.memory_module = MagicMock()
         agent.memory_module.store = AsyncMock()
-        # Make search method a coroutine
+        # Make search methods coroutines
         agent.memory_module.search = AsyncMock()
+        agent.memory_module.recent = AsyncMock()
         return agent
 
 
@@ -159,7 +160,7 @@ async def test_perform_planned_action_analyze_news(agent, mock_logger):
     """Test performing ANALYZE_NEWS action."""
     # arrange:
     mock_info, mock_debug = mock_logger
-    agent.memory_module.search.return_value = [{"event": "Test news"}]
+    agent.memory_module.recent.return_value = [{"event": "Test news"}]
     mock_analyze = AsyncMock(return_value="News analyzed")
 
     with patch("src.agent.analyze_news_workflow", mock_analyze):
@@ -170,7 +171,10 @@ async def test_perform_planned_action_analyze_news(agent, mock_logger):
         assert outcome == "News analyzed"
         mock_debug.assert_any_call("Retrieved memories: [{'event': 'Test news'}]")
         mock_debug.assert_any_call("Stored performed action to memory.")
-        agent.memory_module.search.assert_called_once_with("news", top_k=1)
+        agent.memory_module.recent.assert_called_once_with(
+            top_k=1, filters={"action": AgentAction.ANALYZE_NEWS.value}
+        )
+        agent.memory_module.search.assert_not_called()
         agent.memory_module.store.assert_called_once()
         mock_analyze.assert_called_once_with("Test news")
 
@@ -180,7 +184,7 @@ async def test_perform_planned_action_analyze_news_no_news(agent, mock_logger):
     """Test performing ANALYZE_NEWS action with no news found."""
     # arrange:
     mock_info, mock_debug = mock_logger
-    agent.memory_module.search.return_value = []
+    agent.memory_module.recent.return_value = []
     mock_analyze = AsyncMock(return_value="No news analyzed")
 
     with patch("src.agent.analyze_news_workflow", mock_analyze):
@@ -191,6 +195,9 @@ async def test_perform_planned_action_analyze_news_no_news(agent, mock_logger):
         assert outcome == "No news analyzed"
         mock_debug.assert_any_call("Retrieved memories: []")
         mock_debug.assert_any_call("Stored performed action to memory.")
-        agent.memory_module.search.assert_called_once_with("news", top_k=1)
+        agent.memory_module.recent.assert_called_once_with(
+            top_k=1, filters={"action": AgentAction.ANALYZE_NEWS.value}
+        )
+        agent.memory_module.search.assert_not_called()
         agent.memory_module.store.assert_called_once()
         mock_analyze.assert_called_once_with("No recent news found")
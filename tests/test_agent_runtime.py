@@ -34,6 +34,7 @@ def runtime_agent():
         # Mock memory module methods
         agent.memory_module = MagicMock()
         agent.memory_module.store = AsyncMock()
+        agent.memory_module.start = AsyncMock()
         agent.memory_module.search = AsyncMock()
         # Mock planning module methods
         agent.planning_module = MagicMock()
@@ -1,8 +1,9 @@
-from unittest.mock import MagicMock, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from loguru import logger
 
+from src.core.defs import LLMProviderType
 from src.main import async_main, main
 
 
@@ -24,6 +25,7 @@ def mock_agent():
     # arrange:
     with patch("src.main.Agent") as mock:
         agent_instance = MagicMock()
+        agent_instance.memory_module.close = AsyncMock()
         mock.return_value = agent_instance
         yield agent_instance
 
@@ -57,6 +59,40 @@ async def test_async_main_error(mock_logger, mock_agent):
     mock_info.assert_any_call("Starting the agent runtime...")
     mock_info.assert_any_call("Agent runtime has stopped.")
     mock_critical.assert_called_once_with("Fatal error in the runtime: Test error")
+    mock_agent.memory_module.close.assert_awaited_once()
+
+
+@pytest.mark.asyncio
+async def test_async_main_warms_up_llama(mock_logger, mock_agent, monkeypatch):
+    """Test that the local Llama model is loaded before the runtime loop starts."""
+    # arrange:
+    monkeypatch.setattr("src.main.settings.LLM_PROVIDER", LLMProviderType.LLAMA)
+
+    with (
+        patch("src.main.warmup_llama", AsyncMock()) as mock_warmup,
+        patch("src.main.unload_llama") as mock_unload,
+    ):
+        # act:
+        await async_main()
+
+    # assert:
+    mock_warmup.assert_awaited_once()
+    mock_agent.start_runtime_loop.assert_called_once()
+    mock_unload.assert_called_once()
+
+
+@pytest.mark.asyncio
+async def test_async_main_closes_clients(mock_logger, mock_agent):
+    """Test that the shared API clients are closed when the runtime stops."""
+    # arrange:
+    mock_agent.start_runtime_loop.side_effect = Exception("Test error")
+
+    with patch("src.main.close_clients", AsyncMock()) as mock_close:
+        # act:
+        await async_main()
+
+    # assert:
+    mock_close.assert_awaited_once()
 
 
 def test_main_success(mock_logger):
@@ -108,7 +108,7 @@ async def test_process_files_for_memories(github_integration, mock_repo, temp_di
     # Setup
     github_integration.current_repo = mock_repo
     mock_memory_module = AsyncMock()  # Use AsyncMock for async methods
-    mock_memory_module.exists.return_value = False
+    mock_memory_module.recent.return_value = []
 
     # Create actual test file
     test_file_path = os.path.join(temp_dir, "test.txt")
@@ -119,11 +119,36 @@ async def test_process_files_for_memories(github_integration, mock_repo, temp_di
     await github_integration.process_files_for_memories(["test.txt"], mock_memory_module)
 
     # Verify
-    mock_memory_module.store.assert_called_once()
-    stored_data = mock_memory_module.store.call_args[0][0]
-    assert stored_data["type"] == "file"
-    assert stored_data["path"] == "test.txt"
-    assert stored_data["content"] == "test content"
+    mock_memory_module.ingest.assert_called_once()
+    stored_data = mock_memory_module.ingest.call_args.kwargs
+    assert stored_data["metadata"]["type"] == "file"
+    assert stored_data["metadata"]["path"] == "test.txt"
+    assert stored_data["text"] == "test content"
+    assert stored_data["parent_id"] == stored_data["metadata"]["hash"]
+    mock_memory_module.delete.assert_called_once_with(
+        filters={"action": "store_file", "path": "test.txt"}
+    )
+
+
+@pytest.mark.asyncio
+async def test_process_files_for_memories_skips_stored_files(
+    github_integration, mock_repo, temp_dir
+):
+    """Test that files whose content is already stored are not ingested again."""
+    # Setup
+    github_integration.current_repo = mock_repo
+    mock_memory_module = AsyncMock()
+    mock_memory_module.recent.return_value = [{"parent_id": "hash", "chunk_index": 0}]
+    with open(os.path.join(temp_dir, "test.txt"), "w") as f:
+        f.write("test content")
+
+    # Test
+    await github_integration.process_files_for_memories(["test.txt"], mock_memory_module)
+
+    # Verify
+    assert mock_memory_module.recent.call_args.kwargs["filters"]["parent_id"]
+    mock_memory_module.ingest.assert_not_called()
+    mock_memory_module.delete.assert_not_called()
 
 
 @pytest.mark.asyncio
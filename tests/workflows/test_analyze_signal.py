@@ -1,9 +1,16 @@
-from unittest.mock import AsyncMock, MagicMock, call, patch
+from unittest.mock import AsyncMock, MagicMock, patch
 
 import pytest
 from loguru import logger
 
-from src.workflows.analyze_signal import analyze_signal
+from src.memory.signal_index import ProcessedSignalIndex
+from src.workflows.analyze_signal import analyze_signal, stream_tweet_text
+
+
+async def stream_deltas(deltas):
+    """Yield text deltas like `LLM.stream_response`."""
+    for delta in deltas:
+        yield delta
 
 
 @pytest.fixture
@@ -23,12 +30,21 @@ def mock_memory():
     """Create a mock memory module."""
     memory = MagicMock()
     memory.search = AsyncMock()
+    memory.recent = AsyncMock()
     memory.store = AsyncMock()
     return memory
 
 
+@pytest.fixture
+def signal_index():
+    """Create an in-memory processed-signal index."""
+    index = ProcessedSignalIndex(path="")
+    yield index
+    index.close()
+
+
 @pytest.mark.asyncio
-async def test_analyze_signal_success(mock_workflow_logger, mock_memory):
+async def test_analyze_signal_success(mock_workflow_logger, mock_memory, signal_index):
     """Test successful signal analysis and tweet posting."""
     # arrange:
     mock_info, mock_warning, mock_error = mock_workflow_logger
@@ -38,17 +54,17 @@ async def test_analyze_signal_success(mock_workflow_logger, mock_memory):
 
     # Mock fetch_signal
     mock_fetch = AsyncMock(return_value={"status": "new_signal", "content": signal_content})
-    # Mock memory search (no recent signals)
-    mock_memory.search.side_effect = [
-        [],  # No recent signals
-        [  # Recent memories for context
+    # Mock no previously analyzed signals, then recent memories for context
+    mock_memory.recent.side_effect = [
+        [],
+        [
             {"event": "event1", "outcome": "outcome1"},
             {"event": "event2", "outcome": "outcome2"},
         ],
     ]
     # Mock LLM
-    mock_llm = AsyncMock()
-    mock_llm.generate_response = AsyncMock(return_value="Test analysis")
+    mock_llm = MagicMock()
+    mock_llm.stream_response = MagicMock(return_value=stream_deltas(["Test ", "analysis"]))
     # Mock Twitter post
     mock_post = AsyncMock(return_value=[tweet_id])
 
@@ -58,15 +74,15 @@ async def test_analyze_signal_success(mock_workflow_logger, mock_memory):
         patch("src.workflows.analyze_signal.post_twitter_thread", mock_post),
     ):
         # act:
-        result = await analyze_signal(memory=mock_memory)
+        result = await analyze_signal(memory=mock_memory, signal_index=signal_index)
 
     # assert:
     assert result == tweet_id
     mock_fetch.assert_called_once()
-    mock_memory.search.assert_has_calls(
-        [call(signal_content, top_k=1), call("recent events", top_k=3)]
-    )
-    mock_llm.generate_response.assert_called_once()
+    mock_memory.recent.assert_called_with(top_k=3)
+    mock_memory.search.assert_not_called()
+    assert signal_index.seen(signal_content)
+    mock_llm.stream_response.assert_called_once()
     mock_post.assert_called_once_with(tweets={"tweet1": tweet_text})
     mock_memory.store.assert_called_once()
     mock_info.assert_any_call(f"Received signal: {signal_content}")
@@ -76,30 +92,54 @@ async def test_analyze_signal_success(mock_workflow_logger, mock_memory):
 
 
 @pytest.mark.asyncio
-async def test_analyze_signal_already_processed(mock_workflow_logger, mock_memory):
+async def test_analyze_signal_already_processed(mock_workflow_logger, mock_memory, signal_index):
     """Test when signal was already processed."""
     # arrange:
     mock_info, mock_warning, mock_error = mock_workflow_logger
     signal_content = "Test signal content"
+    signal_index.add("  test SIGNAL content ")
 
     # Mock fetch_signal
     mock_fetch = AsyncMock(return_value={"status": "new_signal", "content": signal_content})
-    # Mock memory search (signal already exists)
-    mock_memory.search.return_value = [{"event": signal_content}]
 
     with patch("src.workflows.analyze_signal.fetch_signal", mock_fetch):
         # act:
-        result = await analyze_signal(memory=mock_memory)
+        result = await analyze_signal(memory=mock_memory, signal_index=signal_index)
 
     # assert:
     assert result is None
     mock_fetch.assert_called_once()
-    mock_memory.search.assert_called_once_with(signal_content, top_k=1)
+    mock_memory.recent.assert_not_called()
     mock_info.assert_any_call("Signal already processed, skipping analysis")
     mock_warning.assert_not_called()
     mock_error.assert_not_called()
 
 
+@pytest.mark.asyncio
+async def test_analyze_signal_processed_before_the_index(
+    mock_workflow_logger, mock_memory, signal_index
+):
+    """Test that a signal stored in memory before the index existed isn't processed again."""
+    # arrange:
+    mock_info, mock_warning, mock_error = mock_workflow_logger
+    signal_content = "Test signal content"
+    mock_memory.recent.return_value = [
+        {"event": signal_content, "action": "analyze_signal", "outcome": "Tweet posted"}
+    ]
+    mock_fetch = AsyncMock(return_value={"status": "new_signal", "content": signal_content})
+
+    with patch("src.workflows.analyze_signal.fetch_signal", mock_fetch):
+        # act:
+        result = await analyze_signal(memory=mock_memory, signal_index=signal_index)
+
+    # assert:
+    assert result is None
+    mock_memory.recent.assert_called_once()
+    mock_memory.store.assert_not_called()
+    mock_info.assert_any_call("Signal already processed, skipping analysis")
+    mock_error.assert_not_called()
+
+
 @pytest.mark.asyncio
 async def test_analyze_signal_no_data(mock_workflow_logger, mock_memory):
     """Test when no signal is available."""
@@ -116,7 +156,7 @@ async def test_analyze_signal_no_data(mock_workflow_logger, mock_memory):
     # assert:
     assert result is None
     mock_fetch.assert_called_once()
-    mock_memory.search.assert_not_called()
+    mock_memory.recent.assert_not_called()
     mock_info.assert_any_call("No actionable signal detected.")
     mock_warning.assert_not_called()
     mock_error.assert_not_called()
@@ -138,7 +178,7 @@ async def test_analyze_signal_unknown_format(mock_workflow_logger, mock_memory):
     # assert:
     assert result is None
     mock_fetch.assert_called_once()
-    mock_memory.search.assert_not_called()
+    mock_memory.recent.assert_not_called()
     mock_warning.assert_called_once_with("Received an unknown signal format or an error occurred.")
     mock_error.assert_not_called()
 
@@ -159,6 +199,60 @@ async def test_analyze_signal_error(mock_workflow_logger, mock_memory):
     # assert:
     assert result is None
     mock_fetch.assert_called_once()
-    mock_memory.search.assert_not_called()
+    mock_memory.recent.assert_not_called()
     mock_error.assert_called_once_with("Error in analyze_and_post_signal workflow: Test error")
     mock_warning.assert_not_called()
+
+
+@pytest.mark.asyncio
+async def test_stream_tweet_text_stops_at_limit():
+    """Test that generation is stopped once the tweet no longer fits."""
+    # arrange:
+    consumed: list = []
+
+    async def deltas():
+        try:
+            for delta in ["Tweet: "] + ["word "] * 100:
+                consumed.append(delta)
+                yield delta
+        finally:
+            consumed.append("closed")
+
+    mock_llm = MagicMock()
+    mock_llm.stream_response = MagicMock(return_value=deltas())
+
+    # act:
+    text = await stream_tweet_text(mock_llm, [{"role": "user", "content": "Test"}], 22)
+
+    # assert:
+    assert text == "word word word word"
+    assert consumed == ["Tweet: "] + ["word "] * 5 + ["closed"]
+
+
+@pytest.mark.asyncio
+async def test_stream_tweet_text_skips_analysis_before_the_tweet():
+    """Test that the tweet is taken from after the tweet line, not from the analysis before it."""
+    # arrange:
+    deltas = ["The signal shows ", "a long rally. " * 30, "\n\n**Tweet:** BTC ", "breaks out!"]
+    mock_llm = MagicMock()
+    mock_llm.stream_response = MagicMock(return_value=stream_deltas(deltas))
+
+    # act:
+    text = await stream_tweet_text(mock_llm, [{"role": "user", "content": "Test"}], 100)
+
+    # assert:
+    assert text == "BTC breaks out!"
+
+
+@pytest.mark.asyncio
+async def test_stream_tweet_text_cuts_long_word():
+    """Test that a response without word boundaries is cut at the limit."""
+    # arrange:
+    mock_llm = MagicMock()
+    mock_llm.stream_response = MagicMock(return_value=stream_deltas(["x" * 30]))
+
+    # act:
+    text = await stream_tweet_text(mock_llm, [{"role": "user", "content": "Test"}], 10)
+
+    # assert:
+    assert text == "x" * 10